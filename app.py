@@ -1,26 +1,51 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_file, Response
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_file, Response, stream_with_context, g, make_response
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import selectinload, undefer
+from sqlalchemy.exc import IntegrityError
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_mail import Mail, Message as MailMessage
 from flask_babel import Babel, gettext, ngettext, get_locale
+from babel.support import Translations as BabelTranslations
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import datetime, timedelta
 import pytz
 import qrcode
 from io import BytesIO
+import io
 import base64
+import csv
 import json
 from dotenv import load_dotenv
 import secrets
 import cv2
 import openpyxl
-from openpyxl.styles import Font, Alignment
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
 from pywebpush import webpush, WebPushException
+from py_vapid import Vapid
 import random
 import string
+import smtplib
+import tempfile
+import threading
+import time
+import zipfile
+import hashlib
+import hmac
+import atexit
+import queue
+import struct
+from functools import wraps
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from qr_scanner import QRDecodePool
 
 load_dotenv()
 
@@ -33,7 +58,7 @@ def get_turkey_time():
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///cafe_loyalty.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///cafe_loyalty.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # UTF-8 encoding configuration for Turkish characters
@@ -70,12 +95,73 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 # Dış linkler için temel alan adı (örn. şifre sıfırlama linki)
 app.config['BASE_URL'] = os.environ.get('BASE_URL', 'https://reevpoints.tr')
 
+# Push bildirim kuyruğu (outbox) ve arka plan dağıtıcı ayarları
+app.config['PUSH_DISPATCHER_ENABLED'] = os.environ.get('PUSH_DISPATCHER_ENABLED', 'True').lower() == 'true'
+app.config['PUSH_WORKERS'] = int(os.environ.get('PUSH_WORKERS', 8))
+app.config['PUSH_BATCH_SIZE'] = int(os.environ.get('PUSH_BATCH_SIZE', 100))
+app.config['PUSH_MAX_ATTEMPTS'] = int(os.environ.get('PUSH_MAX_ATTEMPTS', 5))
+app.config['PUSH_RETRY_BASE_SECONDS'] = int(os.environ.get('PUSH_RETRY_BASE_SECONDS', 30))
+app.config['PUSH_HTTP_TIMEOUT'] = int(os.environ.get('PUSH_HTTP_TIMEOUT', 10))
+
+# Kampanya bildirim/e-posta dağıtımı (fan-out) ayarları
+app.config['CAMPAIGN_FANOUT_CHUNK_SIZE'] = int(os.environ.get('CAMPAIGN_FANOUT_CHUNK_SIZE', 500))
+app.config['CAMPAIGN_EMAIL_PER_SECOND'] = float(os.environ.get('CAMPAIGN_EMAIL_PER_SECOND', 10))
+app.config['CAMPAIGN_FANOUT_STALE_SECONDS'] = int(os.environ.get('CAMPAIGN_FANOUT_STALE_SECONDS', 600))
+app.config['CAMPAIGN_FANOUT_MAX_ATTEMPTS'] = int(os.environ.get('CAMPAIGN_FANOUT_MAX_ATTEMPTS', 5))
+
+# Site ayarları önbelleği: sürüm sayacı en fazla bu aralıkla kontrol edilir
+app.config['SITE_SETTINGS_CHECK_SECONDS'] = float(os.environ.get('SITE_SETTINGS_CHECK_SECONDS', 5))
+app.config['CATALOG_CHECK_SECONDS'] = float(os.environ.get('CATALOG_CHECK_SECONDS', 5))
+
+# Mobil API token doğrulama önbelleği
+app.config['API_TOKEN_CACHE_SECONDS'] = float(os.environ.get('API_TOKEN_CACHE_SECONDS', 60))
+app.config['API_TOKEN_CACHE_SIZE'] = int(os.environ.get('API_TOKEN_CACHE_SIZE', 10000))
+# Token göndermeyen eski uygulama sürümleri için user_id parametresine izin ver
+app.config['API_ALLOW_LEGACY_USER_ID'] = os.environ.get('API_ALLOW_LEGACY_USER_ID', 'False').lower() == 'true'
+
+# QR çözümleme süreç havuzu (0 worker: istek iş parçacığında çözümle)
+app.config['QR_DECODE_WORKERS'] = int(os.environ.get('QR_DECODE_WORKERS', 2))
+app.config['QR_DECODE_MAX_PENDING'] = int(os.environ.get('QR_DECODE_MAX_PENDING', 8))
+app.config['QR_DECODE_TIMEOUT'] = float(os.environ.get('QR_DECODE_TIMEOUT', 5))
+
+# Akışlı QR okutma oturumları (şube kamera terminalleri)
+app.config['SCAN_STREAM_IDLE_SECONDS'] = float(os.environ.get('SCAN_STREAM_IDLE_SECONDS', 60))
+app.config['SCAN_STREAM_MAX_SESSIONS'] = int(os.environ.get('SCAN_STREAM_MAX_SESSIONS', 50))
+app.config['SCAN_STREAM_MAX_FRAME_BYTES'] = int(os.environ.get('SCAN_STREAM_MAX_FRAME_BYTES', 8 * 1024 * 1024))
+
+# İmzalı (satırsız) üye QR kodları: zaman adımı, geçerlilik penceresi ve okutma sınırı
+app.config['MEMBER_QR_SECRET'] = os.environ.get('MEMBER_QR_SECRET') or app.config['SECRET_KEY']
+app.config['MEMBER_QR_STEP_SECONDS'] = int(os.environ.get('MEMBER_QR_STEP_SECONDS', 60))
+app.config['MEMBER_QR_VALID_STEPS'] = int(os.environ.get('MEMBER_QR_VALID_STEPS', 5))
+app.config['MEMBER_QR_MAX_SCANS'] = int(os.environ.get('MEMBER_QR_MAX_SCANS', 3))
+app.config['MEMBER_QR_LIMIT_SECONDS'] = int(os.environ.get('MEMBER_QR_LIMIT_SECONDS', 600))
+
+# Şube terminali çevrimdışı okutma senkronizasyonu
+app.config['SCAN_SYNC_MAX_EVENTS'] = int(os.environ.get('SCAN_SYNC_MAX_EVENTS', 500))
+app.config['SCAN_SYNC_MAX_AGE_HOURS'] = int(os.environ.get('SCAN_SYNC_MAX_AGE_HOURS', 72))
+
+# Puan defteri özetleri: özetten sonra biriken satır eşiği ve commit bekleme payı
+app.config['POINT_SNAPSHOT_MIN_TAIL'] = int(os.environ.get('POINT_SNAPSHOT_MIN_TAIL', 20))
+app.config['POINT_SNAPSHOT_SETTLE_SECONDS'] = int(os.environ.get('POINT_SNAPSHOT_SETTLE_SECONDS', 60))
+
+# Idempotency-Key: tamamlanan yanıtların saklanma süresi ve yarım kalan isteğin kilit süresi
+app.config['IDEMPOTENCY_TTL_SECONDS'] = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 24 * 3600))
+app.config['IDEMPOTENCY_PENDING_SECONDS'] = int(os.environ.get('IDEMPOTENCY_PENDING_SECONDS', 60))
+
 # Dosya yükleme için izin verilen uzantılar
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# QR çözümleme havuzu ilk kullanımda başlatılır
+qr_decode_pool = QRDecodePool(
+    workers=app.config['QR_DECODE_WORKERS'],
+    max_pending=app.config['QR_DECODE_MAX_PENDING'],
+    timeout=app.config['QR_DECODE_TIMEOUT']
+)
+atexit.register(qr_decode_pool.shutdown)
+
 # Upload klasörünü oluştur
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -120,12 +206,16 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(100), unique=True, nullable=False)
     phone = db.Column(db.String(20), nullable=False)
     password_hash = db.Column(db.String(200), nullable=False)
-    points = db.Column(db.Integer, default=0)
+    # Defter öncesi bakiye: yalnızca açılış satırı için okunur (open_point_ledger), güncellenmez.
+    # Güncel bakiye User.points'tir (PointSnapshot'tan sonra tanımlanan defter ifadesi).
+    legacy_points = db.Column('points', db.Integer, default=0)
     is_admin = db.Column(db.Boolean, default=False)
     language = db.Column(db.String(5), default='tr')
     is_verified = db.Column(db.Boolean, default=False)
     verification_code = db.Column(db.String(6))
     auth_token = db.Column(db.String(100), unique=True, nullable=True)
+    # Mobil API token'ının SHA-256 özeti; düz token veritabanında tutulmaz
+    auth_token_hash = db.Column(db.String(64), unique=True, index=True, nullable=True)
     preferred_branch_id = db.Column(db.Integer, db.ForeignKey('branch.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=get_turkey_time)
     updated_at = db.Column(db.DateTime, default=get_turkey_time, onupdate=get_turkey_time)
@@ -146,8 +236,10 @@ class User(UserMixin, db.Model):
         return self.verification_code
     
     def generate_auth_token(self):
-        self.auth_token = secrets.token_urlsafe(32)
-        return self.auth_token
+        token = secrets.token_urlsafe(32)
+        self.auth_token = None
+        self.auth_token_hash = hash_api_token(token)
+        return token
 
 class Branch(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -164,7 +256,7 @@ class Branch(db.Model):
 
 class Transaction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     amount = db.Column(db.Float, nullable=False)
     points_earned = db.Column(db.Integer, default=0)
     points_used = db.Column(db.Integer, default=0)
@@ -175,6 +267,10 @@ class Transaction(db.Model):
 # Eski CustomerQR modeli (mevcut kod uyumluluğu için)
 class CustomerQR(db.Model):
     __tablename__ = 'customer_qr'
+    __table_args__ = (
+        # İmzalı üye kodlarında okutma sınırı müşterinin son okutmalarından sayılır
+        db.Index('idx_customer_qr_customer_used', 'customer_id', 'used_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     code = db.Column(db.String(100), unique=True, nullable=False)
     customer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -184,6 +280,118 @@ class CustomerQR(db.Model):
     created_at = db.Column(db.DateTime, default=get_turkey_time)
     used_at = db.Column(db.DateTime, nullable=True)
 
+# Günlük puan özeti: (kullanıcı, şube, gün) başına QR ile kazanılan puan
+# claim_customer_qr() ile aynı transaction içinde güncellenir; dashboard'lar ham QR geçmişi yerine buradan okur.
+class CustomerPointsDaily(db.Model):
+    __tablename__ = 'customer_points_daily'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    branch_id = db.Column(db.Integer, primary_key=True, default=0)  # 0: şubesiz okutma
+    day = db.Column(db.Date, primary_key=True)  # Türkiye saatine göre gün
+    points = db.Column(db.Integer, nullable=False, default=0)
+    scans = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('idx_points_daily_branch_day', 'branch_id', 'day'),
+    )
+
+# Kullanıcının şube bazında toplam ziyaret/puan özeti (en çok gidilen şube için)
+class CustomerBranchTotal(db.Model):
+    __tablename__ = 'customer_branch_total'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    branch_id = db.Column(db.Integer, primary_key=True, default=0)  # 0: şubesiz okutma
+    points = db.Column(db.Integer, nullable=False, default=0)
+    scans = db.Column(db.Integer, nullable=False, default=0)
+    last_scan_at = db.Column(db.DateTime, nullable=True)
+
+# Kullanıcı başına geçmiş sayfası sayaçları (başlık istatistikleri)
+# Talep, onay, okutma ve kampanya kullanımı ile aynı transaction içinde artırılır.
+class UserActivityTotal(db.Model):
+    __tablename__ = 'user_activity_total'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    redemptions = db.Column(db.Integer, nullable=False, default=0)
+    confirmed_redemptions = db.Column(db.Integer, nullable=False, default=0)
+    points_spent = db.Column(db.Integer, nullable=False, default=0)  # Talep edilen ürünlerin toplam puanı
+    qr_scans = db.Column(db.Integer, nullable=False, default=0)
+    campaign_usages = db.Column(db.Integer, nullable=False, default=0)
+
+# Puan defteri: her bakiye değişikliği işaretli (+/-) tek satır olarak eklenir, satırlar güncellenmez.
+# Bakiyenin tek kaynağıdır; User.points son özet + özetten sonraki satırlardan hesaplanır.
+class PointLedger(db.Model):
+    __tablename__ = 'point_ledger'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    delta = db.Column(db.Integer, nullable=False)  # Kazanım pozitif, harcama negatif
+    reason = db.Column(db.String(20), nullable=False)  # 'qr_scan', 'qr_sync', 'redeem', 'redeem_confirm', 'opening'
+    branch_id = db.Column(db.Integer, nullable=True)
+    ref = db.Column(db.String(100), nullable=True)  # 'qr:<kod>', 'redemption:<onay kodu>'
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_point_ledger_user_id', 'user_id', 'id'),
+    )
+
+# Kullanıcı başına bakiye özeti: ledger_id'ye kadar (dahil) olan defter satırlarının toplamı
+class PointSnapshot(db.Model):
+    __tablename__ = 'point_snapshot'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    ledger_id = db.Column(db.Integer, nullable=False)
+    balance = db.Column(db.Integer, nullable=False)
+    taken_at = db.Column(db.DateTime, nullable=False)
+
+def ledger_balance(user_id):
+    """Defter bakiyesi SQL ifadesi: son özet + özetten sonraki satırlar
+
+    user_id bir kolon (ilişkili alt sorgu) veya değer olabilir. Özet birincil
+    anahtarla, kuyruk idx_point_ledger_user_id ile okunur.
+    """
+    ledger = PointLedger.__table__
+    snapshots = PointSnapshot.__table__
+    snapshot_id = (
+        db.select(snapshots.c.ledger_id).where(snapshots.c.user_id == user_id)
+        .correlate_except(snapshots).scalar_subquery()
+    )
+    snapshot_balance = (
+        db.select(snapshots.c.balance).where(snapshots.c.user_id == user_id)
+        .correlate_except(snapshots).scalar_subquery()
+    )
+    tail = (
+        db.select(db.func.sum(ledger.c.delta))
+        .where(ledger.c.user_id == user_id, ledger.c.id > db.func.coalesce(snapshot_id, 0))
+        .correlate_except(ledger, snapshots).scalar_subquery()
+    )
+    return db.func.coalesce(snapshot_balance, 0) + db.func.coalesce(tail, 0)
+
+# Bakiye her sorguda defterden okunur; nesnelerde ilk erişimde yüklenir (yazmalar oturumdaki değeri sıfırlar)
+User.points = db.column_property(ledger_balance(User.__table__.c.id), deferred=True)
+
+# Şube terminallerinden toplu senkronize edilen okutma olayları (olay id'si ile idempotent)
+# Aynı olay tekrar gönderilirse ilk sonucu döndürülür, tekrar uygulanmaz.
+class ScanSyncEvent(db.Model):
+    __tablename__ = 'scan_sync_event'
+    __table_args__ = (
+        db.UniqueConstraint('branch_id', 'event_id', name='uq_scan_sync_branch_event'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    branch_id = db.Column(db.Integer, db.ForeignKey('branch.id'), nullable=False)
+    event_id = db.Column(db.String(64), nullable=False)  # Terminalin ürettiği benzersiz id
+    event_type = db.Column(db.String(20), nullable=False)  # 'customer_qr', 'campaign_qr'
+    code = db.Column(db.String(200), nullable=False)
+    scanned_at = db.Column(db.DateTime, nullable=False)  # Terminalde okutulduğu an
+    status = db.Column(db.String(20), nullable=False)  # 'applied', 'rejected'
+    error = db.Column(db.String(200), nullable=True)
+    points_earned = db.Column(db.Integer, nullable=True)
+    synced_at = db.Column(db.DateTime, default=get_turkey_time)
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_key'
+    # sha256(uç nokta + istek sahibi + anahtar); ham anahtar saklanmaz
+    key_hash = db.Column(db.String(64), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)  # Aynı anahtarla farklı gövde reddedilir
+    status_code = db.Column(db.Integer, nullable=True)  # NULL: istek hâlâ işleniyor
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=get_turkey_time)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False, unique=True)
@@ -210,7 +418,7 @@ class Product(db.Model):
 
 class ProductRedemption(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     points_used = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=get_turkey_time)
@@ -242,6 +450,19 @@ class ProductRating(db.Model):
     # Unique constraint - bir kullanıcı bir ürünü sadece bir kez puanlayabilir
     __table_args__ = (db.UniqueConstraint('user_id', 'product_id', name='unique_user_product_rating'),)
 
+# Ürün başına puanlama özeti (adet, toplam, yıldız dağılımı)
+# api_rate_product ile aynı transaction içinde artırılır; katalog ProductRating taramadan okur.
+class ProductRatingTotal(db.Model):
+    __tablename__ = 'product_rating_total'
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    stars_1 = db.Column(db.Integer, nullable=False, default=0)
+    stars_2 = db.Column(db.Integer, nullable=False, default=0)
+    stars_3 = db.Column(db.Integer, nullable=False, default=0)
+    stars_4 = db.Column(db.Integer, nullable=False, default=0)
+    stars_5 = db.Column(db.Integer, nullable=False, default=0)
+
 class Campaign(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -257,6 +478,9 @@ class Campaign(db.Model):
     total_usage_limit = db.Column(db.Integer, nullable=True)  # Toplam kullanım limiti (None = sınırsız)
     qr_enabled = db.Column(db.Boolean, default=True)  # QR kod kullanımı aktif mi
     
+    # Kampanya veya ürünleri değiştikçe artar; hesaplanmış ürün listesi önbelleğinin anahtarı
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
     # Şube ilişkisi (many-to-many)
     branches = db.relationship('Branch', secondary='campaign_branches', backref='campaigns')
     
@@ -271,34 +495,38 @@ class Campaign(db.Model):
         return self.is_active and self.start_date <= now <= self.end_date
     
     def get_usage_count(self):
-        """Toplam kullanım sayısını döndür"""
-        return self.usages.filter_by(is_used=True).count()
+        """Toplam kullanım sayısını döndür (sayaç tablosundan)"""
+        return campaign_usage_counts([self.id]).get(self.id, (0, 0))[0]
     
     def get_customer_usage_count(self, customer_id):
-        """Belirli bir müşterinin kullanım sayısını döndür"""
-        return self.usages.filter_by(customer_id=customer_id, is_used=True).count()
+        """Belirli bir müşterinin kullanım sayısını döndür (sayaç tablosundan)"""
+        return campaign_usage_counts([self.id], customer_id).get(self.id, (0, 0))[1]
     
-    def can_be_used_by_customer(self, customer_id, branch_id=None):
-        """Müşteri bu kampanyayı kullanabilir mi?"""
+    def can_be_used_by_customer(self, customer_id, branch_id=None, usage_counts=None):
+        """Müşteri bu kampanyayı kullanabilir mi?
+        
+        usage_counts: önceden toplu okunmuş (toplam, müşteri) kullanım sayıları
+        """
         if not self.is_valid() or not self.qr_enabled:
             return False
         
         # Şube kontrolü - kampanya bu şubede geçerli mi?
-        if branch_id and self.branches:
-            valid_branch_ids = [branch.id for branch in self.branches]
-            if branch_id not in valid_branch_ids:
+        if branch_id:
+            valid_branch_ids = campaign_branch_ids(self)
+            if valid_branch_ids and int(branch_id) not in valid_branch_ids:
                 return False
         
+        if usage_counts is None:
+            usage_counts = campaign_usage_counts([self.id], customer_id).get(self.id, (0, 0))
+        total_usage, customer_usage = usage_counts
+        
         # Müşteri başına limit kontrolü
-        customer_usage = self.get_customer_usage_count(customer_id)
-        if customer_usage >= self.max_usage_per_customer:
+        if customer_usage >= (self.max_usage_per_customer or 0):
             return False
         
         # Toplam limit kontrolü
-        if self.total_usage_limit:
-            total_usage = self.get_usage_count()
-            if total_usage >= self.total_usage_limit:
-                return False
+        if self.total_usage_limit and total_usage >= self.total_usage_limit:
+            return False
         
         return True
 
@@ -308,6 +536,19 @@ campaign_branches = db.Table('campaign_branches',
     db.Column('branch_id', db.Integer, db.ForeignKey('branch.id'), primary_key=True)
 )
 
+# Kampanya kullanım sayaçları: claim_campaign_usage() ile aynı transaction içinde artırılır,
+# limit kontrolleri CampaignUsage üzerinde COUNT yerine buradan okunur.
+class CampaignUsageTotal(db.Model):
+    __tablename__ = 'campaign_usage_total'
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaign.id'), primary_key=True)
+    used_count = db.Column(db.Integer, nullable=False, default=0)
+
+class CampaignCustomerUsage(db.Model):
+    __tablename__ = 'campaign_customer_usage'
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaign.id'), primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    used_count = db.Column(db.Integer, nullable=False, default=0)
+
 # Kampanya Ürünleri Modeli
 class CampaignProduct(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -362,8 +603,8 @@ class CampaignUsage(db.Model):
         # Şube kontrolü - kampanya bu şubede geçerli mi?
         if branch_id and self.campaign:
             # Kampanyanın geçerli şubelerini kontrol et
-            valid_branch_ids = [branch.id for branch in self.campaign.branches]
-            if valid_branch_ids and branch_id not in valid_branch_ids:
+            valid_branch_ids = campaign_branch_ids(self.campaign)
+            if valid_branch_ids and int(branch_id) not in valid_branch_ids:
                 return False
         
         return True
@@ -558,6 +799,206 @@ class SurveyAnswer(db.Model):
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+# Mobil API kimlik doğrulama
+# Token'lar veritabanında SHA-256 özetiyle (User.auth_token_hash) tutulur. Çözülen
+# özet -> user_id eşleşmeleri API_TOKEN_CACHE_SECONDS boyunca süreç içinde saklanır,
+# böylece sık gelen isteklerde kimlik doğrulama veritabanına gitmez.
+_api_token_cache = {}
+_api_token_lock = threading.Lock()
+# Her iptalde artar; iptalden önce başlamış bir çözümleme eski eşleşmeyi önbelleğe yazmaz
+_api_token_generation = 0
+
+def hash_api_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def resolve_api_token(token):
+    """Bearer token'ı user_id'ye çözer (geçersizse None)"""
+    token_hash = hash_api_token(token)
+    now = time.monotonic()
+    cached = _api_token_cache.get(token_hash)
+    if cached and cached[1] > now:
+        return cached[0]
+    
+    generation = _api_token_generation
+    user_id = db.session.query(User.id).filter_by(auth_token_hash=token_hash).scalar()
+    if user_id is None:
+        return None
+    
+    with _api_token_lock:
+        if generation != _api_token_generation:
+            return user_id
+        if len(_api_token_cache) >= app.config['API_TOKEN_CACHE_SIZE']:
+            # En eski kaydı çıkar (dict ekleme sırasını korur)
+            _api_token_cache.pop(next(iter(_api_token_cache)), None)
+        _api_token_cache[token_hash] = (user_id, now + app.config['API_TOKEN_CACHE_SECONDS'])
+    return user_id
+
+def forget_api_tokens(user_id):
+    """Kullanıcının önbellekteki token eşleşmelerini siler"""
+    global _api_token_generation
+    with _api_token_lock:
+        _api_token_generation += 1
+        for token_hash, (cached_user_id, _expires) in list(_api_token_cache.items()):
+            if cached_user_id == user_id:
+                _api_token_cache.pop(token_hash, None)
+
+def revoke_api_token(user, commit=True):
+    """Kullanıcının mobil API token'ını geçersiz kılar (çıkış ve şifre değişikliği)
+
+    commit=False verilirse önbellek temizlenmez; çağıran commit ettikten sonra
+    forget_api_tokens(user.id) çağırmalıdır. Aksi halde eşzamanlı bir istek eski
+    token'ı commit'ten önce tekrar önbelleğe alabilir.
+    """
+    user.auth_token = None
+    user.auth_token_hash = None
+    if commit:
+        db.session.commit()
+        forget_api_tokens(user.id)
+
+def api_auth_required(view=None, allow_legacy_user_id=True, optional=False):
+    """Mobil API uç noktaları için kimlik doğrulama dekoratörü
+
+    Authorization: Bearer <token> başlığını doğrular ve kullanıcıyı g.api_user_id
+    olarak ayarlar. API_ALLOW_LEGACY_USER_ID açıkken token göndermeyen eski
+    istemcilerin user_id parametresi kabul edilir. optional=True ise kimlik
+    bilgisi olmayan istekler g.api_user_id = None ile devam eder.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            # İstek içinde gönderilen user_id (sorgu parametresi veya JSON gövdesi)
+            requested_id = request.args.get('user_id')
+            if requested_id is None and request.is_json:
+                requested_id = (request.get_json(silent=True) or {}).get('user_id')
+            
+            auth_header = request.headers.get('Authorization', '')
+            if auth_header.startswith('Bearer '):
+                user_id = resolve_api_token(auth_header[7:].strip())
+                if user_id is None:
+                    return jsonify({'success': False, 'error': 'Token süresi dolmuş. Lütfen tekrar giriş yapın.'}), 401
+                if requested_id not in (None, '') and str(requested_id) != str(user_id):
+                    return jsonify({'success': False, 'error': 'Yetkisiz erişim'}), 403
+            elif allow_legacy_user_id and app.config['API_ALLOW_LEGACY_USER_ID'] and requested_id not in (None, ''):
+                try:
+                    user_id = int(requested_id)
+                except (TypeError, ValueError):
+                    return jsonify({'success': False, 'error': 'Geçersiz kullanıcı'}), 400
+            elif optional:
+                user_id = None
+            else:
+                return jsonify({'success': False, 'error': 'Token gerekli'}), 401
+            
+            g.api_user_id = user_id
+            return view(*args, **kwargs)
+        return wrapped
+    
+    if view is not None:
+        return decorator(view)
+    return decorator
+
+_idempotency_purged_at = 0.0
+
+def purge_idempotency_keys(now):
+    """Süresi dolan Idempotency-Key kayıtlarını sil (işlem başına en fazla dakikada bir)"""
+    global _idempotency_purged_at
+    if time.monotonic() - _idempotency_purged_at < 60:
+        return
+    _idempotency_purged_at = time.monotonic()
+    IdempotencyKey.query.filter(IdempotencyKey.expires_at < now).delete(synchronize_session=False)
+
+def idempotent(view):
+    """Idempotency-Key başlığını destekleyen POST dekoratörü
+
+    Aynı anahtarla tekrarlanan istek görünümü yeniden çalıştırmaz; ilk yanıt
+    (durum kodu ve gövde) aynen döner ve Idempotent-Replayed: true başlığı eklenir.
+    Anahtar uç nokta ve istek sahibi (API kullanıcısı ya da şube) ile birlikte
+    özetlenir; aynı anahtarla farklı gövde 422, ilk istek sürerken gelen tekrar 409
+    alır. 5xx yanıtlar saklanmaz, böylece sunucu hatasından sonra tekrar denenebilir.
+    Yalnızca JSON yanıtlar saklanır. Kimlik dekoratörlerinin altında
+    kullanılmalıdır (g.api_user_id için).
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key', '').strip()
+        if request.method != 'POST' or not key:
+            return view(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({'success': False, 'error': 'Idempotency-Key en fazla 255 karakter olabilir'}), 400
+
+        if g.get('api_user_id') is not None:
+            owner = f"user:{g.api_user_id}"
+        elif 'branch_id' in session:
+            owner = f"branch:{session['branch_id']}"
+        elif current_user.is_authenticated:
+            owner = f"login:{current_user.get_id()}"
+        else:
+            owner = '-'
+        key_hash = hashlib.sha256(f"{request.endpoint}\n{owner}\n{key}".encode('utf-8')).hexdigest()
+        # get_data gövdeyi önbelleğe alır; görünüm form/JSON'u yine okuyabilir
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+
+        now = get_turkey_time().replace(tzinfo=None)
+        purge_idempotency_keys(now)
+        record = IdempotencyKey.query.get(key_hash)
+        if record is not None and record.expires_at < now:
+            db.session.delete(record)
+            db.session.flush()
+            record = None
+
+        if record is not None:
+            if record.request_hash != request_hash:
+                db.session.rollback()
+                return jsonify({'success': False, 'error': 'Bu Idempotency-Key farklı bir istekle kullanılmış'}), 422
+            if record.status_code is not None:
+                db.session.rollback()
+                response = app.response_class(record.response_body, status=record.status_code, mimetype='application/json')
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+
+            # Yarım kalan istek: kilit süresi dolmadıysa bekle, dolduysa devral
+            stale_before = now - timedelta(seconds=app.config['IDEMPOTENCY_PENDING_SECONDS'])
+            taken = IdempotencyKey.query.filter(
+                IdempotencyKey.key_hash == key_hash,
+                IdempotencyKey.status_code.is_(None),
+                IdempotencyKey.created_at < stale_before
+            ).update({'created_at': now}, synchronize_session=False)
+            db.session.commit()
+            if not taken:
+                return jsonify({'success': False, 'error': 'Aynı istek hâlâ işleniyor, lütfen biraz sonra tekrar deneyin'}), 409
+        else:
+            db.session.add(IdempotencyKey(
+                key_hash=key_hash,
+                request_hash=request_hash,
+                created_at=now,
+                expires_at=now + timedelta(seconds=app.config['IDEMPOTENCY_TTL_SECONDS'])
+            ))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                return jsonify({'success': False, 'error': 'Aynı istek hâlâ işleniyor, lütfen biraz sonra tekrar deneyin'}), 409
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            IdempotencyKey.query.filter_by(key_hash=key_hash).delete(synchronize_session=False)
+            db.session.commit()
+            raise
+
+        db.session.rollback()
+        if response.status_code >= 500 or response.direct_passthrough or not response.is_json:
+            IdempotencyKey.query.filter_by(key_hash=key_hash).delete(synchronize_session=False)
+        else:
+            IdempotencyKey.query.filter_by(key_hash=key_hash).update({
+                'status_code': response.status_code,
+                'response_body': response.get_data(as_text=True),
+                'expires_at': get_turkey_time().replace(tzinfo=None) + timedelta(seconds=app.config['IDEMPOTENCY_TTL_SECONDS'])
+            }, synchronize_session=False)
+        db.session.commit()
+        return response
+    return wrapped
+
 # Şube giriş kontrolü
 def is_branch_logged_in():
     return 'branch_id' in session
@@ -567,6 +1008,21 @@ def get_current_branch():
         return Branch.query.get(session['branch_id'])
     return None
 
+def branch_api_required(view):
+    """Şube API uç noktaları için oturum kontrolü
+
+    Şube girişi yoksa 401 döner; varsa şube kimliği g.api_branch_id olarak
+    ayarlanır. İstek gövdesindeki branch_id dikkate alınmaz. @idempotent ile
+    birlikte kullanılacaksa onun üstünde olmalıdır.
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not is_branch_logged_in():
+            return jsonify({'success': False, 'error': 'Şube girişi gerekli'}), 401
+        g.api_branch_id = session['branch_id']
+        return view(*args, **kwargs)
+    return wrapped
+
 # E-posta gönderme fonksiyonu
 def send_verification_email(user):
     try:
@@ -783,92 +1239,216 @@ REEV Coffee Team'''
         traceback.print_exc()
         return False
 
-# Yeni kampanya e-postası gönderme (tüm kullanıcılara)
-def send_campaign_email(campaign):
-    try:
-        # Admin olmayan tüm kullanıcılar
-        recipients = User.query.filter_by(is_admin=False).all()
-        if not recipients:
-            return 0
+# Yeni kampanya e-postası (tüm kullanıcılara)
+def campaign_email_parts(campaign):
+    """Kampanya e-postasının kullanıcıdan bağımsız kısımlarını bir kez hazırlar"""
+    # Kısa açıklama
+    desc = campaign.description or ''
+    if len(desc) > 180:
+        desc = desc[:180] + '...'
+
+    # Görsel URL'si (varsa)
+    base = app.config.get('BASE_URL', 'https://reevpoints.tr').rstrip('/')
+    image_block = ''
+    image_text = ''
+    if getattr(campaign, 'image_filename', None):
+        image_url = f"{base}/static/uploads/{campaign.image_filename}"
+        image_block = f'<div style="text-align:center;margin:12px 0 18px;"><img src="{image_url}" alt="{campaign.title}" style="max-width:100%;border-radius:8px;" /></div>'
+        image_text = f"Görsel: {image_url}\n\n"
 
-        sent = 0
-        for u in recipients:
-            try:
-                msg = MailMessage(
-                    subject=f"REEV Coffee - Yeni Kampanya: {campaign.title}",
-                    recipients=[u.email],
-                    sender=app.config['MAIL_USERNAME']
-                )
-                msg.charset = 'utf-8'
-                msg.extra_headers = {'Content-Type': 'text/html; charset=utf-8'}
-                # Kısa açıklama
-                desc = campaign.description or ''
-                if len(desc) > 180:
-                    desc = desc[:180] + '...'
-
-                # Görsel URL'si (varsa)
-                base = app.config.get('BASE_URL', 'https://reevpoints.tr').rstrip('/')
-                image_block = ''
-                image_text = ''
-                if getattr(campaign, 'image_filename', None):
-                    image_url = f"{base}/static/uploads/{campaign.image_filename}"
-                    image_block = f'<div style="text-align:center;margin:12px 0 18px;"><img src="{image_url}" alt="{campaign.title}" style="max-width:100%;border-radius:8px;" /></div>'
-                    image_text = f"Görsel: {image_url}\n\n"
-
-                # Body (plain text)
-                msg.body = (
-                    f"Merhaba {u.name},\n\n"
-                    f"Yeni kampanyamız yayında: {campaign.title}\n\n"
-                    f"{desc}\n\n"
-                    f"{image_text}"
-                    f"Detaylar için Kampanyalar sayfasını ziyaret edin: {base}/campaigns\n\n"
-                    f"Saygılarımızla,\nREEV Coffee"
-                )
-                # HTML
-                msg.html = f'''
-                <div style="font-family: Arial, sans-serif; max-width: 640px; margin:0 auto; background:#f8f9fa;">
-                  <div style="background: linear-gradient(135deg,#8B4513,#D2691E); color:#fff; padding:22px; text-align:center;">
-                    <h2 style="margin:0;">REEV COFFEE</h2>
-                    <h3 style="margin:6px 0 0;">Yeni Kampanya</h3>
-                  </div>
-                  <div style="padding:20px;">
-                    <p>Merhaba <strong>{u.name}</strong>,</p>
-                    <p><strong>{campaign.title}</strong> kampanyamız yayında!</p>
-                    <p style="color:#333; white-space:pre-wrap;">{desc}</p>
-                    {image_block}
-                    <div style="text-align:center;margin:14px 0;">
-                      <a href="{base}/campaigns" target="_blank" style="background:#8B4513;color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block;">Kampanyalara Git</a>
-                    </div>
-                    <hr>
-                    <p style="font-size: 0.9rem; color:#666;">Detaylar için uygulamadaki Kampanyalar sayfasını ziyaret edin.</p>
-                  </div>
-                </div>
-                '''
-                mail.send(msg)
-                sent += 1
-            except Exception as inner:
-                print(f"Kampanya e-postası gönderilemedi ({u.email}): {inner}")
-                continue
+    return {
+        'title': campaign.title,
+        'desc': desc,
+        'base': base,
+        'image_block': image_block,
+        'image_text': image_text
+    }
 
-        print(f"✉️ Campaign email sent to {sent} users: {campaign.title}")
-        return sent
-    except Exception as e:
-        print(f"Error in send_campaign_email: {e}")
-        return 0
+def build_campaign_email(parts, name, email):
+    """Tek bir alıcı için kampanya e-postasını oluşturur"""
+    msg = MailMessage(
+        subject=f"REEV Coffee - Yeni Kampanya: {parts['title']}",
+        recipients=[email],
+        sender=app.config['MAIL_USERNAME']
+    )
+    msg.charset = 'utf-8'
+    msg.extra_headers = {'Content-Type': 'text/html; charset=utf-8'}
+
+    # Body (plain text)
+    msg.body = (
+        f"Merhaba {name},\n\n"
+        f"Yeni kampanyamız yayında: {parts['title']}\n\n"
+        f"{parts['desc']}\n\n"
+        f"{parts['image_text']}"
+        f"Detaylar için Kampanyalar sayfasını ziyaret edin: {parts['base']}/campaigns\n\n"
+        f"Saygılarımızla,\nREEV Coffee"
+    )
+    # HTML
+    msg.html = f'''
+    <div style="font-family: Arial, sans-serif; max-width: 640px; margin:0 auto; background:#f8f9fa;">
+      <div style="background: linear-gradient(135deg,#8B4513,#D2691E); color:#fff; padding:22px; text-align:center;">
+        <h2 style="margin:0;">REEV COFFEE</h2>
+        <h3 style="margin:6px 0 0;">Yeni Kampanya</h3>
+      </div>
+      <div style="padding:20px;">
+        <p>Merhaba <strong>{name}</strong>,</p>
+        <p><strong>{parts['title']}</strong> kampanyamız yayında!</p>
+        <p style="color:#333; white-space:pre-wrap;">{parts['desc']}</p>
+        {parts['image_block']}
+        <div style="text-align:center;margin:14px 0;">
+          <a href="{parts['base']}/campaigns" target="_blank" style="background:#8B4513;color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block;">Kampanyalara Git</a>
+        </div>
+        <hr>
+        <p style="font-size: 0.9rem; color:#666;">Detaylar için uygulamadaki Kampanyalar sayfasını ziyaret edin.</p>
+      </div>
+    </div>
+    '''
+    return msg
+
+# Site ayarları önbelleği
+# Tüm SiteSetting satırları tek sorguyla yüklenir ve süreç içinde tutulur. Yükleme
+# işlemleri 'settings_version' satırını artırır; her worker bu sürümü en fazla
+# SITE_SETTINGS_CHECK_SECONDS aralıkla okur ve değiştiyse önbelleği yeniden yükler.
+SITE_SETTINGS_VERSION_KEY = 'settings_version'
+CachedSiteSetting = namedtuple('CachedSiteSetting', ['key', 'value', 'updated_at'])
+_site_settings_cache = {'version': None, 'values': {}, 'checked_at': 0.0}
+_site_settings_lock = threading.Lock()
+
+def get_site_settings():
+    """Önbellekteki site ayarlarını {key: CachedSiteSetting} olarak döndürür"""
+    cache = _site_settings_cache
+    max_age = app.config['SITE_SETTINGS_CHECK_SECONDS']
+    if cache['version'] is not None and time.monotonic() - cache['checked_at'] < max_age:
+        return cache['values']
+    
+    with _site_settings_lock:
+        if cache['version'] is not None and time.monotonic() - cache['checked_at'] < max_age:
+            return cache['values']
+        
+        version = db.session.query(SiteSetting.value).filter_by(key=SITE_SETTINGS_VERSION_KEY).scalar() or '0'
+        if version != cache['version']:
+            cache['values'] = {
+                setting.key: CachedSiteSetting(setting.key, setting.value, setting.updated_at)
+                for setting in SiteSetting.query.all()
+            }
+            cache['version'] = version
+        cache['checked_at'] = time.monotonic()
+        return cache['values']
+
+def get_site_setting(key):
+    """Tek bir site ayarını önbellekten döndürür (yoksa None)"""
+    return get_site_settings().get(key)
+
+def _bump_version_setting(key):
+    """SiteSetting içindeki sayaç satırını atomik olarak artırır (yoksa 1 ile oluşturur)"""
+    table = SiteSetting.__table__
+    now = get_turkey_time().replace(tzinfo=None)
+    # Tek ifade: eşzamanlı ilk artırmalar da unique key hatasına düşmez
+    stmt = _upsert_statement(table).values(key=key, value='1', created_at=now, updated_at=now)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.key],
+        set_={
+            'value': db.cast(db.cast(table.c.value, db.Integer) + 1, db.Text),
+            'updated_at': now
+        }
+    ))
+
+def bump_site_settings_version(commit=True):
+    """Ayar sürümünü artırır; diğer worker'lar bir sonraki kontrolde önbelleği yeniler"""
+    _bump_version_setting(SITE_SETTINGS_VERSION_KEY)
+    
+    if commit:
+        db.session.commit()
+        # Bu worker değişikliği beklemeden görsün
+        _site_settings_cache['checked_at'] = 0.0
+
+# Ürün kataloğu önbelleği
+# /api/redeem ve /redeem_points aktif ürünleri ve kategorileri süreç içindeki bir anlık
+# görüntüden okur. Ürün/kategori yönetimi 'catalog_version' satırını artırır; her worker
+# bu sürümü en fazla CATALOG_CHECK_SECONDS aralıkla okur ve değiştiyse görüntüyü yeniden
+# oluşturur. Puanlama özetleri sık değiştiği için görüntüye girmez, istek başına okunur.
+CATALOG_VERSION_KEY = 'catalog_version'
+CatalogProduct = namedtuple('CatalogProduct', [
+    'id', 'name', 'description', 'points_required', 'category_id', 'category', 'category_name',
+    'image_filename', 'has_image_file'
+])
+CatalogSnapshot = namedtuple('CatalogSnapshot', ['version', 'products', 'categories', 'grouped'])
+_catalog_cache = {'version': None, 'snapshot': None, 'checked_at': 0.0}
+_catalog_lock = threading.Lock()
+
+def build_catalog_snapshot(version):
+    """Aktif ürün ve kategorilerden katalog görüntüsünü oluşturur (2 sorgu)"""
+    all_categories = Category.query.all()
+    categories = [category for category in all_categories if category.is_active]
+    # Pasif kategorideki ürünler de kategori adını korur (category_ref ile aynı davranış)
+    category_names = {category.id: category.name for category in all_categories}
+    products = Product.query.filter_by(is_active=True).all()
+    
+    catalog_products = []
+    for product in products:
+        catalog_products.append(CatalogProduct(
+            id=product.id,
+            name=product.name,
+            description=product.description,
+            points_required=product.points_required,
+            category_id=product.category_id,
+            category=product.category,
+            category_name=category_names.get(product.category_id),
+            image_filename=product.image_filename,
+            has_image_file=bool(product.image_filename) and os.path.exists(os.path.join('static', 'uploads', product.image_filename))
+        ))
+    
+    # Web kataloğu için kategori gruplaması: önce Category sırası, sonra eski string kategoriler
+    grouped = {category.name: [] for category in categories}
+    for product in catalog_products:
+        grouped.setdefault(product.category_name or product.category or 'Genel', []).append(product)
+    
+    return CatalogSnapshot(
+        version=version,
+        products=tuple(catalog_products),
+        categories=tuple({'id': c.id, 'name': c.name, 'description': c.description} for c in categories),
+        grouped={name: tuple(items) for name, items in grouped.items() if items}
+    )
+
+def get_catalog_snapshot():
+    """Güncel katalog görüntüsünü döndürür (sürüm değişmediyse veritabanına gitmez)"""
+    cache = _catalog_cache
+    max_age = app.config['CATALOG_CHECK_SECONDS']
+    if cache['snapshot'] is not None and time.monotonic() - cache['checked_at'] < max_age:
+        return cache['snapshot']
+    
+    with _catalog_lock:
+        if cache['snapshot'] is not None and time.monotonic() - cache['checked_at'] < max_age:
+            return cache['snapshot']
+        
+        version = db.session.query(SiteSetting.value).filter_by(key=CATALOG_VERSION_KEY).scalar() or '0'
+        if version != cache['version']:
+            cache['snapshot'] = build_catalog_snapshot(version)
+            cache['version'] = version
+        cache['checked_at'] = time.monotonic()
+        return cache['snapshot']
+
+def bump_catalog_version(commit=True):
+    """Katalog sürümünü artırır; tüm worker'lar bir sonraki kontrolde görüntüyü yeniler"""
+    _bump_version_setting(CATALOG_VERSION_KEY)
+    
+    if commit:
+        db.session.commit()
+        # Bu worker değişikliği beklemeden görsün
+        _catalog_cache['checked_at'] = 0.0
 
 # Ana Sayfa
 @app.context_processor
 def inject_user():
     # Site logosu için global değişken
-    site_logo = SiteSetting.query.filter_by(key='site_logo').first()
+    site_logo = get_site_setting('site_logo')
     return dict(current_user=current_user, site_logo=site_logo)
 
 @app.route('/')
 def index():
-    # Arka plan resmini al
-    site_background = SiteSetting.query.filter_by(key='site_background').first()
-    # Site logosunu al
-    site_logo = SiteSetting.query.filter_by(key='site_logo').first()
+    # Arka plan resmini ve site logosunu önbellekten al
+    site_background = get_site_setting('site_background')
+    site_logo = get_site_setting('site_logo')
     return render_template('index.html', site_background=site_background, site_logo=site_logo)
 
 # Kullanıcı Kayıt
@@ -1051,37 +1631,20 @@ def dashboard():
             'selected_product_info': selected_product_info
         })
     
-    # Özel metrikler
-    try:
-        # Timezone uyumluluğu için naive datetime kullan
-        last_30 = (get_turkey_time() - timedelta(days=30)).replace(tzinfo=None)
-        # Puan kazanımları CustomerQR kullanımıyla gerçekleşiyor; bu nedenle CustomerQR üzerinden hesapla
-        points_last_30 = db.session.query(db.func.coalesce(db.func.sum(CustomerQR.points_earned), 0)) \
-            .filter(
-                CustomerQR.customer_id == current_user.id,
-                CustomerQR.is_used == True,
-                CustomerQR.used_at >= last_30
-            ).scalar() or 0
-    except Exception:
-        points_last_30 = 0
+    # Son 30 gün günlük puan dağılımı (günlük özet tablosundan, en fazla 30 satır)
+    start_day = (get_turkey_time() - timedelta(days=29)).date()
+    end_day = get_turkey_time().date()
+    daily_map = points_daily_totals(current_user.id, start_day, end_day)
+    points_last_30 = sum(daily_map.values())
 
     # En çok gidilen şube (QR kullanımına göre)
     most_branch_name = None
     most_branch_count = 0
-    try:
-        from sqlalchemy import func
-        rows = db.session.query(CustomerQR.used_by_branch_id, func.count(CustomerQR.id)) \
-            .filter(CustomerQR.customer_id == current_user.id, CustomerQR.is_used == True, CustomerQR.used_by_branch_id != None) \
-            .group_by(CustomerQR.used_by_branch_id) \
-            .order_by(func.count(CustomerQR.id).desc()) \
-            .limit(1).all()
-        if rows:
-            branch_id, cnt = rows[0]
-            branch_obj = Branch.query.get(branch_id)
-            most_branch_name = branch_obj.name if branch_obj else None
-            most_branch_count = int(cnt)
-    except Exception:
-        pass
+    row = most_visited_branch_total(current_user.id)
+    if row:
+        branch_obj = db.session.get(Branch, row.branch_id)
+        most_branch_name = branch_obj.name if branch_obj else None
+        most_branch_count = int(row.scans)
 
     # Okunmamış mesaj sayısını getir
     unread_messages_count = Message.query.filter_by(
@@ -1098,33 +1661,14 @@ def dashboard():
         points_to_reward = 0
     reward_progress_percent = int(round(((user_points % reward_target) / reward_target) * 100))
 
-    # Son 30 gün günlük puan dağılımı (etiketler ve değerler)
-    try:
-        from collections import defaultdict
-        daily_map = defaultdict(int)
-        # Son 30 gün için başlangıç gününü hesapla (sadece tarih)
-        start_day = (get_turkey_time() - timedelta(days=29)).date()
-        end_day = get_turkey_time().date()
-        # İlgili aralıkta kullanılan QR'ları çek
-        used_qrs = CustomerQR.query.filter(
-            CustomerQR.customer_id == current_user.id,
-            CustomerQR.is_used == True,
-            CustomerQR.used_at >= datetime.combine(start_day, datetime.min.time())
-        ).all()
-        for qr in used_qrs:
-            d = (qr.used_at.date() if isinstance(qr.used_at, datetime) else qr.used_at)
-            daily_map[d] += qr.points_earned or 0
-        # Etiket ve değer listeleri
-        points_daily_labels = []
-        points_daily_values = []
-        day = start_day
-        while day <= end_day:
-            points_daily_labels.append(day.strftime('%d.%m'))
-            points_daily_values.append(daily_map.get(day, 0))
-            day += timedelta(days=1)
-    except Exception:
-        points_daily_labels = []
-        points_daily_values = []
+    # Etiket ve değer listeleri
+    points_daily_labels = []
+    points_daily_values = []
+    day = start_day
+    while day <= end_day:
+        points_daily_labels.append(day.strftime('%d.%m'))
+        points_daily_values.append(daily_map.get(day, 0))
+        day += timedelta(days=1)
     
     return render_template('dashboard.html', 
                          transactions=recent_transactions,
@@ -1140,77 +1684,134 @@ def dashboard():
                          unread_messages_count=unread_messages_count)
 
 # Kampanyalar Sayfası
-@app.route('/campaigns')
-@login_required
-def campaigns():
-    # Kullanıcının tercih ettiği şubeye göre kampanyaları filtrele
-    if current_user.preferred_branch_id:
-        # Kullanıcının şubesindeki aktif kampanyalar
-        active_campaigns = Campaign.query.filter(
-            Campaign.is_active == True,
-            Campaign.branches.any(Branch.id == current_user.preferred_branch_id)
-        ).order_by(Campaign.created_at.desc()).all()
+# Kampanya ürün listesi önbelleği: (kampanya id, sürüm, oluşturulma) -> hesaplanmış ürünler
+_campaign_products_cache = {}
+
+def bump_campaign_version(*criteria):
+    """Koşula uyan kampanyaların sürümünü artırır (ürün listesi önbelleği yenilenir)"""
+    campaign_table = Campaign.__table__
+    db.session.execute(
+        campaign_table.update()
+        .where(*criteria)
+        .values(version=campaign_table.c.version + 1)
+    )
+
+def campaign_product_data(cp):
+    """Kampanya ürününü indirimli puanıyla birlikte şablon verisine dönüştürür"""
+    if cp.product_id and cp.product:
+        # Mevcut ürün
+        product_data = {
+            'id': cp.product.id,
+            'campaign_product_id': cp.id,  # CampaignProduct ID'si
+            'name': cp.product.name,
+            'description': cp.product.description,
+            'image_filename': cp.product.image_filename,
+            'category': cp.product.category if isinstance(cp.product.category, str) else (cp.product.category.name if cp.product.category else 'Kategori Yok'),
+            'original_points': int(cp.product.points_required),
+            'discount': cp.discount or 0,
+            'discount_type': cp.discount_type,
+            'source': 'existing_product'
+        }
     else:
-        # Şube seçimi yapılmamışsa tüm kampanyalar
-        active_campaigns = Campaign.query.filter_by(is_active=True).order_by(Campaign.created_at.desc()).all()
-    
-    # Geçerli kampanyaları filtrele
-    valid_campaigns = [campaign for campaign in active_campaigns if campaign.is_valid()]
+        # Manuel ürün
+        product_data = {
+            'id': f'manual_{cp.id}',
+            'campaign_product_id': cp.id,  # CampaignProduct ID'si
+            'name': cp.product_name,
+            'description': cp.product_description or '',
+            'image_filename': None,
+            'category': 'Kampanya Ürünü',
+            'original_points': int(cp.original_price or 0),
+            'discount': cp.discount_value or 0,
+            'discount_type': cp.discount_type,
+            'source': 'manual_product'
+        }
+
+    # İndirimli fiyatı hesapla
+    if product_data['discount_type'] == 'percentage':
+        discounted_points = product_data['original_points'] * (1 - product_data['discount'] / 100)
+    elif product_data['discount_type'] == 'fixed':
+        discounted_points = max(0, product_data['original_points'] - product_data['discount'])
+    else:  # free
+        discounted_points = 0
+
+    product_data['discounted_points'] = int(discounted_points)
+    return product_data
+
+# Kampanyanın geçerli şubeleri önbelleği: kampanya id -> ((sürüm, oluşturulma), şube id'leri)
+_campaign_branch_ids_cache = {}
+
+def campaign_branch_ids(campaign):
+    """Kampanyanın geçerli olduğu şube id'leri (boşsa tüm şubelerde geçerli)"""
+    cache_key = (campaign.version, campaign.created_at)
+    cached = _campaign_branch_ids_cache.get(campaign.id)
+    if cached and cached[0] == cache_key:
+        return cached[1]
+    
+    branch_ids = frozenset(db.session.execute(
+        db.select(campaign_branches.c.branch_id).where(campaign_branches.c.campaign_id == campaign.id)
+    ).scalars())
+    _campaign_branch_ids_cache[campaign.id] = (cache_key, branch_ids)
+    return branch_ids
+
+def get_campaign_products_data(campaigns):
+    """Kampanyaların ürün listelerini önbellekten, eksik olanları tek sorguyla döndürür"""
+    result = {}
+    missing = {}
+    for campaign in campaigns:
+        cache_key = (campaign.version, campaign.created_at)
+        cached = _campaign_products_cache.get(campaign.id)
+        if cached and cached[0] == cache_key:
+            result[campaign.id] = cached[1]
+        else:
+            missing[campaign.id] = cache_key
     
-    # Her kampanya için ürün bilgilerini ekle
-    campaigns_with_products = []
-    for campaign in valid_campaigns:
-        campaign_products = CampaignProduct.query.filter_by(
-            campaign_id=campaign.id, 
-            is_active=True
-        ).all()
+    if missing:
+        campaign_products = CampaignProduct.query.options(
+            selectinload(CampaignProduct.product)
+        ).filter(
+            CampaignProduct.campaign_id.in_(missing),
+            CampaignProduct.is_active == True
+        ).order_by(CampaignProduct.id).all()
         
-        products_data = []
+        grouped = {campaign_id: [] for campaign_id in missing}
         for cp in campaign_products:
-            if cp.product_id and cp.product:
-                # Mevcut ürün
-                product_data = {
-                    'id': cp.product.id,
-                    'campaign_product_id': cp.id,  # CampaignProduct ID'si
-                    'name': cp.product.name,
-                    'description': cp.product.description,
-                    'image_filename': cp.product.image_filename,
-                    'category': cp.product.category if isinstance(cp.product.category, str) else (cp.product.category.name if cp.product.category else 'Kategori Yok'),
-                    'original_points': int(cp.product.points_required),
-                    'discount': cp.discount or 0,
-                    'discount_type': cp.discount_type,
-                    'source': 'existing_product'
-                }
-            else:
-                # Manuel ürün
-                product_data = {
-                    'id': f'manual_{cp.id}',
-                    'campaign_product_id': cp.id,  # CampaignProduct ID'si
-                    'name': cp.product_name,
-                    'description': cp.product_description or '',
-                    'image_filename': None,
-                    'category': 'Kampanya Ürünü',
-                    'original_points': int(cp.original_price or 0),
-                    'discount': cp.discount_value or 0,
-                    'discount_type': cp.discount_type,
-                    'source': 'manual_product'
-                }
-            
-            # İndirimli fiyatı hesapla
-            if product_data['discount_type'] == 'percentage':
-                discounted_points = product_data['original_points'] * (1 - product_data['discount'] / 100)
-            elif product_data['discount_type'] == 'fixed':
-                discounted_points = max(0, product_data['original_points'] - product_data['discount'])
-            else:  # free
-                discounted_points = 0
-            
-            product_data['discounted_points'] = int(discounted_points)
-            products_data.append(product_data)
+            grouped[cp.campaign_id].append(campaign_product_data(cp))
         
-        campaigns_with_products.append({
-            'campaign': campaign,
-            'products': products_data
-        })
+        for campaign_id, products_data in grouped.items():
+            _campaign_products_cache[campaign_id] = (missing[campaign_id], products_data)
+            result[campaign_id] = products_data
+    
+    return result
+
+@app.route('/campaigns')
+@login_required
+def campaigns():
+    # Geçerli kampanyalar: aktiflik ve tarih aralığı SQL'de filtrelenir
+    now = get_turkey_time().replace(tzinfo=None)
+    query = Campaign.query.options(selectinload(Campaign.branches)).filter(
+        Campaign.is_active == True,
+        Campaign.start_date <= now,
+        Campaign.end_date >= now
+    )
+    
+    # Kullanıcının tercih ettiği şubeye göre kampanyaları filtrele
+    if current_user.preferred_branch_id:
+        query = query.filter(Campaign.branches.any(Branch.id == current_user.preferred_branch_id))
+    
+    valid_campaigns = query.order_by(Campaign.created_at.desc()).all()
+    
+    # Ürünler tek sorguda (veya önbellekten) gelir
+    products_by_campaign = get_campaign_products_data(valid_campaigns)
+    # Kullanım limitleri tüm kampanyalar için tek sorguda okunur
+    usage_counts = campaign_usage_counts([campaign.id for campaign in valid_campaigns], current_user.id)
+    campaigns_with_products = [{
+        'campaign': campaign,
+        'products': products_by_campaign[campaign.id],
+        'can_use': campaign.can_be_used_by_customer(
+            current_user.id, usage_counts=usage_counts.get(campaign.id, (0, 0))
+        )
+    } for campaign in valid_campaigns]
     
     return render_template('campaigns.html', campaigns_with_products=campaigns_with_products)
 
@@ -1394,10 +1995,10 @@ def use_campaign_qr():
         if not campaign.is_valid():
             return jsonify({'error': 'Kampanya artık geçerli değil'}), 400
         
-        # QR kodu kullanıldı olarak işaretle
-        campaign_usage.is_used = True
-        campaign_usage.used_at = get_turkey_time().replace(tzinfo=None)
-        campaign_usage.used_by_branch_id = branch.id
+        # QR kodu kullanıldı olarak işaretle (atomik)
+        if not claim_campaign_usage(campaign_usage.id, branch_id=branch.id):
+            db.session.rollback()
+            return jsonify({'error': 'Bu QR kod daha önce kullanılmış'}), 400
         
         db.session.commit()
         
@@ -1571,33 +2172,9 @@ def get_campaign_qr_usage(campaign_id):
 @login_required
 def create_my_qr():
     try:
-        from datetime import datetime, timedelta
-        
-        # Son 10 dakikada oluşturulan QR kodlarını kontrol et
-        ten_minutes_ago = get_turkey_time() - timedelta(minutes=10)
-        recent_qrs = CustomerQR.query.filter(
-            CustomerQR.customer_id == current_user.id,
-            CustomerQR.created_at >= ten_minutes_ago
-        ).count()
-        
-        # 10 dakikada maksimum 2 QR kod sınırı
-        if recent_qrs >= 3:
-            return jsonify({
-                'success': False,
-                'error': 'Son 10 dakika içerisinde maksimum 3 QR kod oluşturabilirsiniz. Lütfen biraz bekleyin.'
-            }), 429
-        
-        # Benzersiz kod oluştur
-        import uuid
-        code = f"CUSTOMER{current_user.id}{str(uuid.uuid4())[:8].upper()}"
-        
-        customer_qr = CustomerQR(
-            customer_id=current_user.id,
-            code=code
-        )
-        
-        db.session.add(customer_qr)
-        db.session.commit()
+        # İmzalı üye kodu: veritabanına yazılmaz, okutma sınırı okutma anında uygulanır
+        step = member_qr_step()
+        code = make_member_qr(current_user.id, step=step)
         
         # QR kod görselini oluştur
         qr = qrcode.QRCode(version=1, box_size=10, border=5)
@@ -1616,7 +2193,7 @@ def create_my_qr():
             'code': code,
             'qr_image': f'data:image/png;base64,{img_str}',
             'customer_name': current_user.name,
-            'remaining_qrs': 2 - recent_qrs - 1
+            'expires_at': member_qr_expires_at(step).isoformat()
         })
         
     except Exception as e:
@@ -1656,37 +2233,16 @@ def redeem_points():
         )
         
         db.session.add(redemption)
+        add_user_activity(current_user.id, redemptions=1, points_spent=product.points_required)
         db.session.commit()
         
         flash(f'{product.name} ürünü rezerve edildi! Onay Kodu: {confirmation_code}', 'success')
         return redirect(url_for('purchase_confirmation', redemption_id=redemption.id))
     
-    # Aktif ürünleri ve kategorileri listele
-    products = Product.query.filter_by(is_active=True).all()
-    
-    # Kategorileri Category tablosundan al
-    db_categories = Category.query.filter_by(is_active=True).all()
-    categories = {}
-    
-    # Her kategori için boş liste oluştur
-    for cat in db_categories:
-        categories[cat.name] = []
-    
-    # Ürünleri kategorilere dağıt
-    for product in products:
-        if product.category_id and product.category_ref:
-            category_name = product.category_ref.name
-        else:
-            category_name = product.category or 'Genel'
-        
-        if category_name not in categories:
-            categories[category_name] = []
-        categories[category_name].append(product)
-    
-    # Boş kategorileri kaldır
-    categories = {k: v for k, v in categories.items() if v}
+    # Aktif ürünler ve kategori gruplaması katalog önbelleğinden (sürüm değişince yenilenir)
+    catalog = get_catalog_snapshot()
     
-    return render_template('redeem.html', products=products, categories=categories)
+    return render_template('redeem.html', products=catalog.products, categories=catalog.grouped)
 
 @app.route('/purchase_history')
 @login_required
@@ -1695,118 +2251,93 @@ def purchase_history():
     # Tarih filtreleme parametreleri
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
-    activity_type = request.args.get('type', 'all')  # all, purchases, points
-    page = request.args.get('page', 1, type=int)
+    activity_type = request.args.get('type', 'all')  # all, purchases, points, campaigns
+    page = max(request.args.get('page', 1, type=int), 1)
     per_page = 15
     
-    # Ürün alımları
-    redemptions_query = current_user.product_redemptions
+    start_dt = end_dt = None
     if start_date:
         try:
             start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            redemptions_query = redemptions_query.filter(ProductRedemption.redeemed_at >= start_dt)
         except ValueError:
             pass
     if end_date:
         try:
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-            end_dt = end_dt.replace(hour=23, minute=59, second=59)
-            redemptions_query = redemptions_query.filter(ProductRedemption.redeemed_at <= end_dt)
+            end_dt = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
         except ValueError:
             pass
     
-    # Puan kazanımları
-    points_query = CustomerQR.query.filter_by(customer_id=current_user.id, is_used=True)
-    if start_date:
-        try:
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            points_query = points_query.filter(CustomerQR.used_at >= start_dt)
-        except ValueError:
-            pass
-    if end_date:
-        try:
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-            end_dt = end_dt.replace(hour=23, minute=59, second=59)
-            points_query = points_query.filter(CustomerQR.used_at <= end_dt)
-        except ValueError:
-            pass
-    
-    # Kampanya kullanımları
-    campaign_query = CampaignUsage.query.filter_by(customer_id=current_user.id, is_used=True)
-    if start_date:
-        try:
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            campaign_query = campaign_query.filter(CampaignUsage.used_at >= start_dt)
-        except ValueError:
-            pass
-    if end_date:
-        try:
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-            end_dt = end_dt.replace(hour=23, minute=59, second=59)
-            campaign_query = campaign_query.filter(CampaignUsage.used_at <= end_dt)
-        except ValueError:
-            pass
+    redemptions = None
+    point_earnings = None
+    campaign_usages = None
+    timeline = None
+    has_next = False
     
     # Aktivite tipine göre filtreleme
     if activity_type == 'purchases':
+        redemptions_query = current_user.product_redemptions
+        if start_dt:
+            redemptions_query = redemptions_query.filter(ProductRedemption.redeemed_at >= start_dt)
+        if end_dt:
+            redemptions_query = redemptions_query.filter(ProductRedemption.redeemed_at <= end_dt)
         redemptions = redemptions_query.paginate(page=page, per_page=per_page, error_out=False)
-        point_earnings = None
-        campaign_usages = None
     elif activity_type == 'points':
-        redemptions = None
+        points_query = CustomerQR.query.filter_by(customer_id=current_user.id, is_used=True)
+        if start_dt:
+            points_query = points_query.filter(CustomerQR.used_at >= start_dt)
+        if end_dt:
+            points_query = points_query.filter(CustomerQR.used_at <= end_dt)
         point_earnings = points_query.order_by(CustomerQR.used_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
-        campaign_usages = None
     elif activity_type == 'campaigns':
-        redemptions = None
-        point_earnings = None
+        campaign_query = CampaignUsage.query.filter_by(customer_id=current_user.id, is_used=True)
+        if start_dt:
+            campaign_query = campaign_query.filter(CampaignUsage.used_at >= start_dt)
+        if end_dt:
+            campaign_query = campaign_query.filter(CampaignUsage.used_at <= end_dt)
         campaign_usages = campaign_query.order_by(CampaignUsage.used_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
     else:
-        # Tüm aktiviteler - sayfalama olmadan
-        redemptions = redemptions_query.all()
-        point_earnings = points_query.order_by(CustomerQR.used_at.desc()).all()
-        campaign_usages = campaign_query.order_by(CampaignUsage.used_at.desc()).all()
-    
-    # İstatistikler
-    total_redemptions = current_user.product_redemptions.count()
-    confirmed_redemptions = current_user.product_redemptions.filter_by(is_confirmed=True).count()
-    total_points_earned = CustomerQR.query.filter_by(customer_id=current_user.id, is_used=True).count()
-    total_points_spent = db.session.query(db.func.sum(ProductRedemption.points_used)).filter_by(user_id=current_user.id).scalar() or 0
-    total_campaign_usages = CampaignUsage.query.filter_by(customer_id=current_user.id, is_used=True).count()
+        # Tüm aktiviteler: SQL'de birleştirilip sayfalanan zaman çizelgesi
+        timeline, has_next = activity_timeline_page(current_user.id, page, per_page, start_dt, end_dt)
+    
+    # İstatistikler: kullanıcı sayaçlarından tek satır
+    totals = user_activity_totals(current_user.id)
     
     # Kampanya kullanımlarını işle (seçilen ürün bilgileri ile)
-    processed_campaign_usages = []
-    if campaign_usages:
-        campaign_list = campaign_usages.items if hasattr(campaign_usages, 'items') else campaign_usages
-        for usage in campaign_list:
-            # Seçilen ürün bilgisini al
-            selected_product_info = None
-            if usage.selected_product_details:
-                try:
-                    selected_product_info = json.loads(usage.selected_product_details)
-                except:
-                    selected_product_info = None
-            
-            processed_campaign_usages.append({
-                'usage': usage,
-                'campaign': usage.campaign,
-                'selected_product_name': usage.selected_product_name,
-                'selected_product_info': selected_product_info,
-                'used_by_branch': usage.used_by_branch
-            })
+    processed_campaign_usages = [campaign_usage_view(usage) for usage in campaign_usages.items] if campaign_usages else []
     
     return render_template('purchase_history.html', 
                          redemptions=redemptions,
                          point_earnings=point_earnings,
                          campaign_usages=campaign_usages,
                          processed_campaign_usages=processed_campaign_usages,
+                         timeline=timeline,
+                         page=page,
+                         has_next=has_next,
                          activity_type=activity_type,
                          start_date=start_date,
                          end_date=end_date,
-                         total_redemptions=total_redemptions,
-                         confirmed_redemptions=confirmed_redemptions,
-                         total_points_earned=total_points_earned,
-                         total_points_spent=total_points_spent,
-                         total_campaign_usages=total_campaign_usages)
+                         total_redemptions=totals['redemptions'],
+                         confirmed_redemptions=totals['confirmed_redemptions'],
+                         total_points_earned=totals['qr_scans'],
+                         total_points_spent=totals['points_spent'],
+                         total_campaign_usages=totals['campaign_usages'])
+
+def campaign_usage_view(usage):
+    """Kampanya kullanımını seçilen ürün bilgileriyle şablon için hazırlar"""
+    selected_product_info = None
+    if usage.selected_product_details:
+        try:
+            selected_product_info = json.loads(usage.selected_product_details)
+        except:
+            selected_product_info = None
+    
+    return {
+        'usage': usage,
+        'campaign': usage.campaign,
+        'selected_product_name': usage.selected_product_name,
+        'selected_product_info': selected_product_info,
+        'used_by_branch': usage.used_by_branch
+    }
 
 # Satın Alma Onay Sayfası
 @app.route('/purchase_confirmation/<int:redemption_id>')
@@ -1860,8 +2391,995 @@ def branch_panel():
     return render_template('branch_panel.html', branch=branch, scanned_qrs=scanned_qrs, 
                           pending_redemptions=pending_redemptions, confirmed_redemptions=confirmed_redemptions)
 
+# İmzalı üye QR kodları
+# Biçim: RM1.<kullanıcı id>.<zaman adımı>.<nonce>.<imza>. İmza, kullanıcıya özel
+# anahtarla (MEMBER_QR_SECRET'tan türetilir) HMAC-SHA256'dır; uygulama anahtarı bir
+# kez alır ve kodları sunucuya gitmeden üretir. Gösterilen kodlar veritabanına
+# yazılmaz; yalnızca başarılı okutma CustomerQR satırı olarak kaydedilir (code
+# unique olduğu için süreçler arası tekrar da engellenir).
+MEMBER_QR_PREFIX = 'RM1'
+
+class RecentNonceCache:
+    """Son zaman adımlarında kullanılmış nonce'lar; eski adımların kovaları toplu atılır"""
+    
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+    
+    def seen(self, step, key):
+        with self._lock:
+            return key in self._buckets.get(step, ())
+    
+    def add(self, step, key, oldest_step):
+        with self._lock:
+            self._buckets.setdefault(step, set()).add(key)
+            for old_step in [old_step for old_step in self._buckets if old_step < oldest_step]:
+                del self._buckets[old_step]
+
+member_qr_nonces = RecentNonceCache()
+
+def member_qr_step(timestamp=None):
+    return int((time.time() if timestamp is None else timestamp) // app.config['MEMBER_QR_STEP_SECONDS'])
+
+def member_qr_key(user_id):
+    """Kullanıcıya özel imza anahtarı (veritabanında tutulmaz, her seferinde türetilir)"""
+    secret = app.config['MEMBER_QR_SECRET'].encode('utf-8')
+    return hmac.new(secret, f'member-qr:{user_id}'.encode('ascii'), hashlib.sha256).digest()
+
+def member_qr_signature(key, user_id, step, nonce):
+    digest = hmac.new(key, f'{user_id}.{step}.{nonce}'.encode('ascii'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:12]).decode('ascii')
+
+def make_member_qr(user_id, step=None, nonce=None):
+    """Sunucu tarafında imzalı üye kodu üretir (web paneli için; mobil uygulama kendisi üretir)"""
+    step = member_qr_step() if step is None else step
+    nonce = nonce or secrets.token_urlsafe(6)
+    signature = member_qr_signature(member_qr_key(user_id), user_id, step, nonce)
+    return f'{MEMBER_QR_PREFIX}.{user_id}.{step}.{nonce}.{signature}'
+
+def member_qr_expires_at(step):
+    """Kodun geçerliliğinin bittiği an (Türkiye saati)"""
+    expires = (step + app.config['MEMBER_QR_VALID_STEPS']) * app.config['MEMBER_QR_STEP_SECONDS']
+    return datetime.fromtimestamp(expires, TURKEY_TZ)
+
+def is_member_qr(code):
+    return code.startswith(MEMBER_QR_PREFIX + '.')
+
+def verify_member_qr(code, at=None):
+    """İmzayı ve zaman penceresini doğrular: (user_id, step, nonce) veya None
+
+    at: okutma anı (Türkiye saati, tz'siz); çevrimdışı okutmalar okutuldukları ana göre doğrulanır
+    """
+    parts = code.split('.')
+    if len(parts) != 5 or parts[0] != MEMBER_QR_PREFIX:
+        return None
+    try:
+        user_id, step = int(parts[1]), int(parts[2])
+    except ValueError:
+        return None
+    nonce, signature = parts[3], parts[4]
+    if not nonce or len(nonce) > 32:
+        return None
+    
+    # Geçerli adım ve öncesindeki VALID_STEPS - 1 adım; saat kayması için bir adım ileri
+    current = member_qr_step(None if at is None else TURKEY_TZ.localize(at).timestamp())
+    if not current - app.config['MEMBER_QR_VALID_STEPS'] < step <= current + 1:
+        return None
+    
+    expected = member_qr_signature(member_qr_key(user_id), user_id, step, nonce)
+    if not hmac.compare_digest(expected, signature):
+        return None
+    return user_id, step, nonce
+
+def record_member_scan(code, branch_id, used_at):
+    """İmzalı üye kodunu doğrular ve kullanılmış CustomerQR satırı olarak ekler (commit çağırana aittir)"""
+    parsed = verify_member_qr(code, at=used_at)
+    if parsed is None:
+        return {'success': False, 'error': 'Geçersiz veya süresi dolmuş QR kod'}
+    user_id, step, nonce = parsed
+    
+    # Bu süreçte zaten okutulmuş kod: veritabanına gitmeden reddet
+    if member_qr_nonces.seen(step, f'{user_id}.{nonce}'):
+        return {'success': False, 'error': 'Geçersiz veya kullanılmış QR kod'}
+    
+    # Kodlar istemcide üretildiği için sınır okutma anında uygulanır
+    since = used_at - timedelta(seconds=app.config['MEMBER_QR_LIMIT_SECONDS'])
+    recent = db.session.query(db.func.count(CustomerQR.id)).filter(
+        CustomerQR.customer_id == user_id,
+        CustomerQR.used_at >= since,
+        CustomerQR.code.like(MEMBER_QR_PREFIX + '.%')
+    ).scalar()
+    if recent >= app.config['MEMBER_QR_MAX_SCANS']:
+        return {'success': False, 'error': 'Bu müşteri için kısa sürede çok fazla QR okutuldu, lütfen biraz bekleyin'}
+    
+    try:
+        with db.session.begin_nested():
+            db.session.execute(CustomerQR.__table__.insert().values(
+                code=code, customer_id=user_id, points_earned=1, is_used=True,
+                used_by_branch_id=branch_id, used_at=used_at, created_at=used_at
+            ))
+    except IntegrityError:
+        # Başka bir süreç aynı kodu daha önce okuttu
+        remember_member_scan(code)
+        return {'success': False, 'error': 'Geçersiz veya kullanılmış QR kod'}
+    
+    return {'success': True, 'customer_id': user_id}
+
+def remember_member_scan(code):
+    """Kullanılan üye kodunun nonce'unu tekrar koruması için önbelleğe ekler"""
+    _prefix, user_id, step, nonce, _signature = code.split('.')
+    step = int(step)
+    member_qr_nonces.add(step, f'{user_id}.{nonce}', member_qr_step() - app.config['MEMBER_QR_VALID_STEPS'])
+
+# Atomik QR okutma servisi
+# Kod koşullu UPDATE ile talep edilir; etkilenen satır sayısı 0 ise kod ya yok ya da
+# başka bir terminal tarafından zaten okutulmuştur. Puan deftere tek satır olarak eklenir,
+# böylece aynı anda okutulan kodlar çift puan yazamaz.
+def claim_customer_qr(code, branch_id=None):
+    """Müşteri QR kodunu tek kısa transaction içinde kullanır ve puanı ekler"""
+    qr_table = CustomerQR.__table__
+    user_table = User.__table__
+    
+    used_at = get_turkey_time()
+    member_code = is_member_qr(code)
+    
+    # 1. Kodu talep et (sadece kullanılmamışsa); imzalı üye kodu doğrulanıp kullanılmış olarak eklenir
+    if member_code:
+        scan = record_member_scan(code, branch_id, used_at.replace(tzinfo=None))
+        if not scan['success']:
+            db.session.rollback()
+            return scan
+    else:
+        claimed = db.session.execute(
+            qr_table.update()
+            .where(
+                qr_table.c.code == code,
+                db.or_(qr_table.c.is_used == False, qr_table.c.is_used.is_(None))
+            )
+            .values(is_used=True, used_at=used_at, used_by_branch_id=branch_id)
+        )
+        if claimed.rowcount != 1:
+            db.session.rollback()
+            return {'success': False, 'error': 'Geçersiz veya kullanılmış QR kod'}
+    
+    # 2. Kodun sahibini ve kazanılan puanı oku
+    owner = db.session.execute(
+        db.select(user_table.c.id, db.func.coalesce(qr_table.c.points_earned, 1).label('points_earned'))
+        .select_from(qr_table.join(user_table, user_table.c.id == qr_table.c.customer_id))
+        .where(qr_table.c.code == code)
+    ).first()
+    if owner is None:
+        db.session.rollback()
+        return {'success': False, 'error': 'Müşteri bulunamadı'}
+    
+    # 3. Puan defteri ile günlük ve şube bazlı puan özetlerini aynı transaction içinde güncelle
+    append_point_ledger([{
+        'user_id': owner.id, 'delta': owner.points_earned, 'reason': 'qr_scan',
+        'branch_id': branch_id, 'ref': f'qr:{code}'
+    }])
+    add_points_rollup(owner.id, branch_id, used_at, owner.points_earned)
+    
+    # 4. Güncel bakiyeyi (yeni satır dahil) aynı transaction içinde oku
+    customer = db.session.execute(
+        db.select(
+            user_table.c.id,
+            user_table.c.name,
+            user_table.c.email,
+            ledger_balance(user_table.c.id).label('points'),
+            db.literal(owner.points_earned).label('points_earned')
+        )
+        .where(user_table.c.id == owner.id)
+    ).first()
+    db.session.commit()
+    if member_code:
+        remember_member_scan(code)
+    
+    return {'success': True, 'customer': customer, 'points_earned': customer.points_earned}
+
+def claim_customer_qrs(codes, branch_id=None):
+    """Birden fazla müşteri QR kodunu tek transaction içinde kullanır (toplu okutma)
+    
+    Her kod claim_customer_qr ile aynı koşullu UPDATE ile talep edilir; geçersiz
+    veya zaten kullanılmış kodlar rejected listesine düşer, diğerleri birlikte
+    işlenir. Aynı müşteriye ait kodların puanı tek UPDATE ile eklenir.
+    """
+    qr_table = CustomerQR.__table__
+    user_table = User.__table__
+    
+    codes = list(dict.fromkeys(code.strip() for code in codes if code and code.strip()))
+    used_at = get_turkey_time()
+    
+    # 1. Kodları talep et (sadece kullanılmamışsa)
+    claimed, rejected = [], []
+    for code in codes:
+        if is_member_qr(code):
+            (claimed if record_member_scan(code, branch_id, used_at.replace(tzinfo=None))['success'] else rejected).append(code)
+            continue
+        result = db.session.execute(
+            qr_table.update()
+            .where(
+                qr_table.c.code == code,
+                db.or_(qr_table.c.is_used == False, qr_table.c.is_used.is_(None))
+            )
+            .values(is_used=True, used_at=used_at, used_by_branch_id=branch_id)
+        )
+        (claimed if result.rowcount == 1 else rejected).append(code)
+    
+    if not claimed:
+        db.session.rollback()
+        return {'success': False, 'error': 'Geçerli QR kod bulunamadı', 'credited': [], 'rejected': rejected}
+    
+    # 2. Puanları müşteri bazında topla
+    rows = db.session.execute(
+        db.select(qr_table.c.code, qr_table.c.customer_id, db.func.coalesce(qr_table.c.points_earned, 1))
+        .where(qr_table.c.code.in_(claimed))
+    ).all()
+    earned_by_code = {code: (customer_id, earned) for code, customer_id, earned in rows}
+    per_customer = {}
+    for customer_id, earned in earned_by_code.values():
+        points, scans = per_customer.get(customer_id, (0, 0))
+        per_customer[customer_id] = (points + earned, scans + 1)
+    
+    existing = set(db.session.execute(
+        db.select(user_table.c.id).where(user_table.c.id.in_(list(per_customer)))
+    ).scalars())
+    if len(existing) != len(per_customer):
+        db.session.rollback()
+        return {'success': False, 'error': 'Müşteri bulunamadı', 'credited': [], 'rejected': codes}
+    
+    # 3. Günlük ve şube bazlı puan özetleri
+    for customer_id, (points, scans) in per_customer.items():
+        add_points_rollup(customer_id, branch_id, used_at, points, scans=scans)
+    
+    # 4. Puan defteri: kod başına bir satır
+    append_point_ledger([{
+        'user_id': earned_by_code[code][0], 'delta': earned_by_code[code][1], 'reason': 'qr_scan',
+        'branch_id': branch_id, 'ref': f'qr:{code}'
+    } for code in claimed])
+    
+    # 5. Güncel bakiyeleri aynı transaction içinde oku
+    customers = {
+        row.id: row for row in db.session.execute(
+            db.select(user_table.c.id, user_table.c.name, user_table.c.email, ledger_balance(user_table.c.id).label('points'))
+            .where(user_table.c.id.in_(list(per_customer)))
+        )
+    }
+    db.session.commit()
+    for code in claimed:
+        if is_member_qr(code):
+            remember_member_scan(code)
+    
+    credited = [{
+        'code': code,
+        'customer': customers[earned_by_code[code][0]],
+        'points_earned': earned_by_code[code][1]
+    } for code in claimed]
+    return {
+        'success': True,
+        'credited': credited,
+        'rejected': rejected,
+        'customer_points': {customer_id: points for customer_id, (points, _scans) in per_customer.items()}
+    }
+
+def _upsert_statement(table):
+    """Veritabanına uygun INSERT ... ON CONFLICT ifadesi"""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+def add_points_rollup(user_id, branch_id, used_at, points, scans=1):
+    """Puan özet tablolarını artırır (commit çağırana aittir)"""
+    used_at = used_at.replace(tzinfo=None)
+    branch_key = branch_id or 0
+    
+    daily = CustomerPointsDaily.__table__
+    stmt = _upsert_statement(daily).values(
+        user_id=user_id, branch_id=branch_key, day=used_at.date(), points=points, scans=scans
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[daily.c.user_id, daily.c.branch_id, daily.c.day],
+        set_={'points': daily.c.points + stmt.excluded.points, 'scans': daily.c.scans + stmt.excluded.scans}
+    ))
+    
+    totals = CustomerBranchTotal.__table__
+    stmt = _upsert_statement(totals).values(
+        user_id=user_id, branch_id=branch_key, points=points, scans=scans, last_scan_at=used_at
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[totals.c.user_id, totals.c.branch_id],
+        set_={
+            'points': totals.c.points + stmt.excluded.points,
+            'scans': totals.c.scans + stmt.excluded.scans,
+            # Çevrimdışı senkronize edilen eski okutmalar son okutma zamanını geri almasın
+            'last_scan_at': db.case(
+                (totals.c.last_scan_at > stmt.excluded.last_scan_at, totals.c.last_scan_at),
+                else_=stmt.excluded.last_scan_at
+            )
+        }
+    ))
+    
+    add_user_activity(user_id, qr_scans=scans)
+
+USER_ACTIVITY_COUNTERS = ('redemptions', 'confirmed_redemptions', 'points_spent', 'qr_scans', 'campaign_usages')
+
+def add_user_activity(user_id, **counts):
+    """Kullanıcı geçmiş sayaçlarını atomik olarak artırır (commit çağırana aittir)"""
+    totals = UserActivityTotal.__table__
+    values = {name: counts.get(name, 0) for name in USER_ACTIVITY_COUNTERS}
+    stmt = _upsert_statement(totals).values(user_id=user_id, **values)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[totals.c.user_id],
+        set_={name: totals.c[name] + stmt.excluded[name] for name in counts}
+    ))
+
+def rebuild_user_activity_totals():
+    """Kullanıcı geçmiş sayaçlarını kaynak tablolardan yeniden oluşturur (backfill)"""
+    totals = UserActivityTotal.__table__
+    redemptions = ProductRedemption.__table__
+    qr_table = CustomerQR.__table__
+    usages = CampaignUsage.__table__
+    user_table = User.__table__
+    
+    claims = db.select(
+        redemptions.c.user_id,
+        db.func.count(redemptions.c.id).label('redemptions'),
+        db.func.sum(db.case((redemptions.c.is_confirmed == True, 1), else_=0)).label('confirmed_redemptions'),
+        db.func.sum(redemptions.c.points_used).label('points_spent')
+    ).group_by(redemptions.c.user_id).subquery()
+    scans = db.select(
+        qr_table.c.customer_id, db.func.count(qr_table.c.id).label('qr_scans')
+    ).where(qr_table.c.is_used == True).group_by(qr_table.c.customer_id).subquery()
+    campaigns = db.select(
+        usages.c.customer_id, db.func.count(usages.c.id).label('campaign_usages')
+    ).where(usages.c.is_used == True).group_by(usages.c.customer_id).subquery()
+    
+    db.session.execute(totals.delete())
+    db.session.execute(totals.insert().from_select(
+        ['user_id', *USER_ACTIVITY_COUNTERS],
+        db.select(
+            user_table.c.id,
+            db.func.coalesce(claims.c.redemptions, 0),
+            db.func.coalesce(claims.c.confirmed_redemptions, 0),
+            db.func.coalesce(claims.c.points_spent, 0),
+            db.func.coalesce(scans.c.qr_scans, 0),
+            db.func.coalesce(campaigns.c.campaign_usages, 0)
+        )
+        .select_from(
+            user_table
+            .join(claims, claims.c.user_id == user_table.c.id, isouter=True)
+            .join(scans, scans.c.customer_id == user_table.c.id, isouter=True)
+            .join(campaigns, campaigns.c.customer_id == user_table.c.id, isouter=True)
+        )
+        .where(db.or_(claims.c.user_id.isnot(None), scans.c.customer_id.isnot(None), campaigns.c.customer_id.isnot(None)))
+    ))
+    db.session.commit()
+    return db.session.query(db.func.count()).select_from(totals).scalar()
+
+def user_activity_totals(user_id):
+    """Kullanıcının geçmiş sayaçları (kaydı yoksa sıfırlar), tek satır okuma"""
+    row = db.session.get(UserActivityTotal, user_id)
+    return {name: getattr(row, name, 0) or 0 for name in USER_ACTIVITY_COUNTERS}
+
+def append_point_ledger(entries):
+    """Puan defterine satır ekler (commit çağırana aittir)
+
+    entries: user_id, delta, reason ve isteğe bağlı branch_id/ref içeren dict'ler.
+    Satırlar tek executemany INSERT ile eklenir; User satırına yazılmaz. Kuyruğu
+    uzayan kullanıcıların özeti aynı transaction içinde ilerletilir.
+    """
+    if not entries:
+        return
+    now = get_turkey_time().replace(tzinfo=None)
+    db.session.execute(PointLedger.__table__.insert(), [{
+        'user_id': entry['user_id'],
+        'delta': entry['delta'],
+        'reason': entry['reason'],
+        'branch_id': entry.get('branch_id'),
+        'ref': entry.get('ref'),
+        'created_at': now
+    } for entry in entries])
+    user_ids = {entry['user_id'] for entry in entries}
+    refresh_point_snapshots(user_ids=user_ids, commit=False)
+    expire_points(user_ids)
+
+def expire_points(user_ids):
+    """Oturumdaki User nesnelerinin bakiyesi bir sonraki erişimde defterden yeniden okunur"""
+    for user_id in user_ids:
+        user = db.session.identity_map.get(db.inspect(User).identity_key_from_primary_key((user_id,)))
+        if user is not None:
+            db.session.expire(user, ['points'])
+
+# PostgreSQL advisory lock anahtar alanı (aynı kullanıcının harcamalarını sıralar)
+POINT_DEBIT_LOCK_SPACE = 2101
+
+def debit_points(user_id, points, reason, branch_id=None, ref=None):
+    """Bakiye yeterliyse deftere harcama satırı ekler
+
+    Kontrol ve ekleme tek INSERT ... SELECT ... WHERE bakiye >= puan ifadesidir.
+    SQLite yazma kilidini ifadenin başında aldığından eşzamanlı harcamalar bakiyeyi
+    eksiye düşüremez; PostgreSQL'de aynı kullanıcının harcamaları transaction
+    sonuna kadar advisory lock ile sıralanır. Bakiye yetersizse hiçbir şey
+    yazılmaz ve False döner. Commit çağırana aittir.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(db.select(db.func.pg_advisory_xact_lock(POINT_DEBIT_LOCK_SPACE, user_id)))
+    ledger = PointLedger.__table__
+    debited = db.session.execute(ledger.insert().from_select(
+        ['user_id', 'delta', 'reason', 'branch_id', 'ref', 'created_at'],
+        db.select(
+            db.literal(user_id, db.Integer), db.literal(-points, db.Integer), db.literal(reason, db.String),
+            db.literal(branch_id, db.Integer), db.literal(ref, db.String),
+            db.literal(get_turkey_time().replace(tzinfo=None), db.DateTime)
+        ).where(ledger_balance(user_id) >= points)
+    ))
+    if debited.rowcount != 1:
+        return False
+    refresh_point_snapshots(user_ids=[user_id], commit=False)
+    expire_points([user_id])
+    return True
+
+def claim_redemption_confirmation(redemption_id, branch_id=None):
+    """Bekleyen ürün talebini onaylı olarak işaretler (compare-and-set)
+
+    Aynı talebi eşzamanlı onaylayan isteklerden yalnızca biri True alır; puan
+    düşümü ancak bu çağrı başarılı olduktan sonra yapılmalıdır. Commit çağırana aittir.
+    """
+    values = {'is_confirmed': True, 'confirmed_at': get_turkey_time()}
+    if branch_id is not None:
+        values['confirmed_by_branch_id'] = branch_id
+    claimed = db.session.execute(
+        db.update(ProductRedemption)
+        .where(ProductRedemption.id == redemption_id, ProductRedemption.is_confirmed == False)
+        .values(**values)
+    )
+    return claimed.rowcount == 1
+
+def points_balance(user_id):
+    """Defterden bakiye: son özet + özetten sonraki satırlar (tek sorgu)"""
+    return int(db.session.execute(db.select(ledger_balance(user_id))).scalar() or 0)
+
+def refresh_point_snapshots(min_tail=None, settle_seconds=None, user_ids=None, commit=True):
+    """Özetten sonra en az min_tail satırı biriken kullanıcıların özetini ilerletir
+
+    Tek INSERT ... SELECT ... ON CONFLICT ile çalışır. Henüz commit edilmemiş
+    olabilecek satırları atlamamak için son settle_seconds (varsayılan
+    POINT_SNAPSHOT_SETTLE_SECONDS) içinde eklenen satırlar özete alınmaz.
+    user_ids verilirse yalnızca o kullanıcılar (defter yazımlarında, commit=False
+    ile çağıranın transaction'ı içinde). Güncellenen kullanıcı sayısını döndürür.
+    """
+    if min_tail is None:
+        min_tail = app.config['POINT_SNAPSHOT_MIN_TAIL']
+    if settle_seconds is None:
+        settle_seconds = app.config['POINT_SNAPSHOT_SETTLE_SECONDS']
+    ledger = PointLedger.__table__
+    snapshots = PointSnapshot.__table__
+    now = get_turkey_time().replace(tzinfo=None)
+    settled_before = now - timedelta(seconds=settle_seconds)
+    
+    tail = (
+        db.select(
+            ledger.c.user_id,
+            db.func.max(ledger.c.id),
+            db.func.coalesce(snapshots.c.balance, 0) + db.func.sum(ledger.c.delta),
+            db.literal(now, db.DateTime)
+        )
+        .select_from(ledger.outerjoin(snapshots, snapshots.c.user_id == ledger.c.user_id))
+        .where(ledger.c.id > db.func.coalesce(snapshots.c.ledger_id, 0), ledger.c.created_at <= settled_before)
+        .group_by(ledger.c.user_id, snapshots.c.balance)
+        .having(db.func.count(ledger.c.id) >= max(min_tail, 1))
+    )
+    if user_ids is not None:
+        tail = tail.where(ledger.c.user_id.in_(list(user_ids)))
+    stmt = _upsert_statement(snapshots).from_select(['user_id', 'ledger_id', 'balance', 'taken_at'], tail)
+    result = db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[snapshots.c.user_id],
+        set_={'ledger_id': stmt.excluded.ledger_id, 'balance': stmt.excluded.balance, 'taken_at': stmt.excluded.taken_at}
+    ))
+    if commit:
+        db.session.commit()
+    return result.rowcount
+
+def reconcile_point_ledger():
+    """Defteri özetlere karşı toplu olarak doğrular
+
+    1. Her özetin bakiyesi, ledger_id'ye kadar olan satırların toplamına eşit olmalı:
+       snapshot_mismatches = (user_id, özet, defter toplamı).
+    2. Hiçbir bakiye (özet + sonraki satırlar) eksi olmamalı: negative_balances = (user_id, bakiye).
+    3. Eski bakiyesi (legacy_points) olan her kullanıcının açılış satırı olmalı:
+       unopened_users = (user_id, eski bakiye).
+    Her kontrol tek sorgudur.
+    """
+    ledger = PointLedger.__table__
+    snapshots = PointSnapshot.__table__
+    user_table = User.__table__
+    
+    snapshot_sum = db.func.coalesce(db.func.sum(ledger.c.delta), 0)
+    snapshot_mismatches = db.session.execute(
+        db.select(snapshots.c.user_id, snapshots.c.balance, snapshot_sum)
+        .select_from(snapshots.outerjoin(ledger, db.and_(
+            ledger.c.user_id == snapshots.c.user_id, ledger.c.id <= snapshots.c.ledger_id
+        )))
+        .group_by(snapshots.c.user_id, snapshots.c.balance)
+        .having(snapshot_sum != snapshots.c.balance)
+    ).all()
+    
+    tail = (
+        db.select(ledger.c.user_id, db.func.sum(ledger.c.delta).label('total'))
+        .select_from(ledger.outerjoin(snapshots, snapshots.c.user_id == ledger.c.user_id))
+        .where(ledger.c.id > db.func.coalesce(snapshots.c.ledger_id, 0))
+        .group_by(ledger.c.user_id)
+        .subquery()
+    )
+    balance = db.func.coalesce(snapshots.c.balance, 0) + db.func.coalesce(tail.c.total, 0)
+    negative_balances = db.session.execute(
+        db.select(user_table.c.id, balance)
+        .select_from(
+            user_table
+            .outerjoin(snapshots, snapshots.c.user_id == user_table.c.id)
+            .outerjoin(tail, tail.c.user_id == user_table.c.id)
+        )
+        .where(balance < 0)
+    ).all()
+    
+    unopened_users = db.session.execute(
+        db.select(user_table.c.id, user_table.c.points)
+        .where(
+            db.func.coalesce(user_table.c.points, 0) != 0,
+            ~db.exists().where(ledger.c.user_id == user_table.c.id, ledger.c.reason == 'opening')
+        )
+    ).all()
+    
+    return {
+        'checked_users': db.session.query(db.func.count()).select_from(user_table).scalar(),
+        'snapshot_mismatches': [tuple(row) for row in snapshot_mismatches],
+        'negative_balances': [tuple(row) for row in negative_balances],
+        'unopened_users': [tuple(row) for row in unopened_users]
+    }
+
+def open_point_ledger():
+    """Açılış satırı olmayan kullanıcılar için eski bakiyeyi (legacy_points) açılış satırı olarak ekler (backfill)
+    
+    Kullanıcının defterde başka satırları (ör. yeni sürümde okuttuğu QR) olması açılışı
+    engellemez; yalnızca reason='opening' satırı olanlar atlanır.
+    """
+    ledger = PointLedger.__table__
+    user_table = User.__table__
+    result = db.session.execute(ledger.insert().from_select(
+        ['user_id', 'delta', 'reason', 'created_at'],
+        db.select(
+            user_table.c.id, user_table.c.points, db.literal('opening'),
+            db.literal(get_turkey_time().replace(tzinfo=None), db.DateTime)
+        ).where(
+            db.func.coalesce(user_table.c.points, 0) != 0,
+            ~db.exists().where(ledger.c.user_id == user_table.c.id, ledger.c.reason == 'opening')
+        )
+    ))
+    db.session.commit()
+    return result.rowcount
+
+def rebuild_points_rollups():
+    """Puan özet tablolarını CustomerQR geçmişinden yeniden oluşturur (backfill)"""
+    qr_table = CustomerQR.__table__
+    daily = CustomerPointsDaily.__table__
+    totals = CustomerBranchTotal.__table__
+    branch_key = db.func.coalesce(qr_table.c.used_by_branch_id, 0)
+    used = db.and_(qr_table.c.is_used == True, qr_table.c.used_at.isnot(None))
+    
+    db.session.execute(daily.delete())
+    db.session.execute(totals.delete())
+    
+    day = db.func.date(qr_table.c.used_at)
+    db.session.execute(daily.insert().from_select(
+        ['user_id', 'branch_id', 'day', 'points', 'scans'],
+        db.select(
+            qr_table.c.customer_id, branch_key, day,
+            db.func.sum(db.func.coalesce(qr_table.c.points_earned, 1)), db.func.count(qr_table.c.id)
+        ).where(used).group_by(qr_table.c.customer_id, branch_key, day)
+    ))
+    db.session.execute(totals.insert().from_select(
+        ['user_id', 'branch_id', 'points', 'scans', 'last_scan_at'],
+        db.select(
+            qr_table.c.customer_id, branch_key,
+            db.func.sum(db.func.coalesce(qr_table.c.points_earned, 1)), db.func.count(qr_table.c.id),
+            db.func.max(qr_table.c.used_at)
+        ).where(used).group_by(qr_table.c.customer_id, branch_key)
+    ))
+    db.session.commit()
+    
+    return (
+        db.session.query(db.func.count()).select_from(daily).scalar(),
+        db.session.query(db.func.count()).select_from(totals).scalar()
+    )
+
+def points_daily_totals(user_id, start_day, end_day):
+    """Kullanıcının gün bazında kazandığı puanlar ({gün: puan}), özet tablodan"""
+    daily = CustomerPointsDaily.__table__
+    rows = db.session.execute(
+        db.select(daily.c.day, db.func.sum(daily.c.points))
+        .where(daily.c.user_id == user_id, daily.c.day >= start_day, daily.c.day <= end_day)
+        .group_by(daily.c.day)
+    ).all()
+    return {day: int(points or 0) for day, points in rows}
+
+def most_visited_branch_total(user_id):
+    """Kullanıcının en çok QR okuttuğu şube: (branch_id, okutma sayısı) veya None"""
+    totals = CustomerBranchTotal.__table__
+    return db.session.execute(
+        db.select(totals.c.branch_id, totals.c.scans)
+        .where(totals.c.user_id == user_id, totals.c.branch_id != 0)
+        .order_by(totals.c.scans.desc(), totals.c.last_scan_at.desc())
+        .limit(1)
+    ).first()
+
+def claim_campaign_usage(usage_id, branch_id=None, used_at=None):
+    """Kampanya QR kodunu koşullu UPDATE ile kullanır (commit çağırana aittir)"""
+    usage_table = CampaignUsage.__table__
+    claimed = db.session.execute(
+        usage_table.update()
+        .where(
+            usage_table.c.id == usage_id,
+            db.or_(usage_table.c.is_used == False, usage_table.c.is_used.is_(None))
+        )
+        .values(
+            is_used=True,
+            used_at=used_at or get_turkey_time().replace(tzinfo=None),
+            used_by_branch_id=branch_id
+        )
+    )
+    if claimed.rowcount != 1:
+        return False
+    
+    # Kullanım sayaçlarını aynı transaction içinde artır
+    campaign_id, customer_id = db.session.execute(
+        db.select(usage_table.c.campaign_id, usage_table.c.customer_id).where(usage_table.c.id == usage_id)
+    ).one()
+    add_campaign_usage_count(campaign_id, customer_id)
+    return True
+
+def add_campaign_usage_count(campaign_id, customer_id, count=1):
+    """Kampanya kullanım sayaçlarını atomik olarak artırır (commit çağırana aittir)"""
+    totals = CampaignUsageTotal.__table__
+    stmt = _upsert_statement(totals).values(campaign_id=campaign_id, used_count=count)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[totals.c.campaign_id],
+        set_={'used_count': totals.c.used_count + stmt.excluded.used_count}
+    ))
+    
+    per_customer = CampaignCustomerUsage.__table__
+    stmt = _upsert_statement(per_customer).values(campaign_id=campaign_id, customer_id=customer_id, used_count=count)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[per_customer.c.campaign_id, per_customer.c.customer_id],
+        set_={'used_count': per_customer.c.used_count + stmt.excluded.used_count}
+    ))
+    
+    add_user_activity(customer_id, campaign_usages=count)
+
+def campaign_usage_counts(campaign_ids, customer_id=None):
+    """{kampanya id: (toplam kullanım, müşterinin kullanımı)} sayaçlarını tek sorguda döndürür"""
+    campaign_ids = list(campaign_ids)
+    if not campaign_ids:
+        return {}
+    
+    if customer_id is None:
+        query = db.select(CampaignUsageTotal.campaign_id, CampaignUsageTotal.used_count, db.literal(0))
+    else:
+        # Müşteri sayacı yalnızca toplam sayaçla birlikte artırıldığı için dış birleştirme yeterli
+        query = db.select(
+            CampaignUsageTotal.campaign_id,
+            CampaignUsageTotal.used_count,
+            db.func.coalesce(CampaignCustomerUsage.used_count, 0)
+        ).outerjoin(
+            CampaignCustomerUsage,
+            db.and_(
+                CampaignCustomerUsage.campaign_id == CampaignUsageTotal.campaign_id,
+                CampaignCustomerUsage.customer_id == customer_id
+            )
+        )
+    
+    rows = db.session.execute(query.where(CampaignUsageTotal.campaign_id.in_(campaign_ids))).all()
+    return {campaign_id: (total, customer) for campaign_id, total, customer in rows}
+
+def rebuild_campaign_usage_counters():
+    """Kampanya kullanım sayaçlarını CampaignUsage geçmişinden yeniden oluşturur (backfill)"""
+    usage_table = CampaignUsage.__table__
+    totals = CampaignUsageTotal.__table__
+    per_customer = CampaignCustomerUsage.__table__
+    used = usage_table.c.is_used == True
+    
+    db.session.execute(totals.delete())
+    db.session.execute(per_customer.delete())
+    
+    db.session.execute(totals.insert().from_select(
+        ['campaign_id', 'used_count'],
+        db.select(usage_table.c.campaign_id, db.func.count(usage_table.c.id))
+        .where(used).group_by(usage_table.c.campaign_id)
+    ))
+    db.session.execute(per_customer.insert().from_select(
+        ['campaign_id', 'customer_id', 'used_count'],
+        db.select(usage_table.c.campaign_id, usage_table.c.customer_id, db.func.count(usage_table.c.id))
+        .where(used).group_by(usage_table.c.campaign_id, usage_table.c.customer_id)
+    ))
+    db.session.commit()
+    
+    return (
+        db.session.query(db.func.count()).select_from(totals).scalar(),
+        db.session.query(db.func.count()).select_from(per_customer).scalar()
+    )
+
+# Çevrimdışı şube okutmalarının toplu senkronizasyonu
+SCAN_SYNC_TYPES = ('customer_qr', 'campaign_qr')
+
+def parse_scan_time(value):
+    """ISO 8601 okutma zamanını tz'siz Türkiye saatine çevirir (bozuksa None)"""
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(TURKEY_TZ).replace(tzinfo=None)
+    return parsed
+
+def sync_branch_scans(branch_id, events):
+    """Terminalde biriken okutma olaylarını tek transaction içinde uygular
+    
+    Olay: {'id', 'type': 'customer_qr' | 'campaign_qr', 'code', 'scanned_at'}.
+    Kodlar ve önceki senkronizasyonlar toplu sorgularla okunur; her kod canlı
+    okutmadaki koşullu UPDATE ile talep edildiği için aynı anda şubede okutulan
+    kodla yarışsa da bir kez kullanılır. Daha önce işlenmiş olay id'si için kayıtlı
+    sonuç döner (tekrar uygulanmaz). Sonuçlar olaylarla aynı sıradadır.
+    Commit burada yapılır; aynı olaylar eşzamanlı senkronize edilirse IntegrityError fırlar.
+    """
+    now = get_turkey_time().replace(tzinfo=None)
+    oldest = now - timedelta(hours=app.config['SCAN_SYNC_MAX_AGE_HOURS'])
+    newest = now + timedelta(minutes=5)
+    results = [None] * len(events)
+    pending = []
+    
+    # 1. Biçim kontrolü (veritabanına gitmeden)
+    event_ids = set()
+    for index, event in enumerate(events):
+        event = event if isinstance(event, dict) else {}
+        event_id = str(event.get('id') or '').strip()
+        event_type = event.get('type')
+        code = str(event.get('code') or '').strip()
+        scanned_at = parse_scan_time(event.get('scanned_at')) if event.get('scanned_at') else None
+        
+        error = None
+        if not event_id or len(event_id) > 64:
+            error = 'Geçersiz olay id'
+        elif event_id in event_ids:
+            results[index] = {'id': event_id, 'status': 'duplicate'}
+            continue
+        elif event_type not in SCAN_SYNC_TYPES:
+            error = 'Geçersiz olay türü'
+        elif not code or len(code) > 200:
+            error = 'QR kod boş olamaz'
+        elif scanned_at is None:
+            error = 'Geçersiz okutma zamanı'
+        elif scanned_at < oldest:
+            error = 'Okutma senkronizasyon süresini aşmış'
+        elif scanned_at > newest:
+            error = 'Okutma zamanı ileri bir tarih'
+        
+        if error:
+            results[index] = {'id': event_id or None, 'status': 'rejected', 'error': error}
+            continue
+        event_ids.add(event_id)
+        pending.append((index, event_id, event_type, code, scanned_at))
+    
+    # 2. Daha önce senkronize edilmiş olaylar
+    if event_ids:
+        stored = {
+            row.event_id: row for row in db.session.execute(
+                db.select(ScanSyncEvent.event_id, ScanSyncEvent.status, ScanSyncEvent.error, ScanSyncEvent.points_earned)
+                .where(ScanSyncEvent.branch_id == branch_id, ScanSyncEvent.event_id.in_(list(event_ids)))
+            )
+        }
+    else:
+        stored = {}
+    for index, event_id, *_rest in pending:
+        row = stored.get(event_id)
+        if row is not None:
+            results[index] = {
+                'id': event_id, 'status': 'duplicate', 'result': row.status,
+                'error': row.error, 'points_earned': row.points_earned
+            }
+    pending = [item for item in pending if item[1] not in stored]
+    # Sınırlar ve yarışlar okutma sırasına göre çözülsün
+    pending.sort(key=lambda item: item[4])
+    
+    # 3. Kodları toplu oku
+    qr_table = CustomerQR.__table__
+    legacy_codes = [code for _i, _e, event_type, code, _t in pending if event_type == 'customer_qr' and not is_member_qr(code)]
+    customer_qrs = {
+        row.code: row for row in db.session.execute(
+            db.select(qr_table.c.code, qr_table.c.customer_id, db.func.coalesce(qr_table.c.points_earned, 1).label('points_earned'))
+            .where(qr_table.c.code.in_(legacy_codes))
+        )
+    } if legacy_codes else {}
+    
+    campaign_codes = [code for _i, _e, event_type, code, _t in pending if event_type == 'campaign_qr']
+    usages = {
+        usage.qr_code: usage for usage in CampaignUsage.query
+        .options(selectinload(CampaignUsage.campaign))
+        .filter(CampaignUsage.qr_code.in_(campaign_codes))
+    } if campaign_codes else {}
+    
+    # 4. Olayları uygula
+    credits = []  # (index, customer_id, puan, okutma zamanı, kod)
+    campaign_uses = []  # (index, usage)
+    records = []
+    for index, event_id, event_type, code, scanned_at in pending:
+        error = None
+        points = None
+        if event_type == 'customer_qr':
+            if is_member_qr(code):
+                scan = record_member_scan(code, branch_id, scanned_at)
+                if scan['success']:
+                    points = 1
+                    credits.append((index, scan['customer_id'], points, scanned_at, code))
+                else:
+                    error = scan['error']
+            elif code not in customer_qrs:
+                error = 'Geçersiz veya kullanılmış QR kod'
+            else:
+                claimed = db.session.execute(
+                    qr_table.update()
+                    .where(
+                        qr_table.c.code == code,
+                        db.or_(qr_table.c.is_used == False, qr_table.c.is_used.is_(None))
+                    )
+                    .values(is_used=True, used_at=scanned_at, used_by_branch_id=branch_id)
+                )
+                if claimed.rowcount == 1:
+                    row = customer_qrs[code]
+                    points = row.points_earned
+                    credits.append((index, row.customer_id, points, scanned_at, code))
+                else:
+                    error = 'Geçersiz veya kullanılmış QR kod'
+        else:
+            usage = usages.get(code)
+            campaign = usage.campaign if usage else None
+            valid_branch_ids = campaign_branch_ids(campaign) if campaign else frozenset()
+            if usage is None or campaign is None:
+                error = 'Geçersiz QR kod'
+            elif usage.is_used:
+                error = 'Bu QR kod daha önce kullanılmış'
+            elif usage.expires_at and scanned_at > usage.expires_at:
+                error = 'QR kod süresi dolmuş'
+            elif not (campaign.is_active and campaign.start_date <= scanned_at <= campaign.end_date):
+                error = 'Kampanya okutma anında geçerli değil'
+            elif valid_branch_ids and int(branch_id) not in valid_branch_ids:
+                error = 'Kampanya bu şubede geçerli değil'
+            elif not claim_campaign_usage(usage.id, branch_id=branch_id, used_at=scanned_at):
+                error = 'Bu QR kod daha önce kullanılmış'
+            else:
+                campaign_uses.append((index, usage))
+        
+        results[index] = {'id': event_id, 'status': 'rejected' if error else 'applied', 'type': event_type}
+        if error:
+            results[index]['error'] = error
+        elif points is not None:
+            results[index]['points_earned'] = points
+        records.append({
+            'branch_id': branch_id, 'event_id': event_id, 'event_type': event_type, 'code': code,
+            'scanned_at': scanned_at, 'status': results[index]['status'], 'error': error,
+            'points_earned': points, 'synced_at': now
+        })
+    
+    # 5. Defter satırları ve özetler: olay başına bir defter satırı, (müşteri, gün) başına tek özet
+    user_table = User.__table__
+    per_customer = {}
+    per_day = {}
+    for _index, customer_id, points, scanned_at, _code in credits:
+        per_customer[customer_id] = per_customer.get(customer_id, 0) + points
+        day_points, day_scans, last_scan = per_day.get((customer_id, scanned_at.date()), (0, 0, scanned_at))
+        per_day[(customer_id, scanned_at.date())] = (day_points + points, day_scans + 1, max(last_scan, scanned_at))
+    
+    for (customer_id, _day), (points, scans, last_scan) in per_day.items():
+        add_points_rollup(customer_id, branch_id, last_scan, points, scans=scans)
+    append_point_ledger([{
+        'user_id': customer_id, 'delta': points, 'reason': 'qr_sync', 'branch_id': branch_id, 'ref': f'qr:{code}'
+    } for _index, customer_id, points, _scanned_at, code in credits])
+    
+    customers = {
+        row.id: row for row in db.session.execute(
+            db.select(user_table.c.id, user_table.c.name, ledger_balance(user_table.c.id).label('points'))
+            .where(user_table.c.id.in_(list(per_customer)))
+        )
+    } if per_customer else {}
+    for index, customer_id, _points, _scanned_at, _code in credits:
+        results[index]['customer_name'] = customers[customer_id].name
+        results[index]['total_points'] = customers[customer_id].points
+    for index, usage in campaign_uses:
+        results[index]['campaign_title'] = usage.campaign.title
+    
+    # 6. Bildirimler aynı transaction içinde kuyruğa eklenir (müşteri başına tek bildirim)
+    for customer_id, points in per_customer.items():
+        send_push_notification(
+            user_id=customer_id,
+            title="🎯 Puan Kazandınız!",
+            body=f"Tebrikler! {points} puan kazandınız. Toplam puanınız: {customers[customer_id].points}",
+            notification_type="points",
+            url="/dashboard",
+            commit=False
+        )
+    branch_name = Branch.query.get(branch_id).name if campaign_uses else None
+    for _index, usage in campaign_uses:
+        send_push_notification(
+            user_id=usage.customer_id,
+            title=f"🎉 Kampanya Kullanıldı: {usage.campaign.title}",
+            body=f"{branch_name} şubesinde kampanyanızı kullandınız!",
+            notification_type="campaign_usage",
+            url="/campaigns",
+            commit=False
+        )
+    
+    if records:
+        db.session.execute(ScanSyncEvent.__table__.insert(), records)
+    db.session.commit()
+    
+    for index, _event_id, event_type, code, _scanned_at in pending:
+        if event_type == 'customer_qr' and is_member_qr(code) and results[index]['status'] == 'applied':
+            remember_member_scan(code)
+    if per_customer or campaign_uses:
+        wake_push_dispatcher()
+    
+    return results
+
+# QR okutma isteklerinde ham gövde olarak kabul edilen görüntü türleri
+SCAN_IMAGE_MIMETYPES = {'image/jpeg', 'image/png', 'image/webp', 'application/octet-stream'}
+SCAN_IMAGE_READ_CHUNK = 64 * 1024
+
+def read_scan_image():
+    """QR okutma isteğinden sıkıştırılmış görüntü baytlarını okur
+    
+    Kabul edilen biçimler: ham gövde (Content-Type: image/jpeg, image/png, ...),
+    multipart 'image' dosya alanı veya eski istemciler için JSON içinde base64
+    data URL ({'image': 'data:image/jpeg;base64,...'}). Görüntü yoksa None döner,
+    base64 bozuksa ValueError, gövde MAX_CONTENT_LENGTH'i aşarsa
+    RequestEntityTooLarge fırlatır.
+    """
+    max_bytes = app.config['MAX_CONTENT_LENGTH']
+    if request.content_length is not None and request.content_length > max_bytes:
+        raise RequestEntityTooLarge()
+    
+    if request.mimetype in SCAN_IMAGE_MIMETYPES:
+        # Gövde JSON/form ayrıştırması olmadan sınırlı parçalar halinde okunur; tampon
+        # istemcinin bildirdiği Content-Length'e göre değil, gelen bayt kadar büyür
+        buffer = bytearray()
+        while True:
+            chunk = request.stream.read(SCAN_IMAGE_READ_CHUNK)
+            if not chunk:
+                break
+            buffer += chunk
+            if len(buffer) > max_bytes:
+                raise RequestEntityTooLarge()
+        return buffer or None
+    
+    if request.mimetype == 'multipart/form-data':
+        file = request.files.get('image')
+        return (file.read() or None) if file else None
+    
+    data = request.get_json(silent=True) or {}
+    base64_image = data.get('image') or ''
+    if not base64_image:
+        return None
+    # Data URL ön ekini ayır (data:image/jpeg;base64,...)
+    comma = base64_image.find(',')
+    return base64.b64decode(base64_image[comma + 1:] if comma >= 0 else base64_image)
+
+def scan_image_too_large_response():
+    return jsonify({
+        'success': False,
+        'error': f"Görüntü boyutu sınırı aşıldı (en fazla {app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)} MB)"
+    }), 413
+
 # Şube Müşteri QR Okutma
 @app.route('/scan_qr', methods=['POST'])
+@idempotent
 def scan_qr():
     try:
         # Şube giriş kontrolü
@@ -1878,33 +3396,19 @@ def scan_qr():
         if not qr_code:
             return jsonify({'success': False, 'error': 'QR kod boş olamaz'})
         
-        # QR kodunu kontrol et
-        customer_qr = CustomerQR.query.filter_by(code=qr_code, is_used=False).first()
-        
-        if not customer_qr:
-            return jsonify({'success': False, 'error': 'Geçersiz veya kullanılmış QR kod'})
-        
-        # Müşteri bilgilerini al
-        customer = User.query.get(customer_qr.customer_id)
-        if not customer:
-            return jsonify({'success': False, 'error': 'Müşteri bulunamadı'})
-        
-        # QR kodu kullanılmış olarak işaretle
-        customer_qr.is_used = True
-        customer_qr.used_at = get_turkey_time()
-        customer_qr.used_by_branch_id = branch.id
-        
-        # Müşteriye 1 puan ekle
-        customer.points += 1
+        # QR kodunu atomik olarak kullan ve puanı ekle
+        result = claim_customer_qr(qr_code, branch_id=branch.id)
+        if not result['success']:
+            return jsonify(result)
         
-        # İşlemi kaydet
-        db.session.commit()
+        customer = result['customer']
+        points_earned = result['points_earned']
         
         # Müşteriye puan kazanım bildirimi gönder
         send_push_notification(
             user_id=customer.id,
             title="🎯 Puan Kazandınız!",
-            body=f"Tebrikler! 1 puan kazandınız. Toplam puanınız: {customer.points}",
+            body=f"Tebrikler! {points_earned} puan kazandınız. Toplam puanınız: {customer.points}",
             notification_type="points",
             url="/dashboard"
         )
@@ -1913,61 +3417,93 @@ def scan_qr():
             'success': True,
             'customer_name': customer.name,
             'customer_email': customer.email,
-            'points_earned': 1,
+            'points_earned': points_earned,
             'total_points': customer.points,
-            'message': f'{customer.name} adlı müşteriye 1 puan eklendi!'
+            'message': f'{customer.name} adlı müşteriye {points_earned} puan eklendi!'
         })
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'success': False, 'error': str(e)})
+        # 5xx: @idempotent yanıtı saklamaz, aynı anahtarla tekrar denenebilir
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# Çevrimdışı okutmaların toplu senkronizasyonu (şube terminali ağ kesintisinde biriktirir)
+@app.route('/branch/sync_scans', methods=['POST'])
+def branch_sync_scans():
+    # Şube giriş kontrolü
+    if 'branch_id' not in session:
+        return jsonify({'success': False, 'error': 'Şube girişi gerekli'}), 403
+    
+    branch = Branch.query.get(session['branch_id'])
+    if not branch:
+        return jsonify({'success': False, 'error': 'Geçersiz şube'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')
+    if not isinstance(events, list) or not events:
+        return jsonify({'success': False, 'error': 'Olay listesi gerekli'}), 400
+    if len(events) > app.config['SCAN_SYNC_MAX_EVENTS']:
+        return jsonify({
+            'success': False,
+            'error': f"Tek istekte en fazla {app.config['SCAN_SYNC_MAX_EVENTS']} olay gönderilebilir"
+        }), 413
+    
+    try:
+        results = sync_branch_scans(branch.id, events)
+    except IntegrityError:
+        # Aynı olaylar başka bir istekte eşzamanlı işlendi; tekrar gönderimde kayıtlı sonuçlar döner
+        db.session.rollback()
+        return jsonify({'success': False, 'error': 'Olaylar şu anda işleniyor, lütfen tekrar deneyin'}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'results': results,
+        'applied': sum(1 for result in results if result['status'] == 'applied'),
+        'rejected': sum(1 for result in results if result['status'] == 'rejected'),
+        'duplicates': sum(1 for result in results if result['status'] == 'duplicate')
+    })
 
 @app.route('/scan_qr_local', methods=['POST'])
 @login_required
 def scan_qr_local():
     """Yerel OpenCV + PyZbar ile QR kod okuma endpoint'i"""
     try:
-        data = request.get_json()
-        base64_image = data.get('image', '')
+        try:
+            image_data = read_scan_image()
+        except RequestEntityTooLarge:
+            return scan_image_too_large_response()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': f'Base64 decode hatası: {str(e)}'})
         
-        if not base64_image:
+        if not image_data:
             return jsonify({'success': False, 'error': 'Görüntü verisi bulunamadı'})
         
-        # QR kod okuma
-        result = scan_qr_from_base64(base64_image)
+        # QR kod okuma (ayrı süreçte; havuz doluysa hemen 503 döner)
+        result = qr_decode_pool.decode_bytes(image_data)
         
         if not result['success']:
+            if result.get('busy'):
+                return jsonify(result), 503
             return jsonify(result)
         
         qr_code = result['data'].strip()
         
-        # QR kodunu kontrol et
-        customer_qr = CustomerQR.query.filter_by(code=qr_code, is_used=False).first()
-        
-        if not customer_qr:
-            return jsonify({'success': False, 'error': 'Geçersiz veya kullanılmış QR kod'})
-        
-        # Müşteri bilgilerini al
-        customer = User.query.get(customer_qr.customer_id)
-        if not customer:
-            return jsonify({'success': False, 'error': 'Müşteri bulunamadı'})
+        # QR kodunu atomik olarak kullan ve puanı ekle
+        claim = claim_customer_qr(qr_code, branch_id=session.get('branch_id'))
+        if not claim['success']:
+            return jsonify(claim)
         
-        # QR kodu kullanılmış olarak işaretle
-        customer_qr.is_used = True
-        customer_qr.used_at = get_turkey_time()
-        customer_qr.used_by_branch = current_user.id
-        
-        # Müşteriye 1 puan ekle
-        customer.points += 1
-        
-        # İşlemi kaydet
-        db.session.commit()
+        customer = claim['customer']
+        points_earned = claim['points_earned']
         
         # Müşteriye puan kazanım bildirimi gönder
         send_push_notification(
             user_id=customer.id,
             title="🎯 Puan Kazandınız!",
-            body=f"Tebrikler! 1 puan kazandınız. Toplam puanınız: {customer.points}",
+            body=f"Tebrikler! {points_earned} puan kazandınız. Toplam puanınız: {customer.points}",
             notification_type="points",
             url="/dashboard"
         )
@@ -1978,17 +3514,354 @@ def scan_qr_local():
             'method': result.get('method', 'OpenCV + PyZbar'),
             'customer_name': customer.name,
             'customer_email': customer.email,
-            'points_earned': 1,
+            'points_earned': points_earned,
             'total_points': customer.points,
-            'message': f'{customer.name} adlı müşteriye 1 puan eklendi!'
+            'message': f'{customer.name} adlı müşteriye {points_earned} puan eklendi!'
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)})
+
+# Toplu QR okutma: tek fotoğraftaki tüm müşteri kodları tek transaction ile işlenir
+@app.route('/scan_qr_batch', methods=['POST'])
+@login_required
+def scan_qr_batch():
+    try:
+        try:
+            image_data = read_scan_image()
+        except RequestEntityTooLarge:
+            return scan_image_too_large_response()
+        except ValueError as e:
+            return jsonify({'success': False, 'error': f'Base64 decode hatası: {str(e)}'})
+        
+        if not image_data:
+            return jsonify({'success': False, 'error': 'Görüntü verisi bulunamadı'})
+        
+        # Görüntüdeki tüm QR kodlarını oku (ayrı süreçte; havuz doluysa hemen 503 döner)
+        result = qr_decode_pool.decode_many_bytes(image_data)
+        
+        if not result['success']:
+            if result.get('busy'):
+                return jsonify(result), 503
+            return jsonify(result)
+        
+        codes = [item['data'] for item in result['codes']]
+        claim = claim_customer_qrs(codes, branch_id=session.get('branch_id'))
+        if not claim['success']:
+            return jsonify({'success': False, 'error': claim['error'], 'codes': codes, 'rejected': claim['rejected']})
+        
+        # Müşteri başına tek bildirim
+        notified = {}
+        for item in claim['credited']:
+            notified[item['customer'].id] = item['customer']
+        for customer_id, customer in notified.items():
+            points_earned = claim['customer_points'][customer_id]
+            send_push_notification(
+                user_id=customer_id,
+                title="🎯 Puan Kazandınız!",
+                body=f"Tebrikler! {points_earned} puan kazandınız. Toplam puanınız: {customer.points}",
+                notification_type="points",
+                url="/dashboard"
+            )
+        
+        return jsonify({
+            'success': True,
+            'codes': codes,
+            'credited': [{
+                'data': item['code'],
+                'customer_name': item['customer'].name,
+                'customer_email': item['customer'].email,
+                'points_earned': item['points_earned'],
+                'total_points': item['customer'].points
+            } for item in claim['credited']],
+            'rejected': claim['rejected'],
+            'message': f"{len(claim['credited'])} QR kod okutuldu, {len(notified)} müşteriye puan eklendi!"
         })
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)})
 
+# Akışlı QR okutma: terminal kareleri tek oturum içinde sürekli gönderir.
+# Oturum başına bir arka plan iş parçacığı kareleri QR havuzunda çözer; yalnızca en
+# yeni kare bekletilir, her kod oturum boyunca bir kez talep edilir ve sonuçlar
+# SSE (text/event-stream) ile terminale akıtılır. Oturumlar süreç içindedir; birden
+# fazla worker süreciyle çalışılıyorsa terminal aynı sürece yönlendirilmelidir.
+SCAN_STREAM_FRAMES_MIMETYPE = 'application/x-reev-frames'
+
+class ScanStreamSession:
+    """Tek bir şube terminalinin akışlı QR okutma oturumu"""
+    
+    def __init__(self, user_id, branch_id, idle_seconds):
+        self.id = secrets.token_urlsafe(16)
+        self.user_id = user_id
+        self.branch_id = branch_id
+        self.idle_seconds = idle_seconds
+        self.closed = False
+        self.last_seen = time.monotonic()
+        # Oturum içinde talep edilmiş kodlar (kod -> başarılı mı)
+        self.seen = {}
+        self.stats = {'frames': 0, 'dropped': 0, 'decoded': 0, 'duplicates': 0, 'credited': 0, 'rejected': 0}
+        self.events = queue.Queue(maxsize=100)
+        self._frame = None
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=f'scan-stream-{self.id[:8]}', daemon=True)
+        self._thread.start()
+    
+    def touch(self):
+        self.last_seen = time.monotonic()
+    
+    def push_frame(self, image_data):
+        """Kareyi sıraya koyar; işlenmeyi bekleyen eski kare varsa atılır"""
+        with self._cond:
+            if self._frame is not None:
+                self.stats['dropped'] += 1
+            self._frame = image_data
+            self.stats['frames'] += 1
+            self.touch()
+            self._cond.notify()
+    
+    def close(self):
+        with self._cond:
+            if self.closed:
+                return
+            self.closed = True
+            self._frame = None
+            self._cond.notify()
+        self._emit({'type': 'closed', 'stats': dict(self.stats)})
+        with _scan_streams_lock:
+            _scan_streams.pop(self.id, None)
+    
+    def _emit(self, event):
+        # Okunmayan olaylar birikirse en eskisi atılır
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+    
+    def _take_frame(self):
+        with self._cond:
+            while self._frame is None and not self.closed:
+                if time.monotonic() - self.last_seen > self.idle_seconds:
+                    break
+                self._cond.wait(timeout=1.0)
+            frame, self._frame = self._frame, None
+            return frame
+    
+    def _run(self):
+        while not self.closed:
+            image_data = self._take_frame()
+            if image_data is None:
+                if not self.closed:
+                    # Terminal bağlantısı koptu (kare veya olay isteği gelmiyor)
+                    self.close()
+                continue
+            
+            result = qr_decode_pool.decode_bytes(image_data)
+            if not result['success']:
+                if result.get('busy'):
+                    self.stats['dropped'] += 1
+                continue
+            
+            self.stats['decoded'] += 1
+            try:
+                with app.app_context():
+                    self._handle_code(result['data'].strip(), result.get('method'))
+            except Exception as e:
+                print(f"Akışlı okutma hatası: {e}")
+    
+    def _handle_code(self, code, method):
+        """Kodu oturum içinde bir kez talep eder ve sonucu olay olarak yayınlar"""
+        if code in self.seen:
+            self.stats['duplicates'] += 1
+            return
+        
+        try:
+            claim = claim_customer_qr(code, branch_id=self.branch_id)
+        except Exception as e:
+            # Veritabanı hatasında kod işaretlenmez; sonraki karede tekrar denenir
+            db.session.rollback()
+            self._emit({'type': 'error', 'data': code, 'error': str(e)})
+            return
+        
+        self.seen[code] = claim['success']
+        if not claim['success']:
+            self.stats['rejected'] += 1
+            self._emit({'type': 'rejected', 'data': code, 'error': claim['error']})
+            return
+        
+        customer = claim['customer']
+        points_earned = claim['points_earned']
+        self.stats['credited'] += 1
+        
+        send_push_notification(
+            user_id=customer.id,
+            title="🎯 Puan Kazandınız!",
+            body=f"Tebrikler! {points_earned} puan kazandınız. Toplam puanınız: {customer.points}",
+            notification_type="points",
+            url="/dashboard"
+        )
+        
+        self._emit({
+            'type': 'credit',
+            'data': code,
+            'method': method,
+            'customer_name': customer.name,
+            'customer_email': customer.email,
+            'points_earned': points_earned,
+            'total_points': customer.points,
+            'message': f'{customer.name} adlı müşteriye {points_earned} puan eklendi!'
+        })
+
+_scan_streams = {}
+_scan_streams_lock = threading.Lock()
+
+def get_scan_stream(stream_id):
+    """Geçerli kullanıcıya ait açık oturumu döndürür (yoksa None)"""
+    with _scan_streams_lock:
+        stream = _scan_streams.get(stream_id)
+    if stream is None or stream.closed or stream.user_id != current_user.id:
+        return None
+    stream.touch()
+    return stream
+
+def read_stream_frames(stream, max_frame_bytes):
+    """Uzunluk önekli kare akışını okur: her kare 4 bayt big-endian uzunluk + görüntü baytları"""
+    while True:
+        header = _read_exact(stream, 4)
+        if len(header) < 4:
+            return
+        length, = struct.unpack('>I', header)
+        if length == 0:
+            return
+        if length > max_frame_bytes:
+            raise ValueError('Kare boyutu sınırı aşıldı')
+        frame = _read_exact(stream, length)
+        if len(frame) < length:
+            return
+        yield frame
+
+def _read_exact(stream, length):
+    buffer = bytearray(length)
+    view = memoryview(buffer)
+    received = 0
+    while received < length:
+        chunk = stream.readinto(view[received:])
+        if not chunk:
+            break
+        received += chunk
+    view.release()
+    del buffer[received:]
+    return buffer
+
+@app.route('/scan_stream', methods=['POST'])
+@login_required
+def scan_stream_open():
+    with _scan_streams_lock:
+        if len(_scan_streams) >= app.config['SCAN_STREAM_MAX_SESSIONS']:
+            return jsonify({'success': False, 'error': 'Açık okutma oturumu sınırına ulaşıldı'}), 503
+        stream = ScanStreamSession(current_user.id, session.get('branch_id'), app.config['SCAN_STREAM_IDLE_SECONDS'])
+        _scan_streams[stream.id] = stream
+    
+    return jsonify({
+        'success': True,
+        'stream_id': stream.id,
+        'frames_url': url_for('scan_stream_frames', stream_id=stream.id),
+        'events_url': url_for('scan_stream_events', stream_id=stream.id)
+    })
+
+@app.route('/scan_stream/<stream_id>/frames', methods=['POST'])
+@login_required
+def scan_stream_frames(stream_id):
+    """Kare gönderimi: tek görüntü (image/jpeg vb.) veya uzunluk önekli kare akışı (chunked)"""
+    stream = get_scan_stream(stream_id)
+    if stream is None:
+        return jsonify({'success': False, 'error': 'Okutma oturumu bulunamadı'}), 404
+    
+    accepted = 0
+    try:
+        if request.mimetype == SCAN_STREAM_FRAMES_MIMETYPE:
+            # Chunked gövdede toplam boyut sınırı (MAX_CONTENT_LENGTH) uzun oturumu kesmesin;
+            # sınır kare başına uygulanır
+            body = request.environ['wsgi.input'] if request.environ.get('wsgi.input_terminated') else request.stream
+            for frame in read_stream_frames(body, app.config['SCAN_STREAM_MAX_FRAME_BYTES']):
+                if stream.closed:
+                    break
+                stream.push_frame(frame)
+                accepted += 1
+        else:
+            image_data = read_scan_image()
+            if not image_data:
+                return jsonify({'success': False, 'error': 'Görüntü verisi bulunamadı'})
+            stream.push_frame(image_data)
+            accepted = 1
+    except RequestEntityTooLarge:
+        return scan_image_too_large_response()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e), 'frames': accepted, 'stats': dict(stream.stats)}), 400
+    
+    return jsonify({'success': True, 'frames': accepted, 'stats': dict(stream.stats)})
+
+@app.route('/scan_stream/<stream_id>/events')
+@login_required
+def scan_stream_events(stream_id):
+    """Oturum olayları (credit / rejected / error / closed) Server-Sent Events olarak"""
+    stream = get_scan_stream(stream_id)
+    if stream is None:
+        return jsonify({'success': False, 'error': 'Okutma oturumu bulunamadı'}), 404
+    
+    def generate():
+        while True:
+            try:
+                event = stream.events.get(timeout=15)
+            except queue.Empty:
+                if stream.closed:
+                    return
+                # Bağlantıyı canlı tut; açık olay bağlantısı oturumu da canlı tutar
+                stream.touch()
+                yield ': keepalive\n\n'
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            if event['type'] == 'closed':
+                return
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/scan_stream/<stream_id>', methods=['DELETE'])
+@login_required
+def scan_stream_close(stream_id):
+    stream = get_scan_stream(stream_id)
+    if stream is None:
+        return jsonify({'success': False, 'error': 'Okutma oturumu bulunamadı'}), 404
+    
+    stream.close()
+    return jsonify({'success': True, 'stats': dict(stream.stats)})
+
+# QR çözümleme metrikleri (strateji başına deneme, başarı ve süre)
+@app.route('/admin/qr_metrics')
+@login_required
+def qr_metrics():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Yetkisiz erişim'}), 403
+    
+    return jsonify({
+        'success': True,
+        'pool': qr_decode_pool.stats(),
+        'decoder': qr_decode_pool.metrics.snapshot()
+    })
+
 # Şube Ürün Onaylama
 @app.route('/branch/confirm_product', methods=['POST'])
+@idempotent
 def branch_confirm_product():
     if not is_branch_logged_in():
         return jsonify({'error': 'Yetkisiz erişim'}), 403
@@ -2002,16 +3875,18 @@ def branch_confirm_product():
     if not redemption:
         return jsonify({'error': 'Geçersiz veya zaten onaylanmış kod!'}), 400
     
-    # Müşterinin puanını kontrol et
     customer = redemption.user
-    if customer.points < redemption.points_used:
-        return jsonify({'error': 'Müşterinin yeterli puanı yok!'}), 400
     
-    # Puanı düş ve ürün alımını onayla
-    customer.points -= redemption.points_used
-    redemption.is_confirmed = True
-    redemption.confirmed_at = get_turkey_time()
-    redemption.confirmed_by_branch_id = branch.id
+    # Önce talebi sahiplen: eşzamanlı ikinci onay burada durur ve puan iki kez düşülmez
+    if not claim_redemption_confirmation(redemption.id, branch_id=branch.id):
+        db.session.rollback()
+        return jsonify({'error': 'Geçersiz veya zaten onaylanmış kod!'}), 400
+    
+    # Puanı koşullu olarak düş (deftere harcama satırı eklenir); yetersizse onay da geri alınır
+    if not debit_points(customer.id, redemption.points_used, 'redeem_confirm', branch_id=branch.id, ref=f'redemption:{confirmation_code}'):
+        db.session.rollback()
+        return jsonify({'error': 'Müşterinin yeterli puanı yok!'}), 400
+    add_user_activity(customer.id, confirmed_redemptions=1)
     
     # İşlem kaydı oluştur
     transaction = Transaction(
@@ -2070,7 +3945,8 @@ def upload_logo():
             logo_setting = SiteSetting(key='site_logo', value=filename)
             db.session.add(logo_setting)
         
-        db.session.commit()
+        # Ayar sürümünü aynı transaction içinde artır ve kaydet
+        bump_site_settings_version()
         
         return jsonify({
             'success': True,
@@ -2117,7 +3993,8 @@ def upload_background():
             bg_setting = SiteSetting(key='site_background', value=filename)
             db.session.add(bg_setting)
         
-        db.session.commit()
+        # Ayar sürümünü aynı transaction içinde artır ve kaydet
+        bump_site_settings_version()
         
         return jsonify({
             'success': True,
@@ -2164,7 +4041,8 @@ def upload_splash():
             splash_setting = SiteSetting(key='splash_image', value=filename)
             db.session.add(splash_setting)
         
-        db.session.commit()
+        # Ayar sürümünü aynı transaction içinde artır ve kaydet
+        bump_site_settings_version()
         
         return jsonify({
             'success': True,
@@ -2211,7 +4089,8 @@ def upload_app_icon():
             app_icon_setting = SiteSetting(key='app_icon', value=filename)
             db.session.add(app_icon_setting)
         
-        db.session.commit()
+        # Ayar sürümünü aynı transaction içinde artır ve kaydet
+        bump_site_settings_version()
         
         return jsonify({
             'success': True,
@@ -2258,7 +4137,8 @@ def upload_login_logo():
             login_logo_setting = SiteSetting(key='login_logo', value=filename)
             db.session.add(login_logo_setting)
         
-        db.session.commit()
+        # Ayar sürümünü aynı transaction içinde artır ve kaydet
+        bump_site_settings_version()
         
         return jsonify({
             'success': True,
@@ -2271,7 +4151,7 @@ def upload_login_logo():
 # Login logo URL'ini döndüren API endpoint'i
 @app.route('/api/login-logo', methods=['GET'])
 def get_login_logo():
-    login_logo_setting = SiteSetting.query.filter_by(key='login_logo').first()
+    login_logo_setting = get_site_setting('login_logo')
     if login_logo_setting and login_logo_setting.value:
         login_logo_url = url_for('static', filename=f'uploads/{login_logo_setting.value}', _external=True)
         return jsonify({
@@ -2319,6 +4199,18 @@ def delete_campaign(campaign_id):
         if os.path.exists(image_path):
             os.remove(image_path)
     
+    # Silinecek kullanımlar müşteri geçmiş sayaçlarından aynı transaction içinde düşülür
+    used_counts = db.session.query(CampaignUsage.customer_id, db.func.count(CampaignUsage.id)).filter(
+        CampaignUsage.campaign_id == campaign.id, CampaignUsage.is_used == True
+    ).group_by(CampaignUsage.customer_id).all()
+    for customer_id, count in used_counts:
+        add_user_activity(customer_id, campaign_usages=-count)
+    
+    # Kullanım sayaçlarını ve dağıtım işlerini sil (çalışan dağıtım bir sonraki parçada durur)
+    CampaignUsageTotal.query.filter_by(campaign_id=campaign.id).delete()
+    CampaignCustomerUsage.query.filter_by(campaign_id=campaign.id).delete()
+    CampaignFanout.query.filter_by(campaign_id=campaign.id).delete()
+    
     db.session.delete(campaign)
     db.session.commit()
     
@@ -2402,6 +4294,7 @@ def update_campaign(campaign_id):
                 if branch:
                     campaign.branches.append(branch)
         
+        bump_campaign_version(Campaign.id == campaign.id)
         db.session.commit()
         
         return jsonify({
@@ -2428,573 +4321,603 @@ def set_language(language=None):
     return redirect(request.referrer or url_for('index'))
 
 # Basit çeviri sistemi
+# Uygulama içi çeviri tablosu; modül yüklenirken Babel kataloglarıyla birleştirilir (TRANSLATION_CATALOG)
+TRANSLATIONS = {
+    'tr': {
+        'to reward':'İlerleme',
+        'Rewards Progress':'Ödül İlerleme',
+        'points':'puan',
+        'Earn points by scanning QR codes to reach your next reward.':'QR kod okutarak kazanın devam et!',
+        'Next reward target':'Bir sonraki ödül hedefi',
+        'Points left':'Hediye ürün için kalan puan',
+        'View Campaigns': 'Kampanyaları Görüntüle',
+        'Single-use QR. Expires in 5 minutes':'Tek kullanımlık QR. 5 dakika sonra sona erer',
+        'Last 5 listed':'En son listenlenen',
+        'visits':'Ziyaret',
+        'Most visited branch':'En çok ziyaret edilen şube',
+        'Keep earning by scanning QR codes!': 'QR kod okutarak kazanın devam et!',
+        'Points earned in last 30 days': 'Son 30 gün kazanan puanlar',
+        'Here is a quick overview of your account': 'Hesabınız için hızlı bir genel bakış',
+        'Points are valid for purchases of medium-sized products': 'Puanlar orta boy ürünler için geçerlidir',
+        'Unread': 'Okunmamış',
+        'Read': 'Okundu',
+        'My Messages': 'Gelen Kutusu',
+        'Messages': 'Mesajlarım',
+        'Welcome back': 'Hoş Geldiniz',
+        'Login': 'Giriş',
+        'Register': 'Kayıt Ol',
+        'Logout': 'Çıkış',
+        'Dashboard': 'Panel',
+        'Profile': 'Profil',
+        'Admin': 'Yönetici',
+        'Campaigns': 'Kampanyalar',
+        'Join Now': 'Hemen Üye Ol',
+        'Go to Dashboard': 'Panelime Git',
+        'Earn Points with QR Code': 'QR Kod ile Puan Kazan',
+        'Scan QR code at checkout and earn points': 'Alışveriş yaptığınızda QR kodu kasada okutturun ve puan kazanın',
+        'Redeem Your Points': 'Puanlarınızı Kullanın',
+        'Use your points for free products': 'Puanlarınızı ücretsiz ürünler için kullanın',
+        'Special Campaigns': 'Özel Kampanyalar',
+        'Take advantage of exclusive campaigns': 'Özel kampanyalardan yararlanın',
+        'Earn points with every purchase, get free drinks with your points!': 'Her alışverişinizde puan kazanın, puanlarınızla ücretsiz içecek kazanın!',
+        'Track Your Transactions': 'İşlemlerini Takip Et',
+        'Track all your point earning and spending transactions in detail': 'Tüm puan kazanma ve kullanma işlemlerinizi detaylı olarak takip edin',
+        'How It Works?': 'Nasıl Çalışır?',
+        '1. Sign Up': '1. Üye Ol',
+        'Quick and easy registration': 'Hızlı ve kolay kayıt',
+        '2. Shop': '2. Alışveriş Yap',
+        'Get your favorite drinks': 'Favori içeceklerini al',
+        '3. Scan QR': '3. QR Okut',
+        'Scan QR code to earn points': 'Puan kazanmak için QR kodu okut',
+        '4. Earn Points': '4. Puan Kazan',
+        'Use your points for discounts': 'İndirim için puanlarını kullan',
+        'Email': 'E-posta',
+        'Password': 'Şifre',
+        'Don\'t have an account?': 'Hesabınız yok mu?',
+        'Sign up': 'Kayıt olun',
+        'Name': 'Ad Soyad',
+        'Phone': 'Telefon',
+        'Confirm Password': 'Şifre Tekrar',
+        'Already have an account?': 'Zaten hesabınız var mı?',
+        'My Points': 'Puanlarım',
+        'QR Code': 'QR Kod',
+        'Redeem Points': 'Puan Kullan',
+        'My Profile': 'Profilim',
+        'Edit Profile': 'Profili Düzenle',
+        'Save Changes': 'Değişiklikleri Kaydet',
+        'Current Password': 'Mevcut Şifre',
+        'New Password': 'Yeni Şifre',
+        'Change Password': 'Şifre Değiştir',
+        'Phone (Optional)': 'Telefon (Opsiyonel)',
+        'Personal Data Protection': 'Kişisel Verilerin Korunması',
+        'CONSENT TEXT': 'AÇIK RIZA METNİ',
+        'I have read and understood the consent text above': 'Yukarıdaki açık rıza metnini okudum, anladım ve kişisel verilerimin belirtilen amaçlarla işlenmesine açık rızamı veriyorum',
+        'Account Summary': 'Hesap Özeti',
+        'Current Points': 'Mevcut Puanınız',
+        'Total Transactions': 'Toplam İşlem',
+        'Membership Date': 'Üyelik Tarihi',
+        'My QR Code': 'Benim QR Kodum',
+        'Generate QR Code': 'QR Kodum Oluştur',
+        'Quick Actions': 'Hızlı İşlemler',
+        'Point System': 'Puan Sistemi',
+        'Each QR code = 1 point': 'Her QR kod = 1 puan',
+        'Minimum 5 points usage': 'Minimum 6 puan kullanılır',
+        'Points never expire': 'Puanlar süresiz geçerli',
+        'Show this code to cashier': 'Bu kodu kasiyere gösterin',
+        'Time remaining': 'Kalan süre',
+        'Your QR Code is Ready!': 'QR Kodunuz Hazır!',
+        'Code': 'Kod',
+        'Generate QR code to show to cashier': 'Kasiyere göstermek için QR kodunuzu oluşturun',
+        'Profile Information': 'Profil Bilgileri',
+        'Customer': 'Müşteri',
+        'Full Name': 'Ad Soyad',
+        'Phone': 'Telefon',
+        'Registration Date': 'Kayıt Tarihi',
+        'Not specified': 'Belirtilmemiş',
+        'Unknown': 'Bilinmiyor',
+        'My Points Status': 'Puan Durumum',
+        'Point Value': 'Puan Değeri',
+        'Total Purchases': 'Toplam Alım',
+        'Confirm New Password': 'Yeni Şifre Tekrar',
+        'At least 6 characters': 'En az 6 karakter olmalıdır',
+        'Update Profile': 'Profil Güncelle',
+        'Preferred Branch': 'Tercih Edilen Şube',
+        'Select Branch': 'Şube Seç',
+        'Campaigns will be filtered by this branch': 'Bu şube ile filtrelenen kampanyalar',
+        'Generate QR': 'QR Kod Oluştur',
+        'My Purchases': 'Alımlarım',
+        'Passwords do not match': 'Şifreler uyuşmuyor',
+        'Active Campaigns': 'Aktif Kampanyalar',
+        'Don\'t miss current opportunities!': 'Anlık fırsatları kaçırmayın!',
+        'Start': 'Başlangıç',
+        'End': 'Bitiş',
+        'Active Campaign': 'Aktif Kampanya',
+        'Valid Branches': 'Geçerli Şubeler',
+        'No active campaigns at the moment': 'Şu anda aktif kampanya yok',
+        'Stay tuned for new campaigns!': 'Yeni kampanyalar için takip edin!',
+        'Back to Home': 'Anasayfaya Dön',
+        'Our Branches': 'Şubelerimiz',
+        'You can find the same quality service and taste in all our branches': 'Tüm şubelerimizde aynı kaliteli servis ve tadı bulabilirsiniz',
+        'Address': 'Address',
+        'Phone': 'Telefon',
+        'Working Hours': 'Çalışma Saatleri',
+        'Active Branch': 'Aktif Şubeler',
+        'Call': 'Ara',
+        'Show on Map': 'Show on Map',
+        'No Branches Yet': 'No Branches Yet',
+        'We will be at your service with our new branches soon!': 'We will be at your service with our new branches soon!',
+        'Information': 'Information',
+        'Earn Points with QR Code': 'Earn Points with QR Code',
+        'You can earn points by scanning your QR code at all our branches': 'You can earn points by scanning your QR code at all our branches',
+        'Use Points': 'Use Points',
+        'You can use your accumulated points at all our branches': 'You can use your accumulated points at all our branches',
+        'Same Quality': 'Same Quality',
+        'Whichever branch you go to, you get the same quality service': 'Whichever branch you go to, you get the same quality service',
+        'Image not found': 'Image not found',
+        'Active Campaigns': 'Aktif Kampanyalar',
+        'Don\'t miss current opportunities!': 'Güncel fırsatları kaçırmayın!',
+        'Start': 'Başlangıç',
+        'End': 'Bitiş',
+        'Active Campaign': 'Aktif Kampanya',
+        'Valid Branches': 'Geçerli Şubeler',
+        'No active campaigns at the moment': 'Şu anda aktif kampanya bulunmuyor',
+        'Stay tuned for new campaigns!': 'Yeni kampanyalar için takipte kalın!',
+        'Back to Home': 'Ana Sayfaya Dön',
+        'Our Branches': 'Şubelerimiz',
+        'You can find the same quality service and taste in all our branches': 'Tüm şubelerimizde aynı kaliteli hizmet ve lezzeti bulabilirsiniz',
+        'Address': 'Adres',
+        'Phone': 'Telefon',
+        'Working Hours': 'Çalışma Saatleri',
+        'Active Branch': 'Aktif Şube',
+        'Call': 'Ara',
+        'Show on Map': 'Haritada Göster',
+        'No Branches Yet': 'Henüz Şube Bulunmuyor',
+        'We will be at your service with our new branches soon!': 'Yakında yeni şubelerimizle hizmetinizdeyiz!',
+        'Information': 'Bilgi',
+        'Earn Points with QR Code': 'QR Kod ile Puan Kazan',
+        'You can earn points by scanning your QR code at all our branches': 'Tüm şubelerimizde QR kodunuzu okutarak puan kazanabilirsiniz',
+        'Use Points': 'Puan Kullan',
+        'You can use your accumulated points at all our branches': 'Biriktirdiğiniz puanları tüm şubelerimizde kullanabilirsiniz',
+        'Same Quality': 'Aynı Kalite',
+        'Whichever branch you go to, you get the same quality service': 'Hangi şubeye giderseniz gidin, aynı kaliteli hizmeti alırsınız',
+        'Image not found': 'Görsel bulunamadı',
+        'Purchase History': 'Alımlarım & Puan Geçmişim',
+        'View your product purchases and point earnings by date': 'Ürün alımları ve puan kazanımlarınızı tarih bazlı görüntüleyin',
+        'Active Points': 'Aktif Puan',
+        'Start Date': 'Başlangıç Tarihi',
+        'End Date': 'Bitiş Tarihi',
+        'Activity Type': 'Aktivite Tipi',
+        'All Activities': 'Tüm Aktiviteler',
+        'Only Product Purchases': 'Sadece Ürün Alımları',
+        'Only Point Earnings': 'Sadece Puan Kazanımları',
+        'Filter': 'Filtrele',
+        'Clear': 'Temizle',
+        'Total Purchases': 'Toplam Alım',
+        'Product': 'Ürün',
+        'Points Earned': 'Kazanılan Puan',
+        'Points': 'Puan',
+        'Points Spent': 'Harcanan Puan',
+        'Confirmed': 'Onaylanan',
+        'Purchase': 'Alım',
+        'Product Purchases': 'Ürün Alımları',
+        'Point Earnings': 'Puan Kazanımları',
+        'Product Purchase': 'Ürün Alımı',
+        'points spent': 'puan harcandı',
+        'Confirmation Code': 'Onay Kodu',
+        'Branch': 'Şube',
+        'Unknown': 'Bilinmiyor',
+        'Confirmed': 'Onaylandı',
+        'Waiting': 'Bekliyor',
+        'Point Earning': 'Puan Kazanımı',
+        'You earned +1 point': '+1 puan kazandınız',
+        'QR Code': 'QR Kod',
+        'No Activity Yet': 'Henüz Aktivite Yok',
+        'Earn points by scanning QR codes or buy products with your points.': 'QR kod okutarak puan kazanın veya puanlarınızla ürün alın.',
+        'Generate QR': 'QR Oluştur',
+        'Use Points': 'Puan Kullan',
+        'Date': 'Tarih',
+        'Used Points': 'Kullanılan Puan',
+        'Status': 'Durum',
+        'Not confirmed yet': 'Henüz onaylanmadı',
+        'Earned Points': 'Kazanılan Puan',
+        'No Product Purchases Yet': 'Henüz Ürün Alımınız Yok',
+        'No Point Earnings Yet': 'Henüz Puan Kazanımınız Yok',
+        'No Data Found': 'Veri Bulunamadı',
+        'You can buy products using your points.': 'Puanlarınızı kullanarak ürün satın alabilirsiniz.',
+        'You can earn points by scanning QR codes.': 'QR kod okutarak puan kazanabilirsiniz.',
+        'No data found matching the selected criteria.': 'Seçilen kriterlere uygun veri bulunamadı.',
+    
+    # Redeem page translations
+    'Points Available': 'Puan Mevcut',
+    'Categories': 'Kategoriler',
+    'All': 'Tümü',
+    'Buy': 'Satın Al',
+    'Insufficient Points': 'Yetersiz Puan',
+    'more points needed': 'puan daha gerekli',
+    'products displayed': 'ürün görüntüleniyor',
+    'No Products Available Yet': 'Henüz Ürün Bulunmuyor',
+    'Products will appear here when added by admin.': 'Admin tarafından ürünler eklendiğinde burada görünecek.',
+    'Earn Points by Generating QR': 'QR Oluşturarak Puan Kazan',
+    'Clear Filters': 'Filtreleri Temizle'
+    },
+    'en': {
+        'Points are valid for purchases of medium-sized products.': 'Points are valid for purchases of medium-sized products.',
+        'Welcome': 'Welcome',
+        'Login': 'Login',
+        'Register': 'Register',
+        'Logout': 'Logout',
+        'Dashboard': 'Dashboard',
+        'Profile': 'Profile',
+        'Admin': 'Admin',
+        'Campaigns': 'Campaigns',
+        'Branches': 'Branches',
+        'Points': 'Points',
+        'History': 'History',
+        'Settings': 'Settings',
+        'Language': 'Language',
+        'Turkish': 'Turkish',
+        'English': 'English',
+        'Russian': 'Russian',
+        'Welcome back': 'Welcome back',
+        'Generate QR': 'Generate QR',
+        'Use Points': 'Use Points',
+        'Purchase History': 'Purchase History',
+        'Our Branches': 'Our Branches',
+        'Branch Login': 'Branch Login',
+        'Join Now': 'Join Now',
+        'Go to Dashboard': 'Go to Dashboard',
+        'Earn Points with QR Code': 'Earn Points with QR Code',
+        'Scan QR code at checkout and earn points': 'Scan QR code at checkout and earn points',
+        'Redeem Your Points': 'Redeem Your Points',
+        'Use your points for free products': 'Use your points for free products',
+        'Special Campaigns': 'Special Campaigns',
+        'Take advantage of exclusive campaigns': 'Take advantage of exclusive campaigns',
+        'Earn points with every purchase, get free drinks with your points!': 'Earn points with every purchase, get free drinks with your points!',
+        'Track Your Transactions': 'Track Your Transactions',
+        'Track all your point earning and spending transactions in detail': 'Track all your point earning and spending transactions in detail',
+        'How It Works?': 'How It Works?',
+        '1. Sign Up': '1. Sign Up',
+        'Quick and easy registration': 'Quick and easy registration',
+        '2. Shop': '2. Shop',
+        'Get your favorite drinks': 'Get your favorite drinks',
+        '3. Scan QR': '3. Scan QR',
+        'Scan QR code to earn points': 'Scan QR code to earn points',
+        '4. Earn Points': '4. Earn Points',
+        'Use your points for discounts': 'Use your points for discounts',
+        'Email': 'Email',
+        'Password': 'Password',
+        'Don\'t have an account?': 'Don\'t have an account?',
+        'Sign up': 'Sign up',
+        'Name': 'Name',
+        'Phone': 'Phone',
+        'Confirm Password': 'Confirm Password',
+        'Already have an account?': 'Already have an account?',
+        'My Points': 'My Points',
+        'QR Code': 'QR Code',
+        'Redeem Points': 'Redeem Points',
+        'My Profile': 'My Profile',
+        'Edit Profile': 'Edit Profile',
+        'Save Changes': 'Save Changes',
+        'Current Password': 'Current Password',
+        'New Password': 'New Password',
+        'Change Password': 'Change Password',
+        
+        # Purchase history and redeem page translations
+        'My Purchases & Point History': 'My Purchases & Point History',
+        'View your product purchases and point earnings by date': 'View your product purchases and point earnings by date',
+        'Active Points': 'Active Points',
+        'Start Date': 'Start Date',
+        'End Date': 'End Date',
+        'Activity Type': 'Activity Type',
+        'All Activities': 'All Activities',
+        'Only Product Purchases': 'Only Product Purchases',
+        'Only Point Earnings': 'Only Point Earnings',
+        'Filter': 'Filter',
+        'Clear': 'Clear',
+        'Total Purchases': 'Total Purchases',
+        'Product': 'Product',
+        'Points Earned': 'Points Earned',
+        'Points Spent': 'Points Spent',
+        'Confirmed': 'Confirmed',
+        'Purchase': 'Purchase',
+        'Product Purchase': 'Product Purchase',
+        'points spent': 'points spent',
+        'Confirmation Code': 'Confirmation Code',
+        'Branch': 'Branch',
+        'Unknown': 'Unknown',
+        'Waiting': 'Waiting',
+        'Point Earning': 'Point Earning',
+        'You earned +1 point': 'You earned +1 point',
+        'No Activity Yet': 'No Activity Yet',
+        'Generate QR': 'Generate QR',
+        'Use Points': 'Use Points',
+        'Date': 'Date',
+        'Used Points': 'Used Points',
+        'Status': 'Status',
+        'Not confirmed yet': 'Not confirmed yet',
+        'Earned Points': 'Earned Points',
+        'No Product Purchases Yet': 'No Product Purchases Yet',
+        'No Point Earnings Yet': 'No Point Earnings Yet',
+        'No Data Found': 'No Data Found',
+        'You can buy products using your points.': 'You can buy products using your points.',
+        'You can earn points by scanning QR codes.': 'You can earn points by scanning QR codes.',
+        'No data found matching the selected criteria.': 'No data found matching the selected criteria.',
+        'Points Available': 'Points Available',
+        'Categories': 'Categories',
+        'All': 'All',
+        'Buy': 'Buy',
+        'Insufficient Points': 'Insufficient Points',
+        'more points needed': 'more points needed',
+        'products displayed': 'products displayed',
+        'No Products Available Yet': 'No Products Available Yet',
+        'Products will appear here when added by admin.': 'Products will appear here when added by admin.',
+        'Earn Points by Generating QR': 'Earn Points by Generating QR',
+        'Clear Filters': 'Clear Filters'
+    },
+    'ru': {
+        'Welcome': 'Добро пожаловать',
+        'Login': 'Войти',
+        'Register': 'Регистрация',
+        'Logout': 'Выйти',
+        'Dashboard': 'Панель',
+        'Profile': 'Профиль',
+        'Admin': 'Админ',
+        'Campaigns': 'Кампании',
+        'Branches': 'Филиалы',
+        'Points': 'Баллы',
+        'History': 'История',
+        'Settings': 'Настройки',
+        'Language': 'Язык',
+        'Turkish': 'Turkish',
+        'English': 'English',
+        'Russian': 'Russian',
+        'German': 'German',
+        'Welcome back': 'Добро пожаловать обратно',
+        'Generate QR': 'Создать QR',
+        'Use Points': 'Использовать баллы',
+        'Purchase History': 'История покупок',
+        'Our Branches': 'Наши филиалы',
+        'Branch Login': 'Вход в филиал',
+        'Join Now': 'Присоединиться сейчас',
+        'Go to Dashboard': 'Перейти к панели',
+        'Earn Points with QR Code': 'Зарабатывайте баллы с QR-кодом',
+        'Scan QR code at checkout and earn points': 'Сканируйте QR-код при оплате и зарабатывайте баллы',
+        'Redeem Your Points': 'Используйте свои баллы',
+        'Use your points for free products': 'Используйте свои баллы для бесплатных продуктов',
+        'Special Campaigns': 'Специальные кампании',
+        'Take advantage of exclusive campaigns': 'Воспользуйтесь эксклюзивными кампаниями',
+        'Earn points with every purchase, get free drinks with your points!': 'Зарабатывайте баллы с каждой покупкой, получайте бесплатные напитки за ваши баллы!',
+        'Track Your Transactions': 'Отслеживайте ваши транзакции',
+        'Track all your point earning and spending transactions in detail': 'Отслеживайте все ваши транзакции по заработку и трате баллов в деталях',
+        'How It Works?': 'Как это работает?',
+        '1. Sign Up': '1. Зарегистрируйтесь',
+        'Quick and easy registration': 'Быстрая и простая регистрация',
+        '2. Shop': '2. Покупайте',
+        'Get your favorite drinks': 'Получите ваши любимые напитки',
+        '3. Scan QR': '3. Сканируйте QR',
+        'Scan QR code to earn points': 'Сканируйте QR-код для заработка баллов',
+        '4. Earn Points': '4. Зарабатывайте баллы',
+        'Use your points for discounts': 'Используйте ваши баллы для скидок',
+        'Email': 'Электронная почта',
+        'Password': 'Пароль',
+        'Don\'t have an account?': 'Нет аккаунта?',
+        'Sign up': 'Зарегистрироваться',
+        'Name': 'Имя',
+        'Phone': 'Телефон',
+        'Confirm Password': 'Подтвердите пароль',
+        'Already have an account?': 'Уже есть аккаунт?',
+        'My Points': 'Мои баллы',
+        'QR Code': 'QR-код',
+        'Redeem Points': 'Использовать баллы',
+        'My Profile': 'Мой профиль',
+        'Edit Profile': 'Редактировать профиль',
+        'Save Changes': 'Сохранить изменения',
+        'Current Password': 'Текущий пароль',
+        'New Password': 'Новый пароль',
+        'Change Password': 'Изменить пароль',
+        'Phone (Optional)': 'Телефон (Необязательно)',
+        'Personal Data Protection': 'Защита персональных данных',
+        'CONSENT TEXT': 'ТЕКСТ СОГЛАСИЯ',
+        'I have read and understood the consent text above': 'Я прочитал и понял текст согласия выше и даю согласие на обработку моих персональных данных для указанных целей',
+        'Account Summary': 'Сводка аккаунта',
+        'Current Points': 'Текущие баллы',
+        'Total Transactions': 'Всего транзакций',
+        'Membership Date': 'Дата членства',
+        'My QR Code': 'Мой QR-код',
+        'Generate QR Code': 'Создать QR-код',
+        'Quick Actions': 'Быстрые действия',
+        'Point System': 'Система баллов',
+        'Each QR code = 1 point': 'Каждый QR-код = 1 балл',
+        'Minimum 10 points usage': 'Минимум 10 баллов для использования',
+        'Points never expire': 'Баллы никогда не истекают',
+        'Show this code to cashier': 'Покажите этот код кассиру',
+        'Time remaining': 'Оставшееся время',
+        'Your QR Code is Ready!': 'Ваш QR-код готов!',
+        'Code': 'Код',
+        'Generate QR code to show to cashier': 'Создайте QR-код для показа кассиру',
+        'Profile Information': 'Информация профиля',
+        'Customer': 'Клиент',
+        'Full Name': 'Полное имя',
+        'Phone': 'Телефон',
+        'Registration Date': 'Дата регистрации',
+        'Not specified': 'Не указано',
+        'Unknown': 'Неизвестно',
+        'My Points Status': 'Статус моих баллов',
+        'Point Value': 'Стоимость баллов',
+        'Total Purchases': 'Всего покупок',
+        'Confirm New Password': 'Подтвердите новый пароль',
+        'At least 6 characters': 'Минимум 6 символов',
+        'Update Profile': 'Обновить профиль',
+        'Preferred Branch': 'Предпочитаемый филиал',
+        'Select Branch': 'Выберите филиал',
+        'Campaigns will be filtered by this branch': 'Кампании будут отфильтрованы по этому филиалу',
+        'Generate QR': 'Создать QR',
+        'My Purchases': 'Мои покупки',
+        'Passwords do not match': 'Пароли не совпадают',
+        'Account Summary': 'Сводка аккаунта',
+        'Current Points': 'Текущие баллы',
+        'Total Transactions': 'Всего транзакций',
+        'Membership Date': 'Дата членства',
+        'My QR Code': 'Мой QR-код',
+        'Generate QR Code': 'Создать QR-код',
+        'Quick Actions': 'Быстрые действия',
+        'Point System': 'Система баллов',
+        'Each QR code = 1 point': 'Каждый QR-код = 1 балл',
+        'Minimum 10 points usage': 'Минимум 10 баллов для использования',
+        'Points never expire': 'Баллы никогда не истекают',
+        'Show this code to cashier': 'Покажите этот код кассиру',
+        'Time remaining': 'Оставшееся время',
+        'Your QR Code is Ready!': 'Ваш QR-код готов!',
+    },
+    'de': {
+        'Welcome': 'Willkommen',
+        'Login': 'Anmelden',
+        'Register': 'Registrieren',
+        'Logout': 'Abmelden',
+        'Dashboard': 'Dashboard',
+        'Profile': 'Profil',
+        'Admin': 'Admin',
+        'Campaigns': 'Kampagnen',
+        'Branches': 'Filialen',
+        'Points': 'Punkte',
+        'History': 'Verlauf',
+        'Settings': 'Einstellungen',
+        'Language': 'Sprache',
+        'Turkish': 'Turkish',
+        'English': 'English',
+        'Russian': 'Russian',
+        'German': 'German',
+        'Home': 'Startseite',
+        'About': 'Über uns',
+        'Contact': 'Kontakt',
+        'Services': 'Dienstleistungen',
+        'Products': 'Produkte',
+        'News': 'Nachrichten',
+        'FAQ': 'FAQ',
+        'Help': 'Hilfe',
+        'Terms': 'Nutzungsbedingungen',
+        'Privacy': 'Datenschutz',
+        'Cookie Policy': 'Cookie-Richtlinie',
+        'Copyright': 'Urheberrecht',
+        'All Rights Reserved': 'Alle Rechte vorbehalten',
+        'Loyalty Program': 'Treueprogramm',
+        'Earn points with every purchase': 'Sammeln Sie Punkte bei jedem Einkauf',
+        'Redeem points for rewards': 'Lösen Sie Punkte für Belohnungen ein',
+        'Join now and start earning': 'Jetzt beitreten und sammeln beginnen',
+        'How it works': 'So funktioniert es',
+        '1. Sign Up': '1. Registrieren',
+        'Quick and easy registration': 'Schnelle und einfache Registrierung',
+        '2. Shop': '2. Einkaufen',
+        'Get your favorite drinks': 'Holen Sie sich Ihre Lieblingsgetränke',
+        '3. Scan QR': '3. QR scannen',
+        'Scan QR code to earn points': 'QR-Code scannen, um Punkte zu sammeln',
+        '4. Earn Points': '4. Punkte sammeln',
+        'Use your points for discounts': 'Verwenden Sie Ihre Punkte für Rabatte',
+        'Email': 'E-Mail',
+        'Password': 'Passwort',
+        'Don\'t have an account?': 'Haben Sie noch kein Konto?',
+        'Sign up': 'Registrieren',
+        'Name': 'Name',
+        'Phone': 'Telefon',
+        'Confirm Password': 'Passwort bestätigen',
+        'Already have an account?': 'Haben Sie bereits ein Konto?',
+        'My Points': 'Meine Punkte',
+        'QR Code': 'QR-Code',
+        'Redeem Points': 'Punkte einlösen',
+        'My Profile': 'Mein Profil',
+        'Edit Profile': 'Profil bearbeiten',
+        'Save Changes': 'Änderungen speichern',
+        'Current Password': 'Aktuelles Passwort',
+        'New Password': 'Neues Passwort',
+        'Change Password': 'Passwort ändern',
+        
+        # Purchase history and redeem page translations
+        'My Purchases & Point History': 'Meine Einkäufe & Punkteverlauf',
+        'View your product purchases and point earnings by date': 'Sehen Sie Ihre Produktkäufe und Punktesammlungen nach Datum',
+        'Active Points': 'Aktive Punkte',
+        'Start Date': 'Startdatum',
+        'End Date': 'Enddatum',
+        'Activity Type': 'Aktivitätstyp',
+        'All Activities': 'Alle Aktivitäten',
+        'Only Product Purchases': 'Nur Produktkäufe',
+        'Only Point Earnings': 'Nur Punktesammlungen',
+        'Filter': 'Filter',
+        'Clear': 'Löschen',
+        'Total Purchases': 'Gesamte Einkäufe',
+        'Product': 'Produkt',
+        'Points Earned': 'Gesammelte Punkte',
+        'Points Spent': 'Ausgegebene Punkte',
+        'Confirmed': 'Bestätigt',
+        'Purchase': 'Einkauf',
+        'Product Purchase': 'Produktkauf',
+        'points spent': 'Punkte ausgegeben',
+        'Confirmation Code': 'Bestätigungscode',
+        'Branch': 'Filiale',
+        'Unknown': 'Unbekannt',
+        'Waiting': 'Wartend',
+        'Point Earning': 'Punkte sammeln',
+        'You earned +1 point': 'Sie haben +1 Punkt gesammelt',
+        'No Activity Yet': 'Noch keine Aktivität',
+        'Generate QR': 'QR generieren',
+        'Use Points': 'Punkte verwenden',
+        'Date': 'Datum',
+        'Used Points': 'Verwendete Punkte',
+        'Status': 'Status',
+        'Not confirmed yet': 'Noch nicht bestätigt',
+        'Earned Points': 'Gesammelte Punkte',
+        'No Product Purchases Yet': 'Noch keine Produktkäufe',
+        'No Point Earnings Yet': 'Noch keine Punktesammlungen',
+        'No Data Found': 'Keine Daten gefunden',
+        'You can buy products using your points.': 'Sie können Produkte mit Ihren Punkten kaufen.',
+        'You can earn points by scanning QR codes.': 'Sie können Punkte durch Scannen von QR-Codes sammeln.',
+        'No data found matching the selected criteria.': 'Keine Daten gefunden, die den ausgewählten Kriterien entsprechen.',
+        'Points Available': 'Verfügbare Punkte',
+        'Categories': 'Kategorien',
+        'All': 'Alle',
+        'Buy': 'Kaufen',
+        'Insufficient Points': 'Unzureichende Punkte',
+        'more points needed': 'weitere Punkte benötigt',
+        'products displayed': 'Produkte angezeigt',
+        'No Products Available Yet': 'Noch keine Produkte verfügbar',
+        'Products will appear here when added by admin.': 'Produkte werden hier angezeigt, wenn sie vom Admin hinzugefügt werden.',
+        'Earn Points by Generating QR': 'Punkte durch QR-Generierung sammeln',
+        'Clear Filters': 'Filter löschen'
+    }
+}
+
+def load_translation_catalog():
+    """Babel kataloglarını (.mo) ve TRANSLATIONS tablosunu dil başına tek sözlükte birleştirir"""
+    directories = app.config.get('BABEL_TRANSLATION_DIRECTORIES', 'translations').split(';')
+    catalog = {}
+    for lang in set(app.config['LANGUAGES']) | set(TRANSLATIONS):
+        messages = {}
+        for directory in directories:
+            path = os.path.join(app.root_path, directory)
+            if os.path.isdir(path):
+                babel_catalog = getattr(BabelTranslations.load(path, [lang]), '_catalog', {})
+                messages.update({
+                    key: value for key, value in babel_catalog.items()
+                    if isinstance(key, str) and key and value
+                })
+        # Uygulama içi çeviriler önceliklidir
+        messages.update(TRANSLATIONS.get(lang, {}))
+        catalog[lang] = messages
+    return catalog
+
+TRANSLATION_CATALOG = load_translation_catalog()
+
+@app.before_request
+def reset_translation_locale():
+    # Dil her istekte ilk _() çağrısında bir kez belirlenir
+    g.pop('translation_messages', None)
+
 def _(text):
     """Basit çeviri fonksiyonu"""
-    translations = {
-        'tr': {
-            'to reward':'İlerleme',
-            'Rewards Progress':'Ödül İlerleme',
-            'points':'puan',
-            'Earn points by scanning QR codes to reach your next reward.':'QR kod okutarak kazanın devam et!',
-            'Next reward target':'Bir sonraki ödül hedefi',
-            'Points left':'Hediye ürün için kalan puan',
-            'View Campaigns': 'Kampanyaları Görüntüle',
-            'Single-use QR. Expires in 5 minutes':'Tek kullanımlık QR. 5 dakika sonra sona erer',
-            'Last 5 listed':'En son listenlenen',
-            'visits':'Ziyaret',
-            'Most visited branch':'En çok ziyaret edilen şube',
-            'Keep earning by scanning QR codes!': 'QR kod okutarak kazanın devam et!',
-            'Points earned in last 30 days': 'Son 30 gün kazanan puanlar',
-            'Here is a quick overview of your account': 'Hesabınız için hızlı bir genel bakış',
-            'Points are valid for purchases of medium-sized products': 'Puanlar orta boy ürünler için geçerlidir',
-            'Unread': 'Okunmamış',
-            'Read': 'Okundu',
-            'My Messages': 'Gelen Kutusu',
-            'Messages': 'Mesajlarım',
-            'Welcome back': 'Hoş Geldiniz',
-            'Login': 'Giriş',
-            'Register': 'Kayıt Ol',
-            'Logout': 'Çıkış',
-            'Dashboard': 'Panel',
-            'Profile': 'Profil',
-            'Admin': 'Yönetici',
-            'Campaigns': 'Kampanyalar',
-            'Join Now': 'Hemen Üye Ol',
-            'Go to Dashboard': 'Panelime Git',
-            'Earn Points with QR Code': 'QR Kod ile Puan Kazan',
-            'Scan QR code at checkout and earn points': 'Alışveriş yaptığınızda QR kodu kasada okutturun ve puan kazanın',
-            'Redeem Your Points': 'Puanlarınızı Kullanın',
-            'Use your points for free products': 'Puanlarınızı ücretsiz ürünler için kullanın',
-            'Special Campaigns': 'Özel Kampanyalar',
-            'Take advantage of exclusive campaigns': 'Özel kampanyalardan yararlanın',
-            'Earn points with every purchase, get free drinks with your points!': 'Her alışverişinizde puan kazanın, puanlarınızla ücretsiz içecek kazanın!',
-            'Track Your Transactions': 'İşlemlerini Takip Et',
-            'Track all your point earning and spending transactions in detail': 'Tüm puan kazanma ve kullanma işlemlerinizi detaylı olarak takip edin',
-            'How It Works?': 'Nasıl Çalışır?',
-            '1. Sign Up': '1. Üye Ol',
-            'Quick and easy registration': 'Hızlı ve kolay kayıt',
-            '2. Shop': '2. Alışveriş Yap',
-            'Get your favorite drinks': 'Favori içeceklerini al',
-            '3. Scan QR': '3. QR Okut',
-            'Scan QR code to earn points': 'Puan kazanmak için QR kodu okut',
-            '4. Earn Points': '4. Puan Kazan',
-            'Use your points for discounts': 'İndirim için puanlarını kullan',
-            'Email': 'E-posta',
-            'Password': 'Şifre',
-            'Don\'t have an account?': 'Hesabınız yok mu?',
-            'Sign up': 'Kayıt olun',
-            'Name': 'Ad Soyad',
-            'Phone': 'Telefon',
-            'Confirm Password': 'Şifre Tekrar',
-            'Already have an account?': 'Zaten hesabınız var mı?',
-            'My Points': 'Puanlarım',
-            'QR Code': 'QR Kod',
-            'Redeem Points': 'Puan Kullan',
-            'My Profile': 'Profilim',
-            'Edit Profile': 'Profili Düzenle',
-            'Save Changes': 'Değişiklikleri Kaydet',
-            'Current Password': 'Mevcut Şifre',
-            'New Password': 'Yeni Şifre',
-            'Change Password': 'Şifre Değiştir',
-            'Phone (Optional)': 'Telefon (Opsiyonel)',
-            'Personal Data Protection': 'Kişisel Verilerin Korunması',
-            'CONSENT TEXT': 'AÇIK RIZA METNİ',
-            'I have read and understood the consent text above': 'Yukarıdaki açık rıza metnini okudum, anladım ve kişisel verilerimin belirtilen amaçlarla işlenmesine açık rızamı veriyorum',
-            'Account Summary': 'Hesap Özeti',
-            'Current Points': 'Mevcut Puanınız',
-            'Total Transactions': 'Toplam İşlem',
-            'Membership Date': 'Üyelik Tarihi',
-            'My QR Code': 'Benim QR Kodum',
-            'Generate QR Code': 'QR Kodum Oluştur',
-            'Quick Actions': 'Hızlı İşlemler',
-            'Point System': 'Puan Sistemi',
-            'Each QR code = 1 point': 'Her QR kod = 1 puan',
-            'Minimum 5 points usage': 'Minimum 6 puan kullanılır',
-            'Points never expire': 'Puanlar süresiz geçerli',
-            'Show this code to cashier': 'Bu kodu kasiyere gösterin',
-            'Time remaining': 'Kalan süre',
-            'Your QR Code is Ready!': 'QR Kodunuz Hazır!',
-            'Code': 'Kod',
-            'Generate QR code to show to cashier': 'Kasiyere göstermek için QR kodunuzu oluşturun',
-            'Profile Information': 'Profil Bilgileri',
-            'Customer': 'Müşteri',
-            'Full Name': 'Ad Soyad',
-            'Phone': 'Telefon',
-            'Registration Date': 'Kayıt Tarihi',
-            'Not specified': 'Belirtilmemiş',
-            'Unknown': 'Bilinmiyor',
-            'My Points Status': 'Puan Durumum',
-            'Point Value': 'Puan Değeri',
-            'Total Purchases': 'Toplam Alım',
-            'Confirm New Password': 'Yeni Şifre Tekrar',
-            'At least 6 characters': 'En az 6 karakter olmalıdır',
-            'Update Profile': 'Profil Güncelle',
-            'Preferred Branch': 'Tercih Edilen Şube',
-            'Select Branch': 'Şube Seç',
-            'Campaigns will be filtered by this branch': 'Bu şube ile filtrelenen kampanyalar',
-            'Generate QR': 'QR Kod Oluştur',
-            'My Purchases': 'Alımlarım',
-            'Passwords do not match': 'Şifreler uyuşmuyor',
-            'Active Campaigns': 'Aktif Kampanyalar',
-            'Don\'t miss current opportunities!': 'Anlık fırsatları kaçırmayın!',
-            'Start': 'Başlangıç',
-            'End': 'Bitiş',
-            'Active Campaign': 'Aktif Kampanya',
-            'Valid Branches': 'Geçerli Şubeler',
-            'No active campaigns at the moment': 'Şu anda aktif kampanya yok',
-            'Stay tuned for new campaigns!': 'Yeni kampanyalar için takip edin!',
-            'Back to Home': 'Anasayfaya Dön',
-            'Our Branches': 'Şubelerimiz',
-            'You can find the same quality service and taste in all our branches': 'Tüm şubelerimizde aynı kaliteli servis ve tadı bulabilirsiniz',
-            'Address': 'Address',
-            'Phone': 'Telefon',
-            'Working Hours': 'Çalışma Saatleri',
-            'Active Branch': 'Aktif Şubeler',
-            'Call': 'Ara',
-            'Show on Map': 'Show on Map',
-            'No Branches Yet': 'No Branches Yet',
-            'We will be at your service with our new branches soon!': 'We will be at your service with our new branches soon!',
-            'Information': 'Information',
-            'Earn Points with QR Code': 'Earn Points with QR Code',
-            'You can earn points by scanning your QR code at all our branches': 'You can earn points by scanning your QR code at all our branches',
-            'Use Points': 'Use Points',
-            'You can use your accumulated points at all our branches': 'You can use your accumulated points at all our branches',
-            'Same Quality': 'Same Quality',
-            'Whichever branch you go to, you get the same quality service': 'Whichever branch you go to, you get the same quality service',
-            'Image not found': 'Image not found',
-            'Active Campaigns': 'Aktif Kampanyalar',
-            'Don\'t miss current opportunities!': 'Güncel fırsatları kaçırmayın!',
-            'Start': 'Başlangıç',
-            'End': 'Bitiş',
-            'Active Campaign': 'Aktif Kampanya',
-            'Valid Branches': 'Geçerli Şubeler',
-            'No active campaigns at the moment': 'Şu anda aktif kampanya bulunmuyor',
-            'Stay tuned for new campaigns!': 'Yeni kampanyalar için takipte kalın!',
-            'Back to Home': 'Ana Sayfaya Dön',
-            'Our Branches': 'Şubelerimiz',
-            'You can find the same quality service and taste in all our branches': 'Tüm şubelerimizde aynı kaliteli hizmet ve lezzeti bulabilirsiniz',
-            'Address': 'Adres',
-            'Phone': 'Telefon',
-            'Working Hours': 'Çalışma Saatleri',
-            'Active Branch': 'Aktif Şube',
-            'Call': 'Ara',
-            'Show on Map': 'Haritada Göster',
-            'No Branches Yet': 'Henüz Şube Bulunmuyor',
-            'We will be at your service with our new branches soon!': 'Yakında yeni şubelerimizle hizmetinizdeyiz!',
-            'Information': 'Bilgi',
-            'Earn Points with QR Code': 'QR Kod ile Puan Kazan',
-            'You can earn points by scanning your QR code at all our branches': 'Tüm şubelerimizde QR kodunuzu okutarak puan kazanabilirsiniz',
-            'Use Points': 'Puan Kullan',
-            'You can use your accumulated points at all our branches': 'Biriktirdiğiniz puanları tüm şubelerimizde kullanabilirsiniz',
-            'Same Quality': 'Aynı Kalite',
-            'Whichever branch you go to, you get the same quality service': 'Hangi şubeye giderseniz gidin, aynı kaliteli hizmeti alırsınız',
-            'Image not found': 'Görsel bulunamadı',
-            'Purchase History': 'Alımlarım & Puan Geçmişim',
-            'View your product purchases and point earnings by date': 'Ürün alımları ve puan kazanımlarınızı tarih bazlı görüntüleyin',
-            'Active Points': 'Aktif Puan',
-            'Start Date': 'Başlangıç Tarihi',
-            'End Date': 'Bitiş Tarihi',
-            'Activity Type': 'Aktivite Tipi',
-            'All Activities': 'Tüm Aktiviteler',
-            'Only Product Purchases': 'Sadece Ürün Alımları',
-            'Only Point Earnings': 'Sadece Puan Kazanımları',
-            'Filter': 'Filtrele',
-            'Clear': 'Temizle',
-            'Total Purchases': 'Toplam Alım',
-            'Product': 'Ürün',
-            'Points Earned': 'Kazanılan Puan',
-            'Points': 'Puan',
-            'Points Spent': 'Harcanan Puan',
-            'Confirmed': 'Onaylanan',
-            'Purchase': 'Alım',
-            'Product Purchases': 'Ürün Alımları',
-            'Point Earnings': 'Puan Kazanımları',
-            'Product Purchase': 'Ürün Alımı',
-            'points spent': 'puan harcandı',
-            'Confirmation Code': 'Onay Kodu',
-            'Branch': 'Şube',
-            'Unknown': 'Bilinmiyor',
-            'Confirmed': 'Onaylandı',
-            'Waiting': 'Bekliyor',
-            'Point Earning': 'Puan Kazanımı',
-            'You earned +1 point': '+1 puan kazandınız',
-            'QR Code': 'QR Kod',
-            'No Activity Yet': 'Henüz Aktivite Yok',
-            'Earn points by scanning QR codes or buy products with your points.': 'QR kod okutarak puan kazanın veya puanlarınızla ürün alın.',
-            'Generate QR': 'QR Oluştur',
-            'Use Points': 'Puan Kullan',
-            'Date': 'Tarih',
-            'Used Points': 'Kullanılan Puan',
-            'Status': 'Durum',
-            'Not confirmed yet': 'Henüz onaylanmadı',
-            'Earned Points': 'Kazanılan Puan',
-            'No Product Purchases Yet': 'Henüz Ürün Alımınız Yok',
-            'No Point Earnings Yet': 'Henüz Puan Kazanımınız Yok',
-            'No Data Found': 'Veri Bulunamadı',
-            'You can buy products using your points.': 'Puanlarınızı kullanarak ürün satın alabilirsiniz.',
-            'You can earn points by scanning QR codes.': 'QR kod okutarak puan kazanabilirsiniz.',
-            'No data found matching the selected criteria.': 'Seçilen kriterlere uygun veri bulunamadı.',
-        
-        # Redeem page translations
-        'Points Available': 'Puan Mevcut',
-        'Categories': 'Kategoriler',
-        'All': 'Tümü',
-        'Buy': 'Satın Al',
-        'Insufficient Points': 'Yetersiz Puan',
-        'more points needed': 'puan daha gerekli',
-        'products displayed': 'ürün görüntüleniyor',
-        'No Products Available Yet': 'Henüz Ürün Bulunmuyor',
-        'Products will appear here when added by admin.': 'Admin tarafından ürünler eklendiğinde burada görünecek.',
-        'Earn Points by Generating QR': 'QR Oluşturarak Puan Kazan',
-        'Clear Filters': 'Filtreleri Temizle'
-        },
-        'en': {
-            'Points are valid for purchases of medium-sized products.': 'Points are valid for purchases of medium-sized products.',
-            'Welcome': 'Welcome',
-            'Login': 'Login',
-            'Register': 'Register',
-            'Logout': 'Logout',
-            'Dashboard': 'Dashboard',
-            'Profile': 'Profile',
-            'Admin': 'Admin',
-            'Campaigns': 'Campaigns',
-            'Branches': 'Branches',
-            'Points': 'Points',
-            'History': 'History',
-            'Settings': 'Settings',
-            'Language': 'Language',
-            'Turkish': 'Turkish',
-            'English': 'English',
-            'Russian': 'Russian',
-            'Welcome back': 'Welcome back',
-            'Generate QR': 'Generate QR',
-            'Use Points': 'Use Points',
-            'Purchase History': 'Purchase History',
-            'Our Branches': 'Our Branches',
-            'Branch Login': 'Branch Login',
-            'Join Now': 'Join Now',
-            'Go to Dashboard': 'Go to Dashboard',
-            'Earn Points with QR Code': 'Earn Points with QR Code',
-            'Scan QR code at checkout and earn points': 'Scan QR code at checkout and earn points',
-            'Redeem Your Points': 'Redeem Your Points',
-            'Use your points for free products': 'Use your points for free products',
-            'Special Campaigns': 'Special Campaigns',
-            'Take advantage of exclusive campaigns': 'Take advantage of exclusive campaigns',
-            'Earn points with every purchase, get free drinks with your points!': 'Earn points with every purchase, get free drinks with your points!',
-            'Track Your Transactions': 'Track Your Transactions',
-            'Track all your point earning and spending transactions in detail': 'Track all your point earning and spending transactions in detail',
-            'How It Works?': 'How It Works?',
-            '1. Sign Up': '1. Sign Up',
-            'Quick and easy registration': 'Quick and easy registration',
-            '2. Shop': '2. Shop',
-            'Get your favorite drinks': 'Get your favorite drinks',
-            '3. Scan QR': '3. Scan QR',
-            'Scan QR code to earn points': 'Scan QR code to earn points',
-            '4. Earn Points': '4. Earn Points',
-            'Use your points for discounts': 'Use your points for discounts',
-            'Email': 'Email',
-            'Password': 'Password',
-            'Don\'t have an account?': 'Don\'t have an account?',
-            'Sign up': 'Sign up',
-            'Name': 'Name',
-            'Phone': 'Phone',
-            'Confirm Password': 'Confirm Password',
-            'Already have an account?': 'Already have an account?',
-            'My Points': 'My Points',
-            'QR Code': 'QR Code',
-            'Redeem Points': 'Redeem Points',
-            'My Profile': 'My Profile',
-            'Edit Profile': 'Edit Profile',
-            'Save Changes': 'Save Changes',
-            'Current Password': 'Current Password',
-            'New Password': 'New Password',
-            'Change Password': 'Change Password',
-            
-            # Purchase history and redeem page translations
-            'My Purchases & Point History': 'My Purchases & Point History',
-            'View your product purchases and point earnings by date': 'View your product purchases and point earnings by date',
-            'Active Points': 'Active Points',
-            'Start Date': 'Start Date',
-            'End Date': 'End Date',
-            'Activity Type': 'Activity Type',
-            'All Activities': 'All Activities',
-            'Only Product Purchases': 'Only Product Purchases',
-            'Only Point Earnings': 'Only Point Earnings',
-            'Filter': 'Filter',
-            'Clear': 'Clear',
-            'Total Purchases': 'Total Purchases',
-            'Product': 'Product',
-            'Points Earned': 'Points Earned',
-            'Points Spent': 'Points Spent',
-            'Confirmed': 'Confirmed',
-            'Purchase': 'Purchase',
-            'Product Purchase': 'Product Purchase',
-            'points spent': 'points spent',
-            'Confirmation Code': 'Confirmation Code',
-            'Branch': 'Branch',
-            'Unknown': 'Unknown',
-            'Waiting': 'Waiting',
-            'Point Earning': 'Point Earning',
-            'You earned +1 point': 'You earned +1 point',
-            'No Activity Yet': 'No Activity Yet',
-            'Generate QR': 'Generate QR',
-            'Use Points': 'Use Points',
-            'Date': 'Date',
-            'Used Points': 'Used Points',
-            'Status': 'Status',
-            'Not confirmed yet': 'Not confirmed yet',
-            'Earned Points': 'Earned Points',
-            'No Product Purchases Yet': 'No Product Purchases Yet',
-            'No Point Earnings Yet': 'No Point Earnings Yet',
-            'No Data Found': 'No Data Found',
-            'You can buy products using your points.': 'You can buy products using your points.',
-            'You can earn points by scanning QR codes.': 'You can earn points by scanning QR codes.',
-            'No data found matching the selected criteria.': 'No data found matching the selected criteria.',
-            'Points Available': 'Points Available',
-            'Categories': 'Categories',
-            'All': 'All',
-            'Buy': 'Buy',
-            'Insufficient Points': 'Insufficient Points',
-            'more points needed': 'more points needed',
-            'products displayed': 'products displayed',
-            'No Products Available Yet': 'No Products Available Yet',
-            'Products will appear here when added by admin.': 'Products will appear here when added by admin.',
-            'Earn Points by Generating QR': 'Earn Points by Generating QR',
-            'Clear Filters': 'Clear Filters'
-        },
-        'ru': {
-            'Welcome': 'Добро пожаловать',
-            'Login': 'Войти',
-            'Register': 'Регистрация',
-            'Logout': 'Выйти',
-            'Dashboard': 'Панель',
-            'Profile': 'Профиль',
-            'Admin': 'Админ',
-            'Campaigns': 'Кампании',
-            'Branches': 'Филиалы',
-            'Points': 'Баллы',
-            'History': 'История',
-            'Settings': 'Настройки',
-            'Language': 'Язык',
-            'Turkish': 'Turkish',
-            'English': 'English',
-            'Russian': 'Russian',
-            'German': 'German',
-            'Welcome back': 'Добро пожаловать обратно',
-            'Generate QR': 'Создать QR',
-            'Use Points': 'Использовать баллы',
-            'Purchase History': 'История покупок',
-            'Our Branches': 'Наши филиалы',
-            'Branch Login': 'Вход в филиал',
-            'Join Now': 'Присоединиться сейчас',
-            'Go to Dashboard': 'Перейти к панели',
-            'Earn Points with QR Code': 'Зарабатывайте баллы с QR-кодом',
-            'Scan QR code at checkout and earn points': 'Сканируйте QR-код при оплате и зарабатывайте баллы',
-            'Redeem Your Points': 'Используйте свои баллы',
-            'Use your points for free products': 'Используйте свои баллы для бесплатных продуктов',
-            'Special Campaigns': 'Специальные кампании',
-            'Take advantage of exclusive campaigns': 'Воспользуйтесь эксклюзивными кампаниями',
-            'Earn points with every purchase, get free drinks with your points!': 'Зарабатывайте баллы с каждой покупкой, получайте бесплатные напитки за ваши баллы!',
-            'Track Your Transactions': 'Отслеживайте ваши транзакции',
-            'Track all your point earning and spending transactions in detail': 'Отслеживайте все ваши транзакции по заработку и трате баллов в деталях',
-            'How It Works?': 'Как это работает?',
-            '1. Sign Up': '1. Зарегистрируйтесь',
-            'Quick and easy registration': 'Быстрая и простая регистрация',
-            '2. Shop': '2. Покупайте',
-            'Get your favorite drinks': 'Получите ваши любимые напитки',
-            '3. Scan QR': '3. Сканируйте QR',
-            'Scan QR code to earn points': 'Сканируйте QR-код для заработка баллов',
-            '4. Earn Points': '4. Зарабатывайте баллы',
-            'Use your points for discounts': 'Используйте ваши баллы для скидок',
-            'Email': 'Электронная почта',
-            'Password': 'Пароль',
-            'Don\'t have an account?': 'Нет аккаунта?',
-            'Sign up': 'Зарегистрироваться',
-            'Name': 'Имя',
-            'Phone': 'Телефон',
-            'Confirm Password': 'Подтвердите пароль',
-            'Already have an account?': 'Уже есть аккаунт?',
-            'My Points': 'Мои баллы',
-            'QR Code': 'QR-код',
-            'Redeem Points': 'Использовать баллы',
-            'My Profile': 'Мой профиль',
-            'Edit Profile': 'Редактировать профиль',
-            'Save Changes': 'Сохранить изменения',
-            'Current Password': 'Текущий пароль',
-            'New Password': 'Новый пароль',
-            'Change Password': 'Изменить пароль',
-            'Phone (Optional)': 'Телефон (Необязательно)',
-            'Personal Data Protection': 'Защита персональных данных',
-            'CONSENT TEXT': 'ТЕКСТ СОГЛАСИЯ',
-            'I have read and understood the consent text above': 'Я прочитал и понял текст согласия выше и даю согласие на обработку моих персональных данных для указанных целей',
-            'Account Summary': 'Сводка аккаунта',
-            'Current Points': 'Текущие баллы',
-            'Total Transactions': 'Всего транзакций',
-            'Membership Date': 'Дата членства',
-            'My QR Code': 'Мой QR-код',
-            'Generate QR Code': 'Создать QR-код',
-            'Quick Actions': 'Быстрые действия',
-            'Point System': 'Система баллов',
-            'Each QR code = 1 point': 'Каждый QR-код = 1 балл',
-            'Minimum 10 points usage': 'Минимум 10 баллов для использования',
-            'Points never expire': 'Баллы никогда не истекают',
-            'Show this code to cashier': 'Покажите этот код кассиру',
-            'Time remaining': 'Оставшееся время',
-            'Your QR Code is Ready!': 'Ваш QR-код готов!',
-            'Code': 'Код',
-            'Generate QR code to show to cashier': 'Создайте QR-код для показа кассиру',
-            'Profile Information': 'Информация профиля',
-            'Customer': 'Клиент',
-            'Full Name': 'Полное имя',
-            'Phone': 'Телефон',
-            'Registration Date': 'Дата регистрации',
-            'Not specified': 'Не указано',
-            'Unknown': 'Неизвестно',
-            'My Points Status': 'Статус моих баллов',
-            'Point Value': 'Стоимость баллов',
-            'Total Purchases': 'Всего покупок',
-            'Confirm New Password': 'Подтвердите новый пароль',
-            'At least 6 characters': 'Минимум 6 символов',
-            'Update Profile': 'Обновить профиль',
-            'Preferred Branch': 'Предпочитаемый филиал',
-            'Select Branch': 'Выберите филиал',
-            'Campaigns will be filtered by this branch': 'Кампании будут отфильтрованы по этому филиалу',
-            'Generate QR': 'Создать QR',
-            'My Purchases': 'Мои покупки',
-            'Passwords do not match': 'Пароли не совпадают',
-            'Account Summary': 'Сводка аккаунта',
-            'Current Points': 'Текущие баллы',
-            'Total Transactions': 'Всего транзакций',
-            'Membership Date': 'Дата членства',
-            'My QR Code': 'Мой QR-код',
-            'Generate QR Code': 'Создать QR-код',
-            'Quick Actions': 'Быстрые действия',
-            'Point System': 'Система баллов',
-            'Each QR code = 1 point': 'Каждый QR-код = 1 балл',
-            'Minimum 10 points usage': 'Минимум 10 баллов для использования',
-            'Points never expire': 'Баллы никогда не истекают',
-            'Show this code to cashier': 'Покажите этот код кассиру',
-            'Time remaining': 'Оставшееся время',
-            'Your QR Code is Ready!': 'Ваш QR-код готов!',
-        },
-        'de': {
-            'Welcome': 'Willkommen',
-            'Login': 'Anmelden',
-            'Register': 'Registrieren',
-            'Logout': 'Abmelden',
-            'Dashboard': 'Dashboard',
-            'Profile': 'Profil',
-            'Admin': 'Admin',
-            'Campaigns': 'Kampagnen',
-            'Branches': 'Filialen',
-            'Points': 'Punkte',
-            'History': 'Verlauf',
-            'Settings': 'Einstellungen',
-            'Language': 'Sprache',
-            'Turkish': 'Turkish',
-            'English': 'English',
-            'Russian': 'Russian',
-            'German': 'German',
-            'Home': 'Startseite',
-            'About': 'Über uns',
-            'Contact': 'Kontakt',
-            'Services': 'Dienstleistungen',
-            'Products': 'Produkte',
-            'News': 'Nachrichten',
-            'FAQ': 'FAQ',
-            'Help': 'Hilfe',
-            'Terms': 'Nutzungsbedingungen',
-            'Privacy': 'Datenschutz',
-            'Cookie Policy': 'Cookie-Richtlinie',
-            'Copyright': 'Urheberrecht',
-            'All Rights Reserved': 'Alle Rechte vorbehalten',
-            'Loyalty Program': 'Treueprogramm',
-            'Earn points with every purchase': 'Sammeln Sie Punkte bei jedem Einkauf',
-            'Redeem points for rewards': 'Lösen Sie Punkte für Belohnungen ein',
-            'Join now and start earning': 'Jetzt beitreten und sammeln beginnen',
-            'How it works': 'So funktioniert es',
-            '1. Sign Up': '1. Registrieren',
-            'Quick and easy registration': 'Schnelle und einfache Registrierung',
-            '2. Shop': '2. Einkaufen',
-            'Get your favorite drinks': 'Holen Sie sich Ihre Lieblingsgetränke',
-            '3. Scan QR': '3. QR scannen',
-            'Scan QR code to earn points': 'QR-Code scannen, um Punkte zu sammeln',
-            '4. Earn Points': '4. Punkte sammeln',
-            'Use your points for discounts': 'Verwenden Sie Ihre Punkte für Rabatte',
-            'Email': 'E-Mail',
-            'Password': 'Passwort',
-            'Don\'t have an account?': 'Haben Sie noch kein Konto?',
-            'Sign up': 'Registrieren',
-            'Name': 'Name',
-            'Phone': 'Telefon',
-            'Confirm Password': 'Passwort bestätigen',
-            'Already have an account?': 'Haben Sie bereits ein Konto?',
-            'My Points': 'Meine Punkte',
-            'QR Code': 'QR-Code',
-            'Redeem Points': 'Punkte einlösen',
-            'My Profile': 'Mein Profil',
-            'Edit Profile': 'Profil bearbeiten',
-            'Save Changes': 'Änderungen speichern',
-            'Current Password': 'Aktuelles Passwort',
-            'New Password': 'Neues Passwort',
-            'Change Password': 'Passwort ändern',
-            
-            # Purchase history and redeem page translations
-            'My Purchases & Point History': 'Meine Einkäufe & Punkteverlauf',
-            'View your product purchases and point earnings by date': 'Sehen Sie Ihre Produktkäufe und Punktesammlungen nach Datum',
-            'Active Points': 'Aktive Punkte',
-            'Start Date': 'Startdatum',
-            'End Date': 'Enddatum',
-            'Activity Type': 'Aktivitätstyp',
-            'All Activities': 'Alle Aktivitäten',
-            'Only Product Purchases': 'Nur Produktkäufe',
-            'Only Point Earnings': 'Nur Punktesammlungen',
-            'Filter': 'Filter',
-            'Clear': 'Löschen',
-            'Total Purchases': 'Gesamte Einkäufe',
-            'Product': 'Produkt',
-            'Points Earned': 'Gesammelte Punkte',
-            'Points Spent': 'Ausgegebene Punkte',
-            'Confirmed': 'Bestätigt',
-            'Purchase': 'Einkauf',
-            'Product Purchase': 'Produktkauf',
-            'points spent': 'Punkte ausgegeben',
-            'Confirmation Code': 'Bestätigungscode',
-            'Branch': 'Filiale',
-            'Unknown': 'Unbekannt',
-            'Waiting': 'Wartend',
-            'Point Earning': 'Punkte sammeln',
-            'You earned +1 point': 'Sie haben +1 Punkt gesammelt',
-            'No Activity Yet': 'Noch keine Aktivität',
-            'Generate QR': 'QR generieren',
-            'Use Points': 'Punkte verwenden',
-            'Date': 'Datum',
-            'Used Points': 'Verwendete Punkte',
-            'Status': 'Status',
-            'Not confirmed yet': 'Noch nicht bestätigt',
-            'Earned Points': 'Gesammelte Punkte',
-            'No Product Purchases Yet': 'Noch keine Produktkäufe',
-            'No Point Earnings Yet': 'Noch keine Punktesammlungen',
-            'No Data Found': 'Keine Daten gefunden',
-            'You can buy products using your points.': 'Sie können Produkte mit Ihren Punkten kaufen.',
-            'You can earn points by scanning QR codes.': 'Sie können Punkte durch Scannen von QR-Codes sammeln.',
-            'No data found matching the selected criteria.': 'Keine Daten gefunden, die den ausgewählten Kriterien entsprechen.',
-            'Points Available': 'Verfügbare Punkte',
-            'Categories': 'Kategorien',
-            'All': 'Alle',
-            'Buy': 'Kaufen',
-            'Insufficient Points': 'Unzureichende Punkte',
-            'more points needed': 'weitere Punkte benötigt',
-            'products displayed': 'Produkte angezeigt',
-            'No Products Available Yet': 'Noch keine Produkte verfügbar',
-            'Products will appear here when added by admin.': 'Produkte werden hier angezeigt, wenn sie vom Admin hinzugefügt werden.',
-            'Earn Points by Generating QR': 'Punkte durch QR-Generierung sammeln',
-            'Clear Filters': 'Filter löschen'
-        }
-    }
-    
-    current_lang = get_locale()
-    return translations.get(current_lang, {}).get(text, text)
+    messages = g.get('translation_messages')
+    if messages is None:
+        messages = TRANSLATION_CATALOG.get(get_locale(), {})
+        g.translation_messages = messages
+    return messages.get(text, text)
 
 # Template context processor
 @app.context_processor
@@ -3029,8 +4952,8 @@ def admin():
     except Exception:
         page = 1
 
-    # Sorguyu oluştur
-    query = User.query
+    # Sorguyu oluştur (bakiyeler listeyle aynı sorguda defterden okunur)
+    query = User.query.options(undefer(User.points))
     if q:
         like = f"%{q}%"
         query = query.filter((User.name.ilike(like)) | (User.email.ilike(like)))
@@ -3055,12 +4978,13 @@ def admin():
     products = Product.query.all()
     campaigns = Campaign.query.order_by(Campaign.created_at.desc()).all()
     
-    # Mevcut logoyu al
-    current_logo = SiteSetting.query.filter_by(key='site_logo').first()
-    current_background = SiteSetting.query.filter_by(key='background_image').first()
-    current_splash = SiteSetting.query.filter_by(key='splash_image').first()
-    current_app_icon = SiteSetting.query.filter_by(key='app_icon').first()
-    current_login_logo = SiteSetting.query.filter_by(key='login_logo').first()
+    # Mevcut logo ve görselleri önbellekten al
+    site_settings = get_site_settings()
+    current_logo = site_settings.get('site_logo')
+    current_background = site_settings.get('site_background')
+    current_splash = site_settings.get('splash_image')
+    current_app_icon = site_settings.get('app_icon')
+    current_login_logo = site_settings.get('login_logo')
     
     return render_template('admin.html', 
         users=users, 
@@ -3105,6 +5029,7 @@ def manage_campaign_products(campaign_id):
             )
             
             db.session.add(campaign_product)
+            bump_campaign_version(Campaign.id == campaign_id)
             db.session.commit()
             
             return jsonify({
@@ -3154,6 +5079,7 @@ def delete_campaign_product(product_id):
     try:
         product = CampaignProduct.query.get_or_404(product_id)
         product.is_active = False
+        bump_campaign_version(Campaign.id == product.campaign_id)
         db.session.commit()
         
         return jsonify({
@@ -3274,7 +5200,7 @@ def reports():
     branches = Branch.query.all()
     
     # Özet veriler
-    total_points = db.session.query(db.func.sum(User.points)).scalar() or 0
+    total_points = db.session.query(db.func.sum(User.points)).select_from(User).scalar() or 0
     total_redemptions = ProductRedemption.query.count()
     active_customers = User.query.filter(User.points > 0).count()
     total_transactions = Transaction.query.count()
@@ -3330,6 +5256,104 @@ def reports():
                          total_transactions=total_transactions,
                          campaign_stats=campaign_stats)
 
+# Müşteri analiz raporu - sıralanabilir kolonlar
+CUSTOMER_REPORT_USER_SORTS = ('name', 'email', 'phone', 'created_at', 'points', 'level')
+CUSTOMER_REPORT_STAT_SORTS = ('used_points', 'total_spent', 'total_transactions', 'last_activity', 'status')
+
+def customer_report_select(sort='points', order='desc', limit=None, offset=0):
+    """Müşteri analiz raporu için tek gruplu sorgu.
+
+    Kullanılan puan, harcama, işlem sayısı, son aktivite, seviye ve aktif/pasif
+    durumu veritabanında hesaplanır. Kullanıcı kolonlarına göre sıralamada önce
+    sayfa seçilir ve toplamlar yalnızca o sayfadaki kullanıcılar için hesaplanır.
+    """
+    if sort not in CUSTOMER_REPORT_USER_SORTS + CUSTOMER_REPORT_STAT_SORTS:
+        sort = 'points'
+    direction = db.asc if order == 'asc' else db.desc
+    active_since = (get_turkey_time() - timedelta(days=30)).replace(tzinfo=None)
+    page_by_user = sort in CUSTOMER_REPORT_USER_SORTS
+    user_points = db.func.coalesce(User.points, 0)
+    user_sort_columns = {
+        'name': User.name, 'email': User.email, 'phone': User.phone,
+        'created_at': User.created_at, 'points': user_points, 'level': user_points
+    }
+
+    users = db.select(
+        User.id, User.name, User.email, User.phone, User.created_at, user_points.label('points')
+    ).where(User.is_admin == False)
+    if page_by_user:
+        users = users.order_by(direction(user_sort_columns[sort]), User.id)
+        if limit:
+            users = users.limit(limit).offset(offset)
+    users = users.subquery()
+
+    redemptions = db.select(
+        ProductRedemption.user_id,
+        db.func.sum(ProductRedemption.points_used).label('used_points')
+    ).group_by(ProductRedemption.user_id)
+    transactions = db.select(
+        Transaction.user_id,
+        db.func.max(Transaction.timestamp).label('last_activity'),
+        db.func.count(Transaction.id).label('total_transactions'),
+        db.func.sum(Transaction.amount).label('total_spent')
+    ).group_by(Transaction.user_id)
+    if page_by_user and limit:
+        page_ids = db.select(users.c.id)
+        redemptions = redemptions.where(ProductRedemption.user_id.in_(page_ids))
+        transactions = transactions.where(Transaction.user_id.in_(page_ids))
+    redemptions = redemptions.subquery()
+    transactions = transactions.subquery()
+
+    stat_columns = {
+        'used_points': db.func.coalesce(redemptions.c.used_points, 0),
+        'total_spent': db.func.coalesce(transactions.c.total_spent, 0),
+        'total_transactions': db.func.coalesce(transactions.c.total_transactions, 0),
+        'last_activity': transactions.c.last_activity,
+        'status': db.case((transactions.c.last_activity >= active_since, 'Aktif'), else_='Pasif')
+    }
+    # Müşteri seviyesi belirleme
+    level = db.case(
+        (users.c.points >= 100, '🥇 VIP'),
+        (users.c.points >= 50, '🥈 Premium'),
+        (users.c.points >= 20, '🥉 Standart'),
+        else_='🆕 Yeni'
+    )
+
+    stmt = db.select(
+        users.c.id, users.c.name, users.c.email, users.c.phone, users.c.created_at, users.c.points,
+        *(column.label(name) for name, column in stat_columns.items()),
+        level.label('level')
+    ).select_from(
+        users
+        .outerjoin(redemptions, redemptions.c.user_id == users.c.id)
+        .outerjoin(transactions, transactions.c.user_id == users.c.id)
+    )
+
+    if page_by_user:
+        sort_column = users.c.points if sort == 'level' else users.c[sort]
+        stmt = stmt.order_by(direction(sort_column), users.c.id)
+    else:
+        stmt = stmt.order_by(direction(stat_columns[sort]), users.c.id)
+        if limit:
+            stmt = stmt.limit(limit).offset(offset)
+    return stmt
+
+def customer_report_row(r):
+    """Rapor satırını tablo/Excel formatına çevirir"""
+    return [
+        r.name,
+        r.email,
+        r.phone or 'Yok',
+        r.created_at.strftime('%d.%m.%Y') if r.created_at else 'Bilinmiyor',
+        r.points,
+        r.used_points,
+        f"{r.total_spent or 0:.2f} ₺",
+        r.total_transactions,
+        r.last_activity.strftime('%d.%m.%Y') if r.last_activity else 'Hiç yok',
+        r.level,
+        r.status
+    ]
+
 # Rapor Verisi API
 @app.route('/admin/report_data')
 @login_required
@@ -3456,42 +5480,22 @@ def report_data():
                 data['branches_data'] = []
         
         elif report_type == 'customers':
-            # Müşteri analiz raporu
+            # Müşteri analiz raporu (tek gruplu sorgu, sunucu tarafı sayfalama ve sıralama)
             try:
-                users = User.query.filter(~User.is_admin).all()
-                data['customers_data'] = []
-                for user in users:
-                    used_points = db.session.query(db.func.sum(ProductRedemption.points_used)).filter_by(user_id=user.id).scalar() or 0
-                    last_activity = db.session.query(db.func.max(Transaction.timestamp)).filter_by(user_id=user.id).scalar()
-                    total_transactions = Transaction.query.filter_by(user_id=user.id).count()
-                    total_spent = db.session.query(db.func.sum(Transaction.amount)).filter_by(user_id=user.id).scalar() or 0
-                    
-                    # Müşteri seviyesi belirleme
-                    if user.points >= 100:
-                        level = "🥇 VIP"
-                    elif user.points >= 50:
-                        level = "🥈 Premium"
-                    elif user.points >= 20:
-                        level = "🥉 Standart"
-                    else:
-                        level = "🆕 Yeni"
-                    
-                    # Son aktivite tarihi
-                    last_activity_str = last_activity.strftime('%d.%m.%Y') if last_activity else 'Hiç yok'
-                    
-                    data['customers_data'].append([
-                        user.name,
-                        user.email,
-                        user.phone or 'Yok',
-                        user.created_at.strftime('%d.%m.%Y') if hasattr(user, 'created_at') else 'Bilinmiyor',
-                        user.points,
-                        used_points,
-                        f"{total_spent:.2f} ₺",
-                        total_transactions,
-                        last_activity_str,
-                        level,
-                        'Aktif' if last_activity and (datetime.now() - last_activity).days < 30 else 'Pasif'
-                    ])
+                page = max(request.args.get('page', 1, type=int), 1)
+                per_page = min(max(request.args.get('per_page', 50, type=int), 1), 500)
+                sort = request.args.get('sort', 'points')
+                order = 'asc' if request.args.get('order') == 'asc' else 'desc'
+                
+                rows = db.session.execute(
+                    customer_report_select(sort, order, limit=per_page, offset=(page - 1) * per_page)
+                ).all()
+                data['customers_data'] = [customer_report_row(r) for r in rows]
+                data['customers_total'] = db.session.query(db.func.count(User.id)).filter(User.is_admin == False).scalar()
+                data['page'] = page
+                data['per_page'] = per_page
+                data['sort'] = sort if sort in CUSTOMER_REPORT_USER_SORTS + CUSTOMER_REPORT_STAT_SORTS else 'points'
+                data['order'] = order
             except Exception as e:
                 print(f"Customers query error: {e}")
                 data['customers_data'] = []
@@ -3656,6 +5660,296 @@ def report_data():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Export sırasında veritabanından parça parça okunan satır sayısı
+EXPORT_YIELD_PER = 2000
+
+def _export_rows(stmt, label, format_row):
+    """Sorgu satırlarını yield_per ile parça parça okuyup formatlar.
+
+    Hata yutulmaz: akış yarıda kesilir, böylece eksik dosya tamamlanmış gibi inmez.
+    """
+    try:
+        for r in db.session.execute(stmt.execution_options(yield_per=EXPORT_YIELD_PER)):
+            yield format_row(r)
+    except Exception as e:
+        print(f"{label} export error: {e}")
+        raise
+
+def export_report_sheets():
+    """Export sayfalarını sırayla döndürür: (ad, başlıklar, renk, kolon genişlikleri, satırlar).
+
+    Satırlar üreteç olarak verilir; bir sayfanın satırları bir sonraki sayfaya
+    geçmeden önce tüketilmelidir.
+    """
+    # 1. Puan Kazanımları
+    points_stmt = db.select(
+        User.name,
+        User.email,
+        User.points,
+        db.func.max(CustomerQR.used_at).label('last_qr_scan'),
+        Branch.name.label('last_branch')
+    ).select_from(User).where(User.is_admin == False)\
+    .outerjoin(CustomerQR, CustomerQR.customer_id == User.id)\
+    .outerjoin(Branch, CustomerQR.used_by_branch_id == Branch.id)\
+    .group_by(User.id, Branch.name)
+    yield (
+        "Puan Kazanımları",
+        ['Müşteri', 'E-posta', 'Toplam Puan', 'Son QR Okutma', 'Son Şube'],
+        "28a745", [25, 32, 13, 17, 22],
+        _export_rows(points_stmt, "Points", lambda u: [
+            u.name, u.email, u.points,
+            u.last_qr_scan.strftime('%d.%m.%Y') if u.last_qr_scan else 'Hiç QR okutmamış',
+            u.last_branch or 'Bilinmiyor'
+        ])
+    )
+
+    # 2. Ürün Alımları
+    redemptions_stmt = db.select(
+        User.name.label('user_name'),
+        Product.name.label('product_name'),
+        ProductRedemption.points_used,
+        ProductRedemption.redeemed_at,
+        ProductRedemption.is_confirmed,
+        Branch.name.label('branch_name')
+    ).select_from(ProductRedemption)\
+    .join(User, ProductRedemption.user_id == User.id)\
+    .join(Product, ProductRedemption.product_id == Product.id)\
+    .outerjoin(Branch, ProductRedemption.confirmed_by_branch_id == Branch.id)\
+    .order_by(ProductRedemption.redeemed_at.desc())
+    yield (
+        "Ürün Alımları",
+        ['Müşteri', 'Ürün', 'Kullanılan Puan', 'Tarih', 'Durum', 'Onaylayan Şube'],
+        "ffc107", [25, 25, 16, 18, 12, 22],
+        _export_rows(redemptions_stmt, "Redemptions", lambda r: [
+            r.user_name, r.product_name, r.points_used,
+            r.redeemed_at.strftime('%d.%m.%Y %H:%M') if r.redeemed_at else '',
+            'Onaylandı' if r.is_confirmed else 'Bekliyor',
+            r.branch_name if r.branch_name else 'Henüz Onaylanmadı'
+        ])
+    )
+
+    # 3. Şube Performansı (QR ve ürün onayları ayrı gruplanır, join satır çoğaltmaz)
+    qr_by_branch = db.select(
+        CustomerQR.used_by_branch_id.label('branch_id'),
+        db.func.count(CustomerQR.id).label('qr_scans'),
+        db.func.sum(CustomerQR.points_earned).label('total_points_given'),
+        db.func.count(db.distinct(CustomerQR.customer_id)).label('active_customers')
+    ).where(CustomerQR.used_by_branch_id.isnot(None)).group_by(CustomerQR.used_by_branch_id).subquery()
+    confirmed_by_branch = db.select(
+        ProductRedemption.confirmed_by_branch_id.label('branch_id'),
+        db.func.count(ProductRedemption.id).label('confirmed_products')
+    ).where(ProductRedemption.confirmed_by_branch_id.isnot(None))\
+    .group_by(ProductRedemption.confirmed_by_branch_id).subquery()
+    branches_stmt = db.select(
+        Branch.name,
+        Branch.address,
+        db.func.coalesce(qr_by_branch.c.qr_scans, 0).label('qr_scans'),
+        db.func.coalesce(qr_by_branch.c.total_points_given, 0).label('total_points_given'),
+        db.func.coalesce(qr_by_branch.c.active_customers, 0).label('active_customers'),
+        db.func.coalesce(confirmed_by_branch.c.confirmed_products, 0).label('confirmed_products')
+    ).outerjoin(qr_by_branch, qr_by_branch.c.branch_id == Branch.id)\
+    .outerjoin(confirmed_by_branch, confirmed_by_branch.c.branch_id == Branch.id)
+
+    def branch_row(b):
+        # Performans hesapla
+        total_activity = b.qr_scans + b.confirmed_products
+        if total_activity > 50:
+            performance = "Yüksek"
+        elif total_activity > 20:
+            performance = "Orta"
+        else:
+            performance = "Düşük"
+        return [b.name, b.address, b.qr_scans, b.total_points_given, b.active_customers, b.confirmed_products, performance]
+
+    yield (
+        "Şube Performansı",
+        ['Şube Adı', 'Adres', 'QR Okutma', 'Verilen Puan', 'Aktif Müşteri', 'Onaylanan Ürün', 'Performans'],
+        "dc3545", [22, 40, 12, 14, 15, 16, 12],
+        _export_rows(branches_stmt, "Branches", branch_row)
+    )
+
+    # 4. Müşteri Analizi
+    qr_by_customer = db.select(
+        CustomerQR.customer_id,
+        db.func.count(CustomerQR.id).label('qr_count'),
+        db.func.max(CustomerQR.used_at).label('last_activity')
+    ).group_by(CustomerQR.customer_id).subquery()
+    redemptions_by_customer = db.select(
+        ProductRedemption.user_id,
+        db.func.count(ProductRedemption.id).label('redemption_count')
+    ).group_by(ProductRedemption.user_id).subquery()
+    customers_stmt = db.select(
+        User.name,
+        User.email,
+        User.points,
+        db.func.coalesce(qr_by_customer.c.qr_count, 0).label('qr_count'),
+        db.func.coalesce(redemptions_by_customer.c.redemption_count, 0).label('redemption_count'),
+        qr_by_customer.c.last_activity
+    ).where(User.is_admin == False)\
+    .outerjoin(qr_by_customer, qr_by_customer.c.customer_id == User.id)\
+    .outerjoin(redemptions_by_customer, redemptions_by_customer.c.user_id == User.id)\
+    .order_by(User.id)
+    yield (
+        "Müşteri Analizi",
+        ['Müşteri', 'E-posta', 'Toplam Puan', 'QR Sayısı', 'Ürün Alımı', 'Son Aktivite'],
+        "6f42c1", [25, 32, 13, 11, 12, 17],
+        _export_rows(customers_stmt, "Customers", lambda c: [
+            c.name, c.email, c.points, c.qr_count, c.redemption_count,
+            c.last_activity.strftime('%d.%m.%Y') if c.last_activity else 'Hiç aktivite yok'
+        ])
+    )
+
+    # 5. İşlem Geçmişi
+    transactions_stmt = db.select(
+        Transaction.amount,
+        Transaction.transaction_type,
+        Transaction.description,
+        Transaction.timestamp,
+        Transaction.points_earned,
+        User.name.label('user_name')
+    ).join(User, Transaction.user_id == User.id)\
+    .order_by(Transaction.timestamp.desc())
+    yield (
+        "İşlem Geçmişi",
+        ['Müşteri', 'İşlem Türü', 'Tutar', 'Tarih', 'Açıklama', 'Puan Değişimi', 'Şube'],
+        "17a2b8", [25, 12, 12, 18, 40, 14, 12],
+        _export_rows(transactions_stmt, "Transactions", lambda t: [
+            t.user_name, t.transaction_type, f"{t.amount or 0:.2f} ₺",
+            t.timestamp.strftime('%d.%m.%Y %H:%M') if t.timestamp else '',
+            t.description or '', t.points_earned or 0, 'Bilinmiyor'
+        ])
+    )
+
+    # 6. Kampanya Raporu
+    yield (
+        "Kampanya Raporu",
+        ['Kampanya Adı', 'QR Oluşturulan', 'QR Kullanılan', 'Kullanım Oranı', 'Ürün Sayısı', 'Ürünler', 'En Aktif Şube', 'Durum'],
+        "dc3545", [30, 15, 14, 15, 12, 50, 22, 10],
+        _export_campaign_rows()
+    )
+
+def _export_campaign_rows():
+    """Kampanya raporu satırları (kampanya başına sorgu yerine gruplu sorgular)"""
+    try:
+        campaigns = db.session.execute(
+            db.select(Campaign.id, Campaign.title, Campaign.is_active).order_by(Campaign.created_at.desc())
+        ).all()
+        if not campaigns:
+            yield ['Henüz kampanya oluşturulmamış', 0, 0, '%0', 0, 'Ürün yok', 'Yok', 'Pasif']
+            return
+
+        # Kampanya QR kullanım istatistikleri
+        usage = {
+            r.campaign_id: r for r in db.session.execute(
+                db.select(
+                    CampaignUsage.campaign_id,
+                    db.func.count(CampaignUsage.id).label('generated'),
+                    db.func.sum(db.case((CampaignUsage.is_used == True, 1), else_=0)).label('used')
+                ).group_by(CampaignUsage.campaign_id)
+            )
+        }
+
+        # Kampanya ürünleri
+        product_names = {}
+        for r in db.session.execute(
+            db.select(CampaignProduct.campaign_id, db.func.coalesce(Product.name, CampaignProduct.product_name).label('name'))
+            .outerjoin(Product, CampaignProduct.product_id == Product.id)
+            .where(CampaignProduct.is_active == True)
+            .order_by(CampaignProduct.id)
+        ):
+            product_names.setdefault(r.campaign_id, []).append(r.name)
+
+        # En çok kullanılan şube (sıralı sonuçta her kampanyanın ilk satırı)
+        top_branches = {}
+        for r in db.session.execute(
+            db.select(CampaignUsage.campaign_id, Branch.name, db.func.count(CampaignUsage.id).label('usage_count'))
+            .join(Branch, Branch.id == CampaignUsage.used_by_branch_id)
+            .where(CampaignUsage.is_used == True)
+            .group_by(CampaignUsage.campaign_id, Branch.id, Branch.name)
+            .order_by(CampaignUsage.campaign_id, db.func.count(CampaignUsage.id).desc())
+        ):
+            top_branches.setdefault(r.campaign_id, r.name)
+
+        for campaign in campaigns:
+            stats = usage.get(campaign.id)
+            total_qr_generated = stats.generated if stats else 0
+            total_qr_used = int(stats.used or 0) if stats else 0
+            names = [name for name in product_names.get(campaign.id, []) if name]
+            usage_rate = round((total_qr_used / total_qr_generated * 100) if total_qr_generated > 0 else 0, 1)
+            yield [
+                campaign.title,
+                total_qr_generated,
+                total_qr_used,
+                f"%{usage_rate}",
+                len(product_names.get(campaign.id, [])),
+                ', '.join(names) if names else 'Ürün yok',
+                top_branches.get(campaign.id, 'Henüz kullanılmadı'),
+                'Aktif' if campaign.is_active else 'Pasif'
+            ]
+    except Exception as e:
+        print(f"Campaigns export error: {e}")
+        raise
+
+def write_report_xlsx(fileobj):
+    """Raporu write-only modda (satırlar belleğe alınmadan) XLSX olarak yazar"""
+    wb = Workbook(write_only=True)
+    for title, headers, color, widths, rows in export_report_sheets():
+        ws = wb.create_sheet(title)
+        # Write-only modda kolon genişlikleri satırlardan önce verilmelidir
+        for col, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = Font(bold=True, color="FFFFFF")
+            cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
+            cell.alignment = Alignment(horizontal="center")
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+        for row in rows:
+            ws.append(row)
+    wb.save(fileobj)
+
+class _ZipStreamBuffer:
+    """Zip çıktısını parça parça istemciye aktarmak için yazılabilir tampon"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def stream_report_csv_zip():
+    """Her rapor sayfasını ayrı CSV olarak içeren ZIP'i parça parça üretir"""
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for title, headers, color, widths, rows in export_report_sheets():
+            with archive.open(f'{title}.csv', 'w', force_zip64=True) as entry:
+                # utf-8-sig ve ';' ayırıcı: Türkçe Excel CSV'yi doğrudan açabilir
+                text = io.TextIOWrapper(entry, encoding='utf-8-sig', newline='')
+                writer = csv.writer(text, delimiter=';')
+                writer.writerow(headers)
+                for count, row in enumerate(rows, 1):
+                    writer.writerow(row)
+                    if count % EXPORT_YIELD_PER == 0:
+                        text.flush()
+                        yield buffer.pop()
+                text.flush()
+                text.detach()
+            yield buffer.pop()
+    yield buffer.pop()
+
 # Excel Export
 @app.route('/admin/export_report')
 @login_required
@@ -3664,304 +5958,33 @@ def export_report():
         return jsonify({'error': 'Yetkisiz erişim'}), 403
     
     try:
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, PatternFill, Alignment
-        import io
-        
-        wb = Workbook()
-        wb.remove(wb.active)
-        
-        # 1. Puan Kazanımları Sayfası
-        ws1 = wb.create_sheet("Puan Kazanımları")
-        headers1 = ['Müşteri', 'E-posta', 'Toplam Puan', 'Son QR Okutma', 'Son Şube']
-        for col, header in enumerate(headers1, 1):
-            cell = ws1.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="28a745", end_color="28a745", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center")
-        
-        # Puan kazanımları verilerini al (limitsiz)
-        try:
-            points_data = db.session.query(
-                User.name,
-                User.email,
-                User.points,
-                db.func.max(CustomerQR.used_at).label('last_qr_scan'),
-                Branch.name.label('last_branch')
-            ).filter(User.is_admin == False)\
-            .outerjoin(CustomerQR, CustomerQR.customer_id == User.id)\
-            .outerjoin(Branch, CustomerQR.used_by_branch_id == Branch.id)\
-            .group_by(User.id, Branch.name)\
-            .all()
-            
-            for row, u in enumerate(points_data, 2):
-                ws1.cell(row=row, column=1, value=u.name)
-                ws1.cell(row=row, column=2, value=u.email)
-                ws1.cell(row=row, column=3, value=u.points)
-                ws1.cell(row=row, column=4, value=u.last_qr_scan.strftime('%d.%m.%Y') if u.last_qr_scan else 'Hiç QR okutmamış')
-                ws1.cell(row=row, column=5, value=u.last_branch or 'Bilinmiyor')
-        except Exception as e:
-            print(f"Points export error: {e}")
-        
-        # 2. Ürün Alımları Sayfası
-        ws2 = wb.create_sheet("Ürün Alımları")
-        headers2 = ['Müşteri', 'Ürün', 'Kullanılan Puan', 'Tarih', 'Durum', 'Onaylayan Şube']
-        for col, header in enumerate(headers2, 1):
-            cell = ws2.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="ffc107", end_color="ffc107", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center")
-        
-        # Ürün alımları verilerini al (limitsiz)
-        try:
-            redemptions_data = db.session.query(
-                User.name.label('user_name'),
-                Product.name.label('product_name'),
-                ProductRedemption.points_used,
-                ProductRedemption.redeemed_at,
-                ProductRedemption.is_confirmed,
-                Branch.name.label('branch_name')
-            ).select_from(ProductRedemption)\
-            .join(User, ProductRedemption.user_id == User.id)\
-            .join(Product, ProductRedemption.product_id == Product.id)\
-            .outerjoin(Branch, ProductRedemption.confirmed_by_branch_id == Branch.id)\
-            .order_by(ProductRedemption.redeemed_at.desc())\
-            .all()
-            
-            for row, r in enumerate(redemptions_data, 2):
-                ws2.cell(row=row, column=1, value=r.user_name)
-                ws2.cell(row=row, column=2, value=r.product_name)
-                ws2.cell(row=row, column=3, value=r.points_used)
-                ws2.cell(row=row, column=4, value=r.redeemed_at.strftime('%d.%m.%Y %H:%M'))
-                ws2.cell(row=row, column=5, value='Onaylandı' if r.is_confirmed else 'Bekliyor')
-                ws2.cell(row=row, column=6, value=r.branch_name if r.branch_name else 'Henüz Onaylanmadı')
-        except Exception as e:
-            print(f"Redemptions export error: {e}")
-        
-        # 3. Şube Performansı Sayfası
-        ws3 = wb.create_sheet("Şube Performansı")
-        headers3 = ['Şube Adı', 'Adres', 'QR Okutma', 'Verilen Puan', 'Aktif Müşteri', 'Onaylanan Ürün', 'Performans']
-        for col, header in enumerate(headers3, 1):
-            cell = ws3.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="dc3545", end_color="dc3545", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center")
-        
-        # Şube performansı verilerini al (limitsiz)
-        try:
-            branches_data = db.session.query(
-                Branch.name,
-                Branch.address,
-                db.func.count(CustomerQR.id).label('qr_scans'),
-                db.func.sum(CustomerQR.points_earned).label('total_points_given'),
-                db.func.count(db.distinct(CustomerQR.customer_id)).label('active_customers'),
-                db.func.count(ProductRedemption.id).label('confirmed_products')
-            ).outerjoin(CustomerQR, CustomerQR.used_by_branch_id == Branch.id)\
-            .outerjoin(ProductRedemption, ProductRedemption.confirmed_by_branch_id == Branch.id)\
-            .group_by(Branch.id)\
-            .all()
-            
-            for row, b in enumerate(branches_data, 2):
-                ws3.cell(row=row, column=1, value=b.name)
-                ws3.cell(row=row, column=2, value=b.address)
-                ws3.cell(row=row, column=3, value=b.qr_scans or 0)
-                ws3.cell(row=row, column=4, value=b.total_points_given or 0)
-                ws3.cell(row=row, column=5, value=b.active_customers or 0)
-                ws3.cell(row=row, column=6, value=b.confirmed_products or 0)
-                
-                # Performans hesapla
-                total_activity = (b.qr_scans or 0) + (b.confirmed_products or 0)
-                if total_activity > 50:
-                    performance = "Yüksek"
-                elif total_activity > 20:
-                    performance = "Orta"
-                else:
-                    performance = "Düşük"
-                ws3.cell(row=row, column=7, value=performance)
-        except Exception as e:
-            print(f"Branches export error: {e}")
-        
-        # 4. Müşteri Analizi Sayfası
-        ws4 = wb.create_sheet("Müşteri Analizi")
-        headers4 = ['Müşteri', 'E-posta', 'Toplam Puan', 'QR Sayısı', 'Ürün Alımı', 'Son Aktivite']
-        for col, header in enumerate(headers4, 1):
-            cell = ws4.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="6f42c1", end_color="6f42c1", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center")
-        
-        # Müşteri analizi verilerini al (limitsiz)
-        try:
-            customers_data = db.session.query(
-                User.name,
-                User.email,
-                User.points,
-                db.func.count(CustomerQR.id).label('qr_count'),
-                db.func.count(ProductRedemption.id).label('redemption_count'),
-                db.func.max(CustomerQR.used_at).label('last_activity')
-            ).filter(User.is_admin == False)\
-            .outerjoin(CustomerQR, CustomerQR.customer_id == User.id)\
-            .outerjoin(ProductRedemption, ProductRedemption.user_id == User.id)\
-            .group_by(User.id)\
-            .all()
-            
-            for row, c in enumerate(customers_data, 2):
-                ws4.cell(row=row, column=1, value=c.name)
-                ws4.cell(row=row, column=2, value=c.email)
-                ws4.cell(row=row, column=3, value=c.points)
-                ws4.cell(row=row, column=4, value=c.qr_count or 0)
-                ws4.cell(row=row, column=5, value=c.redemption_count or 0)
-                ws4.cell(row=row, column=6, value=c.last_activity.strftime('%d.%m.%Y') if c.last_activity else 'Hiç aktivite yok')
-        except Exception as e:
-            print(f"Customers export error: {e}")
-        
-        # 5. İşlem Geçmişi Sayfası
-        ws5 = wb.create_sheet("İşlem Geçmişi")
-        headers5 = ['Müşteri', 'İşlem Türü', 'Tutar', 'Tarih', 'Açıklama', 'Puan Değişimi', 'Şube']
-        for col, header in enumerate(headers5, 1):
-            cell = ws5.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="17a2b8", end_color="17a2b8", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center")
-        
-        # İşlem geçmişi verilerini al (limitsiz)
-        try:
-            transactions = db.session.query(
-                Transaction.user_id,
-                Transaction.amount,
-                Transaction.transaction_type,
-                Transaction.description,
-                Transaction.updated_at,
-                Transaction.points_earned,
-                User.name.label('user_name')
-            ).join(User, Transaction.user_id == User.id)\
-            .order_by(Transaction.updated_at.desc())\
-            .all()
-            
-            for row, t in enumerate(transactions, 2):
-                ws5.cell(row=row, column=1, value=t.user_name)
-                ws5.cell(row=row, column=2, value=t.transaction_type)
-                ws5.cell(row=row, column=3, value=f"{t.amount:.2f} ₺")
-                ws5.cell(row=row, column=4, value=t.updated_at.strftime('%d.%m.%Y %H:%M'))
-                ws5.cell(row=row, column=5, value=t.description or '')
-                ws5.cell(row=row, column=6, value=t.points_earned or 0)
-                ws5.cell(row=row, column=7, value='Bilinmiyor')
-        except Exception as e:
-            print(f"Transactions export error: {e}")
-        
-        # 6. Kampanya Raporu Sayfası
-        ws6 = wb.create_sheet("Kampanya Raporu")
-        headers6 = ['Kampanya Adı', 'QR Oluşturulan', 'QR Kullanılan', 'Kullanım Oranı', 'Ürün Sayısı', 'Ürünler', 'En Aktif Şube', 'Durum']
-        for col, header in enumerate(headers6, 1):
-            cell = ws6.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(start_color="dc3545", end_color="dc3545", fill_type="solid")
-            cell.alignment = Alignment(horizontal="center")
-        
-        # Kampanya raporu verilerini al (limitsiz)
-        try:
-            campaigns = Campaign.query.order_by(Campaign.created_at.desc()).all()
-            
-            if not campaigns:
-                ws6.cell(row=2, column=1, value='Henüz kampanya oluşturulmamış')
-                ws6.cell(row=2, column=2, value=0)
-                ws6.cell(row=2, column=3, value=0)
-                ws6.cell(row=2, column=4, value='%0')
-                ws6.cell(row=2, column=5, value=0)
-                ws6.cell(row=2, column=6, value='Ürün yok')
-                ws6.cell(row=2, column=7, value='Yok')
-                ws6.cell(row=2, column=8, value='Pasif')
-            else:
-                for row, campaign in enumerate(campaigns, 2):
-                    # Kampanya QR kullanım istatistikleri
-                    total_qr_generated = CampaignUsage.query.filter_by(campaign_id=campaign.id).count()
-                    total_qr_used = CampaignUsage.query.filter_by(campaign_id=campaign.id, is_used=True).count()
-                    
-                    # Kampanya ürün sayısı
-                    campaign_products_count = CampaignProduct.query.filter_by(
-                        campaign_id=campaign.id, 
-                        is_active=True
-                    ).count()
-                    
-                    # Kampanya ürünlerini al
-                    campaign_products = CampaignProduct.query.filter_by(
-                        campaign_id=campaign.id, 
-                        is_active=True
-                    ).all()
-                    
-                    product_names = []
-                    for cp in campaign_products:
-                        if cp.product_id and cp.product:
-                            product_names.append(cp.product.name)
-                        elif cp.product_name:
-                            product_names.append(cp.product_name)
-                    
-                    products_str = ', '.join(product_names) if product_names else 'Ürün yok'
-                    
-                    # En çok kullanılan şube
-                    top_branch = db.session.query(
-                        Branch.name,
-                        db.func.count(CampaignUsage.id).label('usage_count')
-                    ).join(
-                        CampaignUsage, Branch.id == CampaignUsage.used_by_branch_id
-                    ).filter(
-                        CampaignUsage.campaign_id == campaign.id,
-                        CampaignUsage.is_used == True
-                    ).group_by(Branch.id, Branch.name).order_by(
-                        db.func.count(CampaignUsage.id).desc()
-                    ).first()
-                    
-                    # Kullanım oranı
-                    usage_rate = round((total_qr_used / total_qr_generated * 100) if total_qr_generated > 0 else 0, 1)
-                    
-                    # Kampanya durumu
-                    status = 'Aktif' if campaign.is_active else 'Pasif'
-                    
-                    ws6.cell(row=row, column=1, value=campaign.title)
-                    ws6.cell(row=row, column=2, value=total_qr_generated)
-                    ws6.cell(row=row, column=3, value=total_qr_used)
-                    ws6.cell(row=row, column=4, value=f"%{usage_rate}")
-                    ws6.cell(row=row, column=5, value=campaign_products_count)
-                    ws6.cell(row=row, column=6, value=products_str)
-                    ws6.cell(row=row, column=7, value=top_branch.name if top_branch else 'Henüz kullanılmadı')
-                    ws6.cell(row=row, column=8, value=status)
-                    
-        except Exception as e:
-            print(f"Campaigns export error: {e}")
-        
-        # Kolon genişliklerini ayarla
-        for ws in wb.worksheets:
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Excel dosyasını memory'ye kaydet
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
-        
-        # Response oluştur
-        response = Response(
-            output.getvalue(),
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
         # Dosya adını tarih ile oluştur
         today = datetime.now().strftime('%Y%m%d_%H%M')
-        filename = f'cafe_sadakat_raporu_{today}.xlsx'
         
-        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
-        response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        if request.args.get('format') == 'csv':
+            # CSV/ZIP: oluşturuldukça istemciye akıtılır
+            response = Response(
+                stream_with_context(stream_report_csv_zip()),
+                mimetype='application/zip'
+            )
+            response.headers['Content-Disposition'] = f'attachment; filename=cafe_sadakat_raporu_{today}.zip'
+            return response
         
-        return response
+        # XLSX: write-only çalışma kitabı geçici dosyaya yazılır ve dosyadan parça parça gönderilir
+        output = tempfile.TemporaryFile()
+        try:
+            write_report_xlsx(output)
+            output.seek(0)
+        except Exception:
+            output.close()
+            raise
+        
+        return send_file(
+            output,
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            as_attachment=True,
+            download_name=f'cafe_sadakat_raporu_{today}.xlsx'
+        )
         
     except Exception as e:
         print(f"Excel export hatası: {e}")
@@ -4082,7 +6105,7 @@ def create_product():
         )
         
         db.session.add(product)
-        db.session.commit()
+        bump_catalog_version()
         
         return jsonify({
             'success': True,
@@ -4101,10 +6124,22 @@ def hard_delete_product(product_id):
     try:
         product = Product.query.get_or_404(product_id)
 
-        # 1) Bu ürüne bağlı ProductRedemption kayıtlarını sil
-        redemptions = ProductRedemption.query.filter_by(product_id=product.id).all()
-        for r in redemptions:
-            db.session.delete(r)
+        # 1) Bu ürüne bağlı ProductRedemption kayıtlarını sil; kullanıcı geçmiş
+        #    sayaçlarından aynı transaction içinde düşülür
+        removed = db.session.query(
+            ProductRedemption.user_id,
+            db.func.count(ProductRedemption.id),
+            db.func.sum(db.case((ProductRedemption.is_confirmed == True, 1), else_=0)),
+            db.func.sum(ProductRedemption.points_used)
+        ).filter(ProductRedemption.product_id == product.id).group_by(ProductRedemption.user_id).all()
+        for user_id, count, confirmed, points_spent in removed:
+            add_user_activity(user_id, redemptions=-count, confirmed_redemptions=-(confirmed or 0),
+                              points_spent=-(points_spent or 0))
+        ProductRedemption.query.filter_by(product_id=product.id).delete(synchronize_session=False)
+        
+        # Ürünün puanlamaları ve puanlama özeti de kaldırılır
+        ProductRating.query.filter_by(product_id=product.id).delete(synchronize_session=False)
+        ProductRatingTotal.query.filter_by(product_id=product.id).delete(synchronize_session=False)
 
         # 2) Kampanya ürünlerinde bu ürüne olan FK'yi kaldır (NULL yap)
         linked_campaign_products = CampaignProduct.query.filter_by(product_id=product.id).all()
@@ -4122,7 +6157,7 @@ def hard_delete_product(product_id):
 
         # 4) Ürünü sil
         db.session.delete(product)
-        db.session.commit()
+        bump_catalog_version()
 
         return jsonify({'success': True, 'message': 'Ürün kalıcı olarak silindi.'})
     except Exception as e:
@@ -4209,7 +6244,11 @@ def update_product(product_id):
         product.category_id = category_fk
         product.category = category_name
 
-        db.session.commit()
+        # Bu ürünü içeren kampanyaların önbelleğini yenile
+        bump_campaign_version(Campaign.id.in_(
+            db.select(CampaignProduct.campaign_id).where(CampaignProduct.product_id == product.id)
+        ))
+        bump_catalog_version()
         return jsonify({'success': True, 'message': 'Ürün başarıyla güncellendi!'})
     except Exception as e:
         db.session.rollback()
@@ -4234,7 +6273,11 @@ def delete_product(product_id):
                 except Exception:
                     pass
             product.image_filename = None
-        db.session.commit()
+        # Bu ürünü içeren kampanyaların önbelleğini yenile
+        bump_campaign_version(Campaign.id.in_(
+            db.select(CampaignProduct.campaign_id).where(CampaignProduct.product_id == product.id)
+        ))
+        bump_catalog_version()
         return jsonify({'success': True, 'message': 'Ürün başarıyla silindi (pasif hale getirildi)!'})
     except Exception as e:
         db.session.rollback()
@@ -4278,7 +6321,7 @@ def add_category():
         )
         
         db.session.add(new_category)
-        db.session.commit()
+        bump_catalog_version()
         
         return jsonify({
             'success': True,
@@ -4327,7 +6370,7 @@ def delete_category():
         
         # Kategoriyi sil
         db.session.delete(category)
-        db.session.commit()
+        bump_catalog_version()
         
         return jsonify({
             'success': True,
@@ -4371,7 +6414,7 @@ def edit_category():
         # Ürünlerdeki eski kategori string'ini de güncelle (uyumluluk için)
         updated_count = Product.query.filter_by(category_id=category_id).update({'category': new_name})
         
-        db.session.commit()
+        bump_catalog_version()
         
         return jsonify({
             'success': True,
@@ -4395,7 +6438,7 @@ def toggle_product(product_id):
     
     product = Product.query.get_or_404(product_id)
     product.is_active = not product.is_active
-    db.session.commit()
+    bump_catalog_version()
     
     status = "aktif" if product.is_active else "pasif"
     return jsonify({
@@ -4465,9 +6508,9 @@ def change_password():
         flash('Şifre en az 6 karakter olmalıdır!', 'password_error')
         return redirect(url_for('profile'))
     
-    # Şifreyi güncelle
+    # Şifreyi güncelle, eski mobil oturumları kapat
     current_user.password_hash = generate_password_hash(new_password)
-    db.session.commit()
+    revoke_api_token(current_user)
     
     flash('Şifreniz başarıyla değiştirildi!', 'password')
     return redirect(url_for('profile'))
@@ -4617,10 +6660,8 @@ def create_campaign():
         
         db.session.commit()
         
-        # Kampanya bildirimi gönder (push)
-        send_campaign_notification(campaign)
-        # Kampanya e-postasını tüm kullanıcılara gönder
-        send_campaign_email(campaign)
+        # Kampanya bildirimi (push) ve e-postası arka planda parça parça gönderilir
+        start_campaign_fanout(campaign.id)
         
         branch_count = len(selected_branches)
         product_count = len(json.loads(products_data)) if products_data else 0
@@ -4842,7 +6883,8 @@ def public_reset_password(token):
         user.set_password(new_password)
         prr.is_used = True
         prr.used_at = get_turkey_time()
-        db.session.commit()
+        # Eski mobil oturumları kapat
+        revoke_api_token(user)
 
         flash('Parola başarıyla güncellendi. Giriş yapabilirsiniz.', 'success')
         return redirect(url_for('login'))
@@ -4897,7 +6939,8 @@ def admin_reset_password(token):
         user.set_password(new_password)
         prr.is_used = True
         prr.used_at = get_turkey_time()
-        db.session.commit()
+        # Eski mobil oturumları kapat
+        revoke_api_token(user)
 
         flash('Parola başarıyla güncellendi.', 'success')
         return redirect(url_for('messages'))
@@ -4990,10 +7033,12 @@ def admin_send_message():
                     title=f"📩 Yeni Mesaj: {title}",
                     body=content[:100] + "..." if len(content) > 100 else content,
                     notification_type="message",
-                    url="/messages"
+                    url="/messages",
+                    commit=False
                 )
             
             db.session.commit()
+            wake_push_dispatcher()
             
             return jsonify({
                 'success': True,
@@ -5008,7 +7053,7 @@ def admin_send_message():
             })
     
     # GET request - müşteri listesini getir
-    customers = User.query.filter_by(is_admin=False).order_by(User.name).all()
+    customers = User.query.options(undefer(User.points)).filter_by(is_admin=False).order_by(User.name).all()
     return render_template('admin_send_message.html', customers=customers)
 
 # Survey API Endpoints
@@ -5149,17 +7194,10 @@ def delete_survey(survey_id):
 
 # Get Active Surveys (Mobile API)
 @app.route('/api/surveys/active', methods=['GET'])
+@api_auth_required(allow_legacy_user_id=False)
 def get_active_surveys():
     try:
-        # Get authorization header
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'success': False, 'error': 'Token gerekli'}), 401
-        
-        token = auth_header.split(' ')[1]
-        
-        # Find user by token (simplified - in production use proper JWT)
-        user = User.query.filter_by(auth_token=token).first()
+        user = User.query.get(g.api_user_id)
         if not user:
             return jsonify({'success': False, 'error': 'Token süresi dolmuş. Lütfen tekrar giriş yapın.'}), 401
         
@@ -5193,17 +7231,10 @@ def get_active_surveys():
 
 # Submit Survey Response (Mobile API)
 @app.route('/api/surveys/<int:survey_id>/submit', methods=['POST'])
+@api_auth_required(allow_legacy_user_id=False)
 def submit_survey_response(survey_id):
     try:
-        # Get authorization header
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'success': False, 'error': 'Token gerekli'}), 401
-        
-        token = auth_header.split(' ')[1]
-        
-        # Find user by token
-        user = User.query.filter_by(auth_token=token).first()
+        user = User.query.get(g.api_user_id)
         if not user:
             return jsonify({'success': False, 'error': 'Geçersiz token'}), 401
         
@@ -5298,6 +7329,45 @@ class PushSubscription(db.Model):
     # İlişki
     user = db.relationship('User', backref='push_subscriptions')
 
+# Push bildirim kuyruğu (outbox)
+# İstek işleyicileri yalnızca buraya kayıt ekler; gönderimi arka plan dağıtıcısı yapar.
+# subscription_id boş olan kayıtlar kullanıcının tüm aboneliklerine açılır (expanded).
+class PushOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    subscription_id = db.Column(db.Integer, db.ForeignKey('push_subscription.id'), nullable=True)
+    payload = db.Column(db.Text, nullable=False)  # JSON bildirim içeriği
+    status = db.Column(db.String(20), default='pending')  # pending, sending, expanded, sent, failed, skipped
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=lambda: get_turkey_time().replace(tzinfo=None))
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: get_turkey_time().replace(tzinfo=None))
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_push_outbox_due', 'status', 'next_attempt_at'),
+    )
+
+# Kampanya bildirim/e-posta dağıtım işi (fan-out)
+# Alıcılar id sırasıyla parça parça işlenir; last_user_id sayesinde yarıda kalan iş kaldığı yerden devam eder.
+class CampaignFanout(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaign.id'), nullable=False)
+    channel = db.Column(db.String(10), nullable=False)  # push, email
+    status = db.Column(db.String(20), default='pending')  # pending, running, done, failed, abandoned, cancelled
+    attempts = db.Column(db.Integer, default=0)  # Sahiplenme (çalıştırma) sayısı
+    last_user_id = db.Column(db.Integer, default=0)  # İşlenen son alıcının id'si
+    sent_count = db.Column(db.Integer, default=0)
+    failed_count = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: get_turkey_time().replace(tzinfo=None))
+    updated_at = db.Column(db.DateTime, default=lambda: get_turkey_time().replace(tzinfo=None))
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('campaign_id', 'channel', name='uq_campaign_fanout_channel'),
+    )
+
 # VAPID Key API
 @app.route('/api/vapid-key')
 def get_vapid_key():
@@ -5344,153 +7414,559 @@ def subscribe_notifications():
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)})
 
-# Push Notification Unsubscription
-@app.route('/api/unsubscribe-notifications', methods=['POST'])
-@login_required
-def unsubscribe_notifications():
+# Push Notification Unsubscription
+@app.route('/api/unsubscribe-notifications', methods=['POST'])
+@login_required
+def unsubscribe_notifications():
+    try:
+        # Kullanıcının tüm subscription'larını deaktif et
+        PushSubscription.query.filter_by(user_id=current_user.id).update({'is_active': False})
+        db.session.commit()
+        
+        return jsonify({'success': True, 'message': 'Unsubscribed successfully'})
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)})
+
+# Test Notification
+@app.route('/api/test-notification', methods=['POST'])
+@login_required
+def send_test_notification():
+    try:
+        # Test bildirimi gönder
+        send_push_notification(
+            user_id=current_user.id,
+            title="Test Bildirimi 🧪",
+            body=f"Merhaba {current_user.name}! Bildirimler çalışıyor.",
+            notification_type="test",
+            url="/dashboard"
+        )
+        
+        return jsonify({'success': True, 'message': 'Test notification sent'})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def build_push_payload(title, body, notification_type="general", url="/dashboard", data=None):
+    """Push bildirim içeriğini (JSON) hazırlar"""
+    return json.dumps({
+        'title': title,
+        'body': body,
+        'icon': '/static/icons/icon-192.png',
+        'badge': '/static/icons/icon-192.png',
+        'tag': f'cafe-{notification_type}',
+        'requireInteraction': True,
+        'data': {
+            'type': notification_type,
+            'url': url,
+            'timestamp': get_turkey_time().isoformat(),
+            **(data or {})
+        }
+    })
+
+def send_push_notification(user_id, title, body, notification_type="general", url="/dashboard", data=None, commit=True):
+    """Push bildirimini kuyruğa ekler; gönderim arka plan dağıtıcısında yapılır.
+
+    commit=False verilirse kayıt çağıranın transaction'ına eklenir; çağıran
+    commit ettikten sonra wake_push_dispatcher() çağırmalıdır.
+    """
+    try:
+        payload = build_push_payload(title, body, notification_type, url, data)
+        db.session.add(PushOutbox(user_id=user_id, payload=payload))
+
+        if commit:
+            db.session.commit()
+            wake_push_dispatcher()
+        return True
+
+    except Exception as e:
+        if commit:
+            db.session.rollback()
+        print(f"Error queueing push notification: {e}")
+        return False
+
+# Push dağıtıcı (dispatcher) durumu - süreç başına bir arka plan thread'i
+_push_wakeup = threading.Event()
+_push_dispatcher_lock = threading.Lock()
+_push_dispatcher_thread = None
+_push_http = threading.local()
+_push_vapid_cache = {}
+
+def wake_push_dispatcher():
+    """Dağıtıcıyı (gerekirse başlatıp) uyandırır"""
+    start_push_dispatcher()
+    _push_wakeup.set()
+
+def start_push_dispatcher():
+    """Arka plan push dağıtıcısını süreç başına bir kez başlatır"""
+    global _push_dispatcher_thread
+    if not app.config['PUSH_DISPATCHER_ENABLED']:
+        return
+    with _push_dispatcher_lock:
+        if _push_dispatcher_thread is not None and _push_dispatcher_thread.is_alive():
+            return
+        _push_dispatcher_thread = threading.Thread(
+            target=_push_dispatcher_loop, name='push-dispatcher', daemon=True
+        )
+        _push_dispatcher_thread.start()
+
+def _push_dispatcher_loop():
+    executor = ThreadPoolExecutor(
+        max_workers=app.config['PUSH_WORKERS'], thread_name_prefix='push-worker'
+    )
+    while True:
+        # Yeni kayıt gelince uyandırılır; ertelenmiş denemeler için periyodik olarak da bakar
+        _push_wakeup.wait(timeout=5)
+        _push_wakeup.clear()
+        try:
+            with app.app_context():
+                while dispatch_push_outbox(executor):
+                    pass
+        except Exception as e:
+            print(f"Push dispatcher error: {e}")
+
+def drain_push_outbox():
+    """Sırası gelen tüm kuyruk kayıtlarını tek seferde işler, sahiplenilen kayıt sayısını döndürür
+
+    Arka plan dağıtıcısı çalışmayan kurulumlar (veya yeniden başlatma sonrası
+    bekleyen kayıtlar) için cron / komut satırından çağrılır.
+    """
+    executor = ThreadPoolExecutor(
+        max_workers=app.config['PUSH_WORKERS'], thread_name_prefix='push-worker'
+    )
+    total = 0
+    try:
+        while True:
+            claimed = dispatch_push_outbox(executor)
+            if not claimed:
+                return total
+            total += claimed
+    finally:
+        executor.shutdown(wait=True)
+
+def _get_push_vapid(private_key):
+    """VAPID anahtarını bir kez parse edip saklar"""
+    vapid = _push_vapid_cache.get(private_key)
+    if vapid is None:
+        if os.path.isfile(private_key):
+            vapid = Vapid.from_file(private_key_file=private_key)
+        else:
+            vapid = Vapid.from_string(private_key=private_key)
+        _push_vapid_cache[private_key] = vapid
+    return vapid
+
+def _push_http_session():
+    """Worker thread başına bir HTTP oturumu; push servislerine bağlantılar yeniden kullanılır"""
+    session = getattr(_push_http, 'session', None)
+    if session is None:
+        session = requests.Session()
+        _push_http.session = session
+    return session
+
+def _deliver_push(subscription_info, payload, vapid, claims_email, timeout):
+    """Tek bir aboneliğe gönderim yapar, (status_code, hata) döndürür"""
+    try:
+        response = webpush(
+            subscription_info=subscription_info,
+            data=payload,
+            vapid_private_key=vapid,
+            # webpush 'aud' ve 'exp' alanlarını claims üzerine yazar, her çağrıda yeni sözlük gerekir
+            vapid_claims={"sub": f"mailto:{claims_email}"},
+            timeout=timeout,
+            requests_session=_push_http_session()
+        )
+        return response.status_code, None
+    except WebPushException as e:
+        # Hata yanıtları bool olarak False döner, bu yüzden None kontrolü yapılır
+        status_code = e.response.status_code if e.response is not None else None
+        return status_code, str(e)
+    except Exception as e:
+        return None, str(e)
+
+def _push_retry_delay(attempts):
+    """Üstel geri çekilme (exponential backoff), en fazla 1 saat"""
+    delay = app.config['PUSH_RETRY_BASE_SECONDS'] * (2 ** max(attempts - 1, 0))
+    return min(delay, 3600) * random.uniform(1.0, 1.25)
+
+def _expand_push_rows(rows, now):
+    """Kullanıcı seviyesindeki kayıtları abonelik başına kayıtlara açar"""
+    user_ids = {row.user_id for row in rows}
+    subscriptions = db.session.execute(
+        db.select(PushSubscription.id, PushSubscription.user_id)
+        .where(PushSubscription.user_id.in_(user_ids), PushSubscription.is_active == True)
+    ).all()
+
+    by_user = {}
+    for subscription in subscriptions:
+        by_user.setdefault(subscription.user_id, []).append(subscription.id)
+
+    outbox = PushOutbox.__table__
+    children = []
+    for row in rows:
+        subscription_ids = by_user.get(row.user_id, [])
+        for subscription_id in subscription_ids:
+            children.append({
+                'user_id': row.user_id,
+                'subscription_id': subscription_id,
+                'payload': row.payload,
+                'status': 'pending',
+                'attempts': 0,
+                'next_attempt_at': now,
+                'created_at': row.created_at
+            })
+        db.session.execute(
+            outbox.update().where(outbox.c.id == row.id).values(
+                status='expanded' if subscription_ids else 'skipped',
+                last_error=None if subscription_ids else 'no active subscriptions'
+            )
+        )
+    if children:
+        db.session.execute(outbox.insert(), children)
+
+def _send_push_rows(rows, executor, now):
+    """Abonelik seviyesindeki kayıtları paralel gönderir ve sonuçları işler"""
+    outbox = PushOutbox.__table__
+    subscriptions = {
+        subscription.id: subscription for subscription in db.session.execute(
+            db.select(PushSubscription.id, PushSubscription.endpoint, PushSubscription.p256dh_key,
+                      PushSubscription.auth_key, PushSubscription.is_active)
+            .where(PushSubscription.id.in_({row.subscription_id for row in rows}))
+        ).all()
+    }
+
+    vapid_private_key = os.getenv('VAPID_PRIVATE_KEY')
+    if not vapid_private_key:
+        print("VAPID_PRIVATE_KEY environment variable not set")
+        db.session.execute(
+            outbox.update().where(outbox.c.id.in_([row.id for row in rows]))
+            .values(status='failed', last_error='VAPID_PRIVATE_KEY not set')
+        )
+        return
+
+    vapid = _get_push_vapid(vapid_private_key)
+    claims_email = os.getenv('VAPID_CLAIMS_EMAIL', 'admin@reevpoints.com')
+    timeout = app.config['PUSH_HTTP_TIMEOUT']
+
+    futures = {}
+    for row in rows:
+        subscription = subscriptions.get(row.subscription_id)
+        if subscription is None or not subscription.is_active:
+            db.session.execute(
+                outbox.update().where(outbox.c.id == row.id)
+                .values(status='skipped', last_error='subscription inactive')
+            )
+            continue
+        subscription_info = {
+            'endpoint': subscription.endpoint,
+            'keys': {'p256dh': subscription.p256dh_key, 'auth': subscription.auth_key}
+        }
+        futures[executor.submit(_deliver_push, subscription_info, row.payload, vapid, claims_email, timeout)] = row
+
+    gone_subscription_ids = set()
+    max_attempts = app.config['PUSH_MAX_ATTEMPTS']
+    for future, row in futures.items():
+        status_code, error = future.result()
+        if status_code is not None and 200 <= status_code < 300:
+            values = {'status': 'sent', 'sent_at': get_turkey_time().replace(tzinfo=None), 'last_error': None}
+        elif status_code in (404, 410):
+            # Abonelik artık geçerli değil (Gone) - deaktif et
+            gone_subscription_ids.add(row.subscription_id)
+            values = {'status': 'failed', 'last_error': error}
+        elif (status_code is None or status_code == 429 or status_code >= 500) and row.attempts + 1 < max_attempts:
+            # Geçici hata - geri çekilerek tekrar dene
+            values = {
+                'status': 'pending',
+                'next_attempt_at': now + timedelta(seconds=_push_retry_delay(row.attempts + 1)),
+                'last_error': error
+            }
+        else:
+            values = {'status': 'failed', 'last_error': error}
+        db.session.execute(outbox.update().where(outbox.c.id == row.id).values(**values))
+
+    if gone_subscription_ids:
+        PushSubscription.query.filter(PushSubscription.id.in_(gone_subscription_ids)).update(
+            {'is_active': False}, synchronize_session=False
+        )
+        print(f"{len(gone_subscription_ids)} push subscriptions marked as inactive (410 Gone)")
+
+def dispatch_push_outbox(executor):
+    """Sırası gelen kuyruk kayıtlarından bir grubu işler, sahiplenilen kayıt sayısını döndürür"""
+    outbox = PushOutbox.__table__
+    now = get_turkey_time().replace(tzinfo=None)
+
+    due = db.session.execute(
+        db.select(outbox.c.id, outbox.c.attempts)
+        .where(outbox.c.status.in_(('pending', 'sending')), outbox.c.next_attempt_at <= now)
+        .order_by(outbox.c.next_attempt_at, outbox.c.id)
+        .limit(app.config['PUSH_BATCH_SIZE'])
+    ).all()
+    if not due:
+        return 0
+
+    # Kayıtları sahiplen (compare-and-set). Birden fazla süreç çalışsa bile her kayıt
+    # tek bir dağıtıcıya düşer; süreç çökerse kira (lease) dolunca kayıt tekrar alınır.
+    lease_until = now + timedelta(seconds=app.config['PUSH_HTTP_TIMEOUT'] * 6)
+    claimed_ids = []
+    for row in due:
+        result = db.session.execute(
+            outbox.update()
+            .where(outbox.c.id == row.id, outbox.c.attempts == row.attempts,
+                   outbox.c.status.in_(('pending', 'sending')))
+            .values(status='sending', attempts=outbox.c.attempts + 1, next_attempt_at=lease_until)
+        )
+        if result.rowcount == 1:
+            claimed_ids.append(row.id)
+    db.session.commit()
+    if not claimed_ids:
+        return 0
+
+    # attempts değeri sahiplenmeden önceki değerdir
+    rows = db.session.execute(
+        db.select(outbox.c.id, outbox.c.user_id, outbox.c.subscription_id, outbox.c.payload,
+                  (outbox.c.attempts - 1).label('attempts'), outbox.c.created_at)
+        .where(outbox.c.id.in_(claimed_ids))
+    ).all()
+
     try:
-        # Kullanıcının tüm subscription'larını deaktif et
-        PushSubscription.query.filter_by(user_id=current_user.id).update({'is_active': False})
+        user_rows = [row for row in rows if row.subscription_id is None]
+        subscription_rows = [row for row in rows if row.subscription_id is not None]
+        if user_rows:
+            _expand_push_rows(user_rows, now)
+        if subscription_rows:
+            _send_push_rows(subscription_rows, executor, now)
         db.session.commit()
-        
-        return jsonify({'success': True, 'message': 'Unsubscribed successfully'})
-        
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        return jsonify({'success': False, 'error': str(e)})
+        raise
 
-# Test Notification
-@app.route('/api/test-notification', methods=['POST'])
-@login_required
-def send_test_notification():
-    try:
-        # Test bildirimi gönder
-        send_push_notification(
-            user_id=current_user.id,
-            title="Test Bildirimi 🧪",
-            body=f"Merhaba {current_user.name}! Bildirimler çalışıyor.",
-            notification_type="test",
-            url="/dashboard"
-        )
-        
-        return jsonify({'success': True, 'message': 'Test notification sent'})
-        
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+    return len(claimed_ids)
+
+_campaign_fanout_lock = threading.Lock()
+
+def get_campaign_fanout_job(campaign_id, channel):
+    """Kampanya ve kanal için dağıtım işini döndürür, yoksa oluşturur"""
+    job = CampaignFanout.query.filter_by(campaign_id=campaign_id, channel=channel).first()
+    if job is None:
+        job = CampaignFanout(campaign_id=campaign_id, channel=channel)
+        db.session.add(job)
+        db.session.commit()
+    return job.id
+
+def start_campaign_fanout(campaign_id):
+    """Kampanyanın push ve e-posta dağıtım işlerini oluşturup arka planda başlatır"""
+    for channel in ('push', 'email'):
+        get_campaign_fanout_job(campaign_id, channel)
+    start_campaign_fanout_worker()
+
+def start_campaign_fanout_worker():
+    """Bekleyen dağıtım işlerini arka plan thread'inde çalıştırır (uygulama açılışında da çağrılır)"""
+    threading.Thread(target=_campaign_fanout_worker, name='campaign-fanout', daemon=True).start()
+
+def _campaign_fanout_worker():
+    with app.app_context():
+        try:
+            resume_campaign_fanouts()
+        except Exception as e:
+            print(f"Campaign fan-out error: {e}")
+
+# Yeniden denenebilir durumlar; done, abandoned ve cancelled kalıcıdır
+CAMPAIGN_FANOUT_OPEN_STATUSES = ('pending', 'running', 'failed')
 
-def send_push_notification(user_id, title, body, notification_type="general", url="/dashboard", data=None):
-    """Push notification gönderme fonksiyonu"""
+def resume_campaign_fanouts():
+    """Bekleyen, hata almış veya yarıda kalmış tüm dağıtım işlerini çalıştırır
+    
+    CAMPAIGN_FANOUT_MAX_ATTEMPTS denemede bitmeyen işler 'abandoned', kampanyası
+    silinmiş işler 'cancelled' olur ve bir daha seçilmez.
+    """
+    # Aynı süreçte tek bir worker yeterli; diğer süreçlerle çakışmayı claim önler
+    if not _campaign_fanout_lock.acquire(blocking=False):
+        return 0
     try:
-        # Kullanıcının aktif subscription'larını al
-        subscriptions = PushSubscription.query.filter_by(
-            user_id=user_id,
-            is_active=True
+        job_ids = [job_id for (job_id,) in db.session.execute(
+            db.select(CampaignFanout.id)
+            .where(CampaignFanout.status.in_(CAMPAIGN_FANOUT_OPEN_STATUSES))
+            .order_by(CampaignFanout.id)
+        ).all()]
+        for job_id in job_ids:
+            try:
+                run_campaign_fanout(job_id)
+            except Exception:
+                # İş 'failed' olarak kaydedildi; bir kanalın hatası diğer işleri bekletmesin
+                continue
+        return len(job_ids)
+    finally:
+        _campaign_fanout_lock.release()
+
+def _campaign_recipient_chunks(after_user_id, chunk_size):
+    """Admin olmayan kullanıcıları id sırasıyla parça parça getirir (keyset)"""
+    while True:
+        chunk = db.session.execute(
+            db.select(User.id, User.name, User.email)
+            .where(User.is_admin == False, User.id > after_user_id)
+            .order_by(User.id)
+            .limit(chunk_size)
         ).all()
-        
-        if not subscriptions:
-            print(f"User {user_id} has no active push subscriptions")
-            return False
-        
-        # Notification payload'ı hazırla
-        notification_data = {
-            'title': title,
-            'body': body,
-            'icon': '/static/icons/icon-192.png',
-            'badge': '/static/icons/icon-192.png',
-            'tag': f'cafe-{notification_type}',
-            'requireInteraction': True,
-            'data': {
-                'type': notification_type,
-                'url': url,
-                'timestamp': get_turkey_time().isoformat(),
-                **(data or {})
-            }
-        }
-        
-        # VAPID anahtarları environment variable'dan al
-        vapid_private_key = os.getenv('VAPID_PRIVATE_KEY')
-        vapid_claims = {
-            "sub": f"mailto:{os.getenv('VAPID_CLAIMS_EMAIL', 'admin@reevpoints.com')}"
-        }
-        
-        if not vapid_private_key:
-            print("VAPID_PRIVATE_KEY environment variable not set")
-            return False
-        
-        # Her subscription için bildirim gönder
-        sent_count = 0
-        for subscription in subscriptions:
+        if not chunk:
+            return
+        yield chunk
+        after_user_id = chunk[-1].id
+
+def _save_campaign_fanout(job_id, **values):
+    """İş satırını günceller; satır silinmişse (kampanya silindi) False döner"""
+    fanout = CampaignFanout.__table__
+    values['updated_at'] = get_turkey_time().replace(tzinfo=None)
+    return db.session.execute(fanout.update().where(fanout.c.id == job_id).values(**values)).rowcount == 1
+
+def _claim_campaign_fanout(job_id):
+    """İşi bu worker'a al (compare-and-set); başka bir worker canlı çalıştırıyorsa False"""
+    fanout = CampaignFanout.__table__
+    now = get_turkey_time().replace(tzinfo=None)
+    stale_before = now - timedelta(seconds=app.config['CAMPAIGN_FANOUT_STALE_SECONDS'])
+    result = db.session.execute(
+        fanout.update()
+        .where(fanout.c.id == job_id,
+               db.func.coalesce(fanout.c.attempts, 0) < app.config['CAMPAIGN_FANOUT_MAX_ATTEMPTS'],
+               db.or_(fanout.c.status.in_(('pending', 'failed')),
+                      db.and_(fanout.c.status == 'running', fanout.c.updated_at < stale_before)))
+        .values(status='running', updated_at=now, last_error=None,
+                attempts=db.func.coalesce(fanout.c.attempts, 0) + 1)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def _rate_limiter(per_second):
+    """Saniyede en fazla per_second çağrıya izin veren bekleme fonksiyonu döndürür"""
+    interval = 1.0 / per_second if per_second > 0 else 0
+    next_at = [time.monotonic()]
+
+    def wait():
+        if not interval:
+            return
+        delay = next_at[0] - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        next_at[0] = max(next_at[0], time.monotonic()) + interval
+    return wait
+
+def _fanout_push_chunk(payload, chunk):
+    """Parçadaki kullanıcıların aboneliklerini tek sorguda alıp kuyruğa ekler"""
+    subscriptions = db.session.execute(
+        db.select(PushSubscription.id, PushSubscription.user_id)
+        .where(PushSubscription.user_id.in_([row.id for row in chunk]),
+               PushSubscription.is_active == True)
+    ).all()
+    if subscriptions:
+        now = get_turkey_time().replace(tzinfo=None)
+        db.session.execute(PushOutbox.__table__.insert(), [{
+            'user_id': subscription.user_id,
+            'subscription_id': subscription.id,
+            'payload': payload,
+            'status': 'pending',
+            'attempts': 0,
+            'next_attempt_at': now,
+            'created_at': now
+        } for subscription in subscriptions])
+    return len(subscriptions)
+
+def _fanout_email_chunk(connection, parts, chunk, throttle, progress):
+    """Parçadaki kullanıcılara açık SMTP bağlantısı üzerinden e-posta gönderir.
+
+    progress her alıcıdan sonra güncellenir; bağlantı tamamen koparsa iş
+    son gönderilen alıcıdan devam eder.
+    """
+    for row in chunk:
+        if row.email:
+            throttle()
+            msg = build_campaign_email(parts, row.name, row.email)
             try:
-                # Subscription bilgilerini parse et
-                subscription_info = json.loads(subscription.subscription_json)
-                
-                # Push notification gönder
-                webpush(
-                    subscription_info=subscription_info,
-                    data=json.dumps(notification_data),
-                    vapid_private_key=vapid_private_key,
-                    vapid_claims=vapid_claims
-                )
-                
-                print(f"📱 Push notification sent to user {user_id}: {title}")
-                sent_count += 1
-                
-            except WebPushException as e:
-                print(f"WebPush failed for subscription {subscription.id}: {e}")
-                # HTTP 410 (Gone) durumunda subscription'ı deaktif et
-                if e.response and e.response.status_code == 410:
-                    subscription.is_active = False
-                    print(f"Subscription {subscription.id} marked as inactive (410 Gone)")
-                    
+                try:
+                    connection.send(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # Sunucu bağlantıyı kapattıysa bir kez yeniden bağlanıp tekrar dene
+                    connection.host = connection.configure_host()
+                    connection.send(msg)
+                progress['sent_count'] += 1
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError):
+                raise
             except Exception as e:
-                print(f"Failed to send push notification to subscription {subscription.id}: {e}")
-                # Genel hata durumunda subscription'ı deaktif et
-                subscription.is_active = False
-        
-        if sent_count > 0:
-            db.session.commit()
-            return True
-        else:
-            return False
-            
-    except Exception as e:
-        print(f"Error sending push notification: {e}")
-        return False
+                print(f"Kampanya e-postası gönderilemedi ({row.email}): {e}")
+                progress['failed_count'] += 1
+        progress['last_user_id'] = row.id
+
+def run_campaign_fanout(job_id):
+    """Bir dağıtım işini kaldığı yerden sonuna kadar çalıştırır, toplam gönderim sayısını döndürür"""
+    if not _claim_campaign_fanout(job_id):
+        job = db.session.get(CampaignFanout, job_id)
+        return job.sent_count if job else 0
+
+    job = db.session.get(CampaignFanout, job_id)
+    campaign = db.session.get(Campaign, job.campaign_id)
+    channel = job.channel
+    attempts = job.attempts or 0
+    # Kalıcı olarak kaydedilmiş (veya SMTP'ye teslim edilmiş) son durum
+    progress = {
+        'last_user_id': job.last_user_id or 0,
+        'sent_count': job.sent_count or 0,
+        'failed_count': job.failed_count or 0
+    }
+    chunk_size = app.config['CAMPAIGN_FANOUT_CHUNK_SIZE']
+
+    if campaign is None:
+        # Kalıcı hata: tekrar denemek sonucu değiştirmez
+        _save_campaign_fanout(job_id, status='cancelled', last_error=f'Kampanya bulunamadı: {job.campaign_id}',
+                              finished_at=get_turkey_time().replace(tzinfo=None))
+        db.session.commit()
+        return progress['sent_count']
 
-def send_campaign_notification(campaign):
-    """Yeni kampanya bildirimi gönder"""
     try:
-        # Tüm müşterileri al (admin olmayanlar)
-        customers = User.query.filter_by(is_admin=False).all()
-        
-        # Kampanya açıklamasını kısalt
-        description = campaign.description
-        if len(description) > 100:
-            description = description[:100] + "..."
-        
-        # Her müşteriye bildirim gönder
-        sent_count = 0
-        for customer in customers:
-            success = send_push_notification(
-                user_id=customer.id,
+        if channel == 'push':
+            description = campaign.description or ''
+            if len(description) > 100:
+                description = description[:100] + "..."
+            payload = build_push_payload(
                 title=f"🎉 Yeni Kampanya: {campaign.title}",
                 body=description,
                 notification_type="campaign",
                 url="/campaigns",
-                data={
-                    'campaign_id': campaign.id,
-                    'campaign_title': campaign.title
-                }
+                data={'campaign_id': campaign.id, 'campaign_title': campaign.title}
             )
-            if success:
-                sent_count += 1
-        
-        print(f"📢 Campaign notification sent to {sent_count} customers: {campaign.title}")
-        return sent_count
-        
+            for chunk in _campaign_recipient_chunks(progress['last_user_id'], chunk_size):
+                queued = _fanout_push_chunk(payload, chunk)
+                # Kuyruk kayıtları ve ilerleme aynı transaction'da: devam edince tekrar eklenmez
+                if not _save_campaign_fanout(job_id, last_user_id=chunk[-1].id, sent_count=progress['sent_count'] + queued):
+                    # Kampanya dağıtım sürerken silindi: bu parça kuyruğa eklenmez
+                    db.session.rollback()
+                    return progress['sent_count']
+                db.session.commit()
+                progress['last_user_id'] = chunk[-1].id
+                progress['sent_count'] += queued
+                wake_push_dispatcher()
+        else:
+            parts = campaign_email_parts(campaign)
+            throttle = _rate_limiter(app.config['CAMPAIGN_EMAIL_PER_SECOND'])
+            # Tüm gönderim tek SMTP oturumu üzerinden yapılır
+            with mail.connect() as connection:
+                for chunk in _campaign_recipient_chunks(progress['last_user_id'], chunk_size):
+                    _fanout_email_chunk(connection, parts, chunk, throttle, progress)
+                    saved = _save_campaign_fanout(job_id, **progress)
+                    db.session.commit()
+                    if not saved:
+                        # Kampanya dağıtım sürerken silindi
+                        return progress['sent_count']
+
+        _save_campaign_fanout(job_id, status='done', finished_at=get_turkey_time().replace(tzinfo=None))
+        db.session.commit()
+        return progress['sent_count']
+
     except Exception as e:
-        print(f"Error sending campaign notifications: {e}")
-        return 0
+        db.session.rollback()
+        print(f"Campaign fan-out {job_id} ({channel}) stopped: {e}")
+        # Deneme hakkı biten iş kalıcı olarak bırakılır (last_error incelenebilir)
+        status = 'abandoned' if attempts >= app.config['CAMPAIGN_FANOUT_MAX_ATTEMPTS'] else 'failed'
+        _save_campaign_fanout(job_id, status=status, last_error=str(e), **progress)
+        db.session.commit()
+        raise
 
 # Mobile API Endpoints for Flutter App
 @app.route('/api/login', methods=['POST'])
@@ -5534,6 +8010,20 @@ def api_login():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/logout', methods=['POST'])
+@api_auth_required(allow_legacy_user_id=False)
+def api_logout():
+    try:
+        user = User.query.get(g.api_user_id)
+        if user:
+            revoke_api_token(user)
+        
+        return jsonify({'success': True, 'message': 'Çıkış yapıldı'})
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/register', methods=['POST'])
 def api_register():
     try:
@@ -5599,10 +8089,9 @@ def api_verify_email():
         if user.verification_code == verification_code:
             user.is_verified = True
             user.verification_code = None
-            db.session.commit()
-            
             # Generate token for auto-login
-            token = secrets.token_urlsafe(32)
+            token = user.generate_auth_token()
+            db.session.commit()
             
             return jsonify({
                 'success': True,
@@ -5624,11 +8113,12 @@ def api_verify_email():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/dashboard', methods=['GET'])
+@api_auth_required
 def api_dashboard():
     try:
         # In a real app, you'd validate the token here
         # For now, we'll use a simple approach
-        user_id = request.args.get('user_id')
+        user_id = g.api_user_id
         print(f"Dashboard request for user_id: {user_id}")
         
         if not user_id:
@@ -5641,49 +8131,9 @@ def api_dashboard():
         
         print(f"User found: {user.name} ({user.email})")
         
-        # Bu ay kazanılan puanları customerQR tablosundan hesapla
-        from datetime import datetime
-        current_month = get_turkey_time().month
-        current_year = get_turkey_time().year
-        
-        print(f"Calculating monthly points for month: {current_month}, year: {current_year}")
-        
-        # Önce hangi tabloda veri var kontrol edelim
-        new_table_count = CustomerQRCode.query.filter_by(customer_id=user_id).count()
-        old_table_count = CustomerQR.query.filter_by(customer_id=user_id).count()
-        
-        print(f"CustomerQRCode table records: {new_table_count}")
-        print(f"CustomerQR table records: {old_table_count}")
-        
-        total_monthly_points = 0
-        
-        # Eğer yeni tabloda veri varsa, sadece yeni tablodan al
-        if new_table_count > 0:
-            monthly_qr_points = db.session.query(
-                db.func.sum(CustomerQRCode.points_earned)
-            ).filter(
-                CustomerQRCode.customer_id == user_id,
-                CustomerQRCode.is_used == True,
-                db.func.extract('month', CustomerQRCode.used_at) == current_month,
-                db.func.extract('year', CustomerQRCode.used_at) == current_year
-            ).scalar() or 0
-            
-            total_monthly_points = int(monthly_qr_points)
-            print(f"Using new table - Monthly points: {total_monthly_points}")
-        else:
-            # Eğer yeni tabloda veri yoksa, eski tablodan al
-            monthly_old_qr_count = db.session.query(
-                db.func.count(CustomerQR.id)
-            ).filter(
-                CustomerQR.customer_id == user_id,
-                CustomerQR.used_at.isnot(None),
-                db.func.extract('month', CustomerQR.used_at) == current_month,
-                db.func.extract('year', CustomerQR.used_at) == current_year
-            ).scalar() or 0
-            
-            # Her eski QR kod 1 puan
-            total_monthly_points = int(monthly_old_qr_count)
-            print(f"Using old table - Monthly QR count: {monthly_old_qr_count}, points: {total_monthly_points}")
+        # Bu ay kazanılan puanlar (günlük özet tablosundan, en fazla 31 satır)
+        today = get_turkey_time().date()
+        total_monthly_points = sum(points_daily_totals(user.id, today.replace(day=1), today).values())
         
         print(f"Final monthly points: {total_monthly_points}")
         
@@ -5722,59 +8172,19 @@ def api_dashboard():
                 'selected_product_name': usage.selected_product_name
             })
         
-        # En çok ziyaret edilen şube bilgisi
+        # En çok ziyaret edilen şube bilgisi (şube bazlı özet tablosundan)
         most_visited_branch = None
         try:
-            from sqlalchemy import func
-            # Hem yeni hem eski tablodan şube ziyaretlerini al
-            branch_visits = []
-            
-            # Yeni tablodan (CustomerQRCode)
-            if new_table_count > 0:
-                new_visits = db.session.query(
-                    CustomerQRCode.used_by_branch_id, 
-                    func.count(CustomerQRCode.id).label('visit_count')
-                ).filter(
-                    CustomerQRCode.customer_id == user_id,
-                    CustomerQRCode.is_used == True,
-                    CustomerQRCode.used_by_branch_id.isnot(None)
-                ).group_by(CustomerQRCode.used_by_branch_id).all()
-                branch_visits.extend(new_visits)
-            
-            # Eski tablodan (CustomerQR)
-            if old_table_count > 0:
-                old_visits = db.session.query(
-                    CustomerQR.used_by_branch_id, 
-                    func.count(CustomerQR.id).label('visit_count')
-                ).filter(
-                    CustomerQR.customer_id == user_id,
-                    CustomerQR.is_used == True,
-                    CustomerQR.used_by_branch_id.isnot(None)
-                ).group_by(CustomerQR.used_by_branch_id).all()
-                branch_visits.extend(old_visits)
-            
-            # Şube ziyaretlerini birleştir ve en çok ziyaret edileni bul
-            if branch_visits:
-                branch_totals = {}
-                for branch_id, count in branch_visits:
-                    if branch_id in branch_totals:
-                        branch_totals[branch_id] += count
-                    else:
-                        branch_totals[branch_id] = count
-                
-                # En çok ziyaret edilen şubeyi bul
-                most_visited_branch_id = max(branch_totals, key=branch_totals.get)
-                most_visit_count = branch_totals[most_visited_branch_id]
-                
-                # Şube bilgilerini al
-                branch = Branch.query.get(most_visited_branch_id)
+            row = most_visited_branch_total(user.id)
+            if row:
+                branch = db.session.get(Branch, row.branch_id)
                 if branch:
                     most_visited_branch = {
                         'id': branch.id,
                         'name': branch.name,
                         'address': branch.address,
                         'phone': branch.phone,
-                        'visit_count': most_visit_count,
+                        'visit_count': row.scans,
                         'working_hours': branch.working_hours
                     }
                     
@@ -5785,6 +8195,7 @@ def api_dashboard():
         # En sevilen ürün bilgisi (gerçek satın alma geçmişinden)
         most_favorite_product = None
         try:
+            from sqlalchemy import func
             # Debug: ProductRedemption tablosundaki veri sayısını kontrol et
             total_redemptions = ProductRedemption.query.filter_by(user_id=user_id).count()
             confirmed_redemptions = ProductRedemption.query.filter_by(user_id=user_id, is_confirmed=True).count()
@@ -5959,57 +8370,52 @@ def api_resend_verification():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/redeem', methods=['GET', 'POST'])
+@api_auth_required(allow_legacy_user_id=False, optional=True)
+@idempotent
 def api_redeem():
     try:
         if request.method == 'GET':
             # Get user points
-            user_id = request.args.get('user_id')
+            user_id = g.api_user_id
             user_points = 0
             if user_id:
-                user = User.query.get(user_id)
-                if user:
-                    user_points = user.points
-            
-            # Get available products for redemption
-            products = Product.query.filter_by(is_active=True).all()
+                user_points = db.session.query(User.points).filter_by(id=user_id).scalar() or 0
             
-            # Get categories
-            categories = Category.query.filter_by(is_active=True).all()
-            categories_data = []
-            for category in categories:
-                categories_data.append({
-                    'id': category.id,
-                    'name': category.name,
-                    'description': category.description
-                })
+            # Catalog snapshot: rebuilt only when the catalog version changes
+            catalog = get_catalog_snapshot()
+            # Ratings change often, so they are read per request (one primary-key lookup)
+            ratings = product_rating_summaries([product.id for product in catalog.products])
             
-            products_data = []
-            for product in products:
-                # Check if image file actually exists before creating URL
-                image_url = None
-                if product.image_filename:
-                    import os
-                    image_path = os.path.join('static', 'uploads', product.image_filename)
-                    if os.path.exists(image_path):
-                        image_url = f"{request.host_url}static/uploads/{product.image_filename}"
+            # ETag covers catalog version, ratings, user points and host (image URLs); unchanged -> 304
+            rating_key = ','.join(f"{pid}:{r['histogram']}" for pid, r in sorted(ratings.items()))
+            etag = hashlib.sha1(f"{catalog.version}:{rating_key}:{user_points}:{request.host_url}".encode('utf-8')).hexdigest()[:20]
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+            else:
+                products_data = []
+                for product in catalog.products:
+                    products_data.append({
+                        'id': product.id,
+                        'name': product.name,
+                        'description': product.description,
+                        'points': product.points_required,  # Mobile app expects 'points'
+                        'category_id': product.category_id,
+                        'category_name': product.category_name or 'Diğer',
+                        # Will be None if file doesn't exist
+                        'image_url': f"{request.host_url}static/uploads/{product.image_filename}" if product.has_image_file else None,
+                        'image_filename': product.image_filename,
+                        'rating': ratings.get(product.id) or {'average': None, 'count': 0, 'histogram': [0, 0, 0, 0, 0]}
+                    })
                 
-                products_data.append({
-                    'id': product.id,
-                    'name': product.name,
-                    'description': product.description,
-                    'points': product.points_required,  # Mobile app expects 'points'
-                    'category_id': product.category_id,
-                    'category_name': product.category_ref.name if product.category_ref else 'Diğer',
-                    'image_url': image_url,  # Will be None if file doesn't exist
-                    'image_filename': product.image_filename
+                response = jsonify({
+                    'success': True,
+                    'products': products_data,
+                    'categories': list(catalog.categories),
+                    'user_points': user_points
                 })
-            
-            return jsonify({
-                'success': True,
-                'products': products_data,
-                'categories': categories_data,
-                'user_points': user_points
-            })
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
             
         elif request.method == 'POST':
             # Redeem a product
@@ -6017,10 +8423,12 @@ def api_redeem():
             if not data:
                 return jsonify({'success': False, 'error': 'No data provided'}), 400
                 
-            user_id = data.get('user_id')
+            user_id = g.api_user_id
             product_id = data.get('product_id')
             
-            if not user_id or not product_id:
+            if not user_id:
+                return jsonify({'success': False, 'error': 'Token gerekli'}), 401
+            if not product_id:
                 return jsonify({'success': False, 'error': 'User ID and Product ID required'}), 400
             
             user = User.query.get(user_id)
@@ -6046,8 +8454,10 @@ def api_redeem():
                 confirmation_code=confirmation_code
             )
             
-            # Deduct points from user
-            user.points -= product.points_required
+            # Deduct points from user (conditional UPDATE + ledger entry)
+            if not debit_points(user.id, product.points_required, 'redeem', ref=f'redemption:{confirmation_code}'):
+                db.session.rollback()
+                return jsonify({'success': False, 'error': 'Insufficient points'}), 400
             
             # Create transaction record
             transaction = Transaction(
@@ -6060,6 +8470,7 @@ def api_redeem():
             
             db.session.add(redemption)
             db.session.add(transaction)
+            add_user_activity(user.id, redemptions=1, points_spent=product.points_required)
             db.session.commit()
             
             return jsonify({
@@ -6073,12 +8484,13 @@ def api_redeem():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/generate-qr', methods=['POST'])
+@api_auth_required(allow_legacy_user_id=False)
 def api_generate_qr():
     try:
         data = request.get_json() or {}
         
         # Get user_id from request data or from query params
-        user_id = data.get('user_id') or request.args.get('user_id')
+        user_id = g.api_user_id
         
         # If no user_id provided, try to get from authorization header
         if not user_id:
@@ -6095,23 +8507,10 @@ def api_generate_qr():
             if not user:
                 return jsonify({'success': False, 'error': 'User not found'}), 404
             
-            # Generate simple QR code for user identification
-            qr_code = f"REEVUSER{user_id}{secrets.token_urlsafe(8).replace('_', '').replace('-', '')}"
-            
-            # Set expiry time (5 minutes from now)
-            expires_at = get_turkey_time() + timedelta(minutes=5)
-            
-            # Save QR code to database (sadece mevcut alanları kullan)
-            customer_qr = CustomerQRCode(
-                customer_id=user_id,
-                code=qr_code,
-                points_earned=1
-            )
-            
-            db.session.add(customer_qr)
-            db.session.commit()
-            
-            print(f"QR code saved to database: {qr_code} for user {user_id}")
+            # İmzalı üye kodu (veritabanına yazılmaz; yalnızca okutma kaydedilir)
+            step = member_qr_step()
+            qr_code = make_member_qr(user_id, step=step)
+            expires_at = member_qr_expires_at(step)
             
             return jsonify({
                 'success': True,
@@ -6188,9 +8587,10 @@ def api_generate_qr():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/user-qr-codes', methods=['GET'])
+@api_auth_required
 def api_user_qr_codes():
     try:
-        user_id = request.args.get('user_id')
+        user_id = g.api_user_id
         if not user_id:
             return jsonify({'success': False, 'error': 'User ID required'}), 400
         
@@ -6225,6 +8625,7 @@ def api_user_qr_codes():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/scan-qr', methods=['POST'])
+@branch_api_required
 def api_scan_qr():
     try:
         data = request.get_json()
@@ -6232,7 +8633,7 @@ def api_scan_qr():
             return jsonify({'success': False, 'error': 'No data provided'}), 400
             
         qr_code = data.get('qr_code')
-        branch_id = data.get('branch_id')
+        branch_id = g.api_branch_id
         
         if not qr_code:
             return jsonify({'success': False, 'error': 'QR code required'}), 400
@@ -6251,10 +8652,10 @@ def api_scan_qr():
             else:
                 return jsonify({'success': False, 'error': 'QR code cannot be used at this branch'}), 400
         
-        # Mark as used
-        usage.is_used = True
-        usage.used_at = get_turkey_time()
-        usage.used_by_branch_id = branch_id
+        # Mark as used (atomic - concurrent scans cannot both succeed)
+        if not claim_campaign_usage(usage.id, branch_id=branch_id, used_at=get_turkey_time()):
+            db.session.rollback()
+            return jsonify({'success': False, 'error': 'QR code already used'}), 400
         
         db.session.commit()
         
@@ -6270,10 +8671,11 @@ def api_scan_qr():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/profile', methods=['GET', 'PUT'])
+@api_auth_required(allow_legacy_user_id=False)
 def api_profile():
     try:
         if request.method == 'GET':
-            user_id = request.args.get('user_id')
+            user_id = g.api_user_id
             if not user_id:
                 return jsonify({'success': False, 'error': 'User ID required'}), 400
                 
@@ -6299,7 +8701,7 @@ def api_profile():
             if not data:
                 return jsonify({'success': False, 'error': 'No data provided'}), 400
                 
-            user_id = data.get('user_id')
+            user_id = g.api_user_id
             if not user_id:
                 return jsonify({'success': False, 'error': 'User ID required'}), 400
             
@@ -6338,13 +8740,15 @@ def api_profile():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/redeem-product', methods=['POST'])
+@api_auth_required(allow_legacy_user_id=False)
+@idempotent
 def api_redeem_product():
     try:
         data = request.get_json()
         if not data:
             return jsonify({'success': False, 'error': 'No data provided'}), 400
             
-        user_id = data.get('user_id')
+        user_id = g.api_user_id
         product_id = data.get('product_id')
         
         if not user_id or not product_id:
@@ -6362,8 +8766,15 @@ def api_redeem_product():
         if user.points < product.points_required:
             return jsonify({'success': False, 'error': 'Insufficient points'}), 400
         
-        # Deduct points from user
-        user.points -= product.points_required
+        # Generate 6-digit confirmation code
+        import random
+        import string
+        confirmation_code = ''.join(random.choices(string.digits, k=6))
+        
+        # Deduct points from user (conditional UPDATE + ledger entry)
+        if not debit_points(user.id, product.points_required, 'redeem', ref=f'redemption:{confirmation_code}'):
+            db.session.rollback()
+            return jsonify({'success': False, 'error': 'Insufficient points'}), 400
         
         # Create transaction record
         transaction = Transaction(
@@ -6375,11 +8786,6 @@ def api_redeem_product():
             timestamp=get_turkey_time()
         )
         
-        # Generate 6-digit confirmation code
-        import random
-        import string
-        confirmation_code = ''.join(random.choices(string.digits, k=6))
-        
         # Generate QR code for confirmation
         import qrcode
         from io import BytesIO
@@ -6406,6 +8812,7 @@ def api_redeem_product():
         
         db.session.add(transaction)
         db.session.add(redemption)
+        add_user_activity(user.id, redemptions=1, points_spent=product.points_required)
         db.session.commit()
         
         return jsonify({
@@ -6421,9 +8828,10 @@ def api_redeem_product():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/messages', methods=['GET'])
+@api_auth_required
 def api_messages():
     try:
-        user_id = request.args.get('user_id')
+        user_id = g.api_user_id
         print(f"Messages request for user_id: {user_id}")
         
         if not user_id:
@@ -6555,7 +8963,8 @@ def api_reset_password():
         reset_request.is_used = True
         reset_request.used_at = get_turkey_time()
         
-        db.session.commit()
+        # Eski mobil oturumları kapat
+        revoke_api_token(user)
         
         return jsonify({
             'success': True,
@@ -6567,10 +8976,11 @@ def api_reset_password():
 
 # Product Request API (creates unconfirmed redemption)
 @app.route('/api/request-product', methods=['POST'])
+@api_auth_required(allow_legacy_user_id=False)
 def api_request_product():
     try:
         data = request.get_json()
-        user_id = data.get('user_id')
+        user_id = g.api_user_id
         product_id = data.get('product_id')
         
         if not user_id or not product_id:
@@ -6609,6 +9019,7 @@ def api_request_product():
         )
         
         db.session.add(redemption)
+        add_user_activity(user_id, redemptions=1, points_spent=product.points_required)
         db.session.commit()
         
         response_data = {
@@ -6628,9 +9039,10 @@ def api_request_product():
 
 # Pending Products API
 @app.route('/api/pending-products', methods=['GET'])
+@api_auth_required
 def api_pending_products():
     try:
-        user_id = request.args.get('user_id')
+        user_id = g.api_user_id
         
         if not user_id:
             return jsonify({'success': False, 'message': 'User ID gerekli'}), 400
@@ -6673,10 +9085,11 @@ def api_pending_products():
 
 # Approve Product API
 @app.route('/api/approve-product', methods=['POST'])
+@api_auth_required(allow_legacy_user_id=False)
 def api_approve_product():
     try:
         data = request.get_json()
-        user_id = data.get('user_id')
+        user_id = g.api_user_id
         product_id = data.get('product_id')
         
         if not user_id or not product_id:
@@ -6699,14 +9112,16 @@ def api_approve_product():
         if not user or not product:
             return jsonify({'success': False, 'message': 'Kullanıcı veya ürün bulunamadı'}), 404
         
-        # Yeterli puan kontrolü (onay anında tekrar kontrol)
-        if user.points < redemption.points_used:
-            return jsonify({'success': False, 'message': 'Yetersiz puan'}), 400
+        # Önce talebi sahiplen: eşzamanlı ikinci onay burada durur ve puan iki kez düşülmez
+        if not claim_redemption_confirmation(redemption.id):
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'Bekleyen talep bulunamadı'}), 404
         
-        # Puanları düş ve talebi onayla
-        user.points -= redemption.points_used
-        redemption.is_confirmed = True
-        redemption.confirmed_at = get_turkey_time()
+        # Puanları koşullu olarak düş (onay anında tekrar kontrol); yetersizse onay da geri alınır
+        if not debit_points(user.id, redemption.points_used, 'redeem_confirm', ref=f'redemption:{redemption.confirmation_code}'):
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'Yetersiz puan'}), 400
+        add_user_activity(user.id, confirmed_redemptions=1)
         
         # Transaction kaydı oluştur
         transaction = Transaction(
@@ -6734,11 +9149,13 @@ def api_approve_product():
 
 # Branch Panel - QR Code ile ürün onaylama
 @app.route('/api/branch/approve-by-qr', methods=['POST'])
+@branch_api_required
+@idempotent
 def api_branch_approve_by_qr():
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         qr_code = data.get('qr_code')
-        branch_id = data.get('branch_id')  # Şube ID'si
+        branch_id = g.api_branch_id  # Şube oturumundan
         
         if not qr_code:
             return jsonify({'success': False, 'message': 'QR kod gerekli'}), 400
@@ -6759,15 +9176,16 @@ def api_branch_approve_by_qr():
         if not user or not product:
             return jsonify({'success': False, 'message': 'Kullanıcı veya ürün bulunamadı'}), 404
         
-        # Yeterli puan kontrolü (onay anında tekrar kontrol)
-        if user.points < redemption.points_used:
-            return jsonify({'success': False, 'message': 'Kullanıcının yetersiz puanı var'}), 400
+        # Önce talebi sahiplen: eşzamanlı ikinci onay burada durur ve puan iki kez düşülmez
+        if not claim_redemption_confirmation(redemption.id, branch_id=branch_id):
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'Geçersiz QR kod veya zaten onaylanmış'}), 404
         
-        # Puanları düş ve talebi onayla
-        user.points -= redemption.points_used
-        redemption.is_confirmed = True
-        redemption.confirmed_at = get_turkey_time()
-        redemption.confirmed_by_branch_id = branch_id
+        # Puanları koşullu olarak düş (onay anında tekrar kontrol); yetersizse onay da geri alınır
+        if not debit_points(user.id, redemption.points_used, 'redeem_confirm', branch_id=branch_id, ref=f'redemption:{redemption.confirmation_code}'):
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'Kullanıcının yetersiz puanı var'}), 400
+        add_user_activity(user.id, confirmed_redemptions=1)
         
         # Transaction kaydı oluştur
         transaction = Transaction(
@@ -6797,10 +9215,11 @@ def api_branch_approve_by_qr():
 
 # Branch Panel - Bekleyen talepleri listele
 @app.route('/api/branch/pending-redemptions', methods=['GET'])
+@branch_api_required
 def api_branch_pending_redemptions():
     try:
         # Tüm bekleyen talepleri getir
-        pending_redemptions = db.session.query(ProductRedemption, Product, User).join(
+        pending_redemptions = db.session.query(ProductRedemption, Product, User).options(undefer(User.points)).join(
             Product, ProductRedemption.product_id == Product.id
         ).join(
             User, ProductRedemption.user_id == User.id
@@ -6874,8 +9293,26 @@ def api_branches():
     except Exception as e:
         return jsonify({'success': False, 'message': f'Hata: {str(e)}'}), 500
 
+# Üye QR anahtarı: uygulama kodları bu anahtarla cihazda, sunucuya gitmeden üretir
+@app.route('/api/member-qr-key', methods=['GET'])
+@api_auth_required(allow_legacy_user_id=False)
+def api_member_qr_key():
+    user_id = g.api_user_id
+    return jsonify({
+        'success': True,
+        'user_id': user_id,
+        'key': base64.urlsafe_b64encode(member_qr_key(user_id)).decode('ascii'),
+        'prefix': MEMBER_QR_PREFIX,
+        'step_seconds': app.config['MEMBER_QR_STEP_SECONDS'],
+        'valid_steps': app.config['MEMBER_QR_VALID_STEPS'],
+        # kod = prefix.user_id.step.nonce.base64url(HMAC-SHA256(key, "user_id.step.nonce")[:12])
+        # step = floor(unix zamanı / step_seconds), nonce: en fazla 32 karakter base64url
+        'signature_bytes': 12
+    })
+
 # Save Customer QR API - QR kodlarını customerQR tablosuna kaydet
 @app.route('/api/save-customer-qr', methods=['POST'])
+@api_auth_required(allow_legacy_user_id=False)
 def api_save_customer_qr():
     try:
         data = request.get_json()
@@ -6883,7 +9320,7 @@ def api_save_customer_qr():
         if not data:
             return jsonify({'success': False, 'error': 'Veri bulunamadı'}), 400
         
-        user_id = data.get('user_id')
+        user_id = g.api_user_id
         qr_code = data.get('qr_code')
         qr_type = data.get('qr_type')  # 'dashboard', 'campaign', 'product_request'
         campaign_id = data.get('campaign_id')
@@ -6897,6 +9334,18 @@ def api_save_customer_qr():
         if not user:
             return jsonify({'success': False, 'error': 'Kullanıcı bulunamadı'}), 404
         
+        # İmzalı üye kodları kaydedilmez; okutulunca imzadan doğrulanır
+        if is_member_qr(qr_code):
+            parsed = verify_member_qr(qr_code)
+            if parsed is None or parsed[0] != user.id:
+                return jsonify({'success': False, 'error': 'Geçersiz QR kod'}), 400
+            return jsonify({
+                'success': True,
+                'message': 'İmzalı QR kod, kayıt gerekmiyor',
+                'qr_id': None,
+                'qr_type': qr_type
+            })
+        
         # Aynı QR kod zaten mevcut mu kontrol et
         existing_qr = CustomerQRCode.query.filter_by(code=qr_code).first()
         if existing_qr:
@@ -6930,11 +9379,169 @@ def api_save_customer_qr():
         return jsonify({'success': False, 'error': f'Hata: {str(e)}'}), 500
 
 # Transaction History API - İşlem geçmişini product_redemption ve customerQR tablolarından al
+def _feed_branch(select, timestamp, sort_key, limit, before=None):
+    """UNION ALL akışının bir kaynağı: (zaman, sıra anahtarı) ile azalan sırada en fazla limit satır
+
+    before=(zaman, anahtar) verilirse yalnızca bu imleçten eski satırlar alınır (keyset).
+    """
+    if before is not None:
+        before_at, before_key = before
+        select = select.where(db.or_(
+            timestamp < before_at,
+            db.and_(timestamp == before_at, sort_key < before_key)
+        ))
+    return select.order_by(timestamp.desc(), sort_key.desc()).limit(limit).subquery()
+
+def parse_history_cursor(value):
+    """'<ISO zaman>,<sıra anahtarı>' biçimindeki sayfa imlecini (datetime, int) olarak çözer"""
+    timestamp, _, key = (value or '').rpartition(',')
+    parsed = datetime.fromisoformat(timestamp)
+    return parsed.replace(tzinfo=None), int(key)
+
+def transaction_history_page(user_id, limit, before=None):
+    """Kullanıcının ürün talepleri ve QR okutmaları, tek UNION ALL sorgusu ile (en yeni önce)
+
+    Sıralama (zaman, sıra anahtarı) üzerindendir; sıra anahtarı kaynaklar arasında
+    benzersizdir (QR: id*2, ürün talebi: id*2+1). before verilirse bu imleçten
+    eski satırlar döner (keyset). Her kaynak kendi içinde filtrelenip limit+1
+    satırla sınırlanır; birleşik sonuç veritabanında sıralanıp kesilir.
+    """
+    qr_table = CustomerQR.__table__
+    redemptions = ProductRedemption.__table__
+    products = Product.__table__
+    
+    # QR okutmaları: (customer_id, used_at) index'i üzerinden
+    qr_at = qr_table.c.used_at
+    qr_key = qr_table.c.id * 2
+    scans = _feed_branch(
+        db.select(
+            db.literal('qr').label('kind'),
+            qr_table.c.id.label('ref_id'),
+            qr_at.label('created_at'),
+            qr_key.label('sort_key'),
+            db.func.coalesce(qr_table.c.points_earned, 1).label('points'),
+            db.null().label('title'),
+            db.literal(True).label('is_confirmed')
+        ).where(qr_table.c.customer_id == user_id, qr_at.isnot(None)),
+        qr_at, qr_key, limit + 1, before
+    )
+    
+    # Ürün talepleri: onaylandıysa onay zamanı, değilse talep zamanı
+    redemption_at = db.case(
+        (db.and_(redemptions.c.is_confirmed == True, redemptions.c.confirmed_at.isnot(None)), redemptions.c.confirmed_at),
+        else_=redemptions.c.redeemed_at
+    )
+    redemption_key = redemptions.c.id * 2 + 1
+    claims = _feed_branch(
+        db.select(
+            db.literal('redemption').label('kind'),
+            redemptions.c.id.label('ref_id'),
+            redemption_at.label('created_at'),
+            redemption_key.label('sort_key'),
+            db.case((redemptions.c.is_confirmed == True, -redemptions.c.points_used), else_=0).label('points'),
+            products.c.name.label('title'),
+            redemptions.c.is_confirmed.label('is_confirmed')
+        )
+        .select_from(redemptions.join(products, products.c.id == redemptions.c.product_id))
+        .where(redemptions.c.user_id == user_id),
+        redemption_at, redemption_key, limit + 1, before
+    )
+    
+    feed = db.union_all(db.select(scans), db.select(claims)).subquery()
+    return db.session.execute(
+        db.select(feed)
+        .order_by(feed.c.created_at.desc(), feed.c.sort_key.desc())
+        .limit(limit + 1)
+    ).all()
+
+def activity_timeline_page(user_id, page, per_page, start=None, end=None):
+    """Geçmiş sayfasının birleşik zaman çizelgesi: ürün talepleri, QR okutmaları ve kampanya kullanımları
+
+    Tek UNION ALL sorgusu veritabanında sıralanır ve sayfalanır; yalnızca sayfadaki
+    kayıtlar ilişkileriyle birlikte yüklenir. Sıra anahtarı kaynaklar arasında
+    benzersizdir (talep: id*3, okutma: id*3+1, kampanya: id*3+2).
+    ({'type', 'data', 'date'} listesi, sonraki sayfa var mı) döndürür.
+    """
+    redemptions = ProductRedemption.__table__
+    qr_table = CustomerQR.__table__
+    usages = CampaignUsage.__table__
+    window = page * per_page + 1
+    
+    def in_range(column):
+        conditions = [column.isnot(None)]
+        if start is not None:
+            conditions.append(column >= start)
+        if end is not None:
+            conditions.append(column <= end)
+        return conditions
+    
+    branches = []
+    for kind, table, owner, at, offset, extra in (
+        ('purchase', redemptions, redemptions.c.user_id, redemptions.c.redeemed_at, 0, ()),
+        ('point', qr_table, qr_table.c.customer_id, qr_table.c.used_at, 1, (qr_table.c.is_used == True,)),
+        ('campaign', usages, usages.c.customer_id, usages.c.used_at, 2, (usages.c.is_used == True,)),
+    ):
+        sort_key = table.c.id * 3 + offset
+        branches.append(db.select(_feed_branch(
+            db.select(
+                db.literal(kind).label('kind'),
+                table.c.id.label('ref_id'),
+                at.label('created_at'),
+                sort_key.label('sort_key')
+            ).where(owner == user_id, *extra, *in_range(at)),
+            at, sort_key, window
+        )))
+    
+    feed = db.union_all(*branches).subquery()
+    rows = db.session.execute(
+        db.select(feed)
+        .order_by(feed.c.created_at.desc(), feed.c.sort_key.desc())
+        .offset((page - 1) * per_page)
+        .limit(per_page + 1)
+    ).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    
+    # Sayfadaki kayıtları türüne göre tek sorguda yükle
+    ids = {'purchase': [], 'point': [], 'campaign': []}
+    for row in rows:
+        ids[row.kind].append(row.ref_id)
+    loaded = {
+        'purchase': {r.id: r for r in ProductRedemption.query.options(
+            selectinload(ProductRedemption.product), selectinload(ProductRedemption.confirmed_by_branch)
+        ).filter(ProductRedemption.id.in_(ids['purchase']))} if ids['purchase'] else {},
+        'point': {q.id: q for q in CustomerQR.query.filter(CustomerQR.id.in_(ids['point']))} if ids['point'] else {},
+        'campaign': {u.id: u for u in CampaignUsage.query.options(
+            selectinload(CampaignUsage.campaign), selectinload(CampaignUsage.used_by_branch)
+        ).filter(CampaignUsage.id.in_(ids['campaign']))} if ids['campaign'] else {},
+    }
+    
+    # Okutan şubeler tek sorguda (customer_qr iki modele bağlı olduğundan
+    # CustomerQR.scanning_branch ilişkisi yüklenemiyor; şube ayrıca eklenir)
+    branch_ids = {q.used_by_branch_id for q in loaded['point'].values() if q.used_by_branch_id}
+    branches = {branch.id: branch for branch in Branch.query.filter(Branch.id.in_(branch_ids))} if branch_ids else {}
+    
+    timeline = []
+    for row in rows:
+        data = loaded[row.kind].get(row.ref_id)
+        if data is None:
+            continue
+        if row.kind == 'campaign':
+            data = campaign_usage_view(data)
+        elif row.kind == 'point':
+            data = {'code': data.code, 'used_at': data.used_at, 'scanning_branch': branches.get(data.used_by_branch_id)}
+        timeline.append({'type': row.kind, 'data': data, 'date': row.created_at})
+    return timeline, has_next
+
 @app.route('/api/transaction-history', methods=['GET'])
+@api_auth_required
 def api_transaction_history():
+    """Puan hareketleri (sonsuz kaydırma)
+
+    ?limit=50 (en fazla 100) ve önceki yanıttaki next_before değeri ile ?before=<zaman,anahtar>.
+    """
     try:
-        user_id = request.args.get('user_id')
-        print(f"Transaction history request for user_id: {user_id}")
+        user_id = g.api_user_id
         
         if not user_id:
             return jsonify({'success': False, 'error': 'Kullanıcı ID gerekli'}), 400
@@ -6942,90 +9549,48 @@ def api_transaction_history():
         # Kullanıcıyı kontrol et
         user = User.query.get(user_id)
         if not user:
-            print(f"User not found: {user_id}")
             return jsonify({'success': False, 'error': 'Kullanıcı bulunamadı'}), 404
         
-        print(f"User found: {user.name} ({user.email})")
-        transactions = []
-        
-        # 1. ProductRedemption tablosundan ürün talep/onay işlemlerini al
-        redemptions = db.session.query(ProductRedemption, Product).join(
-            Product, ProductRedemption.product_id == Product.id
-        ).filter(ProductRedemption.user_id == user_id).order_by(
-            ProductRedemption.redeemed_at.desc()
-        ).all()
-        
-        print(f"ProductRedemption kayıt sayısı: {len(redemptions)}")
-        
-        for redemption, product in redemptions:
-            transaction_type = "Ürün Onayı" if redemption.is_confirmed else "Ürün Talebi"
-            points = -redemption.points_used if redemption.is_confirmed else 0
-            description = f"{product.name}"
-            if redemption.is_confirmed:
-                description += " (Onaylandı)"
-            else:
-                description += " (Beklemede)"
-            
-            # Tarih olarak confirmed_at (onaylandıysa) veya redeemed_at kullan
-            transaction_date = redemption.confirmed_at if redemption.is_confirmed and redemption.confirmed_at else redemption.redeemed_at
-            
-            transactions.append({
-                'id': f'redemption_{redemption.id}',
-                'transaction_type': transaction_type,
-                'description': description,
-                'points': points,
-                'created_at': transaction_date.isoformat() if transaction_date else None,
-                'status': 'confirmed' if redemption.is_confirmed else 'pending'
-            })
-        
-        # 2. CustomerQR tablosundan QR kod okutma işlemlerini al
-        qr_codes = CustomerQRCode.query.filter_by(customer_id=user_id).order_by(
-            CustomerQRCode.created_at.desc()
-        ).all()
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 100)
+        before = None
+        if request.args.get('before'):
+            try:
+                before = parse_history_cursor(request.args['before'])
+            except ValueError:
+                return jsonify({'success': False, 'error': 'Geçersiz sayfa imleci'}), 400
         
-        print(f"CustomerQRCode kayıt sayısı: {len(qr_codes)}")
+        rows = transaction_history_page(user_id, limit, before)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
-        for qr_code in qr_codes:
-            if qr_code.is_used:
+        transactions = []
+        for row in rows:
+            if row.kind == 'qr':
                 transactions.append({
-                    'id': f'qr_{qr_code.id}',
+                    'id': f'qr_{row.ref_id}',
                     'transaction_type': 'QR Kod Okutma',
                     'description': 'QR kod okutularak puan kazanıldı',
-                    'points': qr_code.points_earned or 1,
-                    'created_at': qr_code.used_at.isoformat() if qr_code.used_at else qr_code.created_at.isoformat(),
+                    'points': row.points,
+                    'created_at': row.created_at.isoformat() if row.created_at else None,
                     'status': 'confirmed'
                 })
-        
-        # 3. CustomerQR (eski tablo) tablosundan da QR kod işlemlerini al
-        old_qr_codes = CustomerQR.query.filter_by(customer_id=user_id).order_by(
-            CustomerQR.created_at.desc()
-        ).all()
-        
-        print(f"CustomerQR (eski) kayıt sayısı: {len(old_qr_codes)}")
-        
-        for qr_code in old_qr_codes:
-            if qr_code.used_at:  # Kullanılmış QR kodlar
+            else:
                 transactions.append({
-                    'id': f'old_qr_{qr_code.id}',
-                    'transaction_type': 'QR Kod Okutma',
-                    'description': 'QR kod okutularak puan kazanıldı',
-                    'points': 1,  # Varsayılan puan
-                    'created_at': qr_code.used_at.isoformat(),
-                    'status': 'confirmed'
+                    'id': f'redemption_{row.ref_id}',
+                    'transaction_type': 'Ürün Onayı' if row.is_confirmed else 'Ürün Talebi',
+                    'description': f"{row.title} ({'Onaylandı' if row.is_confirmed else 'Beklemede'})",
+                    'points': row.points,
+                    'created_at': row.created_at.isoformat() if row.created_at else None,
+                    'status': 'confirmed' if row.is_confirmed else 'pending'
                 })
         
-        # Tüm işlemleri tarihe göre sırala (en yeni önce)
-        transactions.sort(key=lambda x: x['created_at'] or '', reverse=True)
-        
-        # Son 50 işlemi al
-        transactions = transactions[:50]
-        
-        print(f"Toplam işlem sayısı: {len(transactions)}")
-        
+        last = rows[-1] if rows else None
         return jsonify({
             'success': True,
             'transactions': transactions,
-            'total_count': len(transactions)
+            'total_count': len(transactions),
+            'has_more': has_more,
+            'next_before': f'{last.created_at.isoformat()},{last.sort_key}' if has_more and last.created_at else None
         })
         
     except Exception as e:
@@ -7036,7 +9601,7 @@ def api_transaction_history():
 def api_splash_image():
     try:
         # Splash resmini al
-        splash_setting = SiteSetting.query.filter_by(key='splash_image').first()
+        splash_setting = get_site_setting('splash_image')
         
         if splash_setting and splash_setting.value:
             splash_url = url_for('static', filename=f'uploads/{splash_setting.value}', _external=True)
@@ -7057,6 +9622,7 @@ def api_splash_image():
 
 # Change Password API - Şifre değiştirme
 @app.route('/api/change-password', methods=['POST'])
+@api_auth_required(allow_legacy_user_id=False)
 def api_change_password():
     try:
         data = request.get_json()
@@ -7064,7 +9630,7 @@ def api_change_password():
         if not data:
             return jsonify({'success': False, 'error': 'Veri bulunamadı'}), 400
         
-        user_id = data.get('user_id')
+        user_id = g.api_user_id
         current_password = data.get('current_password')
         new_password = data.get('new_password')
         
@@ -7087,22 +9653,112 @@ def api_change_password():
         
         # Şifreyi güncelle
         user.set_password(new_password)
+        # Diğer cihazlardaki token'ları geçersiz kıl, bu cihaza yeni token ver
+        revoke_api_token(user, commit=False)
+        token = user.generate_auth_token()
         db.session.commit()
+        forget_api_tokens(user.id)
         
         return jsonify({
             'success': True,
-            'message': 'Şifreniz başarıyla değiştirildi'
+            'message': 'Şifreniz başarıyla değiştirildi',
+            'token': token
         })
         
     except Exception as e:
         print(f"Change password API error: {str(e)}")
         return jsonify({'success': False, 'error': f'Hata: {str(e)}'}), 500
 
+def add_product_rating_total(product_id, rating, previous=None):
+    """Ürün puanlama özetini atomik olarak günceller (commit çağırana aittir)
+    
+    previous verilirse kullanıcının eski puanı özetten çıkarılır (puan güncelleme).
+    """
+    totals = ProductRatingTotal.__table__
+    deltas = {'rating_count': 0 if previous else 1, 'rating_sum': rating - (previous or 0)}
+    for stars in range(1, 6):
+        deltas[f'stars_{stars}'] = (stars == rating) - (stars == previous)
+    stmt = _upsert_statement(totals).values(product_id=product_id, **deltas)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[totals.c.product_id],
+        set_={name: totals.c[name] + stmt.excluded[name] for name in deltas}
+    ))
+
+def rebuild_product_rating_totals():
+    """Ürün puanlama özetlerini ProductRating kayıtlarından yeniden oluşturur (backfill)"""
+    totals = ProductRatingTotal.__table__
+    ratings = ProductRating.__table__
+    db.session.execute(totals.delete())
+    db.session.execute(totals.insert().from_select(
+        ['product_id', 'rating_count', 'rating_sum', *(f'stars_{stars}' for stars in range(1, 6))],
+        db.select(
+            ratings.c.product_id,
+            db.func.count(ratings.c.id),
+            db.func.sum(ratings.c.rating),
+            *(db.func.sum(db.case((ratings.c.rating == stars, 1), else_=0)) for stars in range(1, 6))
+        ).group_by(ratings.c.product_id)
+    ))
+    db.session.commit()
+    return db.session.query(db.func.count()).select_from(totals).scalar()
+
+def product_rating_summaries(product_ids):
+    """{ürün id: {'average', 'count', 'histogram'}} özetlerini tek sorguda döndürür"""
+    if not product_ids:
+        return {}
+    totals = ProductRatingTotal.__table__
+    rows = db.session.execute(
+        db.select(totals).where(totals.c.product_id.in_(list(product_ids)), totals.c.rating_count > 0)
+    ).all()
+    return {
+        row.product_id: {
+            'average': round(row.rating_sum / row.rating_count, 2),
+            'count': row.rating_count,
+            'histogram': [row.stars_1, row.stars_2, row.stars_3, row.stars_4, row.stars_5]
+        } for row in rows
+    }
+
+def save_product_rating(user_id, product_id, rating, comment):
+    """Kullanıcının ürün puanını ekler veya günceller ve ürün özetini aynı transaction içinde düzeltir
+    
+    Güncelleme eski puan üzerinden koşullu UPDATE ile yapılır; eşzamanlı iki istek
+    aynı eski puanı özetten iki kez çıkaramaz. Commit çağırana aittir.
+    """
+    ratings = ProductRating.__table__
+    now = datetime.utcnow()
+    for _attempt in range(3):
+        existing = db.session.execute(
+            db.select(ratings.c.id, ratings.c.rating)
+            .where(ratings.c.user_id == user_id, ratings.c.product_id == product_id)
+        ).first()
+        
+        if existing is None:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(ratings.insert().values(
+                        user_id=user_id, product_id=product_id, rating=rating, comment=comment, created_at=now
+                    ))
+            except IntegrityError:
+                continue  # Aynı anda eklenen puan: güncelleme olarak tekrar dene
+            add_product_rating_total(product_id, rating)
+            return
+        
+        updated = db.session.execute(
+            ratings.update()
+            .where(ratings.c.id == existing.id, ratings.c.rating == existing.rating)
+            .values(rating=rating, comment=comment, updated_at=now)
+        )
+        if updated.rowcount == 1:
+            if existing.rating != rating:
+                add_product_rating_total(product_id, rating, previous=existing.rating)
+            return
+    raise RuntimeError('Puan eşzamanlı olarak güncelleniyor, lütfen tekrar deneyin')
+
 # Purchase History API - Kullanıcının satın alma geçmişi (puanlama için)
 @app.route('/api/purchase-history', methods=['GET'])
+@api_auth_required
 def api_purchase_history():
     try:
-        user_id = request.args.get('user_id')
+        user_id = g.api_user_id
         
         if not user_id:
             return jsonify({'success': False, 'error': 'user_id parametresi gereklidir'}), 400
@@ -7117,13 +9773,18 @@ def api_purchase_history():
             ProductRedemption.is_confirmed == True
         ).order_by(ProductRedemption.created_at.desc()).limit(20).all()
         
+        # Kullanıcının bu sayfadaki ürünlere verdiği puanlar tek sorguda
+        product_ids = {redemption.product_id for redemption, _product, _category in redemptions}
+        ratings = {
+            rating.product_id: rating for rating in ProductRating.query.filter(
+                ProductRating.user_id == user_id,
+                ProductRating.product_id.in_(product_ids)
+            )
+        } if product_ids else {}
+        
         purchases = []
         for redemption, product, category in redemptions:
-            # Kullanıcının bu ürün için verdiği puanı kontrol et
-            rating = ProductRating.query.filter_by(
-                user_id=user_id,
-                product_id=redemption.product_id
-            ).first()
+            rating = ratings.get(redemption.product_id)
             
             purchase_data = {
                 'id': redemption.product_id,
@@ -7150,6 +9811,7 @@ def api_purchase_history():
 
 # Rate Product API - Ürün puanlama
 @app.route('/api/rate-product', methods=['POST'])
+@api_auth_required(allow_legacy_user_id=False)
 def api_rate_product():
     try:
         data = request.get_json()
@@ -7157,7 +9819,7 @@ def api_rate_product():
         if not data:
             return jsonify({'success': False, 'error': 'Veri bulunamadı'}), 400
         
-        user_id = data.get('user_id')
+        user_id = g.api_user_id
         product_id = data.get('product_id')
         rating = data.get('rating')
         comment = data.get('comment', '')
@@ -7193,28 +9855,8 @@ def api_rate_product():
         if not redemption:
             return jsonify({'success': False, 'error': 'Bu ürünü satın almadığınız için puanlayamazsınız'}), 400
         
-        # Mevcut puanı kontrol et
-        existing_rating = ProductRating.query.filter_by(
-            user_id=user_id,
-            product_id=product_id
-        ).first()
-        
-        if existing_rating:
-            # Mevcut puanı güncelle
-            existing_rating.rating = rating
-            existing_rating.comment = comment
-            existing_rating.updated_at = datetime.utcnow()
-        else:
-            # Yeni puan oluştur
-            new_rating = ProductRating(
-                user_id=user_id,
-                product_id=product_id,
-                rating=rating,
-                comment=comment,
-                created_at=datetime.utcnow()
-            )
-            db.session.add(new_rating)
-        
+        # Puanı ekle/güncelle ve ürün puanlama özetini aynı transaction içinde düzelt
+        save_product_rating(user_id, product.id, rating, comment)
         db.session.commit()
         
         return jsonify({
@@ -7232,6 +9874,11 @@ if __name__ == '__main__':
     with app.app_context():
         db.create_all()
     
+    # Yeniden başlatmadan önce kuyrukta kalan push kayıtları beklemeden gönderilsin
+    wake_push_dispatcher()
+    # Yarıda kalmış veya hata almış kampanya dağıtımlarına devam et
+    start_campaign_fanout_worker()
+    
     debug_mode = os.environ.get('FLASK_ENV') != 'production'
     print("HTTP modu aktif - Port 1519")
     app.run(debug=debug_mode, host='0.0.0.0', port=1519)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kampanya kullanım sayaç tablolarını (campaign_usage_total, campaign_customer_usage)
+oluşturur ve mevcut CampaignUsage geçmişinden yeniden doldurur.
+
+Tablolar her çalıştırmada baştan hesaplanır; script tekrar çalıştırılabilir.
+Yeni kullanımlar claim_campaign_usage() tarafından sayaçlara anında işlenir.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, CampaignUsageTotal, CampaignCustomerUsage, rebuild_campaign_usage_counters
+
+def backfill_campaign_usage_counters():
+    """Sayaç tablolarını oluştur ve geçmiş veriden doldur"""
+    
+    with app.app_context():
+        try:
+            CampaignUsageTotal.__table__.create(bind=db.engine, checkfirst=True)
+            CampaignCustomerUsage.__table__.create(bind=db.engine, checkfirst=True)
+            print("✅ Kampanya kullanım sayaç tabloları hazır")
+            
+            total_rows, customer_rows = rebuild_campaign_usage_counters()
+            print(f"✅ Backfill tamamlandı: {total_rows} kampanya sayacı, {customer_rows} müşteri sayacı")
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Backfill hatası: {e}")
+            raise
+
+if __name__ == '__main__':
+    backfill_campaign_usage_counters()
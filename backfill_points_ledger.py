@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Puan defteri tablolarını (point_ledger, point_snapshot) oluşturur ve user.points
+kolonundaki eski bakiyeleri (User.legacy_points) açılış satırı olarak deftere yazar.
+
+Bu script yeni sürüm yayına alındıktan SONRA çalıştırılmalıdır: eski sürüm
+user.points kolonunu güncellemeye devam eder, yeni sürüm ise bu kolona hiç yazmaz.
+Yayından sonra kolon sabit kaldığı için açılış satırı kesin bakiyeyi taşır. Arada
+kalan sürede eski bakiyeler okunmaz ama kaybolmaz; kullanıcının defterde başka
+satırları olsa bile açılış satırı eklenir. Yalnızca reason='opening' satırı olmayan
+kullanıcılar işlenir; script tekrar çalıştırılabilir.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, PointLedger, PointSnapshot, open_point_ledger, refresh_point_snapshots
+
+def backfill_points_ledger():
+    """Defter tablolarını oluştur, açılış bakiyelerini yaz ve ilk özetleri al"""
+    
+    with app.app_context():
+        try:
+            PointLedger.__table__.create(bind=db.engine, checkfirst=True)
+            PointSnapshot.__table__.create(bind=db.engine, checkfirst=True)
+            print("✅ Puan defteri tabloları hazır")
+            
+            opened = open_point_ledger()
+            snapshots = refresh_point_snapshots(min_tail=1, settle_seconds=0)
+            print(f"✅ Backfill tamamlandı: {opened} açılış satırı, {snapshots} bakiye özeti")
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Backfill hatası: {e}")
+            raise
+
+if __name__ == '__main__':
+    backfill_points_ledger()
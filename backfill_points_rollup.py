@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Günlük puan özet tablolarını (customer_points_daily, customer_branch_total)
+oluşturur ve mevcut CustomerQR geçmişinden yeniden doldurur.
+
+Tablolar her çalıştırmada baştan hesaplanır; script tekrar çalıştırılabilir.
+Yeni okutmalar claim_customer_qr() tarafından özetlere anında işlenir.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, CustomerPointsDaily, CustomerBranchTotal, rebuild_points_rollups
+
+def backfill_points_rollup():
+    """Özet tablolarını oluştur ve geçmiş veriden doldur"""
+    
+    with app.app_context():
+        try:
+            CustomerPointsDaily.__table__.create(bind=db.engine, checkfirst=True)
+            CustomerBranchTotal.__table__.create(bind=db.engine, checkfirst=True)
+            print("✅ Puan özet tabloları hazır")
+            
+            daily_rows, branch_rows = rebuild_points_rollups()
+            print(f"✅ Backfill tamamlandı: {daily_rows} günlük özet, {branch_rows} şube özeti")
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Backfill hatası: {e}")
+            raise
+
+if __name__ == '__main__':
+    backfill_points_rollup()
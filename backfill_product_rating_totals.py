@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Ürün puanlama özet tablosunu (product_rating_total) oluşturur ve mevcut
+ProductRating kayıtlarından yeniden doldurur.
+
+Tablo her çalıştırmada baştan hesaplanır; script tekrar çalıştırılabilir.
+Yeni ve güncellenen puanlar api_rate_product tarafından özete anında işlenir.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, ProductRatingTotal, rebuild_product_rating_totals
+
+def backfill_product_rating_totals():
+    """Özet tablosunu oluştur ve geçmiş veriden doldur"""
+    
+    with app.app_context():
+        try:
+            ProductRatingTotal.__table__.create(bind=db.engine, checkfirst=True)
+            print("✅ Ürün puanlama özet tablosu hazır")
+            
+            rows = rebuild_product_rating_totals()
+            print(f"✅ Backfill tamamlandı: {rows} ürün özeti")
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Backfill hatası: {e}")
+            raise
+
+if __name__ == '__main__':
+    backfill_product_rating_totals()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kullanıcı geçmiş sayaçları tablosunu (user_activity_total) oluşturur ve mevcut
+ProductRedemption, CustomerQR ve CampaignUsage geçmişinden yeniden doldurur.
+
+Tablo her çalıştırmada baştan hesaplanır; script tekrar çalıştırılabilir.
+Yeni talep, onay, okutma ve kampanya kullanımları sayaçlara anında işlenir.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, UserActivityTotal, rebuild_user_activity_totals
+
+def backfill_user_activity_totals():
+    """Sayaç tablosunu oluştur ve geçmiş veriden doldur"""
+    
+    with app.app_context():
+        try:
+            UserActivityTotal.__table__.create(bind=db.engine, checkfirst=True)
+            print("✅ Kullanıcı geçmiş sayaç tablosu hazır")
+            
+            rows = rebuild_user_activity_totals()
+            print(f"✅ Backfill tamamlandı: {rows} kullanıcı sayacı")
+            
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Backfill hatası: {e}")
+            raise
+
+if __name__ == '__main__':
+    backfill_user_activity_totals()
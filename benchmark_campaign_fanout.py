@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kampanya dağıtımı (fan-out) için çevrimdışı deneme ve benchmark
+
+Geçici bir veritabanında müşteriler ve push abonelikleri oluşturur, e-postaları
+yerel SMTP sink'e (smtp_sink_server.py) yönlendirir ve bir kampanyanın push ve
+e-posta dağıtım işlerini çalıştırır. Sink belirli sayıda mesajdan sonra bağlantıyı
+koparır; iş 'failed' durumuna düşer ve kaldığı yerden devam ettirilir.
+
+Kontroller: her müşteriye tam bir e-posta, her aktif aboneliğe tam bir kuyruk
+kaydı ve tek SMTP bağlantısı (+ kopma sonrası yeniden bağlantı).
+
+Kullanım:
+    python benchmark_campaign_fanout.py --customers 2000 --chunk-size 500 --fail-after 700
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from smtp_sink_server import start_smtp_sink
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kampanya fan-out benchmark')
+    parser.add_argument('--customers', type=int, default=2000)
+    parser.add_argument('--subscribed-every', type=int, default=3, help='Her N. müşterinin push aboneliği var')
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--per-second', type=float, default=0, help='E-posta hız sınırı (0 = sınırsız)')
+    parser.add_argument('--fail-after', type=int, default=700, help='Sink N mesajdan sonra bağlantıyı koparır (0 = kapalı)')
+    args = parser.parse_args()
+
+    sink = start_smtp_sink(fail_after=args.fail_after)
+
+    # Canlı veritabanı ve posta sunucusu yerine geçici DB ve yerel sink
+    tmp_dir = tempfile.mkdtemp(prefix='reev_fanout_bench_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp_dir, 'fanout.db')}"
+    os.environ['PUSH_DISPATCHER_ENABLED'] = 'False'
+    os.environ['MAIL_SERVER'] = sink.server_address[0]
+    os.environ['MAIL_PORT'] = str(sink.server_address[1])
+    os.environ['MAIL_USE_TLS'] = 'False'
+    os.environ['MAIL_USE_SSL'] = 'False'
+    os.environ['MAIL_USERNAME'] = 'kampanya@reev.test'
+    os.environ['MAIL_PASSWORD'] = ''
+
+    from app import (app, db, User, Campaign, PushSubscription, PushOutbox, CampaignFanout, get_turkey_time,
+                     get_campaign_fanout_job, run_campaign_fanout, resume_campaign_fanouts)
+
+    app.config['CAMPAIGN_FANOUT_CHUNK_SIZE'] = args.chunk_size
+    app.config['CAMPAIGN_EMAIL_PER_SECOND'] = args.per_second
+
+    with app.app_context():
+        db.create_all()
+        users = [
+            User(name=f'Müşteri {i}', email=f'kampanya{i}@reev.test', phone='0', password_hash='x')
+            for i in range(args.customers)
+        ]
+        db.session.add_all(users)
+        db.session.flush()
+        subscriptions = 0
+        for i, user in enumerate(users):
+            if args.subscribed_every and i % args.subscribed_every == 0:
+                db.session.add(PushSubscription(user_id=user.id, endpoint=f'http://127.0.0.1/push/{user.id}',
+                                                p256dh_key='x', auth_key='x'))
+                subscriptions += 1
+        campaign = Campaign(title='Benchmark Kampanyası', description='Deneme ' * 40,
+                            start_date=get_turkey_time(), end_date=get_turkey_time())
+        db.session.add(campaign)
+        db.session.commit()
+        campaign_id = campaign.id
+
+        results = {}
+        for channel in ('push', 'email'):
+            job_id = get_campaign_fanout_job(campaign_id, channel)
+            started = time.perf_counter()
+            try:
+                run_campaign_fanout(job_id)
+            except Exception as e:
+                job = db.session.get(CampaignFanout, job_id)
+                print(f"⚠️ {channel} işi yarıda kaldı ({e}); son alıcı id {job.last_user_id}, devam ediliyor")
+                resume_campaign_fanouts()
+            results[channel] = time.perf_counter() - started
+
+        jobs = {job.channel: job for job in CampaignFanout.query.all()}
+        queued = PushOutbox.query.count()
+
+    unique_recipients = len(set(sink.recipients))
+    duplicates = len(sink.recipients) - unique_recipients
+
+    print(f"📤 Push: {queued} kuyruk kaydı / {results['push']:.2f} sn ({jobs['push'].status})")
+    print(f"✉️ E-posta: {sink.stats['messages']} mesaj / {results['email']:.2f} sn, "
+          f"{sink.stats['messages'] / results['email']:.0f} mesaj/sn ({jobs['email'].status})")
+    print(f"   SMTP bağlantısı: {sink.stats['connections']}, tekrar gönderilen: {duplicates}")
+
+    failures = []
+    if queued != subscriptions or jobs['push'].status != 'done':
+        failures.append(f"push kuyruğu {queued}, beklenen {subscriptions}")
+    if unique_recipients != args.customers or jobs['email'].status != 'done':
+        failures.append(f"e-posta alan müşteri {unique_recipients}, beklenen {args.customers}")
+    if duplicates:
+        failures.append(f"{duplicates} müşteriye birden fazla e-posta gitti")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Her müşteriye tam bir e-posta, her aboneliğe tam bir bildirim")
+
+
+if __name__ == '__main__':
+    main()
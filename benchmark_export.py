@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Rapor export'u (/admin/export_report) için süre ve bellek benchmark'ı
+
+Geçici bir SQLite veritabanına müşteri, QR, ürün alımı ve işlem kayıtları
+(varsayılan 1M işlem) yazar. Sonra XLSX ve CSV/ZIP export'larını ayrı
+süreçlerde çalıştırıp süreyi, çıktı boyutunu ve en yüksek bellek kullanımını
+(peak RSS) ölçer.
+
+Kullanım:
+    python benchmark_export.py --transactions 1000000 --customers 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_rss_mb():
+    # Linux'ta ru_maxrss KB, macOS'ta byte cinsindendir
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def seed(db_url, customers, transactions, batch=50000):
+    """Benchmark verisini toplu INSERT'lerle oluştur"""
+    os.environ['DATABASE_URL'] = db_url
+    from app import app, db, User, Branch, Product, CustomerQR, ProductRedemption, Transaction, open_point_ledger, refresh_point_snapshots
+
+    now = datetime(2025, 1, 1)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(name='Admin', email='admin@reev.test', phone='0', password_hash='x', is_admin=True))
+        db.session.add_all([Branch(name=f'Şube {i}', email=f'sube{i}@reev.test', password_hash='x') for i in range(10)])
+        db.session.add_all([Product(name=f'Ürün {i}', points_required=5) for i in range(20)])
+        db.session.commit()
+
+        db.session.execute(User.__table__.insert(), [
+            {'name': f'Müşteri {i}', 'email': f'musteri{i}@reev.test', 'phone': '0', 'password_hash': 'x',
+             'points': random.randint(0, 200), 'is_admin': False, 'created_at': now}
+            for i in range(customers)
+        ])
+        # Bakiyeler defterden okunur: eski points kolonu açılış satırı ve özet olarak yazılır
+        open_point_ledger()
+        refresh_point_snapshots(min_tail=1, settle_seconds=0)
+        db.session.execute(CustomerQR.__table__.insert(), [
+            {'code': f'BENCH{i}', 'customer_id': random.randint(2, customers + 1), 'points_earned': 1,
+             'is_used': True, 'used_by_branch_id': random.randint(1, 10),
+             'used_at': now - timedelta(minutes=i), 'created_at': now}
+            for i in range(customers * 5)
+        ])
+        db.session.execute(ProductRedemption.__table__.insert(), [
+            {'user_id': random.randint(2, customers + 1), 'product_id': random.randint(1, 20), 'points_used': 5,
+             'is_confirmed': True, 'confirmed_by_branch_id': random.randint(1, 10), 'redeemed_at': now}
+            for _ in range(customers)
+        ])
+        db.session.commit()
+
+        for start in range(0, transactions, batch):
+            db.session.execute(Transaction.__table__.insert(), [
+                {'user_id': random.randint(2, customers + 1), 'amount': 12.5, 'points_earned': 1, 'points_used': 0,
+                 'transaction_type': 'purchase', 'description': 'Benchmark işlemi',
+                 'timestamp': now - timedelta(seconds=i)}
+                for i in range(start, min(start + batch, transactions))
+            ])
+            db.session.commit()
+
+
+def run_export(db_url, export_format):
+    """Tek bir export'u çalıştırır ve sonucu JSON olarak yazar (alt süreç)"""
+    os.environ['DATABASE_URL'] = db_url
+    os.environ['PUSH_DISPATCHER_ENABLED'] = 'False'
+    from app import app
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = '1'
+
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    response = client.get(f'/admin/export_report?format={export_format}', buffered=False)
+    first_byte = None
+    size = 0
+    for chunk in response.response:
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    response.close()
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        'format': export_format,
+        'status': response.status_code,
+        'seconds': round(elapsed, 2),
+        'first_byte_seconds': round(first_byte or elapsed, 2),
+        'size_mb': round(size / (1024 * 1024), 1),
+        'rss_before_mb': round(rss_before, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rapor export benchmark')
+    parser.add_argument('--transactions', type=int, default=1000000)
+    parser.add_argument('--customers', type=int, default=20000)
+    parser.add_argument('--run', choices=['xlsx', 'csv'], help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_export(args.db, args.run)
+        return
+
+    db_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='reev_export_bench_'), 'export.db')}"
+    print(f"🔄 {args.customers} müşteri, {args.transactions} işlem oluşturuluyor: {db_url}")
+    started = time.perf_counter()
+    seed(db_url, args.customers, args.transactions)
+    print(f"   Veri hazır ({time.perf_counter() - started:.1f} sn)")
+
+    for export_format in ('xlsx', 'csv'):
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--db', db_url, '--run', export_format],
+            capture_output=True, text=True
+        )
+        lines = [line for line in result.stdout.splitlines() if line.startswith('{')]
+        if not lines:
+            print(f"❌ {export_format} export başarısız:\n{result.stderr[-2000:]}")
+            sys.exit(1)
+        r = json.loads(lines[-1])
+        print(f"📄 {r['format'].upper()}: HTTP {r['status']}, {r['seconds']} sn (ilk byte {r['first_byte_seconds']} sn), "
+              f"{r['size_mb']} MB, peak RSS {r['peak_rss_mb']} MB (uygulama yüklüyken {r['rss_before_mb']} MB)")
+
+
+if __name__ == '__main__':
+    main()
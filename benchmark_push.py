@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Push bildirim dağıtıcısı için çevrimdışı benchmark
+
+Geçici bir veritabanında müşteri ve abonelikler oluşturur, abonelikleri yerel
+stub push sunucusuna (push_stub_server.py) yönlendirir, bildirimleri kuyruğa
+ekler ve dağıtıcıyı kuyruk boşalana kadar çalıştırır.
+
+Ölçülenler: kuyruğa ekleme süresi (istek işleyicinin maliyeti), gönderim hızı,
+uçtan uca gecikme, bağlantı yeniden kullanımı ve 410 ile deaktif edilen abonelikler.
+
+Kullanım:
+    python benchmark_push.py --customers 200 --subscriptions 2 --workers 8 --latency-ms 40
+"""
+
+import argparse
+import base64
+import os
+import sys
+import tempfile
+import time
+
+# Canlı veritabanından ayrı, geçici bir SQLite dosyası kullan
+_tmp_dir = tempfile.mkdtemp(prefix='reev_push_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'push.db')}"
+# Dağıtıcıyı bu script kendisi çalıştırır
+os.environ['PUSH_DISPATCHER_ENABLED'] = 'False'
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from app import app, db, User, PushSubscription, PushOutbox, send_push_notification, dispatch_push_outbox
+from push_stub_server import start_stub_server
+
+
+def b64url(raw):
+    return base64.urlsafe_b64encode(raw).decode('utf-8').rstrip('=')
+
+
+def subscription_keys():
+    """Tarayıcının üreteceği gibi geçerli p256dh ve auth anahtarları"""
+    key = ec.generate_private_key(ec.SECP256R1())
+    p256dh = key.public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+    )
+    return b64url(p256dh), b64url(os.urandom(16))
+
+
+def seed(base_url, customers, subscriptions, gone_every, flaky_every):
+    """Müşterileri ve stub sunucuya işaret eden abonelikleri oluştur"""
+    p256dh, auth = subscription_keys()
+    with app.app_context():
+        db.create_all()
+        users = [
+            User(name=f'Müşteri {i}', email=f'push{i}@reev.test', phone='0', password_hash='x')
+            for i in range(customers)
+        ]
+        db.session.add_all(users)
+        db.session.flush()
+
+        n = 0
+        for user in users:
+            for j in range(subscriptions):
+                n += 1
+                kind = 'push'
+                if gone_every and n % gone_every == 0:
+                    kind = 'gone'
+                elif flaky_every and n % flaky_every == 0:
+                    kind = 'flaky'
+                db.session.add(PushSubscription(
+                    user_id=user.id, endpoint=f'{base_url}/{kind}/{user.id}-{j}',
+                    p256dh_key=p256dh, auth_key=auth
+                ))
+        db.session.commit()
+        return [user.id for user in users]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Push dağıtıcı benchmark')
+    parser.add_argument('--customers', type=int, default=200)
+    parser.add_argument('--subscriptions', type=int, default=2, help='Müşteri başına abonelik')
+    parser.add_argument('--notifications', type=int, default=1, help='Müşteri başına bildirim')
+    parser.add_argument('--workers', type=int, default=8, help='Gönderim thread havuzu boyutu')
+    parser.add_argument('--latency-ms', type=float, default=40, help='Stub sunucu yanıt gecikmesi')
+    parser.add_argument('--error-rate', type=float, default=0.3, help='/flaky/ aboneliklerde 503 oranı')
+    parser.add_argument('--gone-every', type=int, default=25, help='Her N. abonelik 410 döner')
+    parser.add_argument('--flaky-every', type=int, default=10, help='Her N. abonelik ara sıra 503 döner')
+    args = parser.parse_args()
+
+    app.config['PUSH_RETRY_BASE_SECONDS'] = 0
+    app.config['PUSH_MAX_ATTEMPTS'] = 5
+    os.environ['VAPID_PRIVATE_KEY'] = b64url(
+        ec.generate_private_key(ec.SECP256R1()).private_numbers().private_value.to_bytes(32, 'big')
+    )
+
+    server = start_stub_server(latency=args.latency_ms / 1000, error_rate=args.error_rate)
+    print(f"📡 Stub push sunucusu: {server.base_url}")
+    user_ids = seed(server.base_url, args.customers, args.subscriptions, args.gone_every, args.flaky_every)
+
+    # 1) Kuyruğa ekleme: istek işleyicilerinin ödediği maliyet
+    enqueue_times = []
+    with app.app_context():
+        for _ in range(args.notifications):
+            for user_id in user_ids:
+                started = time.perf_counter()
+                send_push_notification(user_id, 'Benchmark', 'Merhaba', notification_type='benchmark')
+                enqueue_times.append(time.perf_counter() - started)
+
+    # 2) Dağıtım: kuyruk boşalana kadar
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix='push-worker')
+    started = time.perf_counter()
+    with app.app_context():
+        while True:
+            if not dispatch_push_outbox(executor):
+                remaining = PushOutbox.query.filter(PushOutbox.status.in_(('pending', 'sending'))).count()
+                if not remaining:
+                    break
+                time.sleep(0.05)
+        elapsed = time.perf_counter() - started
+
+        rows = PushOutbox.query.filter(PushOutbox.subscription_id.isnot(None)).all()
+        statuses = {}
+        for row in rows:
+            statuses[row.status] = statuses.get(row.status, 0) + 1
+        latencies = sorted(
+            (row.sent_at - row.created_at).total_seconds() for row in rows if row.sent_at
+        )
+        retried = sum(1 for row in rows if row.attempts > 1)
+        inactive = PushSubscription.query.filter_by(is_active=False).count()
+
+    enqueue_times.sort()
+    sent = statuses.get('sent', 0)
+    requests_made = server.stats.get('requests', 0)
+    connections = server.stats.get('connections', 0)
+
+    print(f"📥 Kuyruğa ekleme: {len(enqueue_times)} bildirim, "
+          f"p50 {enqueue_times[len(enqueue_times) // 2] * 1000:.2f} ms, "
+          f"p99 {enqueue_times[int(len(enqueue_times) * 0.99) - 1] * 1000:.2f} ms")
+    print(f"📤 Gönderim: {len(rows)} abonelik kaydı ({sent} gönderildi) / {elapsed:.2f} sn, "
+          f"{requests_made / elapsed:.0f} istek/sn, {args.workers} worker")
+    if latencies:
+        print(f"   Uçtan uca gecikme p50 {latencies[len(latencies) // 2]:.2f} sn, "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f} sn")
+    print(f"   Durumlar: {statuses}, tekrar denenen: {retried}, 410 ile deaktif: {inactive}")
+    print(f"   HTTP: {requests_made} istek / {connections} bağlantı "
+          f"(bağlantı başına {requests_made / max(connections, 1):.1f} istek)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+QR çözümleme hattı için sentetik fotoğraf korpusu ve benchmark
+
+Telefonla çekilmiş QR fotoğraflarına benzeyen bir korpus üretir: farklı
+çözünürlüklerde (12MP, 3MP, 640x480 kamera karesi) döndürülmüş, perspektifi
+bozulmuş, bulanık ve gürültülü JPEG'ler ile içinde QR olmayan kareler.
+
+Her kare eski hat (PIL -> numpy -> BGR -> gri) ve yeni hat
+(QRScanner.decode_from_bytes: imdecode ile küçültülmüş gri ton) ile çözülür.
+
+Ölçülenler: okuma oranı, kare başına gecikme (p50/p95) ve kare başına en yüksek
+bellek (tracemalloc; numpy/OpenCV dizileri dahil).
+
+Kullanım:
+    python benchmark_qr_decode.py --per-size 10 --seed 7
+    python benchmark_qr_decode.py --save-corpus /tmp/qr_corpus
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import cv2
+import numpy as np
+import qrcode
+from PIL import Image
+
+from qr_scanner import QRScanner
+
+# (etiket, genişlik, yükseklik, QR'ın kısa kenara oranı aralığı)
+FRAME_SIZES = (
+    ('12MP', 4000, 3000, (0.15, 0.45)),
+    ('3MP', 2048, 1536, (0.2, 0.5)),
+    ('VGA', 640, 480, (0.35, 0.7)),
+)
+
+
+def synthetic_photo(rng, width, height, qr_ratio, code):
+    """QR içeren (code None ise içermeyen) sentetik telefon fotoğrafı, JPEG baytları"""
+    # Arka plan: yumuşak gradyan + doku gürültüsü
+    gradient = np.linspace(rng.randint(90, 160), rng.randint(160, 230), width, dtype=np.float32)
+    frame = np.tile(gradient, (height, 1))
+    frame += np.random.default_rng(rng.randint(0, 2 ** 31)).normal(0, 6, (height, width)).astype(np.float32)
+
+    if code is not None:
+        side = int(min(width, height) * rng.uniform(*qr_ratio))
+        qr_image = np.asarray(qrcode.make(code, border=2).convert('L').resize((side, side), Image.NEAREST), dtype=np.float32)
+
+        # Döndürme + hafif perspektif ile kareye yerleştir
+        margin = side * 0.3
+        cx = rng.uniform(side / 2 + margin, width - side / 2 - margin) if width > side + 2 * margin else width / 2
+        cy = rng.uniform(side / 2 + margin, height - side / 2 - margin) if height > side + 2 * margin else height / 2
+        angle = np.deg2rad(rng.uniform(-30, 30))
+        corners = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=np.float32) * side / 2
+        jitter = np.array([[rng.uniform(-0.06, 0.06) * side for _ in range(2)] for _ in range(4)], dtype=np.float32)
+        rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]], dtype=np.float32)
+        target = corners @ rotation.T + jitter + np.array([cx, cy], dtype=np.float32)
+        source = np.array([[0, 0], [side, 0], [side, side], [0, side]], dtype=np.float32)
+        matrix = cv2.getPerspectiveTransform(source, target)
+
+        warped = cv2.warpPerspective(qr_image, matrix, (width, height), borderValue=-1)
+        mask = cv2.warpPerspective(np.ones_like(qr_image), matrix, (width, height))
+        contrast = rng.uniform(0.7, 1.0)
+        frame = np.where(mask > 0.5, warped * contrast + (1 - contrast) * 128, frame)
+
+    frame = cv2.GaussianBlur(frame, (0, 0), rng.uniform(0.6, 1.6) * max(1.0, width / 2000))
+    frame = np.clip(frame, 0, 255).astype(np.uint8)
+
+    # Telefon fotoğrafı gibi renkli JPEG olarak kaydet
+    color = cv2.merge([frame, np.clip(frame.astype(np.int16) + 6, 0, 255).astype(np.uint8), frame])
+    ok, encoded = cv2.imencode('.jpg', color, [cv2.IMWRITE_JPEG_QUALITY, rng.randint(75, 92)])
+    return encoded.tobytes()
+
+
+def build_corpus(per_size, seed, negatives):
+    rng = random.Random(seed)
+    corpus = []
+    for label, width, height, qr_ratio in FRAME_SIZES:
+        for i in range(per_size):
+            code = f'REEV{label}{i:04d}{rng.randint(1000, 9999)}'
+            corpus.append((label, code, synthetic_photo(rng, width, height, qr_ratio, code)))
+        for _ in range(negatives):
+            corpus.append((f'{label}-boş', None, synthetic_photo(rng, width, height, qr_ratio, None)))
+    return corpus
+
+
+def legacy_decode(scanner, image_data):
+    """Eski hat: PIL -> numpy -> BGR, gri tonlama sadece iyileştirmede"""
+    image_array = np.array(Image.open(BytesIO(image_data)))
+    if image_array.ndim == 3:
+        image_array = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
+    return scanner.decode_from_opencv(image_array)
+
+
+def measure(decode, corpus):
+    stats = {}
+    for label, code, image_data in corpus:
+        tracemalloc.start()
+        started = time.perf_counter()
+        result = decode(image_data)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        entry = stats.setdefault(label, {'ok': 0, 'total': 0, 'times': [], 'peaks': []})
+        entry['total'] += 1
+        if code is None:
+            entry['ok'] += 0 if result.get('success') else 1
+        elif result.get('success') and result.get('data') == code:
+            entry['ok'] += 1
+        entry['times'].append(elapsed)
+        entry['peaks'].append(peak)
+    return stats
+
+
+def percentile(values, ratio):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='QR çözümleme hattı benchmark')
+    parser.add_argument('--per-size', type=int, default=10, help='Çözünürlük başına QR içeren kare')
+    parser.add_argument('--negatives', type=int, default=3, help='Çözünürlük başına QR içermeyen kare')
+    parser.add_argument('--seed', type=int, default=7, help='Korpus tohumu')
+    parser.add_argument('--target-size', type=int, default=960, help='Hızlı deneme hedef çözünürlüğü')
+    parser.add_argument('--save-corpus', help='Korpusu bu klasöre JPEG olarak kaydet')
+    args = parser.parse_args()
+
+    cv2.setNumThreads(1)
+    print("🔄 Korpus üretiliyor...")
+    corpus = build_corpus(args.per_size, args.seed, args.negatives)
+
+    if args.save_corpus:
+        os.makedirs(args.save_corpus, exist_ok=True)
+        for i, (label, code, image_data) in enumerate(corpus):
+            with open(os.path.join(args.save_corpus, f'{i:03d}_{label}_{code or "none"}.jpg'), 'wb') as f:
+                f.write(image_data)
+        print(f"💾 {len(corpus)} kare kaydedildi: {args.save_corpus}")
+
+    scanner = QRScanner(target_size=args.target_size)
+    pipelines = (
+        ('Eski hat (PIL + BGR)', lambda data: legacy_decode(scanner, data)),
+        ('Yeni hat (imdecode küçültülmüş gri)', scanner.decode_from_bytes),
+    )
+
+    for name, decode in pipelines:
+        print(f"📊 {name}")
+        for label, entry in measure(decode, corpus).items():
+            times = entry['times']
+            print(f"   {label:10s} doğru: {entry['ok']}/{entry['total']}  "
+                  f"p50: {percentile(times, 0.5) * 1000:7.1f} ms  p95: {percentile(times, 0.95) * 1000:7.1f} ms  "
+                  f"bellek (kare başı en fazla): {max(entry['peaks']) / 2 ** 20:6.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
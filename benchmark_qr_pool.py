@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+QR çözümleme süreç havuzu (QRDecodePool) için benchmark
+
+Şube kameralarından gelen bir yükleme patlamasını simüle eder: birden fazla
+iş parçacığı aynı anda kamera karesi (ham JPEG baytları) çözümletir. Aynı sırada bir
+"heartbeat" iş parçacığı 5 ms'lik uykulardan ne kadar geç uyandığını ölçer; bu
+gecikme, çözümleme sürerken uygulamanın geri kalanının (diğer istekler) ne kadar
+bekletildiğini gösterir.
+
+Ölçülenler: kare başına gecikme (p50/p99), başarılı/yoğun/zaman aşımı sayıları
+ve heartbeat gecikmesi. Karşılaştırma için aynı yük havuzsuz (workers=0) da çalışır.
+
+Kullanım:
+    python benchmark_qr_pool.py --frames 60 --clients 8 --workers 2 --max-pending 8
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from io import BytesIO
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import qrcode
+from PIL import Image, ImageFilter
+
+from qr_scanner import QRDecodePool
+
+
+def make_frame(code, size=(1280, 720)):
+    """Kamera karesine benzeyen, QR içeren JPEG baytları üretir"""
+    qr_image = qrcode.make(code).convert('L').resize((300, 300))
+    frame = Image.new('L', size, color=random.randint(150, 220))
+    frame.paste(qr_image, (random.randint(0, size[0] - 300), random.randint(0, size[1] - 300)))
+    frame = frame.filter(ImageFilter.GaussianBlur(0.8)).convert('RGB')
+    buffer = BytesIO()
+    frame.save(buffer, format='JPEG', quality=80)
+    return buffer.getvalue()
+
+
+def heartbeat(stop, delays):
+    """5 ms uyku döngüsü; planlanandan geç uyanma süresini kaydeder"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        time.sleep(0.005)
+        delays.append(time.perf_counter() - started - 0.005)
+
+
+def run(pool, frames, clients):
+    latencies = []
+    counts = {'ok': 0, 'busy': 0, 'failed': 0}
+    lock = threading.Lock()
+    chunks = [frames[i::clients] for i in range(clients)]
+
+    def client(chunk):
+        for frame in chunk:
+            started = time.perf_counter()
+            result = pool.decode_bytes(frame)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if result.get('success'):
+                    counts['ok'] += 1
+                elif result.get('busy'):
+                    counts['busy'] += 1
+                else:
+                    counts['failed'] += 1
+
+    # Havuz süreçleri ölçüme dahil edilmesin
+    pool.decode_bytes(frames[0])
+
+    stop = threading.Event()
+    delays = []
+    beat = threading.Thread(target=heartbeat, args=(stop, delays), daemon=True)
+    beat.start()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(chunk,)) for chunk in chunks]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    beat.join()
+    return elapsed, sorted(latencies), counts, sorted(delays)
+
+
+def percentile(values, ratio):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * ratio))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='QR çözümleme havuzu benchmark')
+    parser.add_argument('--frames', type=int, default=60, help='Toplam kare sayısı')
+    parser.add_argument('--clients', type=int, default=8, help='Eşzamanlı yükleme yapan terminal')
+    parser.add_argument('--workers', type=int, default=2, help='Havuz süreç sayısı')
+    parser.add_argument('--max-pending', type=int, default=8, help='Kuyruk sınırı')
+    parser.add_argument('--timeout', type=float, default=5.0, help='Kare başına zaman aşımı (sn)')
+    args = parser.parse_args()
+
+    print(f"🔄 {args.frames} kare hazırlanıyor...")
+    frames = [make_frame(f'REEVQR{i:06d}') for i in range(args.frames)]
+
+    for label, workers in (('Havuzsuz (istek iş parçacığında)', 0), (f'Süreç havuzu ({args.workers} worker)', args.workers)):
+        pool = QRDecodePool(workers=workers, max_pending=args.max_pending if workers else 10 ** 6, timeout=args.timeout)
+        try:
+            elapsed, latencies, counts, delays = run(pool, frames, args.clients)
+        finally:
+            pool.shutdown()
+
+        print(f"📊 {label}")
+        print(f"   {args.frames} kare / {elapsed:.2f} sn ({args.frames / elapsed:.1f} kare/sn)")
+        print(f"   Kare gecikmesi p50: {percentile(latencies, 0.5):.0f} ms, p99: {percentile(latencies, 0.99):.0f} ms")
+        print(f"   Okunan: {counts['ok']}, yoğun/zaman aşımı: {counts['busy']}, okunamayan: {counts['failed']}")
+        print(f"   Heartbeat gecikmesi p50: {percentile(delays, 0.5):.1f} ms, p99: {percentile(delays, 0.99):.1f} ms, "
+              f"en fazla: {percentile(delays, 1.0):.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
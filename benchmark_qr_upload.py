@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+QR okutma yüklemesi (/scan_qr_local) için istek ayrıştırma benchmark'ı
+
+Aynı JPEG karesi üç biçimde gönderilir:
+    - JSON içinde base64 data URL (eski istemciler)
+    - ham gövde (Content-Type: image/jpeg)
+    - multipart/form-data 'image' alanı
+
+Her biçim için read_scan_image() çalıştırılır; yani WSGI gövdesinden
+cv2.imdecode'un kullanacağı baytlara kadar geçen süre ve bu sırada ayrılan en
+yüksek bellek (tracemalloc) ölçülür. Çözümleme (QR okuma) ölçüme dahil değildir.
+
+Kullanım:
+    python benchmark_qr_upload.py --repeat 30
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Uygulama modülü içe aktarılırken canlı veritabanına dokunulmasın
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='reev_upload_'), 'bench.db')}")
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import cv2
+import numpy as np
+
+from app import app, read_scan_image
+
+# (etiket, genişlik, yükseklik)
+FRAME_SIZES = (
+    ('VGA', 640, 480),
+    ('720p', 1280, 720),
+    ('3MP', 2048, 1536),
+    ('12MP', 4000, 3000),
+)
+
+
+def make_jpeg(width, height, seed):
+    """Kamera karesine benzer dokulu JPEG baytları"""
+    rng = np.random.default_rng(seed)
+    frame = rng.normal(150, 40, (height // 8, width // 8, 3)).clip(0, 255).astype(np.uint8)
+    frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_CUBIC)
+    ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    return encoded.tobytes()
+
+
+def request_bodies(image_data):
+    """(biçim, gövde, content_type) üçlüleri"""
+    boundary = 'reevbenchboundary'
+    multipart = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="frame.jpg"\r\n'
+        f'Content-Type: image/jpeg\r\n\r\n'
+    ).encode() + image_data + f'\r\n--{boundary}--\r\n'.encode()
+    data_url = 'data:image/jpeg;base64,' + base64.b64encode(image_data).decode('ascii')
+    return (
+        ('JSON base64', json.dumps({'image': data_url}).encode(), 'application/json'),
+        ('Ham gövde', image_data, 'image/jpeg'),
+        ('Multipart', multipart, f'multipart/form-data; boundary={boundary}'),
+    )
+
+
+def measure(body, content_type, repeat):
+    times, peaks = [], []
+    for _ in range(repeat):
+        with app.test_request_context('/scan_qr_local', method='POST', data=body, content_type=content_type):
+            tracemalloc.start()
+            started = time.perf_counter()
+            image_data = read_scan_image()
+            buffer = np.frombuffer(image_data, dtype=np.uint8)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        assert buffer.size == len(image_data)
+        times.append(elapsed)
+        peaks.append(peak)
+    return sorted(times), max(peaks)
+
+
+def percentile(values, ratio):
+    return values[min(len(values) - 1, int(len(values) * ratio))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='QR yükleme ayrıştırma benchmark')
+    parser.add_argument('--repeat', type=int, default=30, help='Biçim ve çözünürlük başına tekrar')
+    args = parser.parse_args()
+
+    for label, width, height in FRAME_SIZES:
+        image_data = make_jpeg(width, height, seed=width)
+        print(f"📊 {label} ({width}x{height}, JPEG {len(image_data) / 1024:.0f} KB)")
+        for name, body, content_type in request_bodies(image_data):
+            times, peak = measure(body, content_type, args.repeat)
+            print(f"   {name:12s} gövde: {len(body) / 1024:7.0f} KB  "
+                  f"p50: {percentile(times, 0.5):7.2f} ms  p95: {percentile(times, 0.95):7.2f} ms  "
+                  f"bellek (en fazla): {peak / 2 ** 20:6.2f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Şablon çeviri fonksiyonu _() için mikro benchmark
+
+Eski _() her çağrıda tüm çeviri sözlüğünü yeniden oluşturup get_locale()
+çağırıyordu. Bu script o davranışı aynı sözlük literal'inden üretilen bir
+fonksiyonla taklit eder ve TRANSLATION_CATALOG kullanan güncel _() ile
+karşılaştırır:
+
+  1. Tek başına _() çağrısı maliyeti
+  2. dashboard.html render süresi (/dashboard isteği)
+
+Kullanım:
+    python benchmark_translations.py --renders 200 --calls 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Canlı veritabanından ayrı, geçici bir SQLite dosyası kullan
+_tmp_dir = tempfile.mkdtemp(prefix='reev_i18n_bench_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'i18n.db')}"
+os.environ['PUSH_DISPATCHER_ENABLED'] = 'False'
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app as app_module
+from app import app, db, User, TRANSLATIONS
+
+
+def build_legacy_translate():
+    """Eski _() fonksiyonunun birebir davranışı: her çağrıda sözlük literal'i + get_locale()"""
+    source = (
+        "def legacy_translate(text):\n"
+        f"    translations = {TRANSLATIONS!r}\n"
+        "    current_lang = get_locale()\n"
+        "    return translations.get(current_lang, {}).get(text, text)\n"
+    )
+    namespace = {'get_locale': app_module.get_locale}
+    exec(compile(source, '<legacy _>', 'exec'), namespace)
+    return namespace['legacy_translate']
+
+
+def time_calls(translate, calls):
+    with app.test_request_context('/dashboard'):
+        app.preprocess_request()
+        started = time.perf_counter()
+        for _ in range(calls):
+            translate('Rewards Progress')
+        return (time.perf_counter() - started) / calls
+
+
+def time_renders(client, translate, renders):
+    app_module._ = translate
+    for _ in range(5):
+        client.get('/dashboard')
+    started = time.perf_counter()
+    for _ in range(renders):
+        response = client.get('/dashboard')
+        assert response.status_code == 200, response.status_code
+    return (time.perf_counter() - started) / renders
+
+
+def count_calls_per_render(client, translate):
+    calls = [0]
+
+    def counting(text):
+        calls[0] += 1
+        return translate(text)
+
+    app_module._ = counting
+    client.get('/dashboard')
+    return calls[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='_() çeviri benchmark')
+    parser.add_argument('--renders', type=int, default=200)
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--lang', default='tr')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        user = User(name='Benchmark', email='i18n@reev.test', phone='0', password_hash='x', language=args.lang)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    legacy = build_legacy_translate()
+    catalog = app_module._
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user_id)
+        sess['language'] = args.lang
+
+    legacy_call = time_calls(legacy, args.calls)
+    catalog_call = time_calls(catalog, args.calls)
+    calls_per_render = count_calls_per_render(client, catalog)
+    legacy_render = time_renders(client, legacy, args.renders)
+    catalog_render = time_renders(client, catalog, args.renders)
+    app_module._ = catalog
+
+    print(f"🔤 _() çağrısı: eski {legacy_call * 1e6:.1f} µs, katalog {catalog_call * 1e6:.2f} µs "
+          f"({legacy_call / catalog_call:.0f}x)")
+    print(f"📄 dashboard.html: render başına {calls_per_render} _() çağrısı")
+    print(f"   Eski: {legacy_render * 1000:.2f} ms, katalog: {catalog_render * 1000:.2f} ms, "
+          f"render başına kazanç {(legacy_render - catalog_render) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Push bildirim kuyruğunu (push_outbox) tek seferde boşaltan iş (cron ile periyodik çalıştırılabilir)
+
+Arka plan dağıtıcısı çalışmayan süreçlerde veya yeniden başlatma sonrası
+bekleyen / tekrar denenecek kayıtlar için kullanılır. Kayıtlar compare-and-set
+ile sahiplenildiğinden çalışan dağıtıcılarla aynı anda çalıştırmak güvenlidir.
+
+Kullanım:
+    python drain_push_outbox.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, drain_push_outbox
+
+def main():
+    with app.app_context():
+        sent = drain_push_outbox()
+        print(f"✅ {sent} push kaydı işlendi")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Mobil API token'larını özet (SHA-256) olarak saklamak için auth_token_hash
+kolonunu ve index'ini ekleyen migration scripti
+
+Mevcut düz token'ların özeti hesaplanır ve düz değerler silinir; giriş yapmış
+kullanıcıların token'ları geçerli kalır.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, hash_api_token
+from sqlalchemy import text, inspect
+
+def migrate_auth_token_hash():
+    """user tablosuna auth_token_hash kolonu ve unique index ekle"""
+    
+    with app.app_context():
+        try:
+            columns = [c['name'] for c in inspect(db.engine).get_columns('user')]
+            
+            with db.engine.begin() as conn:
+                if 'auth_token_hash' not in columns:
+                    conn.execute(text('ALTER TABLE "user" ADD COLUMN auth_token_hash VARCHAR(64)'))
+                
+                conn.execute(text("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS ix_user_auth_token_hash 
+                    ON "user" (auth_token_hash)
+                """))
+                
+                # Mevcut düz token'ları özetle
+                rows = conn.execute(text("""
+                    SELECT id, auth_token FROM "user" 
+                    WHERE auth_token IS NOT NULL AND auth_token != ''
+                """)).fetchall()
+                for user_id, token in rows:
+                    conn.execute(
+                        text('UPDATE "user" SET auth_token_hash = :token_hash, auth_token = NULL WHERE id = :id'),
+                        {'token_hash': hash_api_token(token), 'id': user_id}
+                    )
+            
+            print(f"   {len(rows)} token özetlendi")
+            print("✅ auth_token_hash kolonu başarıyla oluşturuldu!")
+            
+        except Exception as e:
+            print(f"❌ Migration hatası: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_auth_token_hash()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kampanya dağıtım işi (campaign_fanout) tablosu oluşturma migration scripti
+
+Tablo önceden oluşturulmuşsa eksik attempts kolonu eklenir.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from sqlalchemy import text, inspect
+
+def migrate_campaign_fanout():
+    """Campaign fanout tablosunu oluştur"""
+    
+    with app.app_context():
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS campaign_fanout (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        campaign_id INTEGER NOT NULL,
+                        channel VARCHAR(10) NOT NULL,
+                        status VARCHAR(20) DEFAULT 'pending',
+                        attempts INTEGER DEFAULT 0,
+                        last_user_id INTEGER DEFAULT 0,
+                        sent_count INTEGER DEFAULT 0,
+                        failed_count INTEGER DEFAULT 0,
+                        last_error TEXT,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        finished_at DATETIME,
+                        FOREIGN KEY (campaign_id) REFERENCES campaign (id),
+                        CONSTRAINT uq_campaign_fanout_channel UNIQUE (campaign_id, channel)
+                    )
+                """))
+            
+            columns = [c['name'] for c in inspect(db.engine).get_columns('campaign_fanout')]
+            with db.engine.begin() as conn:
+                if 'attempts' not in columns:
+                    conn.execute(text("ALTER TABLE campaign_fanout ADD COLUMN attempts INTEGER DEFAULT 0"))
+            
+            print("✅ Campaign fanout tablosu başarıyla oluşturuldu!")
+            
+        except Exception as e:
+            print(f"❌ Migration hatası: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_campaign_fanout()
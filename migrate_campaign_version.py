@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kampanya ürün listesi önbelleği için campaign.version kolonunu ekleyen migration scripti
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from sqlalchemy import text, inspect
+
+def migrate_campaign_version():
+    """campaign tablosuna version kolonu ekle"""
+    
+    with app.app_context():
+        try:
+            columns = [c['name'] for c in inspect(db.engine).get_columns('campaign')]
+            
+            with db.engine.begin() as conn:
+                if 'version' not in columns:
+                    conn.execute(text("ALTER TABLE campaign ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+            
+            print("✅ campaign.version kolonu başarıyla oluşturuldu!")
+            
+        except Exception as e:
+            print(f"❌ Migration hatası: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_campaign_version()
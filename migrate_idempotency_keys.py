@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Idempotency-Key yanıt deposu (idempotency_key) tablosu oluşturma migration scripti
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from sqlalchemy import text
+
+def migrate_idempotency_keys():
+    """Tekrarlanan POST isteklerinin ilk yanıtlarını saklayan tabloyu oluştur"""
+
+    with app.app_context():
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS idempotency_key (
+                        key_hash VARCHAR(64) PRIMARY KEY,
+                        request_hash VARCHAR(64) NOT NULL,
+                        status_code INTEGER,
+                        response_body TEXT,
+                        created_at DATETIME NOT NULL,
+                        expires_at DATETIME NOT NULL
+                    )
+                """))
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_idempotency_key_expires_at
+                    ON idempotency_key (expires_at)
+                """))
+
+            print("✅ Idempotency-Key tablosu başarıyla oluşturuldu!")
+
+        except Exception as e:
+            print(f"❌ Migration hatası: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_idempotency_keys()
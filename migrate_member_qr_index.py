@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+İmzalı üye QR kodları için customer_qr (customer_id, used_at) index'ini ekleyen migration scripti
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from sqlalchemy import text
+
+def migrate_member_qr_index():
+    """Okutma sınırı sorgusu (müşterinin son okutmaları) için index ekle"""
+
+    with app.app_context():
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS idx_customer_qr_customer_used
+                    ON customer_qr (customer_id, used_at)
+                """))
+
+            print("✅ Üye QR index'i başarıyla oluşturuldu!")
+
+        except Exception as e:
+            print(f"❌ Migration hatası: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_member_qr_index()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Push bildirim kuyruğu (push_outbox) tablosu oluşturma migration scripti
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from sqlalchemy import text
+
+def migrate_push_outbox():
+    """Push outbox tablosunu oluştur"""
+    
+    with app.app_context():
+        try:
+            with db.engine.begin() as conn:
+                # Push outbox tablosunu oluştur
+                conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS push_outbox (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER NOT NULL,
+                        subscription_id INTEGER,
+                        payload TEXT NOT NULL,
+                        status VARCHAR(20) DEFAULT 'pending',
+                        attempts INTEGER DEFAULT 0,
+                        next_attempt_at DATETIME,
+                        last_error TEXT,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        sent_at DATETIME,
+                        FOREIGN KEY (user_id) REFERENCES user (id),
+                        FOREIGN KEY (subscription_id) REFERENCES push_subscription (id)
+                    )
+                """))
+                
+                # Dağıtıcının sırası gelen kayıtları bulduğu index
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS idx_push_outbox_due 
+                    ON push_outbox (status, next_attempt_at)
+                """))
+            
+            print("✅ Push outbox tablosu başarıyla oluşturuldu!")
+            
+        except Exception as e:
+            print(f"❌ Migration hatası: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_push_outbox()
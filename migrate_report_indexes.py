@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Müşteri analiz raporu için user_id index'lerini ekleyen migration scripti
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from sqlalchemy import text
+
+def migrate_report_indexes():
+    """transaction ve product_redemption tablolarına user_id index'i ekle"""
+    
+    with app.app_context():
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_transaction_user_id 
+                    ON "transaction" (user_id)
+                """))
+                
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_product_redemption_user_id 
+                    ON product_redemption (user_id)
+                """))
+            
+            print("✅ Rapor index'leri başarıyla oluşturuldu!")
+            
+        except Exception as e:
+            print(f"❌ Migration hatası: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_report_indexes()
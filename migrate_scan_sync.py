@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Çevrimdışı şube okutmaları senkronizasyonu (scan_sync_event) tablosu oluşturma migration scripti
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db
+from sqlalchemy import text
+
+def migrate_scan_sync():
+    """Senkronize edilen okutma olayları tablosunu oluştur"""
+
+    with app.app_context():
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS scan_sync_event (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        branch_id INTEGER NOT NULL,
+                        event_id VARCHAR(64) NOT NULL,
+                        event_type VARCHAR(20) NOT NULL,
+                        code VARCHAR(200) NOT NULL,
+                        scanned_at DATETIME NOT NULL,
+                        status VARCHAR(20) NOT NULL,
+                        error VARCHAR(200),
+                        points_earned INTEGER,
+                        synced_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (branch_id) REFERENCES branch (id),
+                        CONSTRAINT uq_scan_sync_branch_event UNIQUE (branch_id, event_id)
+                    )
+                """))
+
+            print("✅ Okutma senkronizasyon tablosu başarıyla oluşturuldu!")
+
+        except Exception as e:
+            print(f"❌ Migration hatası: {e}")
+            raise
+
+if __name__ == '__main__':
+    migrate_scan_sync()
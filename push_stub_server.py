@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Yerel push servis taklidi (stub)
+
+Gerçek push servislerine (FCM, Mozilla, Apple) gitmeden push dağıtıcısının
+gecikme ve hızını çevrimdışı ölçmek için kullanılır. Gelen her POST isteğine
+web push protokolündeki gibi 201 döner.
+
+Endpoint yolları davranışı belirler:
+    /push/<id>   -> 201 Created
+    /gone/<id>   -> 410 Gone (abonelik silinmiş)
+    /flaky/<id>  -> --error-rate oranında 503, aksi halde 201
+
+Kullanım:
+    python push_stub_server.py --port 8765 --latency-ms 40 --error-rate 0.2
+"""
+
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubPushHandler(BaseHTTPRequestHandler):
+    # Keep-alive için HTTP/1.1; böylece bağlantı yeniden kullanımı ölçülebilir
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.count('connections')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        status = 201
+        if self.path.startswith('/gone/'):
+            status = 410
+        elif self.path.startswith('/flaky/') and random.random() < self.server.error_rate:
+            status = 503
+
+        self.server.count('requests')
+        self.server.count(status)
+
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubPushServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, error_rate=0.0):
+        super().__init__(address, StubPushHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+
+    def count(self, key):
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+def start_stub_server(host='127.0.0.1', port=0, latency=0.0, error_rate=0.0):
+    """Stub sunucuyu arka plan thread'inde başlatır (port=0 ise boş port seçilir)"""
+    server = StubPushServer((host, port), latency=latency, error_rate=error_rate)
+    threading.Thread(target=server.serve_forever, name='push-stub', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Yerel push servis taklidi')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=40, help='Yanıt başına yapay gecikme')
+    parser.add_argument('--error-rate', type=float, default=0.2, help='/flaky/ için 503 oranı')
+    args = parser.parse_args()
+
+    server = StubPushServer((args.host, args.port), latency=args.latency_ms / 1000, error_rate=args.error_rate)
+    print(f"📡 Push stub sunucusu çalışıyor: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {server.stats}")
+
+
+if __name__ == '__main__':
+    main()
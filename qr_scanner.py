@@ -4,96 +4,370 @@ OpenCV ile QR kod okuma servisi
 """
 import cv2
 import numpy as np
-import base64
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
 from PIL import Image
 
-class QRScanner:
+try:
+    from pyzbar import pyzbar
+except (ImportError, OSError):
+    # pyzbar veya zbar kütüphanesi yoksa bu strateji cascade'den çıkarılır
+    pyzbar = None
+
+class DecodeStrategy:
+    """Cascade'deki tek bir çözümleme yöntemi ve süreç içi başarı/maliyet istatistiği"""
+    
+    def __init__(self, name, label, func):
+        self.name = name
+        self.label = label
+        self.func = func
+        self.attempts = 0
+        self.hits = 0
+        self.total_time = 0.0
+    
+    def record(self, elapsed, hit):
+        self.attempts += 1
+        self.hits += 1 if hit else 0
+        self.total_time += elapsed
+    
+    def expected_cost(self):
+        """Başarı başına beklenen süre (ortalama süre / başarı oranı, Laplace düzeltmeli)
+
+        Bağımsız denemelerde bu değere göre artan sıralama, kod bulunana kadar
+        harcanan beklenen toplam süreyi en aza indirir.
+        """
+        average = (self.total_time + 0.01) / (self.attempts + 1)
+        hit_rate = (self.hits + 1) / (self.attempts + 2)
+        return average / hit_rate
+
+class DecodeMetrics:
+    """Çözümleme sonuçlarındaki strateji denemelerini toplar (metrik yüzeyi için)"""
+    
     def __init__(self):
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.decoded = 0
+        self.strategies = {}
+    
+    def record(self, result):
+        attempts = result.pop('attempts', None) or []
+        with self._lock:
+            self.frames += 1
+            self.decoded += 1 if result.get('success') else 0
+            for name, elapsed_ms, hit in attempts:
+                entry = self.strategies.setdefault(name, {'attempts': 0, 'hits': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+                entry['attempts'] += 1
+                entry['hits'] += 1 if hit else 0
+                entry['total_ms'] += elapsed_ms
+                entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+        return result
+    
+    def snapshot(self):
+        with self._lock:
+            strategies = [{
+                'name': name,
+                'attempts': entry['attempts'],
+                'hits': entry['hits'],
+                'hit_rate': round(entry['hits'] / entry['attempts'], 4) if entry['attempts'] else 0,
+                'avg_ms': round(entry['total_ms'] / entry['attempts'], 2) if entry['attempts'] else 0,
+                'max_ms': round(entry['max_ms'], 2),
+                'total_ms': round(entry['total_ms'], 2)
+            } for name, entry in self.strategies.items()]
+            return {
+                'frames': self.frames,
+                'decoded': self.decoded,
+                'strategies': sorted(strategies, key=lambda item: -item['hits'])
+            }
+
+class QRScanner:
+    # Eski okuyucunun denediği yöntemler; sıralama ne olursa olsun her karede denenir
+    BASELINE_STRATEGIES = ('opencv_raw', 'opencv_threshold')
+    
+    # Küçültülmüş okuma bayrakları: JPEG'de DCT ölçekleme ile tam kare hiç açılmaz
+    REDUCED_GRAYSCALE = (
+        (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+        (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+        (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+    )
+    
+    def __init__(self, target_size=960, full_retry_unlocated=False, reorder_every=25, max_strategies=3,
+                 multi_target_size=1920):
         self.detector = cv2.QRCodeDetector()
+        # Strateji sırası her reorder_every karede beklenen maliyete göre yenilenir.
+        # Kod içermeyen karelerin maliyetini sınırlamak için kare başına en fazla
+        # max_strategies yöntem denenir; sıralama karelerinde hepsi denenir (keşif).
+        # BASELINE_STRATEGIES bu sınırın dışında kalsa da denenir.
+        self.strategies = self.build_strategies()
+        self.reorder_every = reorder_every
+        self.max_strategies = max_strategies
+        self._frames = 0
+        # Hızlı denemede görüntünün uzun kenarı için hedef çözünürlük (piksel)
+        self.target_size = target_size
+        # Küçültülmüş karede kod hiç bulunamadığında da tam çözünürlük denensin mi
+        self.full_retry_unlocated = full_retry_unlocated
+        # Çoklu okumada kodlar karede daha küçük kalır; hedef çözünürlük daha yüksektir
+        self.multi_target_size = multi_target_size
     
-    def decode_from_base64(self, base64_image):
-        """Base64 görüntüden QR kod okur"""
+    def decode_from_bytes(self, image_data):
+        """Sıkıştırılmış görüntü baytlarından (JPEG/PNG) QR kod okur
+        
+        Önce hedef çözünürlüğe küçültülmüş gri tonlu görüntü denenir; kod
+        bulunamazsa tam çözünürlüğe dönülür.
+        """
         try:
-            # Base64 string kontrolü
-            if ',' in base64_image:
-                image_data = base64.b64decode(base64_image.split(',')[1])
+            if not image_data:
+                return {'success': False, 'error': 'Boş görüntü verisi'}
+            
+            buffer = np.frombuffer(image_data, dtype=np.uint8)
+            factor = self.reduction_factor(image_data)
+            
+            if factor > 1:
+                reduced_flag = dict(self.REDUCED_GRAYSCALE)[factor]
+                reduced = cv2.imdecode(buffer, reduced_flag)
+                if reduced is not None:
+                    result = self.decode_from_opencv(reduced)
+                    if result['success']:
+                        result['scale'] = 1 / factor
+                        return result
+                    if not result.get('located') and not self.full_retry_unlocated:
+                        # Küçük görüntüde kod izi bile yoksa tam çözünürlüğe gitme
+                        return result
+                    reduced_attempts = result.get('attempts', [])
+                else:
+                    reduced_attempts = []
             else:
-                image_data = base64.b64decode(base64_image)
+                reduced_attempts = []
             
-            # PIL Image oluştur
-            image = Image.open(BytesIO(image_data))
+            # OpenCV'nin açamadığı formatlar (örn. GIF) için PIL
+            gray = self.load_grayscale(buffer, image_data)
+            if gray is None:
+                return {'success': False, 'error': 'Desteklenmeyen görüntü formatı'}
             
-            # PIL'i numpy array'e çevir
-            image_array = np.array(image)
+            result = self.decode_from_opencv(gray)
+            result['attempts'] = reduced_attempts + result.get('attempts', [])
+            return result
             
-            # Array boyut ve tip kontrolü
-            if image_array.size == 0:
+        except Exception as e:
+            return {'success': False, 'error': f'Görüntü decode hatası: {str(e)}'}
+    
+    def decode_many(self, image_data):
+        """Tek görüntüdeki tüm QR kodlarını okur (tepsi / toplu okutma)
+        
+        Sonuç: {'success', 'codes': [{'data', 'method'}, ...], 'attempts'}; aynı
+        içerik birden fazla kez bulunsa da codes içinde bir kez yer alır.
+        
+        Sıra: küçültülmüş karede detectAndDecodeMulti; bulunup çözülemeyen kod
+        kalırsa tam çözünürlükte tekrar; hâlâ kalırsa pyzbar (varsa). Hiç kod
+        izi yoksa tekli cascade denenir (ters renk, döndürülmüş vb.).
+        """
+        try:
+            if not image_data:
                 return {'success': False, 'error': 'Boş görüntü verisi'}
             
-            # Görüntü formatını kontrol et ve düzelt
-            if len(image_array.shape) == 3:
-                if image_array.shape[2] == 4:  # RGBA
-                    opencv_image = cv2.cvtColor(image_array, cv2.COLOR_RGBA2BGR)
-                elif image_array.shape[2] == 3:  # RGB
-                    opencv_image = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
-                else:
+            buffer = np.frombuffer(image_data, dtype=np.uint8)
+            factor = self.reduction_factor(image_data, self.multi_target_size)
+            gray = None
+            if factor > 1:
+                gray = cv2.imdecode(buffer, dict(self.REDUCED_GRAYSCALE)[factor])
+            full = None
+            if gray is None:
+                factor = 1
+                full = gray = self.load_grayscale(buffer, image_data)
+                if gray is None:
                     return {'success': False, 'error': 'Desteklenmeyen görüntü formatı'}
-            elif len(image_array.shape) == 2:  # Grayscale
-                opencv_image = image_array
-            else:
-                return {'success': False, 'error': 'Geçersiz görüntü boyutları'}
             
-            # Veri tipini uint8'e çevir
-            if opencv_image.dtype != np.uint8:
-                opencv_image = opencv_image.astype(np.uint8)
+            found = {}
+            attempts = []
+            unresolved = self._decode_multi('opencv_multi', gray, found, attempts)
+            
+            if unresolved and factor > 1:
+                full = self.load_grayscale(buffer, image_data)
+                if full is not None:
+                    unresolved = self._decode_multi('opencv_multi_full', full, found, attempts)
             
-            return self.decode_from_opencv(opencv_image)
+            if pyzbar is not None and (unresolved or not found):
+                started = time.perf_counter()
+                before = len(found)
+                for symbol in pyzbar.decode(full if full is not None else gray, symbols=[pyzbar.ZBarSymbol.QRCODE]):
+                    data = symbol.data.decode('utf-8', errors='replace')
+                    if data:
+                        found.setdefault(data, 'PyZbar')
+                attempts.append(('pyzbar_multi', round((time.perf_counter() - started) * 1000, 3), len(found) > before))
+            
+            if not found and not unresolved:
+                # Çoklu dedektör hiçbir şey bulamadı: tek kod için tüm cascade
+                single = self.decode_from_opencv(gray)
+                attempts.extend(single.get('attempts', []))
+                if single['success']:
+                    found[single['data']] = single['method']
+            
+            if not found:
+                return {'success': False, 'error': 'QR kod bulunamadı', 'codes': [], 'attempts': attempts}
+            
+            return {
+                'success': True,
+                'codes': [{'data': data, 'method': method} for data, method in found.items()],
+                'attempts': attempts
+            }
             
         except Exception as e:
-            return {'success': False, 'error': f'Base64 decode hatası: {str(e)}'}
+            return {'success': False, 'error': f'Görüntü decode hatası: {str(e)}'}
+    
+    def _decode_multi(self, name, gray, found, attempts):
+        """detectAndDecodeMulti sonuçlarını found'a ekler; bulunup çözülemeyen kod sayısını döndürür"""
+        started = time.perf_counter()
+        ok, decoded, points, _ = self.detector.detectAndDecodeMulti(gray)
+        before = len(found)
+        unresolved = 0
+        if ok:
+            for data in decoded:
+                if data:
+                    found.setdefault(data, 'OpenCV QRCodeDetector (Çoklu)')
+                else:
+                    unresolved += 1
+        attempts.append((name, round((time.perf_counter() - started) * 1000, 3), len(found) > before))
+        return unresolved
+    
+    def load_grayscale(self, buffer, image_data):
+        """Tam çözünürlüklü gri ton; OpenCV açamazsa PIL (başarısızsa None)"""
+        gray = cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            gray = self.decode_with_pil(image_data)
+        return gray
+    
+    def reduction_factor(self, image_data, target_size=None):
+        """Uzun kenarı hedef çözünürlüğün altına düşürmeyen en büyük küçültme oranı (1, 2, 4, 8)"""
+        target_size = target_size or self.target_size
+        try:
+            # PIL yalnızca başlığı okur, pikselleri açmaz
+            width, height = Image.open(BytesIO(image_data)).size
+        except Exception:
+            return 1
+        
+        longest = max(width, height)
+        for factor, _flag in self.REDUCED_GRAYSCALE:
+            if longest / factor >= target_size:
+                return factor
+        return 1
+    
+    def decode_with_pil(self, image_data):
+        """PIL ile gri tonlu uint8 diziye çevirir (başarısızsa None)"""
+        try:
+            return np.asarray(Image.open(BytesIO(image_data)).convert('L'), dtype=np.uint8)
+        except Exception:
+            return None
+    
+    def build_strategies(self):
+        """Çözümleme cascade'i: ucuz ve sık başarılı olanlar zamanla öne geçer"""
+        strategies = [
+            DecodeStrategy('opencv_raw', 'OpenCV QRCodeDetector (Orijinal)', self._decode_raw),
+            DecodeStrategy('opencv_clahe', 'OpenCV QRCodeDetector + CLAHE', self._decode_clahe),
+            DecodeStrategy('opencv_threshold', 'OpenCV QRCodeDetector + Enhancement', self._decode_threshold),
+            DecodeStrategy('opencv_inverted', 'OpenCV QRCodeDetector (Ters Renk)', self._decode_inverted),
+            DecodeStrategy('opencv_rotated', 'OpenCV QRCodeDetector (45° Döndürülmüş)', self._decode_rotated),
+        ]
+        if pyzbar is not None:
+            strategies.append(DecodeStrategy('pyzbar', 'PyZbar', self._decode_pyzbar))
+        return strategies
     
     def decode_from_opencv(self, image):
-        """OpenCV görüntüsünden QR kod okur"""
+        """OpenCV görüntüsünden QR kod okur (strateji cascade'i ile)"""
         try:
             # Görüntü geçerlilik kontrolü
             if image is None or image.size == 0:
                 return {'success': False, 'error': 'Geçersiz görüntü verisi'}
             
-            # Veri tipini kontrol et
-            if image.dtype != np.uint8:
-                image = image.astype(np.uint8)
+            gray = self.to_grayscale(image)
             
-            # OpenCV QRCodeDetector ile orijinal görüntü dene
-            try:
-                data, bbox, _ = self.detector.detectAndDecode(image)
-                if data:
-                    return {
-                        'success': True,
-                        'data': data,
-                        'method': 'OpenCV QRCodeDetector (Orijinal)'
-                    }
-            except Exception as opencv_error:
-                print(f"OpenCV orijinal hatası: {opencv_error}")
-            
-            # OpenCV QRCodeDetector ile iyileştirilmiş görüntü dene
-            try:
-                enhanced_image = self.enhance_image(image)
-                data, bbox, _ = self.detector.detectAndDecode(enhanced_image)
+            # Kod bulunup çözülemediyse (bbox var) çağıran daha yüksek çözünürlük deneyebilir
+            located = False
+            attempts = []
+            result = None
+            
+            self._frames += 1
+            explore = self._frames % self.reorder_every == 0
+            strategies = list(self.strategies)
+            if not explore:
+                strategies = strategies[:self.max_strategies] + [
+                    strategy for strategy in strategies[self.max_strategies:]
+                    if strategy.name in self.BASELINE_STRATEGIES
+                ]
+            
+            for strategy in strategies:
+                started = time.perf_counter()
+                try:
+                    data, found = strategy.func(gray)
+                except Exception as strategy_error:
+                    print(f"{strategy.label} hatası: {strategy_error}")
+                    data, found = None, False
+                elapsed = time.perf_counter() - started
+                
+                strategy.record(elapsed, bool(data))
+                attempts.append((strategy.name, round(elapsed * 1000, 3), bool(data)))
+                located = located or found
                 if data:
-                    return {
-                        'success': True,
-                        'data': data,
-                        'method': 'OpenCV QRCodeDetector + Enhancement'
-                    }
-            except Exception as opencv_enhanced_error:
-                print(f"OpenCV enhanced hatası: {opencv_enhanced_error}")
+                    result = {'success': True, 'data': data, 'method': strategy.label, 'attempts': attempts}
+                    break
             
-            return {'success': False, 'error': 'QR kod bulunamadı'}
+            if explore:
+                self.strategies = sorted(self.strategies, key=lambda item: item.expected_cost())
+            
+            return result or {'success': False, 'error': 'QR kod bulunamadı', 'located': located, 'attempts': attempts}
             
         except Exception as e:
             return {'success': False, 'error': f'QR okuma hatası: {str(e)}'}
     
+    def _detect(self, gray):
+        data, bbox, _ = self.detector.detectAndDecode(gray)
+        return data or None, bbox is not None
+    
+    def _decode_raw(self, gray):
+        return self._detect(gray)
+    
+    def _decode_clahe(self, gray):
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        return self._detect(clahe.apply(gray))
+    
+    def _decode_threshold(self, gray):
+        return self._detect(self.enhance_image(gray))
+    
+    def _decode_inverted(self, gray):
+        # Koyu zemin üzerinde açık renkli kodlar (örn. karanlık mod ekranlar)
+        return self._detect(cv2.bitwise_not(gray))
+    
+    def _decode_rotated(self, gray):
+        height, width = gray.shape[:2]
+        side = int(np.hypot(width, height))
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), 45, 1.0)
+        matrix[0, 2] += (side - width) / 2
+        matrix[1, 2] += (side - height) / 2
+        rotated = cv2.warpAffine(gray, matrix, (side, side), borderValue=255)
+        return self._detect(rotated)
+    
+    def _decode_pyzbar(self, gray):
+        symbols = pyzbar.decode(gray, symbols=[pyzbar.ZBarSymbol.QRCODE])
+        for symbol in symbols:
+            data = symbol.data.decode('utf-8', errors='replace')
+            if data:
+                return data, True
+        return None, bool(symbols)
+    
+    def to_grayscale(self, image):
+        """Görüntüyü gri tonlu uint8 diziye çevirir"""
+        if image.dtype != np.uint8:
+            image = image.astype(np.uint8)
+        if len(image.shape) == 3:
+            if image.shape[2] == 3:  # BGR
+                return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            if image.shape[2] == 4:  # BGRA
+                return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+            return image[:, :, 0]  # İlk kanalı al
+        return image
+    
     def enhance_image(self, image):
         """Görüntü iyileştirme işlemleri"""
         try:
@@ -101,20 +375,8 @@ class QRScanner:
             if image is None or image.size == 0:
                 return image
             
-            # Veri tipini uint8'e çevir
-            if image.dtype != np.uint8:
-                image = image.astype(np.uint8)
-            
             # Gri tonlamaya çevir
-            if len(image.shape) == 3:
-                if image.shape[2] == 3:  # BGR
-                    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                elif image.shape[2] == 4:  # BGRA
-                    gray = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
-                else:
-                    gray = image[:, :, 0]  # İlk kanalı al
-            else:
-                gray = image
+            gray = self.to_grayscale(image)
             
             # Görüntü boyut kontrolü
             if gray.shape[0] < 10 or gray.shape[1] < 10:
@@ -145,9 +407,145 @@ class QRScanner:
 # Global scanner instance
 qr_scanner = QRScanner()
 
-def scan_qr_from_base64(base64_image):
-    """Flask endpoint için QR okuma fonksiyonu"""
-    return qr_scanner.decode_from_base64(base64_image)
+# Süreç havuzu: her worker süreci kendi QRScanner örneğini bir kez oluşturur
+_worker_scanner = None
+
+def _init_decode_worker():
+    global _worker_scanner
+    _worker_scanner = QRScanner()
+    # Worker içinde OpenCV'nin ek iş parçacığı açmasını engelle (çekirdekler süreçlere ait)
+    cv2.setNumThreads(1)
+
+def _decode_bytes_in_worker(image_data):
+    return _worker_scanner.decode_from_bytes(image_data)
+
+def _decode_many_bytes_in_worker(image_data):
+    return _worker_scanner.decode_many(image_data)
+
+def scan_qr_from_bytes(image_data):
+    """Ham görüntü baytlarından (JPEG/PNG) QR okur"""
+    return qr_scanner.decode_from_bytes(image_data)
+
+def scan_many_qr_from_bytes(image_data):
+    """Ham görüntü baytlarındaki tüm QR kodlarını okur"""
+    return qr_scanner.decode_many(image_data)
+
+class QRDecodePool:
+    """QR çözümlemeyi Flask iş parçacıklarından ayrı süreçlerde çalıştırır
+
+    - workers: süreç sayısı (0 ise çözümleme istek iş parçacığında yapılır)
+    - max_pending: aynı anda kuyrukta/çalışmakta olabilecek en fazla kare;
+      aşılırsa istek beklemeden 'busy' ile reddedilir (backpressure)
+    - timeout: bir karenin sonucunu bekleme süresi (saniye)
+
+    Havuz başlatılamaz veya çökerse çözümleme geçici olarak istek iş parçacığında
+    yapılır ve havuz retry_seconds sonra yeniden kurulur.
+    """
+    
+    def __init__(self, workers=2, max_pending=8, timeout=5.0, retry_seconds=30.0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self._executor = None
+        self._broken_until = 0.0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.metrics = DecodeMetrics()
+        self.rejected = 0
+        self.timeouts = 0
+    
+    def _get_executor(self):
+        if self.workers <= 0 or time.monotonic() < self._broken_until:
+            return None
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: Flask sürecindeki DB bağlantıları ve iş parçacıkları kopyalanmaz.
+                    # Worker'lar ana modülü bir kez içe aktarır; sunucu başlatma kodu
+                    # `if __name__ == '__main__'` bloğunda kalmalıdır.
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_decode_worker
+                    )
+        return self._executor
+    
+    def _mark_broken(self, error):
+        print(f"QR çözümleme havuzu devre dışı ({error}); {self.retry_seconds:.0f} sn yerel çözümleme")
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._broken_until = time.monotonic() + self.retry_seconds
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+    
+    def decode_bytes(self, image_data):
+        """Ham görüntü baytlarından QR kod okur; sonuç scan_qr_from_bytes ile aynı biçimdedir"""
+        return self._run(_decode_bytes_in_worker, scan_qr_from_bytes, image_data)
+    
+    def decode_many_bytes(self, image_data):
+        """Ham görüntü baytlarındaki tüm QR kodlarını okur"""
+        return self._run(_decode_many_bytes_in_worker, scan_many_qr_from_bytes, image_data)
+    
+    def _run(self, worker_func, local_func, payload):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                return {'success': False, 'busy': True, 'error': 'QR okuma servisi yoğun, lütfen tekrar deneyin'}
+            self._pending += 1
+        
+        try:
+            executor = self._get_executor()
+        except Exception as e:
+            self._mark_broken(e)
+            executor = None
+        
+        if executor is None:
+            # Yerel çözümleme (havuz kapalı veya geçici olarak devre dışı)
+            try:
+                return self.metrics.record(local_func(payload))
+            finally:
+                self._release()
+        
+        try:
+            future = executor.submit(worker_func, payload)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._mark_broken(e)
+            try:
+                return self.metrics.record(local_func(payload))
+            finally:
+                self._release()
+        
+        # Kuyruk sayacı iş gerçekten bittiğinde azalır; zaman aşımı CPU yükünü gizlemez
+        future.add_done_callback(self._release)
+        try:
+            return self.metrics.record(future.result(timeout=self.timeout))
+        except FutureTimeoutError:
+            self.timeouts += 1
+            return {'success': False, 'busy': True, 'error': 'QR okuma zaman aşımına uğradı'}
+        except BrokenProcessPool as e:
+            self._mark_broken(e)
+            return {'success': False, 'busy': True, 'error': 'QR okuma servisi yeniden başlatılıyor'}
+    
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'pending': self._pending,
+            'max_pending': self.max_pending,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+            'degraded': time.monotonic() < self._broken_until
+        }
+    
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
 
 if __name__ == "__main__":
     # Test
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Puan defteri uzlaştırma işi (cron ile periyodik çalıştırılabilir)
+
+1. Özetten sonra yeterince satır biriken kullanıcıların bakiye özetlerini ilerletir.
+2. Her özeti defter toplamına karşı doğrular; eksi bakiyeleri ve eski bakiyesi
+   olup açılış satırı yazılmamış kullanıcıları listeler. Sorun varsa çıkış kodu 1'dir.
+
+Kullanım:
+    python reconcile_points_ledger.py
+    python reconcile_points_ledger.py --min-tail 1
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, refresh_point_snapshots, reconcile_point_ledger
+
+def main():
+    parser = argparse.ArgumentParser(description='Puan defteri uzlaştırma')
+    parser.add_argument('--min-tail', type=int, default=None, help='Özet alınacak en az yeni satır (varsayılan: POINT_SNAPSHOT_MIN_TAIL)')
+    parser.add_argument('--limit', type=int, default=20, help='Listelenecek en fazla uyuşmazlık')
+    args = parser.parse_args()
+    
+    with app.app_context():
+        refreshed = refresh_point_snapshots(min_tail=args.min_tail)
+        print(f"🔄 {refreshed} kullanıcının bakiye özeti güncellendi")
+        
+        report = reconcile_point_ledger()
+        print(f"📊 {report['checked_users']} kullanıcı kontrol edildi")
+        for user_id, snapshot_balance, ledger_total in report['snapshot_mismatches'][:args.limit]:
+            print(f"   ❌ Özet uyuşmazlığı: kullanıcı {user_id} özet={snapshot_balance} defter={ledger_total}")
+        for user_id, balance in report['negative_balances'][:args.limit]:
+            print(f"   ❌ Eksi bakiye: kullanıcı {user_id} bakiye={balance}")
+        for user_id, legacy_points in report['unopened_users'][:args.limit]:
+            print(f"   ❌ Açılış satırı yok: kullanıcı {user_id} eski bakiye={legacy_points} (backfill_points_ledger.py)")
+        
+        if report['snapshot_mismatches'] or report['negative_balances'] or report['unopened_users']:
+            print(f"❌ {len(report['snapshot_mismatches'])} özet uyuşmazlığı, {len(report['negative_balances'])} eksi bakiye, "
+                  f"{len(report['unopened_users'])} açılmamış hesap")
+            sys.exit(1)
+        print("✅ Puan defteri özetlerle tutarlı")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Bekleyen, hata almış veya yarıda kalmış kampanya dağıtım işlerini (campaign_fanout)
+sonuna kadar çalıştıran iş (cron ile periyodik çalıştırılabilir)
+
+İşler compare-and-set ile sahiplenilir; başka bir süreçte canlı çalışan iş
+atlanır, çöken sürecin işi CAMPAIGN_FANOUT_STALE_SECONDS sonra devralınır.
+CAMPAIGN_FANOUT_MAX_ATTEMPTS denemede bitmeyen işler 'abandoned' olarak
+bırakılır ve listelenir; bunlar çıkış kodunu etkilemez.
+
+Kullanım:
+    python resume_campaign_fanouts.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, CampaignFanout, CAMPAIGN_FANOUT_OPEN_STATUSES, resume_campaign_fanouts
+
+def main():
+    with app.app_context():
+        resumed = resume_campaign_fanouts()
+        print(f"🔄 {resumed} dağıtım işi çalıştırıldı")
+        
+        for job in CampaignFanout.query.filter_by(status='abandoned').all():
+            print(f"⚠️ Bırakılan dağıtım: kampanya {job.campaign_id} ({job.channel}), "
+                  f"{job.attempts} deneme, son hata: {job.last_error}")
+        
+        unfinished = CampaignFanout.query.filter(CampaignFanout.status.in_(CAMPAIGN_FANOUT_OPEN_STATUSES)).count()
+        if unfinished:
+            print(f"❌ {unfinished} dağıtım işi tamamlanamadı")
+            sys.exit(1)
+        print("✅ Tüm kampanya dağıtımları tamamlandı")
+
+if __name__ == '__main__':
+    main()
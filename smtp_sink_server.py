@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Yerel SMTP çukuru (sink)
+
+Kampanya e-posta dağıtımını gerçek bir posta sunucusuna gitmeden denemek için
+kullanılır. Gelen her mesajı kabul eder, hiçbir yere iletmez; yalnızca bağlantı,
+mesaj ve alıcı sayılarını tutar.
+
+--fail-after N verilirse N. mesajdan sonra bağlantıyı bir kez koparır
+(yarıda kalan işin kaldığı yerden devam etmesini denemek için).
+
+Kullanım:
+    python smtp_sink_server.py --port 2525
+"""
+
+import argparse
+import socketserver
+import threading
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode('ascii'))
+
+    def handle(self):
+        server = self.server
+        server.count('connections')
+        recipients = []
+        self.reply('220 reev-smtp-sink ESMTP')
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 reev-smtp-sink')
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[-1].strip().strip('<>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                    pass
+                if server.should_fail():
+                    # Bağlantıyı yanıt vermeden kopar
+                    return
+                server.record(recipients)
+                self.reply('250 OK queued')
+            elif verb == 'RSET':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'NOOP':
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPSinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, fail_after=0):
+        super().__init__(address, SMTPSinkHandler)
+        self.fail_after = fail_after
+        self.stats = {'connections': 0, 'messages': 0}
+        self.recipients = []
+        self._lock = threading.Lock()
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def should_fail(self):
+        with self._lock:
+            if self.fail_after and self.stats['messages'] >= self.fail_after:
+                self.fail_after = 0
+                return True
+            return False
+
+    def record(self, recipients):
+        with self._lock:
+            self.stats['messages'] += 1
+            self.recipients.extend(recipients)
+
+
+def start_smtp_sink(host='127.0.0.1', port=0, fail_after=0):
+    """SMTP sink'i arka plan thread'inde başlatır (port=0 ise boş port seçilir)"""
+    server = SMTPSinkServer((host, port), fail_after=fail_after)
+    threading.Thread(target=server.serve_forever, name='smtp-sink', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Yerel SMTP sink')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2525)
+    parser.add_argument('--fail-after', type=int, default=0, help='N mesajdan sonra bağlantıyı bir kez kopar')
+    args = parser.parse_args()
+
+    server = SMTPSinkServer((args.host, args.port), fail_after=args.fail_after)
+    print(f"📭 SMTP sink çalışıyor: {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {server.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -101,17 +101,25 @@ class LocalQRScanner {
                 this.canvasElement.height
             );
 
-            // Canvas'ı base64'e çevir
-            const base64Image = this.canvasElement.toDataURL('image/jpeg', 0.8);
+            // Canvas'ı JPEG olarak al (base64 yerine ham bayt: %33 daha küçük gövde)
+            const imageBlob = await new Promise(resolve => {
+                this.canvasElement.toBlob(resolve, 'image/jpeg', 0.8);
+            });
 
             // Backend'e gönder
-            const response = await fetch('/scan_qr_local', {
+            const response = imageBlob ? await fetch('/scan_qr_local', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'image/jpeg',
+                },
+                body: imageBlob
+            }) : await fetch('/scan_qr_local', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
-                    image: base64Image
+                    image: this.canvasElement.toDataURL('image/jpeg', 0.8)
                 })
             });
 
@@ -219,5 +227,97 @@ class LocalQRScanner {
     }
 }
 
+/**
+ * Sürekli tarama yapan şube terminali: kareler tek bir okutma oturumuna gönderilir,
+ * puan/ret olayları sunucudan Server-Sent Events ile gelir. Sunucu eski kareleri
+ * atar ve her kodu oturum boyunca bir kez işler; tarama ilk koddan sonra durmaz.
+ */
+class StreamingQRScanner extends LocalQRScanner {
+    constructor() {
+        super();
+        this.stream = null;
+        this.events = null;
+        this.frameInFlight = false;
+    }
+
+    async startFrameCapture() {
+        try {
+            const response = await fetch('/scan_stream', { method: 'POST' });
+            this.stream = await response.json();
+            if (!this.stream.success) {
+                throw new Error(this.stream.error);
+            }
+        } catch (error) {
+            // Oturum açılamazsa tek kare modu
+            console.warn('Akışlı okutma açılamadı, tek kare moduna geçiliyor:', error);
+            this.stream = null;
+            super.startFrameCapture();
+            return;
+        }
+
+        this.events = new EventSource(this.stream.events_url);
+        this.events.addEventListener('credit', event => this.onStreamEvent(JSON.parse(event.data)));
+        this.events.addEventListener('rejected', event => this.onStreamEvent(JSON.parse(event.data)));
+        this.events.addEventListener('closed', () => this.stopScanning());
+
+        this.scanInterval = setInterval(() => {
+            this.pushFrame();
+        }, 200);
+    }
+
+    async pushFrame() {
+        // Önceki kare yüklenmeden yenisi gönderilmez (sunucu zaten en yeni kareyi işler)
+        if (this.frameInFlight || !this.videoElement || this.videoElement.readyState !== 4) {
+            return;
+        }
+
+        this.frameInFlight = true;
+        try {
+            this.canvasElement.width = this.videoElement.videoWidth;
+            this.canvasElement.height = this.videoElement.videoHeight;
+            this.context.drawImage(this.videoElement, 0, 0, this.canvasElement.width, this.canvasElement.height);
+
+            const imageBlob = await new Promise(resolve => {
+                this.canvasElement.toBlob(resolve, 'image/jpeg', 0.8);
+            });
+            if (imageBlob) {
+                await fetch(this.stream.frames_url, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'image/jpeg' },
+                    body: imageBlob
+                });
+            }
+        } catch (error) {
+            console.error('Kare gönderim hatası:', error);
+        } finally {
+            this.frameInFlight = false;
+        }
+    }
+
+    onStreamEvent(event) {
+        const success = event.type === 'credit';
+        this.resultsElement.innerHTML =
+            `<div class="alert alert-${success ? 'success' : 'warning'}"><i class="fas fa-${success ? 'check-circle' : 'exclamation-triangle'}"></i> ` +
+            `<strong>${success ? event.message : event.error}</strong><br>Kod: <code>${event.data}</code></div>`;
+
+        if (typeof this.onCredit === 'function' && success) {
+            this.onCredit(event);
+        }
+    }
+
+    stopScanning() {
+        if (this.events) {
+            this.events.close();
+            this.events = null;
+        }
+        if (this.stream) {
+            fetch(`/scan_stream/${this.stream.stream_id}`, { method: 'DELETE' }).catch(() => {});
+            this.stream = null;
+        }
+        super.stopScanning();
+    }
+}
+
 // Global instance
 const localQRScanner = new LocalQRScanner();
+const streamingQRScanner = new StreamingQRScanner();
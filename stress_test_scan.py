@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+QR okutma servisi için çok iş parçacıklı stres testi
+
+Sabah yoğunluğunu simüle eder: birden fazla şube terminali aynı QR kodlarını
+eşzamanlı okutur. claim_customer_qr() her kod için tam olarak bir kez puan
+vermeli, hiçbir müşteriye çift puan yazılmamalıdır.
+
+Kullanım:
+    python stress_test_scan.py --terminals 8 --customers 200 --codes-per-customer 5 --duplicates 3
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# Testi canlı veritabanından ayrı, geçici bir SQLite dosyasında çalıştır
+_tmp_dir = tempfile.mkdtemp(prefix='reev_stress_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'stress.db')}"
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, db, User, Branch, CustomerQR, CustomerPointsDaily, CustomerBranchTotal, claim_customer_qr
+
+
+def seed(customers, codes_per_customer):
+    """Test müşterilerini, şubeyi ve QR kodlarını oluştur"""
+    with app.app_context():
+        db.create_all()
+        branch = Branch(name='Stres Şube', email='stress@reev.test', password_hash='x')
+        db.session.add(branch)
+
+        users = []
+        for i in range(customers):
+            user = User(name=f'Müşteri {i}', email=f'musteri{i}@reev.test', phone='0', password_hash='x')
+            users.append(user)
+        db.session.add_all(users)
+        db.session.flush()
+
+        codes = []
+        for user in users:
+            for j in range(codes_per_customer):
+                code = f'STRESS{user.id}X{j}'
+                db.session.add(CustomerQR(code=code, customer_id=user.id))
+                codes.append(code)
+        db.session.commit()
+        return branch.id, codes
+
+
+def terminal(scans, branch_id, results, lock):
+    """Tek bir şube terminali: kendisine düşen kodları sırayla okutur"""
+    latencies = []
+    ok = used = errors = 0
+    with app.app_context():
+        for code in scans:
+            started = time.perf_counter()
+            try:
+                result = claim_customer_qr(code, branch_id=branch_id)
+                if result['success']:
+                    ok += 1
+                else:
+                    used += 1
+            except Exception as e:
+                db.session.rollback()
+                errors += 1
+                print(f"❌ Terminal hatası ({code}): {e}")
+            latencies.append(time.perf_counter() - started)
+        db.session.remove()
+
+    with lock:
+        results['ok'] += ok
+        results['used'] += used
+        results['errors'] += errors
+        results['latencies'].extend(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='QR okutma stres testi')
+    parser.add_argument('--terminals', type=int, default=8, help='Eşzamanlı şube terminali sayısı')
+    parser.add_argument('--customers', type=int, default=200, help='Müşteri sayısı')
+    parser.add_argument('--codes-per-customer', type=int, default=5, help='Müşteri başına QR kod')
+    parser.add_argument('--duplicates', type=int, default=3, help='Her kodun kaç kez okutulacağı')
+    args = parser.parse_args()
+
+    print(f"🔄 Veritabanı hazırlanıyor: {os.environ['DATABASE_URL']}")
+    branch_id, codes = seed(args.customers, args.codes_per_customer)
+
+    # Her kod birden fazla kez, karışık sırayla ve farklı terminallere dağıtılır
+    scans = codes * args.duplicates
+    random.shuffle(scans)
+    chunks = [scans[i::args.terminals] for i in range(args.terminals)]
+
+    results = {'ok': 0, 'used': 0, 'errors': 0, 'latencies': []}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=terminal, args=(chunk, branch_id, results, lock)) for chunk in chunks]
+
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(results['latencies'])
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0
+
+    print(f"📊 {len(scans)} okutma / {args.terminals} terminal / {elapsed:.2f} sn")
+    print(f"   Hız: {len(scans) / elapsed:.0f} okutma/sn, p50: {p50:.1f} ms, p99: {p99:.1f} ms")
+    print(f"   Başarılı: {results['ok']}, zaten kullanılmış: {results['used']}, hata: {results['errors']}")
+
+    # Tutarlılık kontrolleri
+    with app.app_context():
+        total_points = db.session.query(db.func.coalesce(db.func.sum(User.points), 0)).select_from(User).scalar()
+        used_codes = CustomerQR.query.filter_by(is_used=True).count()
+        wrong_balances = db.session.query(User.id).filter(
+            User.points != db.session.query(db.func.count(CustomerQR.id))
+            .filter(CustomerQR.customer_id == User.id, CustomerQR.is_used == True)
+            .correlate(User).scalar_subquery()
+        ).count()
+        daily_points = db.session.query(db.func.coalesce(db.func.sum(CustomerPointsDaily.points), 0)).scalar()
+        branch_points = db.session.query(db.func.coalesce(db.func.sum(CustomerBranchTotal.points), 0)).scalar()
+
+    failures = []
+    if results['errors']:
+        failures.append(f"{results['errors']} okutma hata ile sonuçlandı")
+    if results['ok'] != len(codes):
+        failures.append(f"başarılı okutma {results['ok']}, beklenen {len(codes)}")
+    if used_codes != len(codes) or total_points != len(codes):
+        failures.append(f"kullanılan kod {used_codes}, toplam puan {total_points}, beklenen {len(codes)}")
+    if daily_points != total_points or branch_points != total_points:
+        failures.append(f"puan özetleri (günlük {daily_points}, şube {branch_points}) toplam puanla ({total_points}) uyuşmuyor")
+    if wrong_balances:
+        failures.append(f"{wrong_balances} müşterinin bakiyesi QR geçmişiyle uyuşmuyor")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+
+    print("✅ Çift puan yok: her kod tam olarak bir kez kullanıldı")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,12 @@
-from app import app
+from app import app, wake_push_dispatcher, start_campaign_fanout_worker
 
 # IIS için WSGI application
 application = app
 
+# Yeniden başlatmadan önce kuyrukta kalan push kayıtları beklemeden gönderilsin
+wake_push_dispatcher()
+# Yarıda kalmış veya hata almış kampanya dağıtımlarına devam et
+start_campaign_fanout_worker()
+
 if __name__ == "__main__":
     app.run()